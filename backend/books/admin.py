@@ -1,4 +1,11 @@
-from django.contrib import admin
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+from .exceptions import TransferError
 from .models import (
     UserProfile,
     Library,
@@ -15,7 +22,42 @@ from .models import (
     BookElectronic,
     BookPage,
     BookReadingDate,
+    AutoFillCacheEntry,
 )
+from .services.book_bulk import BookBulkService
+from .services.hashtag_service import HashtagService
+from .services.row_counts import bounded_count, table_row_estimate
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Количество строк без полного COUNT(*): для списка без фильтров - оценка
+    PostgreSQL (pg_class.reltuples), если она больше ADMIN_EXACT_COUNT_LIMIT;
+    иначе COUNT не дальше ADMIN_EXACT_COUNT_LIMIT строк (дальше страницы не листаются,
+    нужные объекты находятся фильтрами и поиском)
+    """
+    
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limit = getattr(settings, 'ADMIN_EXACT_COUNT_LIMIT', 10000)
+        if not queryset.query.has_filters():
+            estimate = table_row_estimate(queryset.model, queryset.db)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return bounded_count(queryset, limit)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Админка таблиц с миллионами строк: оценка количества, без второго COUNT для «Показать все»"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.display(description='Книга')
+def book_title(obj):
+    """Название книги без Book.__str__ (он запрашивает авторов для каждой строки)"""
+    return obj.book.title
 
 
 @admin.register(UserProfile)
@@ -34,28 +76,32 @@ class LibraryAdmin(admin.ModelAdmin):
 
 
 @admin.register(Hashtag)
-class HashtagAdmin(admin.ModelAdmin):
+class HashtagAdmin(LargeTableAdmin):
     list_display = ['name', 'slug', 'creator', 'created_at']
-    list_filter = ['creator', 'created_at']
+    list_select_related = ['creator']
     search_fields = ['name', 'slug']
+    autocomplete_fields = ['creator']
     readonly_fields = ['created_at']
     prepopulated_fields = {'slug': ('name',)}
 
 
 @admin.register(BookHashtag)
-class BookHashtagAdmin(admin.ModelAdmin):
-    list_display = ['book', 'hashtag', 'created_at']
-    list_filter = ['created_at']
+class BookHashtagAdmin(LargeTableAdmin):
+    list_display = [book_title, 'hashtag', 'created_at']
+    list_select_related = ['book', 'hashtag']
     search_fields = ['book__title', 'hashtag__name']
     readonly_fields = ['created_at']
+    autocomplete_fields = ['book', 'hashtag']
 
 
 @admin.register(BookReview)
-class BookReviewAdmin(admin.ModelAdmin):
-    list_display = ['book', 'user', 'rating', 'created_at']
+class BookReviewAdmin(LargeTableAdmin):
+    list_display = [book_title, 'user', 'rating', 'created_at']
+    list_select_related = ['book', 'user']
     list_filter = ['rating', 'created_at']
     search_fields = ['book__title', 'user__username', 'review_text']
     readonly_fields = ['created_at', 'updated_at']
+    autocomplete_fields = ['book', 'user']
 
 
 @admin.register(Category)
@@ -92,16 +138,53 @@ class LanguageAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at', 'updated_at']
 
 
+class BookActionForm(ActionForm):
+    """Параметры массовых действий над книгами (рядом со списком действий)"""
+    library_id = forms.IntegerField(required=False, label='ID библиотеки')
+    owner_id = forms.IntegerField(required=False, label='ID пользователя')
+    hashtags = forms.CharField(required=False, label='Хэштеги через запятую')
+
+
+class BookAuthorInline(admin.TabularInline):
+    model = BookAuthor
+    autocomplete_fields = ['author']
+    extra = 0
+    max_num = 3
+
+
+class BookHashtagInline(admin.TabularInline):
+    model = BookHashtag
+    autocomplete_fields = ['hashtag']
+    readonly_fields = ['created_at']
+    extra = 0
+
+
+def enqueued_message(modeladmin, request, job):
+    """Сообщение о постановке массовой операции в очередь (или о результате, если она уже выполнена)"""
+    if job.status == 'done':
+        modeladmin.message_user(request, f'{job.name}: обработано {job.processed}', messages.SUCCESS)
+    elif job.status == 'failed':
+        modeladmin.message_user(request, f'{job.name}: ошибка - {job.error}', messages.ERROR)
+    else:
+        modeladmin.message_user(
+            request, f'{job.name}: задача #{job.id} поставлена в очередь (статус - GET /api/profiling/)'
+        )
+
+
 @admin.register(Book)
-class BookAdmin(admin.ModelAdmin):
-    list_display = ['title', 'owner', 'category', 'status', 'year', 'language', 'cover_page', 'created_at']
-    list_filter = ['status', 'category', 'binding_type', 'format', 'condition', 'year', 'language', 'created_at']
-    search_fields = ['title', 'subtitle', 'isbn', 'owner__username']
+class BookAdmin(LargeTableAdmin):
+    list_display = ['title', 'owner', 'category', 'status', 'year', 'language', 'has_cover', 'created_at']
+    list_select_related = ['owner', 'category', 'language']
+    # Только фильтры по индексированным столбцам (FK и created_at) без запросов DISTINCT по таблице книг
+    list_filter = ['category', 'language', 'created_at']
+    search_fields = ['title', 'subtitle', '=isbn', '=owner__username']
     readonly_fields = ['created_at', 'updated_at']
     raw_id_fields = ['cover_page']
-    filter_horizontal = ['authors', 'hashtags']
-    # ManyToMany поля с through моделями нельзя включать в fieldsets
-    # Они будут автоматически добавлены Django admin через filter_horizontal
+    autocomplete_fields = ['owner', 'library', 'category', 'publisher', 'language']
+    # ManyToMany поля с through моделями нельзя включать в fieldsets - они редактируются inline
+    inlines = [BookAuthorInline, BookHashtagInline]
+    action_form = BookActionForm
+    actions = ['transfer_books', 'add_hashtags', 'remove_hashtags', 'reprocess_book_pages']
     fieldsets = (
         ('Основная информация', {
             'fields': ('title', 'subtitle', 'category', 'status', 'cover_page')
@@ -126,46 +209,117 @@ class BookAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    @admin.display(description='Обложка', boolean=True)
+    def has_cover(self, obj):
+        return obj.cover_page_id is not None
+    
+    def action_params(self, request):
+        form = self.action_form(request.POST)
+        form.is_valid()
+        return form.cleaned_data
+    
+    def hashtag_names(self, request):
+        names = [HashtagService.normalize_name(name) for name in self.action_params(request).get('hashtags', '').split(',')]
+        return [name for name in names if name]
+    
+    @admin.action(description='Передать в библиотеку / пользователю (ID в поле действия)')
+    def transfer_books(self, request, queryset):
+        params = self.action_params(request)
+        try:
+            job = BookBulkService.enqueue_transfer(queryset, params.get('library_id'), params.get('owner_id'))
+        except TransferError as e:
+            self.message_user(request, str(e), messages.ERROR)
+            return
+        enqueued_message(self, request, job)
+    
+    @admin.action(description='Добавить хэштеги (общие, через запятую в поле действия)')
+    def add_hashtags(self, request, queryset):
+        names = self.hashtag_names(request)
+        if not names:
+            self.message_user(request, 'Укажите хэштеги', messages.ERROR)
+            return
+        hashtag_ids = [HashtagService.get_or_create_hashtag(name, None)[0].id for name in names]
+        enqueued_message(self, request, BookBulkService.enqueue_retag(queryset, add_ids=hashtag_ids))
+    
+    @admin.action(description='Удалить хэштеги (через запятую в поле действия)')
+    def remove_hashtags(self, request, queryset):
+        names = self.hashtag_names(request)
+        if not names:
+            self.message_user(request, 'Укажите хэштеги', messages.ERROR)
+            return
+        hashtag_ids = list(
+            Hashtag.objects.filter(name__in=[f'#{name}' for name in names]).values_list('id', flat=True)
+        )
+        enqueued_message(self, request, BookBulkService.enqueue_retag(queryset, remove_ids=hashtag_ids))
+    
+    @admin.action(description='Обработать страницы заново')
+    def reprocess_book_pages(self, request, queryset):
+        pages = BookPage.objects.filter(book__in=queryset.values('pk'))
+        enqueued_message(self, request, BookBulkService.enqueue_reprocess(pages))
 
 
 @admin.register(BookAuthor)
-class BookAuthorAdmin(admin.ModelAdmin):
-    list_display = ['book', 'author', 'order']
-    list_filter = ['order']
+class BookAuthorAdmin(LargeTableAdmin):
+    list_display = [book_title, 'author', 'order']
+    list_select_related = ['book', 'author']
     search_fields = ['book__title', 'author__full_name']
-    ordering = ['book', 'order']
+    autocomplete_fields = ['book', 'author']
+    ordering = ['book_id', 'order']
 
 
 @admin.register(BookImage)
-class BookImageAdmin(admin.ModelAdmin):
-    list_display = ['book', 'order', 'created_at']
+class BookImageAdmin(LargeTableAdmin):
+    list_display = [book_title, 'order', 'created_at']
+    list_select_related = ['book']
     list_filter = ['created_at']
     search_fields = ['book__title']
     readonly_fields = ['created_at']
-    ordering = ['book', 'order']
+    autocomplete_fields = ['book']
+    ordering = ['book_id', 'order']
 
 
 @admin.register(BookElectronic)
-class BookElectronicAdmin(admin.ModelAdmin):
-    list_display = ['book', 'format', 'created_at']
+class BookElectronicAdmin(LargeTableAdmin):
+    list_display = [book_title, 'format', 'created_at']
+    list_select_related = ['book']
     list_filter = ['format', 'created_at']
     search_fields = ['book__title']
     readonly_fields = ['created_at']
+    autocomplete_fields = ['book']
 
 
 @admin.register(BookPage)
-class BookPageAdmin(admin.ModelAdmin):
-    list_display = ['book', 'page_number', 'processing_status', 'processed_at']
-    list_filter = ['processing_status', 'processed_at', 'created_at']
+class BookPageAdmin(LargeTableAdmin):
+    list_display = [book_title, 'page_number', 'processing_status', 'processed_at']
+    list_select_related = ['book']
+    # processing_status - индекс books_page_status_idx
+    list_filter = ['processing_status']
     search_fields = ['book__title']
     readonly_fields = ['created_at', 'processed_at']
-    ordering = ['book', 'page_number']
+    autocomplete_fields = ['book']
+    ordering = ['book_id', 'page_number']
+    actions = ['reprocess_pages']
+    
+    @admin.action(description='Обработать выбранные страницы заново')
+    def reprocess_pages(self, request, queryset):
+        enqueued_message(self, request, BookBulkService.enqueue_reprocess(queryset))
 
 
 @admin.register(BookReadingDate)
-class BookReadingDateAdmin(admin.ModelAdmin):
-    list_display = ['book', 'date', 'created_at']
+class BookReadingDateAdmin(LargeTableAdmin):
+    list_display = [book_title, 'date', 'created_at']
+    list_select_related = ['book']
     list_filter = ['date', 'created_at']
     search_fields = ['book__title', 'notes']
     readonly_fields = ['created_at', 'updated_at']
-    ordering = ['book', '-date']
+    autocomplete_fields = ['book']
+    ordering = ['book_id', '-date']
+
+
+@admin.register(AutoFillCacheEntry)
+class AutoFillCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ['key', 'model_name', 'prompt_version', 'images_count', 'hits', 'last_hit_at', 'created_at']
+    list_filter = ['model_name', 'prompt_version', 'created_at']
+    search_fields = ['key']
+    readonly_fields = ['created_at', 'last_hit_at', 'hits']
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BooksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'books'
+
+    def ready(self):
+        from .services.profiling import install_serializer_timing
+        install_serializer_timing()
@@ -13,3 +13,6 @@ MAX_IMAGE_ORDER = 20
 # Лимит страниц для обработки
 MAX_PAGES_BATCH_SIZE = 100
 
+
+# Лимит книг в одном запросе пакетного автозаполнения
+MAX_AUTOFILL_BATCH_SIZE = 20
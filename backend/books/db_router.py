@@ -0,0 +1,137 @@
+"""
+Маршрутизация запросов к БД: чтение в GET/HEAD - на реплики
+
+ReplicaRoutingMiddleware открывает для каждого HTTP-запроса состояние
+маршрутизации, ReplicaRouter по нему выбирает базу:
+- чтение в безопасных методах (GET/HEAD) идет на одну из реплик
+  (DATABASE_REPLICAS), выбранную на весь запрос;
+- запись и чтение после записи в том же запросе, чтение внутри транзакции
+  и все остальные методы - на основную базу;
+- после записи клиент закрепляется за основной базой на REPLICA_PIN_SECONDS
+  (read-your-writes): cookie для браузера и ключ в кэше для JWT-пользователя;
+- недоступная реплика исключается на REPLICA_RETRY_SECONDS, запрос читает
+  из основной базы.
+
+Вне HTTP-запросов (management-команды, shell) маршрутизация не меняется.
+"""
+import contextvars
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+PIN_COOKIE_NAME = 'db_pin'
+PIN_CACHE_KEY = 'db_pin:user:{user_id}'
+
+
+@dataclass
+class RoutingState:
+    """Маршрутизация в рамках одного HTTP-запроса"""
+    use_replica: bool
+    replica: Optional[str] = None  # Выбранная реплика (одна на весь запрос)
+    wrote: bool = False  # В запросе была запись
+
+
+_state: contextvars.ContextVar[Optional[RoutingState]] = contextvars.ContextVar('db_routing_state', default=None)
+
+
+def get_replicas() -> List[str]:
+    """Алиасы реплик для чтения"""
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def current_state() -> Optional[RoutingState]:
+    return _state.get()
+
+
+@contextmanager
+def routing(use_replica: bool) -> Iterator[RoutingState]:
+    """Состояние маршрутизации на время запроса (use_replica - чтение с реплики разрешено)"""
+    state = RoutingState(use_replica=use_replica)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+class ReplicaHealth:
+    """Реплики с ошибками подключения исключаются из выбора на REPLICA_RETRY_SECONDS"""
+
+    _failed_until: Dict[str, float] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def mark_failed(cls, alias: str) -> None:
+        retry = getattr(settings, 'REPLICA_RETRY_SECONDS', 30)
+        with cls._lock:
+            cls._failed_until[alias] = time.monotonic() + retry
+
+    @classmethod
+    def is_available(cls, alias: str) -> bool:
+        return cls._failed_until.get(alias, 0) <= time.monotonic()
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._failed_until.clear()
+
+
+def choose_replica() -> Optional[str]:
+    """Доступная реплика в случайном порядке (с проверкой подключения) или None"""
+    candidates = [alias for alias in get_replicas() if ReplicaHealth.is_available(alias)]
+    random.shuffle(candidates)
+    for alias in candidates:
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            ReplicaHealth.mark_failed(alias)
+            continue
+        return alias
+    return None
+
+
+def fall_back_to_primary(state: RoutingState) -> None:
+    """Отказ реплики во время запроса: реплика исключается, дальнейшее чтение - из основной базы"""
+    if state.replica is not None:
+        ReplicaHealth.mark_failed(state.replica)
+    state.use_replica = False
+    state.replica = None
+
+
+class ReplicaRouter:
+    """Роутер Django (DATABASE_ROUTERS): см. описание модуля"""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not get_replicas():
+            return None
+        if not state.use_replica or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Явно: иначе Django взял бы базу объекта из hints (возможно, реплику)
+            return DEFAULT_DB_ALIAS
+        if state.replica is None:
+            state.replica = choose_replica()
+            if state.replica is None:
+                state.use_replica = False
+                return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            # Чтение после записи в этом же запросе - из основной базы
+            state.wrote = True
+            state.use_replica = False
+        # Объекты, прочитанные с реплики, сохраняются в основную базу
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -22,3 +22,16 @@ class BookValidationError(BookException):
     """Ошибка валидации книги"""
     pass
 
+
+
+class QueryBudgetExceeded(Exception):
+    """Маршрут выполнил больше SQL-запросов, чем разрешено бюджетом (строгий режим профилирования)"""
+    pass
+
+
+class AdmissionRejected(Exception):
+    """Запрос к тяжелому эндпоинту не допущен: превышен лимит частоты или нет свободного слота"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
@@ -0,0 +1,235 @@
+"""
+Management команда для нагрузочного тестирования автозаполнения
+Выполняет N запросов POST /api/books/auto-fill/ от параллельных клиентов (полный путь запроса:
+middleware, разбор тела, JWT-аутентификация, контроль допуска, профилирование, async view)
+и выводит пропускную способность, перцентили задержки и статистику повторных попыток
+"""
+import json
+import math
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Any
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from PIL import Image
+from rest_framework_simplejwt.tokens import AccessToken
+
+from books.services.llm_client import get_llm_client
+from books.services.llm_stub import StubConfig, start_stub_server
+
+# Временные пользователи нагрузочного теста (по одному на параллельного клиента)
+LOAD_TEST_USERNAME_PREFIX = 'autofill_load_test_'
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Перцентиль методом ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочное тестирование автозаполнения (рекомендуется вместе с заглушкой LLM)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Количество вызовов (по умолчанию: 50)')
+        parser.add_argument('--concurrency', type=int, default=8, help='Параллельных клиентов (по умолчанию: 8)')
+        parser.add_argument('--image', action='append', default=[], help='Путь к изображению (можно несколько)')
+        parser.add_argument('--use-cache', action='store_true', help='Использовать кэш ответов (по умолчанию обход)')
+        parser.add_argument('--stub', action='store_true', help='Запустить заглушку LLM в этом процессе')
+        parser.add_argument('--stub-latency', type=float, default=0.5, help='Задержка заглушки, секунды')
+        parser.add_argument('--stub-jitter', type=float, default=0.0, help='Случайная добавка к задержке заглушки')
+        parser.add_argument('--stub-error-rate', type=float, default=0.0, help='Доля ответов 500 заглушки')
+        parser.add_argument('--stub-malformed-rate', type=float, default=0.0, help='Доля некорректных JSON заглушки')
+        parser.add_argument('--json', action='store_true', help='Вывести отчет в формате JSON')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests и --concurrency должны быть положительными')
+
+        stub = None
+        original_base_url = getattr(settings, 'OPENAI_BASE_URL', None)
+        original_api_key = os.environ.get('OPENAI_API_KEY')
+        if options['stub']:
+            stub = start_stub_server(config=StubConfig(
+                latency=options['stub_latency'],
+                jitter=options['stub_jitter'],
+                error_rate=options['stub_error_rate'],
+                malformed_rate=options['stub_malformed_rate'],
+            ))
+            settings.OPENAI_BASE_URL = stub.base_url
+            if original_api_key is None:
+                os.environ['OPENAI_API_KEY'] = 'stub-key'
+        elif 'api.openai.com' in (original_base_url or ''):
+            self.stderr.write(self.style.WARNING(
+                '⚠️  Запросы пойдут в OpenAI API. Для локальной нагрузки используйте --stub или OPENAI_BASE_URL'
+            ))
+
+        upload_dir = Path(settings.MEDIA_ROOT) / 'temp' / 'load_test' / uuid.uuid4().hex
+        users = []
+        try:
+            image_urls = self._prepare_images(upload_dir, options['image'])
+            users = self._create_users(options['concurrency'])
+            report = self._run(image_urls, users, options)
+        finally:
+            get_user_model().objects.filter(id__in=[user.id for user in users]).delete()
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            if stub is not None:
+                settings.OPENAI_BASE_URL = original_base_url
+                if original_api_key is None:
+                    os.environ.pop('OPENAI_API_KEY', None)
+                report_stub = stub.stats()
+                stub.shutdown()
+                stub.server_close()
+        if stub is not None:
+            report['stub'] = report_stub
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+        else:
+            self._print_report(report)
+
+    @staticmethod
+    def _prepare_images(upload_dir: Path, paths: List[str]) -> List[str]:
+        """
+        Кладет изображения в MEDIA_ROOT, как после нормализации страниц, и возвращает их URL
+        (без --image - сгенерированная страница 1200×1600)
+        """
+        upload_dir.mkdir(parents=True)
+        targets = []
+        for index, path in enumerate(paths):
+            source = Path(path)
+            if not source.is_file():
+                raise CommandError(f'Изображение не найдено: {source}')
+            targets.append(upload_dir / f'page_{index}{source.suffix}')
+            shutil.copyfile(source, targets[-1])
+        if not targets:
+            targets.append(upload_dir / 'load_test_page.jpg')
+            Image.new('RGB', (1200, 1600), color=(245, 240, 230)).save(targets[-1], quality=85)
+        media_url = settings.MEDIA_URL.rstrip('/')
+        return [f'{media_url}/{target.relative_to(settings.MEDIA_ROOT).as_posix()}' for target in targets]
+
+    @staticmethod
+    def _create_users(count: int) -> List[Any]:
+        """Временные пользователи: у каждого клиента свои лимиты контроля допуска"""
+        User = get_user_model()
+        suffix = uuid.uuid4().hex[:8]
+        return [
+            User.objects.create_user(username=f'{LOAD_TEST_USERNAME_PREFIX}{suffix}_{index}')
+            for index in range(count)
+        ]
+
+    def _run(self, image_urls: List[str], users: List[Any], options: Dict[str, Any]) -> Dict[str, Any]:
+        url = reverse('book-auto-fill')
+        body = {'normalized_image_urls': image_urls, 'bypass_cache': not options['use_cache']}
+        tokens = [str(AccessToken.for_user(user)) for user in users]
+        local = threading.local()
+        next_client = iter(range(len(tokens)))
+        lock = threading.Lock()
+
+        def get_client() -> Client:
+            # Свой клиент и пользователь у каждого потока пула
+            if not hasattr(local, 'client'):
+                with lock:
+                    token = tokens[next(next_client)]
+                local.client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+            return local.client
+
+        def call(_):
+            started = time.perf_counter()
+            try:
+                response = get_client().post(url, body, content_type='application/json')
+                try:
+                    result = response.json()
+                except ValueError:
+                    result = {'success': False, 'error': f'HTTP {response.status_code}'}
+                status_code = response.status_code
+            except Exception as e:
+                result, status_code = {'success': False, 'error': str(e)}, None
+            finally:
+                connection.close()
+            if status_code == 429:
+                result = {'success': False, 'error': result.get('detail', 'HTTP 429')}
+            return time.perf_counter() - started, status_code, result
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency'], thread_name_prefix='autofill-load') as executor:
+            outcomes = list(executor.map(call, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+
+        latencies = [duration * 1000 for duration, _, _ in outcomes]
+        statuses = Counter(status_code for _, status_code, _ in outcomes)
+        results = [result for _, _, result in outcomes]
+        attempts = Counter(
+            (result.get('metrics') or {}).get('attempts', 0)
+            for result in results if result.get('metrics')
+        )
+        errors = Counter(result.get('error') for result in results if not result.get('success'))
+
+        return {
+            'url': url,
+            'requests': len(results),
+            'concurrency': options['concurrency'],
+            'llm_max_concurrency': get_llm_client().max_concurrency,
+            'base_url': get_llm_client().base_url,
+            'elapsed_s': round(elapsed, 3),
+            'throughput_rps': round(len(results) / elapsed, 2) if elapsed else 0.0,
+            'succeeded': sum(1 for result in results if result.get('success')),
+            'failed': sum(1 for result in results if not result.get('success')),
+            'cached': sum(1 for result in results if result.get('cached')),
+            'rejected': statuses.get(429, 0),
+            'status_codes': {str(code): total for code, total in sorted(statuses.items(), key=lambda item: str(item[0]))},
+            'latency_ms': {
+                'p50': round(percentile(latencies, 50), 1),
+                'p95': round(percentile(latencies, 95), 1),
+                'p99': round(percentile(latencies, 99), 1),
+                'max': round(max(latencies), 1),
+            },
+            'attempts': {str(count): total for count, total in sorted(attempts.items())},
+            'retried': sum(total for count, total in attempts.items() if count > 1),
+            'errors': {str(error): total for error, total in errors.most_common(5)},
+        }
+
+    def _print_report(self, report: Dict[str, Any]) -> None:
+        latency = report['latency_ms']
+        self.stdout.write(self.style.SUCCESS('\n📊 Нагрузочный тест автозаполнения'))
+        self.stdout.write(f"   Эндпоинт: POST {report['url']}")
+        self.stdout.write(f"   API: {report['base_url']} (LLM_MAX_CONCURRENCY={report['llm_max_concurrency']})")
+        self.stdout.write(
+            f"   Запросов: {report['requests']}, клиентов: {report['concurrency']}, "
+            f"время: {report['elapsed_s']} с"
+        )
+        self.stdout.write(f"   Пропускная способность: {report['throughput_rps']} запросов/с")
+        self.stdout.write(
+            f"   Задержка, мс: p50 {latency['p50']}, p95 {latency['p95']}, "
+            f"p99 {latency['p99']}, max {latency['max']}"
+        )
+        self.stdout.write(
+            f"   Успешно: {report['succeeded']}, ошибок: {report['failed']}, из кэша: {report['cached']}, "
+            f"отклонено (429): {report['rejected']}"
+        )
+        statuses = ', '.join(f"{code}: {total}" for code, total in report['status_codes'].items())
+        self.stdout.write(f"   Коды ответа: {statuses}")
+        attempts = ', '.join(f"{count}: {total}" for count, total in report['attempts'].items())
+        self.stdout.write(f"   Попыток на запрос: {attempts or '-'} (с повторами: {report['retried']})")
+        for error, total in report['errors'].items():
+            self.stdout.write(self.style.WARNING(f"   ⚠️  {total} × {error}"))
+        if 'stub' in report:
+            stub = report['stub']
+            self.stdout.write(
+                f"   Заглушка: запросов {stub['requests']}, ошибок {stub['errors']}, "
+                f"некорректных {stub['malformed']}"
+            )
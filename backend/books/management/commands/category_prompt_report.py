@@ -0,0 +1,50 @@
+"""
+Management команда для сравнения размера раздела категорий в промпте автозаполнения
+"""
+import json
+from django.core.management.base import BaseCommand
+from books.services.category_prompt import CategoryPromptService
+from books.services.llm_service import build_prompt, get_prompt_version
+
+
+class Command(BaseCommand):
+    help = 'Показывает размер раздела категорий промпта автозаполнения в разных форматах'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Вывести отчет в формате JSON',
+        )
+
+    def handle(self, *args, **options):
+        report = CategoryPromptService.size_report()
+        section, _ = CategoryPromptService.get_section()
+        prompt = build_prompt(section)
+        prompt_tokens, prompt_exact = CategoryPromptService.count_tokens(prompt)
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'prompt_version': get_prompt_version(),
+                'variants': report,
+                'prompt': {'chars': len(prompt), 'tokens': prompt_tokens, 'tokens_exact': prompt_exact},
+            }, ensure_ascii=False, indent=2))
+            return
+
+        self.stdout.write(f'📐 Версия промпта: {get_prompt_version()}')
+        if not all(row['tokens_exact'] for row in report):
+            self.stdout.write(self.style.WARNING(
+                '⚠️  tiktoken не установлен, токены оценены как байты UTF-8 / 4'
+            ))
+
+        baseline = report[0]['tokens'] or 1
+        self.stdout.write(f"\n{'Формат':<14}{'Символы':>10}{'Байты':>10}{'Токены':>10}{'% от JSON':>11}")
+        for row in report:
+            share = row['tokens'] / baseline * 100
+            self.stdout.write(
+                f"{row['variant']:<14}{row['chars']:>10}{row['bytes']:>10}{row['tokens']:>10}{share:>10.0f}%"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n📊 Полный промпт (формат lines): {len(prompt)} символов, {prompt_tokens} токенов'
+        ))
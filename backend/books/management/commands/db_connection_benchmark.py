@@ -0,0 +1,167 @@
+"""
+Management команда для проверки настроек соединений с БД под параллельной нагрузкой
+Выполняет N GET-запросов к API в несколько потоков через WSGI-обработчик Django
+(с сигналами начала/конца запроса, как под gunicorn) и сравнивает CONN_MAX_AGE:
+пропускная способность, перцентили задержки, число открытых соединений и метрики пула
+"""
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory
+
+from books.services.db_pool import PoolRegistry
+from .autofill_load_test import percentile
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочная проверка постоянных соединений и пула соединений с БД'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Количество запросов (по умолчанию: 500)')
+        parser.add_argument('--concurrency', type=int, default=16, help='Параллельных потоков (по умолчанию: 16)')
+        parser.add_argument(
+            '--path', action='append', default=[],
+            help='Путь API (можно несколько, по кругу; по умолчанию /api/categories/)',
+        )
+        parser.add_argument(
+            '--conn-max-age', type=int, action='append', default=[],
+            help='Значение CONN_MAX_AGE для прогона, -1 - без ограничения (можно несколько для сравнения)',
+        )
+        parser.add_argument('--database', default='default', help='Алиас базы (по умолчанию: default)')
+        parser.add_argument('--json', action='store_true', help='Вывести отчет в формате JSON')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests и --concurrency должны быть положительными')
+        alias = options['database']
+        if alias not in settings.DATABASES:
+            raise CommandError(f'База "{alias}" не настроена')
+        database = settings.DATABASES[alias]
+        ages: List[Optional[int]] = [
+            None if age < 0 else age for age in options['conn_max_age']
+        ] or [database.get('CONN_MAX_AGE', 0)]
+        if database.get('POOL') and any(ages):
+            raise CommandError('С пулом соединений (POOL) допустим только CONN_MAX_AGE = 0')
+
+        original_age = database.get('CONN_MAX_AGE', 0)
+        reports = []
+        try:
+            for age in ages:
+                database['CONN_MAX_AGE'] = age
+                reports.append(self._run(age, options))
+        finally:
+            database['CONN_MAX_AGE'] = original_age
+
+        if options['json']:
+            self.stdout.write(json.dumps(reports, ensure_ascii=False, indent=2))
+        else:
+            for report in reports:
+                self._print_report(report)
+
+    def _run(self, age: Optional[int], options: Dict[str, Any]) -> Dict[str, Any]:
+        alias = options['database']
+        paths = options['path'] or ['/api/categories/']
+        total = options['requests']
+        handler = WSGIHandler()
+        factory = RequestFactory()
+
+        lock = threading.Lock()
+        next_request = iter(range(total))
+        opened = Counter()
+
+        def count_connection(sender, connection, **kwargs):
+            with lock:
+                opened[connection.alias] += 1
+
+        def worker() -> List[tuple]:
+            outcomes = []
+            try:
+                while True:
+                    with lock:
+                        number = next(next_request, None)
+                    if number is None:
+                        return outcomes
+                    environ = factory._base_environ(PATH_INFO=paths[number % len(paths)], REQUEST_METHOD='GET')
+                    statuses = []
+                    started = time.perf_counter()
+                    response = handler(environ, lambda status, headers, *args: statuses.append(status))
+                    try:
+                        for _ in response:
+                            pass
+                    finally:
+                        response.close()  # Сигнал request_finished: закрытие устаревших соединений
+                    outcomes.append((time.perf_counter() - started, int(statuses[0].split()[0])))
+            finally:
+                connections.close_all()
+
+        pools_before = PoolRegistry.stats()
+        connection_created.connect(count_connection)
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency'], thread_name_prefix='db-bench') as executor:
+                futures = [executor.submit(worker) for _ in range(options['concurrency'])]
+                outcomes = [outcome for future in futures for outcome in future.result()]
+            elapsed = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(count_connection)
+
+        latencies = [duration * 1000 for duration, _ in outcomes]
+        statuses = Counter(status for _, status in outcomes)
+        pool = PoolRegistry.stats().get(alias)
+        if pool is not None:
+            before = pools_before.get(alias, {})
+            for counter in ('created', 'closed', 'acquired', 'waited', 'timeouts', 'check_failures', 'wait_ms_total'):
+                pool[counter] = round(pool[counter] - before.get(counter, 0), 1)
+
+        return {
+            'conn_max_age': age,
+            'health_checks': bool(settings.DATABASES[alias].get('CONN_HEALTH_CHECKS')),
+            'requests': len(outcomes),
+            'concurrency': options['concurrency'],
+            'paths': paths,
+            'elapsed_s': round(elapsed, 3),
+            'throughput_rps': round(len(outcomes) / elapsed, 2) if elapsed else 0.0,
+            'latency_ms': {
+                'p50': round(percentile(latencies, 50), 1),
+                'p95': round(percentile(latencies, 95), 1),
+                'p99': round(percentile(latencies, 99), 1),
+                'max': round(max(latencies), 1),
+            },
+            'statuses': {str(status): count for status, count in sorted(statuses.items())},
+            'connections_opened': opened[alias],
+            'pool': pool,
+        }
+
+    def _print_report(self, report: Dict[str, Any]) -> None:
+        latency = report['latency_ms']
+        age = 'без ограничения' if report['conn_max_age'] is None else report['conn_max_age']
+        self.stdout.write(self.style.SUCCESS(
+            f"\n📊 CONN_MAX_AGE={age}, CONN_HEALTH_CHECKS={report['health_checks']}"
+        ))
+        self.stdout.write(
+            f"   Запросов: {report['requests']}, параллельно: {report['concurrency']}, "
+            f"время: {report['elapsed_s']} с ({', '.join(report['paths'])})"
+        )
+        self.stdout.write(f"   Пропускная способность: {report['throughput_rps']} запросов/с")
+        self.stdout.write(
+            f"   Задержка, мс: p50 {latency['p50']}, p95 {latency['p95']}, "
+            f"p99 {latency['p99']}, max {latency['max']}"
+        )
+        statuses = ', '.join(f'{status}: {count}' for status, count in report['statuses'].items())
+        self.stdout.write(f"   Ответы: {statuses}")
+        self.stdout.write(f"   Подключений к БД (connect): {report['connections_opened']}")
+        pool = report['pool']
+        if pool is not None:
+            self.stdout.write(
+                f"   Пул: размер {pool['size']}/{pool['max_size']}, создано {pool['created']}, "
+                f"ожиданий {pool['waited']} ({pool['wait_ms_total']} мс), таймаутов {pool['timeouts']}"
+            )
@@ -1,8 +1,12 @@
 """
 Management команда для удаления всех книг (сохраняя категории, авторов, издательства)
 """
-from django.core.management.base import BaseCommand
-from books.models import Book, BookImage, BookPage, BookElectronic, BookAuthor, BookHashtag, BookReview
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from books.models import Book, BookImage, BookPage, BookElectronic, BookReview, Library
+from books.services.book_purge import BookPurgeService
+
+User = get_user_model()
 
 
 class Command(BaseCommand):
@@ -14,70 +18,136 @@ class Command(BaseCommand):
             action='store_true',
             help='Подтверждение удаления (обязательно для выполнения)',
         )
+        parser.add_argument(
+            '--purge',
+            action='store_true',
+            help='Быстрое удаление пачками по диапазонам ID (без загрузки связанных объектов и сигналов)',
+        )
+        parser.add_argument(
+            '--library',
+            type=int,
+            action='append',
+            default=[],
+            help='Удалить только книги библиотеки с этим ID (можно несколько)',
+        )
+        parser.add_argument(
+            '--owner',
+            action='append',
+            default=[],
+            help='Удалить только книги владельца (ID или username, можно несколько)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Ширина диапазона ID пачки в режиме --purge (по умолчанию: 5000)',
+        )
+        parser.add_argument(
+            '--keep-files',
+            action='store_true',
+            help='Не удалять файлы изображений, страниц и электронных версий в режиме --purge',
+        )
 
     def handle(self, *args, **options):
+        library_ids = options['library']
+        owner_ids = self._resolve_owners(options['owner'])
+        scoped = bool(library_ids or owner_ids)
+
         if not options['confirm']:
+            target = 'книги выбранных библиотек и владельцев' if scoped else 'ВСЕ книги'
             self.stdout.write(
                 self.style.ERROR(
-                    '⚠️  ВНИМАНИЕ: Эта команда удалит ВСЕ книги из базы данных!\n'
+                    f'⚠️  ВНИМАНИЕ: Эта команда удалит {target} из базы данных!\n'
                     'Для подтверждения используйте флаг --confirm'
                 )
             )
             return
-        
-        # Подсчитываем количество объектов для удаления
-        books_count = Book.objects.count()
-        images_count = BookImage.objects.count()
-        pages_count = BookPage.objects.count()
-        electronic_count = BookElectronic.objects.count()
-        reviews_count = BookReview.objects.count()
-        
+
+        missing = set(library_ids) - set(Library.objects.filter(id__in=library_ids).values_list('id', flat=True))
+        if missing:
+            raise CommandError(f'Библиотеки не найдены: {", ".join(map(str, sorted(missing)))}')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным')
+
+        books = BookPurgeService.scoped_queryset(library_ids, owner_ids)
+        books_count = books.count()
+        self.stdout.write(self.style.WARNING(f'\n🗑️  Удаление книг: {books_count}'))
+
+        if options['purge']:
+            self._purge(library_ids, owner_ids, books_count, options)
+        else:
+            self._delete(books)
+
+        # Проверяем что категории, авторы и издательства остались
+        from books.models import Category, Author, Publisher
         self.stdout.write(
-            self.style.WARNING(
-                f'\n🗑️  Удаление книг и связанных данных:\n'
-                f'   Книг: {books_count}\n'
-                f'   Изображений: {images_count}\n'
-                f'   Страниц: {pages_count}\n'
-                f'   Электронных версий: {electronic_count}\n'
-                f'   Отзывов: {reviews_count}\n'
+            self.style.SUCCESS(
+                f'\n✅ Сохранено:\n'
+                f'   Категорий: {Category.objects.count()}\n'
+                f'   Авторов: {Author.objects.count()}\n'
+                f'   Издательств: {Publisher.objects.count()}\n'
             )
         )
-        
-        # Удаляем все книги (связанные объекты удалятся автоматически благодаря CASCADE)
-        deleted_books = Book.objects.all().delete()
-        
+
+    @staticmethod
+    def _resolve_owners(values):
+        owner_ids = []
+        for value in values:
+            lookup = {'id': int(value)} if str(value).isdigit() else {'username': value}
+            owner_id = User.objects.filter(**lookup).values_list('id', flat=True).first()
+            if owner_id is None:
+                raise CommandError(f'Пользователь не найден: {value}')
+            owner_ids.append(owner_id)
+        return owner_ids
+
+    def _delete(self, books):
+        """Удаление через Django Collector (с сигналами, файлы остаются на диске)"""
+        self.stdout.write(
+            f'   Изображений: {BookImage.objects.filter(book__in=books).count()}\n'
+            f'   Страниц: {BookPage.objects.filter(book__in=books).count()}\n'
+            f'   Электронных версий: {BookElectronic.objects.filter(book__in=books).count()}\n'
+            f'   Отзывов: {BookReview.objects.filter(book__in=books).count()}\n'
+        )
+
+        # Связанные объекты удалятся автоматически благодаря CASCADE
+        deleted_total, deleted_by_model = books.delete()
+
         self.stdout.write(
             self.style.SUCCESS(
                 f'\n✅ Успешно удалено:\n'
-                f'   Объектов удалено: {deleted_books[0]}\n'
-                f'   Типов объектов: {len(deleted_books[1])}\n'
+                f'   Объектов удалено: {deleted_total}\n'
+                f'   Типов объектов: {len(deleted_by_model)}\n'
+                f'   Книг осталось: {Book.objects.count()}\n'
             )
         )
-        
-        # Показываем что осталось
-        categories_count = Book.objects.count()  # Должно быть 0
-        authors_count = Book.objects.count()  # Должно быть 0
-        publishers_count = Book.objects.count()  # Должно быть 0
-        
-        self.stdout.write(
-            self.style.SUCCESS(
-                f'\n📊 Статус после удаления:\n'
-                f'   Книги: {Book.objects.count()}\n'
-                f'   Изображения: {BookImage.objects.count()}\n'
-                f'   Страницы: {BookPage.objects.count()}\n'
-                f'   Электронные версии: {BookElectronic.objects.count()}\n'
-                f'   Отзывы: {BookReview.objects.count()}\n'
+
+    def _purge(self, library_ids, owner_ids, books_count, options):
+        """Удаление пачками по диапазонам ID, файлы - фоновой очередью"""
+        def progress(stats):
+            rate = stats['books'] / stats['elapsed_s'] if stats['elapsed_s'] else 0
+            self.stdout.write(
+                f"   ✓ {stats['books']}/{books_count} книг "
+                f"(ID до {min(stats['low_id'] + options['batch_size'] - 1, stats['high_id'])}, "
+                f"{rate:.0f} книг/с, файлов в очереди: {stats['files_queued'] - stats['files_deleted']})"
             )
+
+        stats = BookPurgeService.purge(
+            library_ids=library_ids,
+            owner_ids=owner_ids,
+            batch_size=options['batch_size'],
+            delete_files=not options['keep_files'],
+            progress=progress,
         )
-        
-        # Проверяем что категории, авторы и издательства остались
-        from books.models import Category, Author, Publisher
+
         self.stdout.write(
             self.style.SUCCESS(
-                f'\n✅ Сохранено:\n'
-                f'   Категорий: {Category.objects.count()}\n'
-                f'   Авторов: {Author.objects.count()}\n'
-                f'   Издательств: {Publisher.objects.count()}\n'
+                f"\n✅ Удалено за {stats['elapsed_s']} с:\n"
+                f"   Книг: {stats['books']}\n"
+                f"   Авторов книг: {stats['book_authors']}, хэштегов книг: {stats['book_hashtags']}\n"
+                f"   Отзывов: {stats['reviews']}, дат прочтения: {stats['reading_dates']}\n"
+                f"   Изображений: {stats['images']}, страниц: {stats['pages']}, "
+                f"электронных версий: {stats['electronic']}\n"
+                f"   Файлов удалено: {stats['files_deleted']}"
+                + (f", ошибок: {stats['files_failed']}" if stats['files_failed'] else '')
             )
         )
-
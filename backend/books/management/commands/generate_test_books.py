@@ -57,6 +57,39 @@ class Command(BaseCommand):
             help='Распределять книги равномерно между всеми библиотеками',
         )
 
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help='Быстрый режим: bulk_create пачками, без страниц и электронных версий',
+        )
+        parser.add_argument(
+            '--total',
+            type=int,
+            help='Общее количество книг в быстром режиме (вместо --count-per-category)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Размер пачки в быстром режиме (по умолчанию: 5000)',
+        )
+        parser.add_argument(
+            '--images',
+            choices=['skip', 'pool'],
+            default='skip',
+            help='Изображения в быстром режиме: skip - без изображений, pool - в пуле процессов',
+        )
+        parser.add_argument(
+            '--image-variants',
+            type=int,
+            help='Рендерить только N вариантов изображений, книгам - жесткие ссылки на них',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Количество процессов для изображений (по умолчанию: число CPU)',
+        )
+
     def handle(self, *args, **options):
         count_per_category = options['count_per_category']
         user_id = options.get('user_id')
@@ -100,10 +133,26 @@ class Command(BaseCommand):
             factory.ensure_authors_and_publishers_in_db()
             
             # Генерируем книги
-            created_count = factory.generate_books_for_all_categories(
-                books_per_category=count_per_category,
-                distribute_to_all_libraries=distribute_books
-            )
+            if options['bulk']:
+                stats = factory.generate_books_bulk(
+                    books_per_category=count_per_category,
+                    total_books=options.get('total'),
+                    batch_size=options['batch_size'],
+                    distribute_to_all_libraries=distribute_books,
+                    images=options['images'],
+                    image_workers=options.get('workers'),
+                    image_variants=options.get('image_variants'),
+                )
+                created_count = stats['books']
+                self.stdout.write(
+                    f"\n⚡ Скорость: {stats['books_per_second']} книг/с, "
+                    f"{stats['rows_per_second']} строк/с ({stats['rows']} строк за {stats['elapsed_s']} с)"
+                )
+            else:
+                created_count = factory.generate_books_for_all_categories(
+                    books_per_category=count_per_category,
+                    distribute_to_all_libraries=distribute_books
+                )
             
             # Очищаем временные файлы
             factory.cleanup()
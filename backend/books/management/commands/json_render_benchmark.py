@@ -0,0 +1,165 @@
+"""
+Management команда для сравнения сериализации, рендеринга JSON и сжатия ответа списка книг
+Сериализует страницу из N книг (queryset списка BookViewSet) через BookListSerializer
+и проекцией .values() (BookListProjection) и измеряет время на книгу и число запросов,
+затем время рендеринга и разбора стандартным json и orjson, размер ответа
+без сжатия, с gzip и brotli
+"""
+import io
+import json
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.text import compress_string
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from books.middleware import brotli
+from books.parsers import FastJSONParser
+from books.renderers import FastJSONRenderer, orjson
+from books.serializers import BookListSerializer
+from books.services.book_list import BookListProjection
+from books.views import BookViewSet
+from .autofill_load_test import percentile
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Время вызова func, мс: медиана и минимум по repeat повторам"""
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - started) * 1000)
+    return {'p50_ms': round(percentile(durations, 50), 3), 'min_ms': round(min(durations), 3)}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение сериализации (модели/values), рендеринга JSON (json/orjson) '
+        'и сжатия (gzip/brotli) для страницы списка книг'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=100, help='Книг на странице (по умолчанию: 100)')
+        parser.add_argument('--repeat', type=int, default=50, help='Повторов каждого замера (по умолчанию: 50)')
+        parser.add_argument('--json', action='store_true', help='Вывести отчет в формате JSON')
+
+    def handle(self, *args, **options):
+        if options['books'] < 1 or options['repeat'] < 1:
+            raise CommandError('--books и --repeat должны быть положительными')
+
+        request = Request(APIRequestFactory().get('/api/books/'))
+        view = BookViewSet(action='list', request=request, format_kwarg=None, kwargs={})
+        queryset = view.get_queryset()
+        count = queryset[:options['books']].count()
+        if count < options['books']:
+            raise CommandError(
+                f'В базе {count} книг, нужно {options["books"]} '
+                f'(python manage.py generate_test_books или --books {count or 1})'
+            )
+
+        serialization, results = self._serialize(queryset, request, options['books'], options['repeat'])
+        page = {'count': len(results), 'next': None, 'previous': None, 'results': results}
+
+        report = self._run(page, options['repeat'])
+        report.update({'books': len(results), 'repeat': options['repeat'], 'serialization': serialization})
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+        else:
+            self._print_report(report)
+
+    def _serialize(self, queryset, request: Request, books: int, repeat: int) -> Tuple[List[Dict[str, Any]], Any]:
+        """Выборка и сериализация страницы моделями и проекцией: время на книгу, запросы, совпадение"""
+        projection = BookListProjection({'request': request})
+        paths = {
+            'model': lambda: BookListSerializer(
+                queryset[:books], many=True, context={'request': request}
+            ).data,
+            'values': lambda: projection.serialize(projection.project(queryset)[:books]),
+        }
+        renderer = JSONRenderer()
+        reference = paths['model']()
+        serialization = []
+        for name, serialize in paths.items():
+            with CaptureQueriesContext(connection) as queries:
+                data = serialize()
+            timing = measure(serialize, repeat)
+            serialization.append({
+                'path': name,
+                'identical': renderer.render(data) == renderer.render(reference),
+                'queries': len(queries),
+                'page': timing,
+                'per_row_us': round(timing['p50_ms'] * 1000 / books, 1),
+            })
+        return serialization, reference
+
+    def _run(self, page: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+        renderers = {'json': JSONRenderer(), 'orjson': FastJSONRenderer()}
+        parsers = {'json': JSONParser(), 'orjson': FastJSONParser()}
+        if orjson is None:
+            del renderers['orjson'], parsers['orjson']
+
+        payload = renderers['json'].render(page)
+        rendering: List[Dict[str, Any]] = []
+        for name, renderer in renderers.items():
+            rendering.append({
+                'renderer': name,
+                'identical': renderer.render(page) == payload,
+                'render': measure(lambda: renderer.render(page), repeat),
+                'parse': measure(lambda: parsers[name].parse(io.BytesIO(payload)), repeat),
+            })
+
+        compression = [{'encoding': 'identity', 'bytes': len(payload), 'ratio': 1.0, 'compress': None}]
+        codecs = {'gzip': lambda: compress_string(payload)}
+        if brotli is not None:
+            quality = getattr(settings, 'RESPONSE_COMPRESSION_BROTLI_QUALITY', 5)
+            codecs[f'br (quality {quality})'] = lambda: brotli.compress(payload, quality=quality)
+        for name, compress in codecs.items():
+            size = len(compress())
+            compression.append({
+                'encoding': name,
+                'bytes': size,
+                'ratio': round(size / len(payload), 3),
+                'compress': measure(compress, repeat),
+            })
+
+        return {
+            'orjson_available': orjson is not None,
+            'brotli_available': brotli is not None,
+            'rendering': rendering,
+            'compression': compression,
+        }
+
+    def _print_report(self, report: Dict[str, Any]) -> None:
+        self.stdout.write(self.style.SUCCESS(
+            f"\n📊 Страница списка: {report['books']} книг, повторов: {report['repeat']}"
+        ))
+        for item in report['serialization']:
+            page = item['page']
+            self.stdout.write(
+                f"   {item['path']:<7} выборка и сериализация p50 {page['p50_ms']} мс "
+                f"(min {page['min_ms']}), {item['per_row_us']} мкс на книгу, запросов: {item['queries']}"
+                + ('' if item['identical'] else ' - РЕЗУЛЬТАТ ОТЛИЧАЕТСЯ от BookListSerializer')
+            )
+        for item in report['rendering']:
+            render, parse = item['render'], item['parse']
+            self.stdout.write(
+                f"   {item['renderer']:<7} рендеринг p50 {render['p50_ms']} мс (min {render['min_ms']}), "
+                f"разбор p50 {parse['p50_ms']} мс (min {parse['min_ms']})"
+                + ('' if item['identical'] else ' - РЕЗУЛЬТАТ ОТЛИЧАЕТСЯ от json')
+            )
+        if not report['orjson_available']:
+            self.stdout.write('   orjson не установлен - FastJSONRenderer использует стандартный json')
+        for item in report['compression']:
+            compress = item['compress']
+            timing = f", сжатие p50 {compress['p50_ms']} мс" if compress else ''
+            self.stdout.write(f"   {item['encoding']:<16} {item['bytes']} байт ({item['ratio']:.0%}){timing}")
+        if not report['brotli_available']:
+            self.stdout.write('   brotli не установлен - ответы сжимаются gzip')
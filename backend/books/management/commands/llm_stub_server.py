@@ -0,0 +1,46 @@
+"""
+Management команда для запуска локальной заглушки OpenAI chat completions API
+"""
+from django.core.management.base import BaseCommand
+from books.services.llm_stub import StubConfig, LLMStubServer
+
+
+class Command(BaseCommand):
+    help = 'Запускает локальную заглушку OpenAI API для нагрузочного тестирования автозаполнения'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', type=str, default='127.0.0.1', help='Адрес (по умолчанию: 127.0.0.1)')
+        parser.add_argument('--port', type=int, default=8765, help='Порт (по умолчанию: 8765)')
+        parser.add_argument('--latency', type=float, default=0.5, help='Задержка ответа, секунды (по умолчанию: 0.5)')
+        parser.add_argument('--jitter', type=float, default=0.0, help='Случайная добавка к задержке, секунды')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Доля ответов 500 (0..1)')
+        parser.add_argument('--malformed-rate', type=float, default=0.0, help='Доля ответов с некорректным JSON (0..1)')
+        parser.add_argument('--seed', type=int, default=None, help='Seed генератора случайных чисел')
+
+    def handle(self, *args, **options):
+        config = StubConfig(
+            latency=options['latency'],
+            jitter=options['jitter'],
+            error_rate=options['error_rate'],
+            malformed_rate=options['malformed_rate'],
+            seed=options['seed'],
+        )
+        server = LLMStubServer((options['host'], options['port']), config)
+
+        self.stdout.write(self.style.SUCCESS(f'🤖 Заглушка LLM запущена: {server.base_url}'))
+        self.stdout.write(f'   Укажите OPENAI_BASE_URL={server.base_url}')
+        self.stdout.write(
+            f'   Задержка {config.latency} с (+{config.jitter} с), ошибки {config.error_rate:.0%}, '
+            f'некорректный JSON {config.malformed_rate:.0%}'
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            stats = server.stats()
+            self.stdout.write(
+                f"\n📊 Запросов: {stats['requests']}, успешных: {stats['ok']}, "
+                f"ошибок: {stats['errors']}, некорректных: {stats['malformed']}"
+            )
@@ -1,11 +1,16 @@
 """
 Management команда для загрузки авторов и издательств из JSON в БД
 Используется при деплое для наполнения базы справочными данными
+
+JSON читается потоково, существующие имена загружаются одним запросом,
+новые записи вставляются пачками через bulk_create
 """
 import sys
+import time
 from pathlib import Path
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
 # Добавляем путь к фабрике в sys.path
 base_dir = Path(__file__).parent.parent.parent.parent.parent
@@ -13,73 +18,71 @@ test_factory_dir = base_dir / 'test_data_factory'
 sys.path.insert(0, str(base_dir))
 
 from books.models import Author, Publisher
-from test_data_factory.generators.publishers_loader import load_publishers_from_json
-from test_data_factory.generators.authors_loader import load_authors_from_json
+from books.services.autocomplete import AutocompleteService
+from test_data_factory.generators.publishers_loader import iter_publishers_from_json
+from test_data_factory.generators.authors_loader import iter_authors_from_json
+
+
+# Модель -> (ключевое поле, поля, обновляемые при --update)
+REFERENCE_FIELDS = {
+    Author: ('full_name', ('birth_year', 'death_year', 'biography')),
+    Publisher: ('name', ('city', 'website', 'description')),
+}
+
+# Модель -> справочник автодополнения (bulk_create не отправляет сигналы)
+AUTOCOMPLETE_KINDS = {Author: 'authors', Publisher: 'publishers'}
 
 
 class Command(BaseCommand):
     help = 'Загружает авторов и издательства из JSON файлов в базу данных'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--authors-file',
+            type=Path,
+            default=None,
+            help='JSON файл авторов (по умолчанию - из test_data_factory/data)',
+        )
+        parser.add_argument(
+            '--publishers-file',
+            type=Path,
+            default=None,
+            help='JSON файл издательств (по умолчанию - из test_data_factory/data)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Размер пачки bulk_create/bulk_update (по умолчанию: 5000)',
+        )
+        parser.add_argument(
+            '--update',
+            action='store_true',
+            help='Обновлять у существующих записей изменившиеся поля '
+                 '(авторы: годы жизни, биография; издательства: город, сайт, описание)',
+        )
+
     def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным')
+        for key in ('authors_file', 'publishers_file'):
+            if options[key] is not None and not options[key].exists():
+                raise CommandError(f'Файл {options[key]} не найден')
+
         self.stdout.write(self.style.SUCCESS('📚 Загрузка авторов и издательств...\n'))
-        
-        # Определяем путь к JSON файлам
-        json_dir = base_dir / 'test_data_factory' / 'data'
-        
-        # Загружаем авторов
+
         self.stdout.write('📝 Загрузка авторов...')
-        authors_data = load_authors_from_json()
-        
-        created_authors = 0
-        existing_authors = 0
-        
-        for author_data in authors_data:
-            author, created = Author.objects.get_or_create(
-                full_name=author_data['full_name'],
-                defaults={
-                    'birth_year': author_data.get('birth_year'),
-                    'death_year': author_data.get('death_year'),
-                    'biography': author_data.get('biography', ''),
-                }
-            )
-            if created:
-                created_authors += 1
-            else:
-                existing_authors += 1
-        
-        self.stdout.write(
-            self.style.SUCCESS(
-                f'  ✅ Авторы: создано {created_authors}, уже существует {existing_authors}'
-            )
+        stats = self.load(
+            Author, iter_authors_from_json(options['authors_file']), options['batch_size'], options['update']
         )
-        
-        # Загружаем издательства
+        self._report('Авторы', stats, options['update'])
+
         self.stdout.write('\n📝 Загрузка издательств...')
-        publishers_data = load_publishers_from_json()
-        
-        created_publishers = 0
-        existing_publishers = 0
-        
-        for publisher_data in publishers_data:
-            publisher, created = Publisher.objects.get_or_create(
-                name=publisher_data['name'],
-                defaults={
-                    'city': publisher_data.get('city', ''),
-                    'website': publisher_data.get('website', ''),
-                    'description': publisher_data.get('description', ''),
-                }
-            )
-            if created:
-                created_publishers += 1
-            else:
-                existing_publishers += 1
-        
-        self.stdout.write(
-            self.style.SUCCESS(
-                f'  ✅ Издательства: создано {created_publishers}, уже существует {existing_publishers}'
-            )
+        stats = self.load(
+            Publisher, iter_publishers_from_json(options['publishers_file']), options['batch_size'], options['update']
         )
-        
+        self._report('Издательства', stats, options['update'])
+
         self.stdout.write(
             self.style.SUCCESS(
                 f'\n✨ Готово! Всего авторов в БД: {Author.objects.count()}, '
@@ -87,3 +90,97 @@ class Command(BaseCommand):
             )
         )
 
+    @staticmethod
+    def load(model, records, batch_size=5000, update=False):
+        """
+        Загружает записи справочника пачками
+
+        Существование проверяется по ключевому полю (ФИО автора, название
+        издательства) по множеству имен, загруженному одним запросом;
+        повторы внутри файла пропускаются.
+
+        Args:
+            model: Author или Publisher
+            records: Итератор словарей с полями модели
+            batch_size: Размер пачки bulk_create/bulk_update
+            update: Обновлять изменившиеся поля существующих записей
+                (пустые значения из JSON не затирают данные в БД)
+
+        Returns:
+            Количество созданных, обновленных и уже существующих записей, время
+        """
+        key_field, update_fields = REFERENCE_FIELDS[model]
+        started = time.perf_counter()
+        stats = {'created': 0, 'updated': 0, 'existing': 0}
+
+        if update:
+            # Ключ -> (id, текущие значения обновляемых полей)
+            existing = {
+                row[1]: (row[0], row[2:])
+                for row in model.objects.values_list('id', key_field, *update_fields).iterator(chunk_size=batch_size)
+            }
+        else:
+            existing = set(model.objects.values_list(key_field, flat=True).iterator(chunk_size=batch_size))
+
+        to_create, to_update = [], []
+
+        def flush():
+            with transaction.atomic():
+                if to_create:
+                    model.objects.bulk_create(to_create, batch_size=batch_size)
+                if to_update:
+                    model.objects.bulk_update(to_update, update_fields, batch_size=batch_size)
+            stats['created'] += len(to_create)
+            stats['updated'] += len(to_update)
+            to_create.clear()
+            to_update.clear()
+
+        for record in records:
+            key = record[key_field]
+            if key not in existing:
+                to_create.append(model(**record))
+                if update:
+                    existing[key] = (None, tuple(record[field] for field in update_fields))
+                else:
+                    existing.add(key)
+            else:
+                stats['existing'] += 1
+                if update:
+                    instance = Command._changed(model, existing[key], record, update_fields)
+                    if instance is not None:
+                        to_update.append(instance)
+                        existing[key] = (instance.id, tuple(getattr(instance, field) for field in update_fields))
+
+            if len(to_create) + len(to_update) >= batch_size:
+                flush()
+
+        flush()
+        if stats['created'] or stats['updated']:
+            AutocompleteService.invalidate(AUTOCOMPLETE_KINDS[model])
+        stats['elapsed_s'] = round(time.perf_counter() - started, 3)
+        return stats
+
+    @staticmethod
+    def _changed(model, current, record, update_fields):
+        """Экземпляр с измененными полями для bulk_update или None, если изменений нет"""
+        instance_id, current_values = current
+        if instance_id is None:
+            # Повтор записи, созданной в этом же запуске
+            return None
+        values = dict(zip(update_fields, current_values))
+        changed = False
+        for field in update_fields:
+            value = record.get(field)
+            if value not in (None, '') and value != values[field]:
+                values[field] = value
+                changed = True
+        return model(id=instance_id, **values) if changed else None
+
+    def _report(self, title, stats, update):
+        updated = f', обновлено {stats["updated"]}' if update else ''
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'  ✅ {title}: создано {stats["created"]}{updated}, '
+                f'уже существует {stats["existing"]} ({stats["elapsed_s"]} с)'
+            )
+        )
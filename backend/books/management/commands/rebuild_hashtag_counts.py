@@ -0,0 +1,27 @@
+"""
+Management команда для пересчета таблицы частот хэштегов (облако хэштегов)
+Нужна после массовых операций без сигналов (bulk_create, queryset.update, загрузка SQL-дампов)
+"""
+import time
+from django.core.management.base import BaseCommand
+from books.services.hashtag_counts import HashtagCountService
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает частоты хэштегов по библиотекам и категориям'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--library',
+            type=int,
+            action='append',
+            default=[],
+            help='Пересчитать только для библиотеки с этим ID (можно несколько)',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rows = HashtagCountService.rebuild(library_ids=options['library'] or None)
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Частоты хэштегов пересчитаны: {rows} строк за {time.perf_counter() - started:.2f} с'
+        ))
@@ -0,0 +1,27 @@
+"""
+Management команда для пересчета статистики чтения (сводные таблицы прочтений по месяцам и авторам)
+Нужна после массовых операций без сигналов (bulk_create дат прочтения, queryset.update, загрузка SQL-дампов)
+"""
+import time
+from django.core.management.base import BaseCommand
+from books.services.reading_stats import ReadingStatsService
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает статистику чтения пользователей по датам прочтения'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            default=[],
+            help='Пересчитать только для пользователя с этим ID (можно несколько)',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rows = ReadingStatsService.rebuild(user_ids=options['user'] or None)
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Статистика чтения пересчитана: {rows} строк за {time.perf_counter() - started:.2f} с'
+        ))
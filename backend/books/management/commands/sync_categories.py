@@ -1,13 +1,24 @@
 """
 Management команда для синхронизации категорий из канонического JSON файла
-Простая загрузка категорий с иерархией из categories_canonical.json
+Загрузка категорий с иерархией из categories_canonical.json: существующие категории
+читаются одним запросом, в БД записываются только изменения (bulk_create/bulk_update)
 """
 import json
+from collections import defaultdict
 from pathlib import Path
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.utils.text import slugify
 from books.models import Category
+from books.services.category_prompt import CategoryPromptService
+
+
+# Поля категории, которые синхронизируются из JSON
+SYNC_FIELDS = ('name', 'slug', 'icon', 'order', 'parent_category_id')
+
+# Корневая категория для архивации категорий, отсутствующих в JSON (--missing archive)
+ARCHIVE_CODE = 'archive'
+ARCHIVE_DEFAULTS = {'name': 'Архив', 'slug': 'archive', 'icon': '🗄️', 'order': 100000}
 
 
 class Command(BaseCommand):
@@ -20,108 +31,142 @@ class Command(BaseCommand):
             default='categories_canonical.json',
             help='Имя JSON файла в books/data/ (по умолчанию: categories_canonical.json)',
         )
+        parser.add_argument(
+            '--missing',
+            choices=['keep', 'delete', 'archive'],
+            default='keep',
+            help='Категории, отсутствующие в JSON: keep - оставить (по умолчанию), '
+                 'delete - удалить (с подкатегориями), archive - перенести в категорию "Архив"',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Показать изменения без записи в БД',
+        )
 
     def handle(self, *args, **options):
         file_name = options.get('file', 'categories_canonical.json')
         json_path = Path(__file__).resolve().parent.parent.parent / 'data' / file_name
-        
+
         if not json_path.exists():
             self.stdout.write(self.style.ERROR(f'Файл {json_path} не найден!'))
             return
-        
+
         # Загружаем JSON
         with open(json_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
-        
+
         categories_data = data.get('categories', [])
-        
+
         if not categories_data:
             self.stdout.write(self.style.ERROR('Категории не найдены в JSON файле!'))
             return
-        
+
         self.stdout.write(f'📖 Загружено {len(categories_data)} категорий из канонического JSON')
-        
-        created_count = 0
-        updated_count = 0
-        
-        # Словарь для хранения всех категорий по коду
-        all_categories = {}
-        
+
         with transaction.atomic():
-            # Проход 1: Создаем/обновляем все категории (сначала родительские, потом подкатегории)
-            categories_to_process = []
-            
-            # Сортируем: сначала родительские (parent=null), потом подкатегории
-            for cat_data in categories_data:
-                parent_code = cat_data.get('parent')
-                if parent_code is None:
-                    categories_to_process.insert(0, cat_data)  # В начало
-                else:
-                    categories_to_process.append(cat_data)  # В конец
-            
-            for cat_data in categories_to_process:
-                code = cat_data['code']
-                name = cat_data['name']
-                slug = cat_data.get('slug', '')
-                if not slug:
-                    slug = slugify(name) or code
-                icon = cat_data.get('icon', '📚')
-                order = cat_data.get('order', 0)
-                
-                # Пытаемся найти по коду
-                try:
-                    category = Category.objects.get(code=code)
-                    # Обновляем существующую
-                    category.name = name
-                    category.slug = slug
-                    category.icon = icon
-                    category.order = order
-                    category.save()
-                    created = False
-                except Category.DoesNotExist:
-                    # Создаем новую
-                    category = Category.objects.create(
-                        code=code,
-                        name=name,
-                        slug=slug,
-                        icon=icon,
-                        order=order,
-                    )
-                    created = True
-                
-                # Сохраняем для установки parent_category во втором проходе
-                all_categories[code] = category
-                
-                if created:
-                    created_count += 1
-                    self.stdout.write(self.style.SUCCESS(f'✅ Создана: {code} - {name}'))
-                else:
-                    updated_count += 1
-                    if updated_count <= 10:  # Показываем только первые 10
-                        self.stdout.write(f'🔄 Обновлена: {code} - {name}')
-            
-            # Проход 2: Устанавливаем parent_category для подкатегорий
-            linked_count = 0
+            # Все существующие категории - одним запросом
+            existing = {category.code: category for category in Category.objects.all()}
+
+            # Проход 1: новые категории (без родителя - id родителя может быть еще неизвестен)
+            to_create = [
+                Category(code=cat_data['code'], **self._fields(cat_data))
+                for cat_data in categories_data
+                if cat_data['code'] not in existing
+            ]
+            if to_create and not options['dry_run']:
+                Category.objects.bulk_create(to_create)
+            created_codes = {category.code for category in to_create}
+            for category in to_create:
+                existing[category.code] = category
+                self.stdout.write(self.style.SUCCESS(f'✅ Создана: {category.code} - {category.name}'))
+
+            # Проход 2: изменившиеся поля (включая parent_category) существующих и новых категорий
+            changed_by_fields = defaultdict(list)
+            updated_codes = set()
             for cat_data in categories_data:
+                category = existing[cat_data['code']]
+                desired = self._fields(cat_data)
                 parent_code = cat_data.get('parent')
-                if parent_code:
-                    category = all_categories[cat_data['code']]
-                    parent_category = all_categories.get(parent_code)
-                    
-                    if parent_category:
-                        if category.parent_category != parent_category:
-                            category.parent_category = parent_category
-                            category.save()
-                            linked_count += 1
-                    else:
-                        self.stdout.write(self.style.WARNING(
-                            f'⚠️  Родительская категория с кодом "{parent_code}" не найдена для "{category.name}"'
-                        ))
-            
-            if linked_count > 0:
-                self.stdout.write(f'🔗 Установлено связей parent_category: {linked_count}')
-        
+                parent = existing.get(parent_code) if parent_code else None
+                if parent_code and parent is None:
+                    self.stdout.write(self.style.WARNING(
+                        f'⚠️  Родительская категория с кодом "{parent_code}" не найдена для "{category.name}"'
+                    ))
+                desired['parent_category_id'] = parent.id if parent else None
+
+                changed = tuple(field for field in SYNC_FIELDS if getattr(category, field) != desired[field])
+                if not changed:
+                    continue
+                for field in changed:
+                    setattr(category, field, desired[field])
+                changed_by_fields[changed].append(category)
+                if category.code not in created_codes:
+                    updated_codes.add(category.code)
+                    if len(updated_codes) <= 10:  # Показываем только первые 10
+                        self.stdout.write(f'🔄 Обновлена: {category.code} - {category.name} ({", ".join(changed)})')
+
+            if not options['dry_run']:
+                # Один bulk_update на набор изменившихся полей
+                for fields, categories in changed_by_fields.items():
+                    Category.objects.bulk_update(categories, fields)
+
+            # Категории, которых нет в JSON
+            json_codes = {cat_data['code'] for cat_data in categories_data}
+            missing = [
+                category for code, category in existing.items()
+                if code not in json_codes and code != ARCHIVE_CODE
+            ]
+            removed_count = self._handle_missing(missing, existing, options['missing'], options['dry_run'])
+
+            if (to_create or changed_by_fields or removed_count) and not options['dry_run']:
+                # bulk_create/bulk_update не отправляют сигналы post_save - сбрасываем кэши явно
+                CategoryPromptService.invalidate()
+                transaction.on_commit(CategoryPromptService.invalidate)
+
+        unchanged_count = len(categories_data) - len(to_create) - len(updated_codes)
+        prefix = '🔍 Без записи в БД (--dry-run). ' if options['dry_run'] else ''
         self.stdout.write(self.style.SUCCESS(
-            f'\n📊 Итого: создано {created_count}, обновлено {updated_count} категорий'
+            f'\n📊 {prefix}Итого: создано {len(to_create)}, обновлено {len(updated_codes)}, '
+            f'без изменений {unchanged_count}, отсутствуют в JSON {len(missing)}'
+            + (f' ({options["missing"]}: {removed_count})' if options['missing'] != 'keep' else '')
         ))
 
+    @staticmethod
+    def _fields(cat_data):
+        name = cat_data['name']
+        return {
+            'name': name,
+            'slug': cat_data.get('slug') or slugify(name) or cat_data['code'],
+            'icon': cat_data.get('icon', '📚'),
+            'order': cat_data.get('order', 0),
+        }
+
+    def _handle_missing(self, missing, existing, mode, dry_run):
+        """Удаляет или архивирует категории, отсутствующие в JSON. Возвращает их количество"""
+        if not missing or mode == 'keep':
+            return 0
+
+        if mode == 'delete':
+            for category in missing:
+                self.stdout.write(self.style.WARNING(f'🗑️  Удалена: {category.code} - {category.name}'))
+            if not dry_run:
+                # Подкатегории удаляются каскадом, у книг категория обнуляется (SET_NULL)
+                Category.objects.filter(id__in=[category.id for category in missing]).delete()
+            return len(missing)
+
+        # archive: верхние из отсутствующих категорий переносятся в "Архив" вместе с подкатегориями
+        missing_ids = {category.id for category in missing}
+        to_archive = [category for category in missing if category.parent_category_id not in missing_ids]
+        archive = existing.get(ARCHIVE_CODE)
+        if archive is not None:
+            to_archive = [category for category in to_archive if category.parent_category_id != archive.id]
+        elif to_archive and not dry_run:
+            archive = Category.objects.create(code=ARCHIVE_CODE, **ARCHIVE_DEFAULTS)
+        archive_id = archive.id if archive is not None else None
+        for category in to_archive:
+            category.parent_category_id = archive_id
+            self.stdout.write(self.style.WARNING(f'🗄️  В архив: {category.code} - {category.name}'))
+        if to_archive and not dry_run:
+            Category.objects.bulk_update(to_archive, ['parent_category_id'])
+        return len(to_archive)
@@ -0,0 +1,349 @@
+"""
+Middleware приложения books
+"""
+import math
+import time
+from typing import Optional
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import InterfaceError, OperationalError
+from django.http import JsonResponse
+from django.middleware.gzip import GZipMiddleware
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+from . import db_router
+from .exceptions import AdmissionRejected, QueryBudgetExceeded
+from .services.admission import AdmissionController, get_queue_timeout, is_admission_enabled
+from .services.profiling import (
+    QueryRecorder, ProfileStore, is_profiling_enabled, get_query_budget, serialization_timer,
+)
+
+try:
+    import brotli
+except ImportError:  # brotli - необязательная зависимость, без нее ответы сжимаются gzip
+    brotli = None
+
+re_accepts_brotli = _lazy_re_compile(r'\bbr\b')
+
+
+def token_user_id(request) -> Optional[int]:
+    """user_id из access-токена без обращения к БД (подпись и срок проверяются)"""
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    scheme, _, raw_token = header.partition(' ')
+    if scheme != 'Bearer' or not raw_token:
+        return None
+    try:
+        return AccessToken(raw_token.strip()).get(settings.SIMPLE_JWT.get('USER_ID_CLAIM', 'user_id'))
+    except TokenError:
+        return None
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование запросов: количество и время SQL-запросов, дублирующиеся
+    запросы (N+1), время view, сериализации и рендеринга ответа, размер ответа.
+
+    Результат добавляется в заголовок Server-Timing и в сводку по маршрутам
+    (ProfileStore, GET /api/profiling/). В строгом режиме (PROFILING_STRICT)
+    превышение бюджета запросов маршрута вызывает QueryBudgetExceeded.
+
+    Под ASGI с выключенным профилированием запрос проходит без перехода в
+    поток; с включенным - обработка выполняется в одном потоке (QueryRecorder
+    подключается к соединениям потока).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not is_profiling_enabled():
+            return self.get_response(request)
+        return self._profile(request, self.get_response)
+
+    async def __acall__(self, request):
+        if not is_profiling_enabled():
+            return await self.get_response(request)
+        return await sync_to_async(self._profile)(request, async_to_sync(self.get_response))
+
+    def _profile(self, request, get_response):
+        marks = request._profiling_marks = {}
+        started = time.perf_counter()
+        with QueryRecorder() as recorder, serialization_timer() as serialize_ms:
+            response = get_response(request)
+        finished = time.perf_counter()
+
+        view_started = marks.get('view_started', started)
+        view_finished = marks.get('view_finished', finished)
+        render_finished = marks.get('render_finished', view_finished)
+
+        # serializer.data выполняется внутри view - его время выделяется из view_ms
+        profile = {
+            'queries': recorder.count,
+            'db_ms': recorder.total_ms,
+            'view_ms': max((view_finished - view_started) * 1000 - serialize_ms[0], 0.0),
+            'serialize_ms': serialize_ms[0],
+            'render_ms': (render_finished - view_finished) * 1000,
+            'total_ms': (finished - started) * 1000,
+            'response_bytes': 0 if response.streaming else len(response.content),
+            'duplicates': recorder.duplicates(),
+        }
+
+        if getattr(settings, 'PROFILING_SERVER_TIMING', True):
+            response['Server-Timing'] = (
+                f'db;dur={profile["db_ms"]:.1f};desc="{profile["queries"]} queries", '
+                f'view;dur={profile["view_ms"]:.1f}, '
+                f'serialize;dur={profile["serialize_ms"]:.1f}, '
+                f'render;dur={profile["render_ms"]:.1f}, '
+                f'total;dur={profile["total_ms"]:.1f}'
+            )
+
+        match = request.resolver_match
+        if match is None:
+            return response
+
+        budget = get_query_budget(match.view_name)
+        profile['budget_exceeded'] = budget is not None and profile['queries'] > budget
+        ProfileStore.record(f'{request.method} {match.view_name or match.route}', profile)
+
+        if profile['budget_exceeded'] and getattr(settings, 'PROFILING_STRICT', False):
+            duplicates = sorted(profile['duplicates'].items(), key=lambda item: -item[1])[:3]
+            details = '; '.join(f'{count}× {fingerprint[:200]}' for fingerprint, count in duplicates)
+            raise QueryBudgetExceeded(
+                f'{request.method} {request.path} ({match.view_name}): '
+                f'{profile["queries"]} SQL-запросов при бюджете {budget}'
+                + (f'. Повторяющиеся: {details}' if details else '')
+            )
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        marks = getattr(request, '_profiling_marks', None)
+        if marks is not None:
+            marks['view_started'] = time.perf_counter()
+        return None
+
+    def process_template_response(self, request, response):
+        # DRF Response рендерится после view: время до рендеринга относится к view
+        # (сериализаторы измеряются отдельно, см. serialization_timer), время рендеринга - к render
+        marks = getattr(request, '_profiling_marks', None)
+        if marks is not None:
+            marks['view_finished'] = time.perf_counter()
+
+            def mark_rendered(rendered_response):
+                marks['render_finished'] = time.perf_counter()
+
+            response.add_post_render_callback(mark_rendered)
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Чтение с реплик БД для GET/HEAD (см. books.db_router).
+
+    После запроса с записью клиент закрепляется за основной базой на
+    REPLICA_PIN_SECONDS: cookie db_pin (браузер, тот же origin или
+    withCredentials) и ключ в кэше по user_id из JWT (API-клиенты).
+    Ошибка подключения к реплике во время view - запрос выполняется
+    повторно на основной базе.
+    """
+
+    SAFE_METHODS = ('GET', 'HEAD')
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not db_router.get_replicas():
+            return self.get_response(request)
+
+        user_id = token_user_id(request)
+        use_replica = request.method in self.SAFE_METHODS and not self._is_pinned(request, user_id)
+        with db_router.routing(use_replica) as state:
+            request._db_routing = state
+            response = self.get_response(request)
+
+        if state.wrote or request.method not in self.SAFE_METHODS:
+            pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+            response.set_cookie(db_router.PIN_COOKIE_NAME, '1', max_age=pin_seconds, httponly=True, samesite='Lax')
+            if user_id is not None:
+                cache.set(db_router.PIN_CACHE_KEY.format(user_id=user_id), 1, pin_seconds)
+        return response
+
+    async def __acall__(self, request):
+        # Состояние маршрутизации - contextvar: оно доступно и в sync_to_async потоках view
+        if not db_router.get_replicas():
+            return await self.get_response(request)
+
+        user_id = token_user_id(request)
+        pinned = await sync_to_async(self._is_pinned)(request, user_id)
+        use_replica = request.method in self.SAFE_METHODS and not pinned
+        with db_router.routing(use_replica) as state:
+            request._db_routing = state
+            response = await self.get_response(request)
+
+        if state.wrote or request.method not in self.SAFE_METHODS:
+            pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+            response.set_cookie(db_router.PIN_COOKIE_NAME, '1', max_age=pin_seconds, httponly=True, samesite='Lax')
+            if user_id is not None:
+                await sync_to_async(cache.set)(db_router.PIN_CACHE_KEY.format(user_id=user_id), 1, pin_seconds)
+        return response
+
+    def process_exception(self, request, exception):
+        state = getattr(request, '_db_routing', None)
+        if (
+            state is None or state.replica is None or state.wrote
+            or not isinstance(exception, (OperationalError, InterfaceError))
+        ):
+            return None
+        # Повтор только для чтения: запрос без записи безопасно выполнить снова
+        db_router.fall_back_to_primary(state)
+        match = request.resolver_match
+        view = async_to_sync(match.func) if iscoroutinefunction(match.func) else match.func
+        return view(request, *match.args, **match.kwargs)
+
+    @staticmethod
+    def _is_pinned(request, user_id: Optional[int]) -> bool:
+        if request.COOKIES.get(db_router.PIN_COOKIE_NAME):
+            return True
+        return user_id is not None and bool(cache.get(db_router.PIN_CACHE_KEY.format(user_id=user_id)))
+
+
+class AdmissionControlMiddleware:
+    """
+    Контроль допуска к тяжелым эндпоинтам (см. books.services.admission).
+
+    Запрос к маршруту из ADMISSION_ENDPOINT_CLASSES занимает слот своего
+    класса на время обработки. Пользователь определяется по JWT без обращения
+    к БД (анонимный - по IP). Отказ - 429 с Retry-After до чтения тела запроса
+    и аутентификации. Стоит после CorsMiddleware: ответ 429 получает CORS-заголовки.
+    """
+
+    # Чтение и preflight-запросы не ограничиваются
+    EXEMPT_METHODS = ('GET', 'HEAD', 'OPTIONS')
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        admission = self._admission(request)
+        if admission is None:
+            return self.get_response(request)
+        user_key = self._user_key(request)
+        try:
+            admission.acquire(user_key, get_queue_timeout())
+        except AdmissionRejected as e:
+            return self._reject(e)
+        try:
+            return self.get_response(request)
+        finally:
+            admission.release(user_key)
+
+    async def __acall__(self, request):
+        admission = self._admission(request)
+        if admission is None:
+            return await self.get_response(request)
+        user_key = self._user_key(request)
+        try:
+            await admission.aacquire(user_key, get_queue_timeout())
+        except AdmissionRejected as e:
+            return self._reject(e)
+        try:
+            return await self.get_response(request)
+        finally:
+            admission.release(user_key)
+
+    def _admission(self, request):
+        if request.method in self.EXEMPT_METHODS or not is_admission_enabled():
+            return None
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        return AdmissionController.for_view(match.view_name)
+
+    @staticmethod
+    def _user_key(request) -> str:
+        user_id = token_user_id(request)
+        if user_id is not None:
+            return f'user:{user_id}'
+        return f'ip:{request.META.get("REMOTE_ADDR", "")}'
+
+    @staticmethod
+    def _reject(error: AdmissionRejected) -> JsonResponse:
+        response = JsonResponse(
+            {'detail': str(error)},
+            status=429,
+            json_dumps_params={'ensure_ascii': False},
+        )
+        response['Retry-After'] = str(max(1, math.ceil(error.retry_after)))
+        return response
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Сжатие ответов от RESPONSE_COMPRESSION_MIN_BYTES байт.
+
+    JSON-ответы API сжимаются brotli, если клиент его принимает и пакет
+    brotli установлен (меньше gzip при сопоставимом времени); остальное -
+    gzip через GZipMiddleware Django (с защитой от BREACH для HTML со
+    CSRF-токеном). Ответы API не содержат секретов сессии, поэтому brotli
+    применяется только к ним.
+    """
+
+    def process_response(self, request, response):
+        if not getattr(settings, 'RESPONSE_COMPRESSION_ENABLED', True):
+            return response
+        if not response.streaming and len(response.content) < getattr(settings, 'RESPONSE_COMPRESSION_MIN_BYTES', 1024):
+            return response
+        if brotli is not None and self._use_brotli(request, response):
+            return self._compress_brotli(response)
+        return super().process_response(request, response)
+
+    @staticmethod
+    def _use_brotli(request, response) -> bool:
+        return (
+            not response.streaming
+            and not response.has_header('Content-Encoding')
+            and response.get('Content-Type', '').startswith('application/json')
+            and bool(re_accepts_brotli.search(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+        )
+
+    @staticmethod
+    def _compress_brotli(response):
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed_content = brotli.compress(
+            response.content, quality=getattr(settings, 'RESPONSE_COMPRESSION_BROTLI_QUALITY', 5)
+        )
+        if len(compressed_content) >= len(response.content):
+            return response
+        response.content = compressed_content
+        response.headers['Content-Length'] = str(len(compressed_content))
+        # Как в GZipMiddleware: сильный ETag становится слабым
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
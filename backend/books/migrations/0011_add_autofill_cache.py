@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0010_add_cover_page'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AutoFillCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='SHA-256 от отсортированных хэшей изображений, версии промпта и модели', max_length=64, unique=True, verbose_name='Ключ')),
+                ('model_name', models.CharField(help_text='Модель LLM, которая сформировала ответ', max_length=100, verbose_name='Модель')),
+                ('prompt_version', models.CharField(help_text='Версия промпта, с которой был получен ответ', max_length=100, verbose_name='Версия промпта')),
+                ('images_count', models.IntegerField(default=0, verbose_name='Изображений')),
+                ('result', models.JSONField(help_text='Распарсенный ответ LLM (success, data, error, confidence)', verbose_name='Результат')),
+                ('hits', models.IntegerField(default=0, verbose_name='Попаданий')),
+                ('last_hit_at', models.DateTimeField(blank=True, null=True, verbose_name='Последнее попадание')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+            ],
+            options={
+                'verbose_name': 'Кэш автозаполнения',
+                'verbose_name_plural': 'Кэш автозаполнения',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='books_autofill_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_hashtag_counts(apps, schema_editor):
+    """Начальное заполнение счетчиков по существующим хэштегам книг"""
+    BookHashtag = apps.get_model('books', 'BookHashtag')
+    HashtagCategoryCount = apps.get_model('books', 'HashtagCategoryCount')
+    rows = (
+        BookHashtag.objects.filter(book__library__isnull=False).order_by()
+        .values('hashtag_id', 'book__library_id', 'book__category_id')
+        .annotate(count=models.Count('id'))
+    )
+    HashtagCategoryCount.objects.bulk_create(
+        [
+            HashtagCategoryCount(
+                hashtag_id=row['hashtag_id'],
+                library_id=row['book__library_id'],
+                category_id=row['book__category_id'],
+                count=row['count'],
+            )
+            for row in rows
+        ],
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0011_add_autofill_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HashtagCategoryCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0, verbose_name='Книг')),
+                ('category', models.ForeignKey(blank=True, help_text='null - книги без категории', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='hashtag_counts', to='books.category', verbose_name='Категория')),
+                ('hashtag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_counts', to='books.hashtag', verbose_name='Хэштег')),
+                ('library', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hashtag_counts', to='books.library', verbose_name='Библиотека')),
+            ],
+            options={
+                'verbose_name': 'Частота хэштега',
+                'verbose_name_plural': 'Частоты хэштегов',
+                'indexes': [models.Index(fields=['library', 'category'], name='books_hashtag_count_lib_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='hashtagcategorycount',
+            constraint=models.UniqueConstraint(fields=('hashtag', 'library', 'category'), name='books_hashtag_count_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='hashtagcategorycount',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('hashtag', 'library'), name='books_hashtag_count_no_category_unique'),
+        ),
+        migrations.RunPython(fill_hashtag_counts, migrations.RunPython.noop),
+    ]
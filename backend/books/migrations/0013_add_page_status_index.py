@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0012_hashtag_category_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookpage',
+            index=models.Index(fields=['processing_status'], name='books_page_status_idx'),
+        ),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_reading_stats(apps, schema_editor):
+    """Начальное заполнение статистики чтения по существующим датам прочтения"""
+    BookReadingDate = apps.get_model('books', 'BookReadingDate')
+    BookAuthor = apps.get_model('books', 'BookAuthor')
+    ReadingMonthCount = apps.get_model('books', 'ReadingMonthCount')
+    ReadingAuthorCount = apps.get_model('books', 'ReadingAuthorCount')
+
+    months = {}
+    previous_book_id = None
+    rows = (
+        BookReadingDate.objects.filter(book__owner__isnull=False).order_by('book_id', 'date')
+        .values_list('book_id', 'date', 'book__owner_id', 'book__category_id')
+    )
+    for book_id, read_on, owner_id, category_id in rows.iterator(chunk_size=5000):
+        counts = months.setdefault((owner_id, read_on.year, read_on.month, category_id), [0, 0])
+        counts[0] += 1
+        # Все даты книги, кроме самой ранней - повторные прочтения
+        if book_id == previous_book_id:
+            counts[1] += 1
+        previous_book_id = book_id
+    ReadingMonthCount.objects.bulk_create(
+        [
+            ReadingMonthCount(
+                user_id=user_id, year=year, month=month, category_id=category_id, reads=reads, rereads=rereads
+            )
+            for (user_id, year, month, category_id), (reads, rereads) in months.items()
+        ],
+        batch_size=5000,
+    )
+
+    authors = (
+        BookAuthor.objects.filter(book__owner__isnull=False).order_by()
+        .values('book__owner_id', 'author_id')
+        .annotate(reads=models.Count('book__reading_dates'))
+        .filter(reads__gt=0)
+    )
+    ReadingAuthorCount.objects.bulk_create(
+        [
+            ReadingAuthorCount(user_id=row['book__owner_id'], author_id=row['author_id'], reads=row['reads'])
+            for row in authors
+        ],
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('books', '0013_add_page_status_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadingMonthCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField(verbose_name='Год')),
+                ('month', models.PositiveSmallIntegerField(verbose_name='Месяц')),
+                ('reads', models.IntegerField(default=0, verbose_name='Прочтений')),
+                ('rereads', models.IntegerField(default=0, verbose_name='Повторных прочтений')),
+                ('category', models.ForeignKey(blank=True, help_text='null - книги без категории', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reading_counts', to='books.category', verbose_name='Категория')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reading_month_counts', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Прочтения за месяц',
+                'verbose_name_plural': 'Прочтения за месяц',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReadingAuthorCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reads', models.IntegerField(default=0, verbose_name='Прочтений')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reading_counts', to='books.author', verbose_name='Автор')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reading_author_counts', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Прочтения автора',
+                'verbose_name_plural': 'Прочтения авторов',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='readingmonthcount',
+            constraint=models.UniqueConstraint(fields=('user', 'year', 'month', 'category'), name='books_reading_month_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='readingmonthcount',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('user', 'year', 'month'), name='books_reading_month_no_category_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='readingauthorcount',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='books_reading_author_unique'),
+        ),
+        migrations.RunPython(fill_reading_stats, migrations.RunPython.noop),
+    ]
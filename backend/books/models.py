@@ -3,7 +3,7 @@
 """
 from django.db import models
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete, m2m_changed
 from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.text import slugify
@@ -174,6 +174,56 @@ class BookHashtag(models.Model):
         return f"{self.book.title} - {self.hashtag.name}"
 
 
+class HashtagCategoryCount(models.Model):
+    """
+    Количество книг с хэштегом в библиотеке и категории (облако хэштегов).
+    Поддерживается сигналами (HashtagCountService), перестраивается командой rebuild_hashtag_counts
+    """
+    hashtag = models.ForeignKey(
+        Hashtag,
+        on_delete=models.CASCADE,
+        related_name='category_counts',
+        verbose_name='Хэштег'
+    )
+    library = models.ForeignKey(
+        'Library',
+        on_delete=models.CASCADE,
+        related_name='hashtag_counts',
+        verbose_name='Библиотека'
+    )
+    category = models.ForeignKey(
+        'Category',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='hashtag_counts',
+        verbose_name='Категория',
+        help_text='null - книги без категории'
+    )
+    count = models.IntegerField('Книг', default=0)
+
+    class Meta:
+        verbose_name = 'Частота хэштега'
+        verbose_name_plural = 'Частоты хэштегов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['hashtag', 'library', 'category'],
+                name='books_hashtag_count_unique'
+            ),
+            models.UniqueConstraint(
+                fields=['hashtag', 'library'],
+                condition=models.Q(category__isnull=True),
+                name='books_hashtag_count_no_category_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['library', 'category'], name='books_hashtag_count_lib_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.hashtag_id} / {self.library_id} / {self.category_id}: {self.count}"
+
+
 class BookReview(models.Model):
     """Отзыв пользователя на книгу"""
     book = models.ForeignKey(
@@ -246,6 +296,18 @@ class Category(models.Model):
         return self.subcategories.exists()
 
 
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_prompt(sender, **kwargs):
+    """
+    Сбрасывает раздел категорий промпта автозаполнения.
+    Повторный сброс после коммита исключает раздел, построенный по данным до коммита
+    """
+    from django.db import transaction
+    from .services.category_prompt import CategoryPromptService
+    CategoryPromptService.invalidate()
+    transaction.on_commit(CategoryPromptService.invalidate)
+
+
 class Author(models.Model):
     """Автор книги"""
     full_name = models.CharField(
@@ -761,6 +823,10 @@ class BookPage(models.Model):
         verbose_name_plural = 'Страницы книг'
         ordering = ['book', 'page_number']
         unique_together = ['book', 'page_number']
+        indexes = [
+            # Фильтр по статусу в админке и выборка страниц для повторной обработки
+            models.Index(fields=['processing_status'], name='books_page_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.book.title} - стр. {self.page_number}"
@@ -795,3 +861,264 @@ class BookReadingDate(models.Model):
     
     def __str__(self):
         return f"{self.book.title} - {self.date}"
+
+
+class ReadingMonthCount(models.Model):
+    """
+    Прочтения книг пользователя за месяц по категории (статистика чтения).
+    Читатель - владелец книги. Поддерживается сигналами (ReadingStatsService),
+    перестраивается командой rebuild_reading_stats
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='reading_month_counts',
+        verbose_name='Пользователь'
+    )
+    year = models.PositiveSmallIntegerField('Год')
+    month = models.PositiveSmallIntegerField('Месяц')
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='reading_counts',
+        verbose_name='Категория',
+        help_text='null - книги без категории'
+    )
+    reads = models.IntegerField('Прочтений', default=0)
+    rereads = models.IntegerField('Повторных прочтений', default=0)
+
+    class Meta:
+        verbose_name = 'Прочтения за месяц'
+        verbose_name_plural = 'Прочтения за месяц'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'year', 'month', 'category'],
+                name='books_reading_month_unique'
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'year', 'month'],
+                condition=models.Q(category__isnull=True),
+                name='books_reading_month_no_category_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} / {self.year}-{self.month:02d} / {self.category_id}: {self.reads}"
+
+
+class ReadingAuthorCount(models.Model):
+    """Прочтения книг автора пользователем (статистика чтения, поддерживается ReadingStatsService)"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='reading_author_counts',
+        verbose_name='Пользователь'
+    )
+    author = models.ForeignKey(
+        Author,
+        on_delete=models.CASCADE,
+        related_name='reading_counts',
+        verbose_name='Автор'
+    )
+    reads = models.IntegerField('Прочтений', default=0)
+
+    class Meta:
+        verbose_name = 'Прочтения автора'
+        verbose_name_plural = 'Прочтения авторов'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'], name='books_reading_author_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} / {self.author_id}: {self.reads}"
+
+
+class AutoFillCacheEntry(models.Model):
+    """Кэш результатов автозаполнения через LLM (ключ - хэши содержимого изображений)"""
+    key = models.CharField(
+        'Ключ',
+        max_length=64,
+        unique=True,
+        help_text='SHA-256 от отсортированных хэшей изображений, версии промпта и модели'
+    )
+    model_name = models.CharField(
+        'Модель',
+        max_length=100,
+        help_text='Модель LLM, которая сформировала ответ'
+    )
+    prompt_version = models.CharField(
+        'Версия промпта',
+        max_length=100,
+        help_text='Версия промпта, с которой был получен ответ'
+    )
+    images_count = models.IntegerField('Изображений', default=0)
+    result = models.JSONField(
+        'Результат',
+        help_text='Распарсенный ответ LLM (success, data, error, confidence)'
+    )
+    hits = models.IntegerField('Попаданий', default=0)
+    last_hit_at = models.DateTimeField('Последнее попадание', blank=True, null=True)
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Кэш автозаполнения'
+        verbose_name_plural = 'Кэш автозаполнения'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='books_autofill_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.model_name} / {self.prompt_version} - {self.key[:12]}"
+
+
+# Частоты хэштегов (HashtagCategoryCount) - поддержка при изменении книг и их хэштегов
+
+@receiver(post_save, sender=BookHashtag)
+def count_added_hashtag(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        from .services.hashtag_counts import HashtagCountService
+        HashtagCountService.book_hashtag_changed(instance.book_id, instance.hashtag_id, 1)
+
+
+@receiver(m2m_changed, sender=BookHashtag)
+def count_m2m_added_hashtags(sender, instance, action, reverse, pk_set, **kwargs):
+    """book.hashtags.add() создает связи через bulk_create (без post_save); remove/clear идут через post_delete"""
+    if action != 'post_add' or not pk_set:
+        return
+    from .services.hashtag_counts import HashtagCountService
+    if reverse:
+        for book_id in pk_set:
+            HashtagCountService.book_hashtag_changed(book_id, instance.pk, 1)
+    else:
+        HashtagCountService.book_hashtags_added(instance, pk_set)
+
+
+@receiver(post_delete, sender=BookHashtag)
+def count_removed_hashtag(sender, instance, origin=None, **kwargs):
+    """
+    Только прямое удаление хэштега книги. При удалении книги счетчики уменьшает
+    book_pre_delete, при удалении хэштега его строки счетчиков удаляются каскадом
+    """
+    if isinstance(origin, BookHashtag) or getattr(origin, 'model', None) is BookHashtag:
+        from .services.hashtag_counts import HashtagCountService
+        HashtagCountService.book_hashtag_changed(instance.book_id, instance.hashtag_id, -1)
+
+
+@receiver(pre_save, sender=Book)
+def remember_book_location(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Запоминает библиотеку, категорию и владельца книги до сохранения
+    (для переноса счетчиков хэштегов и статистики чтения)
+    """
+    instance._hashtag_counts_location = None
+    instance._reading_stats_location = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    fields = {'library', 'library_id', 'category', 'category_id', 'owner', 'owner_id'}
+    if update_fields is not None and not fields & set(update_fields):
+        return
+    row = Book.objects.filter(pk=instance.pk).values_list('library_id', 'category_id', 'owner_id').first()
+    if row is not None:
+        instance._hashtag_counts_location = (row[0], row[1])
+        instance._reading_stats_location = (row[2], row[1])
+
+
+@receiver(post_save, sender=Book)
+def move_book_hashtag_counts(sender, instance, created, **kwargs):
+    old_location = getattr(instance, '_hashtag_counts_location', None)
+    if old_location is not None and old_location != (instance.library_id, instance.category_id):
+        from .services.hashtag_counts import HashtagCountService
+        HashtagCountService.book_moved(instance.pk, old_location, (instance.library_id, instance.category_id))
+    old_reader = getattr(instance, '_reading_stats_location', None)
+    if old_reader is not None and old_reader != (instance.owner_id, instance.category_id):
+        from .services.reading_stats import ReadingStatsService
+        ReadingStatsService.book_moved(instance.pk, old_reader)
+
+
+@receiver(pre_delete, sender=Book)
+def book_pre_delete(sender, instance, origin=None, **kwargs):
+    """Удаление одной книги - один UPDATE счетчиков, массовое удаление - пересчет после коммита"""
+    from .services.hashtag_counts import HashtagCountService
+    from .services.reading_stats import ReadingStatsService
+    if origin is None or isinstance(origin, Book):
+        HashtagCountService.book_deleted(instance)
+        ReadingStatsService.book_deleted(instance)
+    else:
+        HashtagCountService.schedule_rebuild(origin, library_id=instance.library_id)
+        ReadingStatsService.schedule_rebuild(origin, user_id=instance.owner_id)
+
+
+@receiver(pre_delete, sender=Category)
+def move_category_hashtag_counts(sender, instance, **kwargs):
+    """Книги удаляемой категории остаются без категории (SET_NULL) - переносим их счетчики"""
+    from .services.hashtag_counts import HashtagCountService
+    from .services.reading_stats import ReadingStatsService
+    HashtagCountService.move_category(instance.pk, None)
+    ReadingStatsService.move_category(instance.pk, None)
+
+
+# Статистика чтения (ReadingMonthCount, ReadingAuthorCount) - поддержка при изменении дат прочтения и авторов
+
+@receiver(pre_save, sender=BookReadingDate)
+def remember_reading_date(sender, instance, raw=False, **kwargs):
+    """Запоминает книгу и дату до изменения существующей даты прочтения (админка)"""
+    instance._reading_stats_previous = None
+    if not raw and not instance._state.adding and instance.pk is not None:
+        instance._reading_stats_previous = (
+            BookReadingDate.objects.filter(pk=instance.pk).values_list('book_id', 'date').first()
+        )
+
+
+@receiver(post_save, sender=BookReadingDate)
+def count_reading_date(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    from .services.reading_stats import ReadingStatsService
+    if created:
+        ReadingStatsService.reading_added(instance)
+        return
+    previous = getattr(instance, '_reading_stats_previous', None)
+    if previous is not None and previous != (instance.book_id, instance.date):
+        # Дата или книга изменены - пересчет статистики владельцев прежней и новой книги
+        owner_ids = Book.objects.filter(id__in={previous[0], instance.book_id}).values_list('owner_id', flat=True)
+        ReadingStatsService.rebuild({owner_id for owner_id in owner_ids if owner_id is not None})
+
+
+@receiver(post_delete, sender=BookReadingDate)
+def count_removed_reading_date(sender, instance, origin=None, **kwargs):
+    """
+    Удаление одной даты - изменение счетчиков, массовое удаление дат - пересчет
+    после коммита. При удалении книги статистику уменьшает book_pre_delete
+    """
+    from .services.reading_stats import ReadingStatsService
+    if isinstance(origin, BookReadingDate):
+        ReadingStatsService.reading_removed(instance)
+    elif getattr(origin, 'model', None) is BookReadingDate:
+        ReadingStatsService.schedule_rebuild(origin, book_id=instance.book_id)
+
+
+@receiver(post_save, sender=BookAuthor)
+def count_added_author(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        from .services.reading_stats import ReadingStatsService
+        ReadingStatsService.book_author_changed(instance.book_id, instance.author_id, 1)
+
+
+@receiver(post_delete, sender=BookAuthor)
+def count_removed_author(sender, instance, origin=None, **kwargs):
+    """Только удаление связи книги с автором (при удалении книги или автора строки уже учтены)"""
+    if isinstance(origin, BookAuthor) or getattr(origin, 'model', None) is BookAuthor:
+        from .services.reading_stats import ReadingStatsService
+        ReadingStatsService.book_author_changed(instance.book_id, instance.author_id, -1)
+
+
+@receiver([post_save, post_delete], sender=Author)
+@receiver([post_save, post_delete], sender=Publisher)
+@receiver([post_save, post_delete], sender=Hashtag)
+def invalidate_autocomplete(sender, **kwargs):
+    """Сбрасывает индекс автодополнения справочника (авторы, издательства, хэштеги)"""
+    from .services.autocomplete import AutocompleteService
+    AutocompleteService.invalidate({Author: 'authors', Publisher: 'publishers', Hashtag: 'hashtags'}[sender])
@@ -1,8 +1,53 @@
 """
 Кастомные пагинаторы для книг
 """
-from rest_framework.pagination import PageNumberPagination
+from functools import partial
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, Paginator
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .services.row_counts import approximate_count
+
+
+class CountedPaginator(Paginator):
+    """
+    Paginator с заранее посчитанным количеством объектов (без повторного COUNT).
+    При count_is_estimate количество приблизительное: страницы за оценкой
+    не считаются ошибкой (пустая страница вместо 404)
+    """
+    
+    def __init__(self, object_list, per_page, known_count=None, count_is_estimate=False, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if known_count is not None:
+            self.count = known_count
+        self.count_is_estimate = count_is_estimate
+    
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if self.count_is_estimate and int(number) > 1:
+                return int(number)
+            raise
+    
+    def page(self, number):
+        """С оценкой страница не обрезается по count: всегда до per_page объектов"""
+        if not self.count_is_estimate:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(self.object_list[bottom:bottom + self.per_page], number, self)
+
+
+def is_approximate_count_enabled() -> bool:
+    return getattr(settings, 'BOOK_LIST_APPROXIMATE_COUNT', True)
+
+
+def get_exact_count_limit() -> int:
+    return getattr(settings, 'BOOK_LIST_EXACT_COUNT_LIMIT', 10000)
 
 
 class ConditionalBookPagination(PageNumberPagination):
@@ -10,6 +55,10 @@ class ConditionalBookPagination(PageNumberPagination):
     Условная пагинация для книг:
     - Если книг <= 30: возвращаем все книги без пагинации
     - Если книг > 30: применяем пагинацию с размером страницы 30
+    
+    При BOOK_LIST_APPROXIMATE_COUNT книги считаются не дальше
+    BOOK_LIST_EXACT_COUNT_LIMIT, больше - оценка PostgreSQL или сам предел
+    (row_counts.approximate_count), в ответе count_is_estimate = True
     """
     page_size = 30
     page_size_query_param = 'page_size'
@@ -19,16 +68,34 @@ class ConditionalBookPagination(PageNumberPagination):
         """
         Пагинирует queryset только если количество объектов больше page_size
         """
-        # Подсчитываем общее количество книг
-        self.count = queryset.count()
+        # Подсчитываем общее количество книг (точно или до предела с оценкой дальше)
+        if is_approximate_count_enabled():
+            self.count, self.count_is_estimate = approximate_count(queryset, get_exact_count_limit())
+        else:
+            self.count, self.count_is_estimate = queryset.count(), False
         
         # Если книг меньше или равно page_size, не применяем пагинацию
         if self.count <= self.page_size:
             return None
         
-        # Иначе применяем стандартную пагинацию
+        # Иначе применяем стандартную пагинацию (с уже посчитанным количеством)
+        self.django_paginator_class = partial(
+            CountedPaginator, known_count=self.count, count_is_estimate=self.count_is_estimate
+        )
         return super().paginate_queryset(queryset, request, view)
     
+    def get_next_link(self):
+        """
+        С приблизительным количеством следующая страница есть, пока текущая
+        заполнена полностью (число страниц по оценке может быть неверным)
+        """
+        if not self.count_is_estimate:
+            return super().get_next_link()
+        if len(self.page.object_list) < self.page.paginator.per_page:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page.number + 1)
+    
     def get_paginated_response(self, data):
         """
         Возвращает пагинированный ответ или обычный список если пагинация не применена
@@ -37,6 +104,7 @@ class ConditionalBookPagination(PageNumberPagination):
         if self.count <= self.page_size:
             return Response({
                 'count': self.count,
+                'count_is_estimate': self.count_is_estimate,
                 'results': data,
                 'paginated': False
             })
@@ -44,9 +112,38 @@ class ConditionalBookPagination(PageNumberPagination):
         # Иначе возвращаем стандартный пагинированный ответ
         return Response({
             'count': self.count,
+            'count_is_estimate': self.count_is_estimate,
             'next': self.get_next_link(),
             'previous': self.get_previous_link(),
             'results': data,
             'paginated': True
         })
 
+
+class BookCursorPagination(CursorPagination):
+    """
+    Курсорная пагинация для книг (?pagination=cursor, далее - по ссылкам next/previous):
+    без COUNT и OFFSET, стоимость страницы не зависит от ее номера.
+    Порядок - параметр ordering (как у условной пагинации) с id для однозначности
+    """
+    page_size = 30
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    # Позиция курсора - значение первого поля сортировки: только поля без NULL
+    ordering_fields = ('created_at', 'updated_at', 'title')
+    
+    def get_ordering(self, request, queryset, view):
+        ordering = request.query_params.get('ordering', '-created_at')
+        if ordering.lstrip('-') in ('id', 'pk'):
+            return ('-id' if ordering.startswith('-') else 'id',)
+        if ordering.lstrip('-') not in self.ordering_fields:
+            ordering = '-created_at'
+        return (ordering, '-id' if ordering.startswith('-') else 'id')
+    
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+            'paginated': True
+        })
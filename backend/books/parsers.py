@@ -0,0 +1,28 @@
+"""
+Быстрый JSON parser для API (orjson с откатом на стандартный json)
+
+orjson разбирает только UTF-8; тело в другой кодировке (charset запроса)
+и окружение без orjson обрабатывает JSONParser DRF. NaN и Infinity
+отклоняются, как в JSONParser со STRICT_JSON.
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .renderers import FastJSONRenderer, orjson
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser на orjson"""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8') or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -44,16 +44,14 @@ class UserProfileSerializer(serializers.ModelSerializer):
         return None
     
     def get_libraries_count(self, obj):
-        # Используем prefetch_related если доступен, иначе count()
-        if hasattr(obj.user, '_prefetched_objects_cache') and 'libraries' in obj.user._prefetched_objects_cache:
-            return len(obj.user.libraries.all())
-        return obj.user.libraries.count()
+        # Используем аннотацию UserProfileViewSet если есть, иначе count()
+        count = getattr(obj, 'libraries_count_annotated', None)
+        return count if count is not None else obj.user.libraries.count()
     
     def get_books_count(self, obj):
-        # Используем prefetch_related если доступен, иначе count()
-        if hasattr(obj.user, '_prefetched_objects_cache') and 'owned_books' in obj.user._prefetched_objects_cache:
-            return len(obj.user.owned_books.all())
-        return obj.user.owned_books.count()
+        # Используем аннотацию UserProfileViewSet если есть, иначе count()
+        count = getattr(obj, 'books_count_annotated', None)
+        return count if count is not None else obj.user.owned_books.count()
 
 
 class LibrarySerializer(serializers.ModelSerializer):
@@ -73,8 +71,9 @@ class LibrarySerializer(serializers.ModelSerializer):
         }
     
     def get_books_count(self, obj):
-        # Используем аннотацию если есть, иначе count()
-        return getattr(obj, 'books_count_annotated', obj.books.count())
+        # Используем аннотацию если есть, иначе count() (только для одной библиотеки после create/update)
+        count = getattr(obj, 'books_count_annotated', None)
+        return count if count is not None else obj.books.count()
 
 
 class HashtagSerializer(serializers.ModelSerializer):
@@ -126,18 +125,19 @@ class CategorySerializer(serializers.ModelSerializer):
     
     def get_books_count(self, obj):
         """Подсчитывает книги включая подкатегории"""
-        # Используем аннотации если доступны
-        books_count = getattr(obj, 'books_count_annotated', 0)
-        subcategories_count = getattr(obj, 'subcategories_books_count_annotated', 0)
+        # Используем аннотации если доступны (в том числе нулевые)
+        if hasattr(obj, 'books_count_annotated'):
+            return obj.books_count_annotated + getattr(obj, 'subcategories_books_count_annotated', 0)
         
-        if books_count > 0 or subcategories_count > 0:
-            return books_count + subcategories_count
-        
-        # Fallback: если аннотации нет, используем старый метод (но это медленнее)
-        count = obj.books.count()
-        if hasattr(obj, '_prefetched_objects_cache') and 'subcategories' in obj._prefetched_objects_cache:
+        # Fallback: если аннотации нет (вложенные подкатегории), используем prefetch или запросы
+        prefetched = getattr(obj, '_prefetched_objects_cache', {})
+        count = len(obj.books.all()) if 'books' in prefetched else obj.books.count()
+        if 'subcategories' in prefetched:
             for subcategory in obj.subcategories.all():
-                count += subcategory.books.count()
+                if 'books' in getattr(subcategory, '_prefetched_objects_cache', {}):
+                    count += len(subcategory.books.all())
+                else:
+                    count += subcategory.books.count()
         else:
             # Если нет prefetch, делаем один запрос для всех подкатегорий
             from django.db.models import Count
@@ -149,7 +149,8 @@ class CategorySerializer(serializers.ModelSerializer):
     
     def get_subcategories(self, obj):
         """Возвращает подкатегории"""
-        subcategories = obj.subcategories.all().order_by('name')  # Сортировка по алфавиту
+        # Сортировка по алфавиту в памяти: order_by() выполнил бы запрос мимо prefetch
+        subcategories = sorted(obj.subcategories.all(), key=lambda subcategory: subcategory.name)
         return CategorySerializer(subcategories, many=True).data
 
 
@@ -163,76 +164,41 @@ class CategoryTreeSerializer(serializers.ModelSerializer):
         fields = ['id', 'code', 'name', 'slug', 'icon', 'order', 'subcategories', 'books_count']
     
     def get_subcategories(self, obj):
-        """Возвращает подкатегории"""
-        from django.db.models import Count, Q
-        from books.models import Book, Category
-        
-        library_ids = self.context.get('library_ids', [])
-        # Получаем подкатегории через prefetch (если доступен) или напрямую
-        subcategories_qs = obj.subcategories.all()
-        
-        # Проверяем, есть ли уже аннотация books_count из prefetch
-        # Prefetch из tree() уже содержит аннотацию, если она была добавлена
-        # Проверяем первый элемент queryset (если есть) на наличие аннотации
-        needs_annotation = True
-        try:
-            # Пытаемся получить первый элемент без оценки всего queryset
-            first_sub = subcategories_qs.first()
-            if first_sub:
-                # Проверяем через getattr с default
-                test_count = getattr(first_sub, 'books_count', None)
-                # Если books_count доступен и это число, значит аннотация есть из prefetch
-                if test_count is not None and isinstance(test_count, (int, type(None))):
-                    needs_annotation = False
-        except (AttributeError, TypeError):
-            pass
-        
-        # Аннотируем только если нужно (если prefetch не содержал аннотацию)
-        if needs_annotation:
-            if library_ids:
-                subcategories_qs = subcategories_qs.annotate(
-                    books_count=Count(
-                        'books',
-                        filter=Q(books__library_id__in=library_ids),
-                        distinct=True
-                    )
-                )
-            else:
-                subcategories_qs = subcategories_qs.annotate(
-                    books_count=Count('books', distinct=True)
-                )
-        
-        # Сортируем и получаем список
-        subcategories = list(subcategories_qs.order_by('name'))
+        """Возвращает подкатегории с книгами"""
+        if 'subcategories' in getattr(obj, '_prefetched_objects_cache', {}):
+            # Prefetch из tree()/tree_all() уже содержит аннотацию books_count
+            subcategories = obj.subcategories.all()
+        else:
+            from django.db.models import Count, Q
+            library_ids = self.context.get('library_ids', [])
+            books_filter = Q(books__library_id__in=library_ids) if library_ids else Q()
+            subcategories = obj.subcategories.annotate(
+                books_count=Count('books', filter=books_filter, distinct=True)
+            )
         
-        # Используем простой сериализатор для подкатегорий (без вложенности)
-        # Фильтруем подкатегории с нулевым количеством книг
-        result = []
-        for sub in subcategories:
-            books_count = getattr(sub, 'books_count', 0)
-            # Показываем только подкатегории с книгами
-            if books_count > 0:
-                result.append({
-                    'id': sub.id,
-                    'code': sub.code,
-                    'name': sub.name,
-                    'slug': sub.slug,
-                    'icon': sub.icon,
-                    'order': sub.order,
-                    'books_count': books_count
-                })
-        return result
+        # Сортировка по алфавиту в памяти: order_by() выполнил бы запрос мимо prefetch.
+        # Показываем только подкатегории с книгами
+        return [
+            {
+                'id': sub.id,
+                'code': sub.code,
+                'name': sub.name,
+                'slug': sub.slug,
+                'icon': sub.icon,
+                'order': sub.order,
+                'books_count': sub.books_count
+            }
+            for sub in sorted(subcategories, key=lambda subcategory: subcategory.name)
+            if sub.books_count > 0
+        ]
     
     def get_books_count(self, obj):
         """Подсчитывает книги включая подкатегории"""
         library_ids = self.context.get('library_ids', [])
         
-        # Используем аннотации если доступны
-        books_count = getattr(obj, 'books_count_annotated', 0)
-        subcategories_count = getattr(obj, 'subcategories_books_count_annotated', 0)
-        
-        if books_count > 0 or subcategories_count > 0:
-            return books_count + subcategories_count
+        # Используем аннотации если доступны (в том числе нулевые)
+        if hasattr(obj, 'books_count_annotated'):
+            return obj.books_count_annotated + getattr(obj, 'subcategories_books_count_annotated', 0)
         
         # Fallback: если аннотации нет и библиотеки не указаны, возвращаем 0
         if not library_ids:
@@ -355,7 +321,9 @@ class BookListSerializer(serializers.ModelSerializer):
     average_rating = serializers.SerializerMethodField()
     
     def get_average_rating(self, obj):
-        """Возвращает средний рейтинг книги"""
+        """Возвращает средний рейтинг книги (аннотация BookViewSet, иначе запрос)"""
+        if hasattr(obj, 'average_rating_annotated'):
+            return round(obj.average_rating_annotated, 2) if obj.average_rating_annotated else None
         return obj.average_rating
     
     def get_authors(self, obj):
@@ -373,8 +341,9 @@ class BookListSerializer(serializers.ModelSerializer):
             cover_page = obj.cover_page
             if not cover_page:
                 # Если обложка не назначена, используем первую страницу
-                if hasattr(obj, 'all_pages') and obj.all_pages:
-                    cover_page = obj.all_pages[0] if obj.all_pages else None
+                if hasattr(obj, 'first_pages'):
+                    # Первая страница загружена prefetch (пустой список - страниц нет)
+                    cover_page = obj.first_pages[0] if obj.first_pages else None
                 else:
                     # Иначе делаем запрос - используем order_by для получения первой страницы
                     cover_page = obj.pages_set.order_by('page_number').first()
@@ -443,8 +412,9 @@ class BookSerializer(serializers.ModelSerializer):
             cover_page = obj.cover_page
             if not cover_page:
                 # Если обложка не назначена, используем первую страницу
-                if hasattr(obj, 'all_pages') and obj.all_pages:
-                    cover_page = obj.all_pages[0] if obj.all_pages else None
+                if hasattr(obj, 'first_pages'):
+                    # Первая страница загружена prefetch (пустой список - страниц нет)
+                    cover_page = obj.first_pages[0] if obj.first_pages else None
                 else:
                     # Иначе делаем запрос - используем order_by для получения первой страницы
                     cover_page = obj.pages_set.order_by('page_number').first()
@@ -490,7 +460,9 @@ class BookDetailSerializer(BookSerializer):
     average_rating = serializers.SerializerMethodField()
     
     def get_average_rating(self, obj):
-        """Возвращает средний рейтинг книги"""
+        """Возвращает средний рейтинг книги (аннотация BookViewSet, иначе запрос)"""
+        if hasattr(obj, 'average_rating_annotated'):
+            return round(obj.average_rating_annotated, 2) if obj.average_rating_annotated else None
         return obj.average_rating
     
     def get_pages(self, obj):
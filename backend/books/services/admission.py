@@ -0,0 +1,239 @@
+"""
+Контроль допуска к тяжелым эндпоинтам (нормализация и загрузка страниц, автозаполнение)
+
+Маршруты разделены на классы (ADMISSION_ENDPOINT_CLASSES: имя маршрута -> класс),
+для каждого класса действуют лимиты ADMISSION_LIMITS:
+- token bucket на пользователя: rate_per_minute запросов в минуту и запас burst
+  для всплеска; превышение - сразу 429 с Retry-After до появления токена
+- слоты параллельности: не больше user_slots одновременных запросов пользователя
+  и global_slots всего; запрос без свободного слота ждет в очереди до
+  ADMISSION_QUEUE_TIMEOUT секунд (ожидающих не больше max_queue), затем 429
+
+Состояние хранится в памяти процесса (как LLM_MAX_CONCURRENCY): при
+нескольких воркерах лимиты действуют в каждом воркере.
+Используется AdmissionControlMiddleware, метрики - в GET /api/profiling/.
+"""
+import asyncio
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+
+from ..exceptions import AdmissionRejected
+
+
+DEFAULT_LIMITS = {
+    'global_slots': 4,
+    'user_slots': 1,
+    'rate_per_minute': 30,  # 0 - без ограничения частоты
+    'burst': 5,
+    'max_queue': 16,
+}
+
+# Интервал проверки свободного слота асинхронным запросом в очереди, секунды
+ASYNC_POLL_INTERVAL = 0.05
+
+
+class TokenBucket:
+    """Token bucket: rate токенов в секунду, не больше capacity"""
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Забирает токен; 0 - успешно, иначе секунды до появления токена"""
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def refund(self) -> None:
+        """Возвращает токен запроса, не получившего слот"""
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def is_full(self, now: float) -> bool:
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class AdmissionClass:
+    """Слоты параллельности, очередь и token bucket'ы пользователей одного класса эндпоинтов"""
+
+    # Сколько token bucket'ов хранить до удаления полностью восстановившихся
+    MAX_BUCKETS = 1024
+
+    def __init__(self, name: str, limits: Dict[str, Any]):
+        limits = {**DEFAULT_LIMITS, **limits}
+        if limits['global_slots'] < 1 or limits['user_slots'] < 1:
+            raise ValueError(f'Класс допуска "{name}": global_slots и user_slots должны быть >= 1')
+        self.name = name
+        self.limits = limits
+        self._condition = threading.Condition()
+        self._active = 0
+        self._active_by_user: Counter = Counter()
+        self._waiting = 0
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._counters = {'admitted': 0, 'queued': 0, 'rejected_rate': 0, 'rejected_busy': 0}
+        self._wait_seconds = 0.0
+
+    def acquire(self, user_key: str, timeout: float) -> None:
+        """Занимает слот (ожидание в очереди не дольше timeout); иначе AdmissionRejected"""
+        bucket = self._take_token(user_key)
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            if self._try_occupy(user_key):
+                return
+            self._enqueue(bucket, timeout)
+            waited_since = time.monotonic()
+            try:
+                while not self._try_occupy(user_key):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._reject_busy(bucket, timeout)
+                    self._condition.wait(remaining)
+            finally:
+                self._waiting -= 1
+                self._wait_seconds += time.monotonic() - waited_since
+
+    async def aacquire(self, user_key: str, timeout: float) -> None:
+        """acquire для event loop: ожидание слота не занимает поток"""
+        bucket = self._take_token(user_key)
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            if self._try_occupy(user_key):
+                return
+            self._enqueue(bucket, timeout)
+        waited_since = time.monotonic()
+        try:
+            while True:
+                await asyncio.sleep(min(ASYNC_POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+                with self._condition:
+                    if self._try_occupy(user_key):
+                        return
+                    if time.monotonic() >= deadline:
+                        self._reject_busy(bucket, timeout)
+        finally:
+            with self._condition:
+                self._waiting -= 1
+                self._wait_seconds += time.monotonic() - waited_since
+
+    def release(self, user_key: str) -> None:
+        """Освобождает слот, занятый acquire/aacquire"""
+        with self._condition:
+            self._active -= 1
+            self._active_by_user[user_key] -= 1
+            if self._active_by_user[user_key] <= 0:
+                del self._active_by_user[user_key]
+            self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики класса: лимиты, занятые слоты, очередь и накопленные счетчики"""
+        with self._condition:
+            return {
+                **self.limits,
+                'active': self._active,
+                'active_users': len(self._active_by_user),
+                'waiting': self._waiting,
+                **self._counters,
+                'wait_ms_total': round(self._wait_seconds * 1000, 1),
+            }
+
+    def _take_token(self, user_key: str) -> Optional[TokenBucket]:
+        rate = self.limits['rate_per_minute']
+        if not rate:
+            return None
+        now = time.monotonic()
+        with self._condition:
+            bucket = self._buckets.get(user_key)
+            if bucket is None:
+                if len(self._buckets) >= self.MAX_BUCKETS:
+                    self._buckets = {key: b for key, b in self._buckets.items() if not b.is_full(now)}
+                bucket = self._buckets[user_key] = TokenBucket(
+                    rate / 60, max(self.limits['burst'], 1), now
+                )
+            retry_after = bucket.take(now)
+            if retry_after:
+                self._counters['rejected_rate'] += 1
+                raise AdmissionRejected(
+                    f'Слишком много запросов ({rate} в минуту). Повторите позже.', retry_after
+                )
+        return bucket
+
+    def _try_occupy(self, user_key: str) -> bool:
+        """Занимает слот, если свободны глобальный и пользовательский (под блокировкой)"""
+        if self._active >= self.limits['global_slots']:
+            return False
+        if self._active_by_user[user_key] >= self.limits['user_slots']:
+            return False
+        self._active += 1
+        self._active_by_user[user_key] += 1
+        self._counters['admitted'] += 1
+        return True
+
+    def _enqueue(self, bucket: Optional[TokenBucket], timeout: float) -> None:
+        """Ставит запрос в очередь (под блокировкой); очередь заполнена или без ожидания - отказ"""
+        if self._waiting >= self.limits['max_queue'] or timeout <= 0:
+            self._reject_busy(bucket, timeout)
+        self._waiting += 1
+        self._counters['queued'] += 1
+
+    def _reject_busy(self, bucket: Optional[TokenBucket], timeout: float) -> None:
+        self._counters['rejected_busy'] += 1
+        if bucket is not None:
+            bucket.refund()
+        raise AdmissionRejected(
+            'Сервер занят обработкой предыдущих запросов. Повторите позже.', max(timeout, 1)
+        )
+
+
+class AdmissionController:
+    """Классы допуска процесса (создаются при первом запросе, пересоздаются при изменении лимитов)"""
+
+    _classes: Dict[str, AdmissionClass] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def for_view(cls, view_name: Optional[str]) -> Optional[AdmissionClass]:
+        """Класс допуска маршрута (None - маршрут не ограничивается)"""
+        if not view_name or not is_admission_enabled():
+            return None
+        name = getattr(settings, 'ADMISSION_ENDPOINT_CLASSES', {}).get(view_name)
+        if name is None:
+            return None
+        limits = {**DEFAULT_LIMITS, **getattr(settings, 'ADMISSION_LIMITS', {}).get(name, {})}
+        admission = cls._classes.get(name)
+        if admission is None or admission.limits != limits:
+            with cls._lock:
+                admission = cls._classes.get(name)
+                if admission is None or admission.limits != limits:
+                    # Запросы со слотами старого экземпляра освобождают их в нем же
+                    admission = cls._classes[name] = AdmissionClass(name, limits)
+        return admission
+
+    @classmethod
+    def stats(cls) -> Dict[str, Dict[str, Any]]:
+        """Метрики всех классов допуска процесса: {класс: метрики}"""
+        return {name: admission.stats() for name, admission in sorted(cls._classes.items())}
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._classes.clear()
+
+
+def is_admission_enabled() -> bool:
+    return getattr(settings, 'ADMISSION_CONTROL_ENABLED', False)
+
+
+def get_queue_timeout() -> float:
+    """Сколько секунд запрос ждет свободного слота до отказа (429)"""
+    return getattr(settings, 'ADMISSION_QUEUE_TIMEOUT', 5.0)
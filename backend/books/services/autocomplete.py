@@ -0,0 +1,208 @@
+"""
+Автодополнение авторов, издательств и хэштегов по префиксу
+Индекс в памяти процесса: отсортированные нормализованные слова названий со списками
+записей и готовые top-K для коротких префиксов. Поиск - бинарный, без запросов к БД
+"""
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from itertools import accumulate, chain, groupby, islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+
+from ..models import Author, Hashtag, Publisher
+
+_SEPARATORS = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def normalize(text: str) -> str:
+    """Ключ поиска: без регистра, ё → е, знаки препинания и # - пробелы"""
+    text = unicodedata.normalize('NFKC', text or '').casefold().replace('ё', 'е')
+    return ' '.join(_SEPARATORS.sub(' ', text).split())
+
+
+class PrefixIndex:
+    """
+    Неизменяемый индекс одного справочника.
+
+    Записи упорядочены по популярности (количеству книг): номер записи - ее ранг.
+    Для каждого слова названий хранится возрастающий список рангов записей,
+    слова отсортированы - префикс находится бинарным поиском, а ранги нескольких
+    слов сливаются лениво до набора limit результатов. Для префиксов длиной
+    до SHORT_PREFIX символов top-K готов заранее.
+    """
+
+    SHORT_PREFIX = 2
+    # До скольких рангов диапазон сливается целиком (быстрее ленивого heapq.merge)
+    EAGER_MERGE_LIMIT = 20000
+
+    def __init__(self, entries: List[Dict[str, Any]], name_field: str, top_k: int):
+        self.entries = sorted(entries, key=lambda entry: (-entry['books_count'], entry[name_field]))
+        self.top_k = top_k
+        # " слово1 слово2" - начало слова проверяется поиском подстроки " префикс"
+        self.names: List[str] = []
+        postings: Dict[str, List[int]] = {}
+        for rank, entry in enumerate(self.entries):
+            words = dict.fromkeys(normalize(entry[name_field]).split())
+            self.names.append(' ' + ' '.join(words))
+            for word in words:
+                postings.setdefault(word, []).append(rank)
+        self.words = sorted(postings)
+        self.postings = [postings[word] for word in self.words]
+        # Накопленные длины списков: размер диапазона слов без его просмотра
+        self.offsets = [0, *accumulate(len(ranks) for ranks in self.postings)]
+
+        # top-K для коротких префиксов (иначе "а" сливало бы списки тысяч слов)
+        prefixes = {word[:length] for word in self.words for length in range(1, self.SHORT_PREFIX + 1)}
+        self.short: Dict[str, List[int]] = {
+            prefix: list(islice(self._merged(prefix), top_k)) for prefix in prefixes
+        }
+
+    def _merged(self, prefix: str) -> Iterator[int]:
+        """Ранги записей со словом, начинающимся с prefix, по возрастанию (лениво, без повторов)"""
+        low = bisect_left(self.words, prefix)
+        high = bisect_left(self.words, prefix + '\uffff', low)
+        if high - low == 1:
+            return iter(self.postings[low])
+        if self.offsets[high] - self.offsets[low] <= self.EAGER_MERGE_LIMIT:
+            return iter(sorted(set(chain.from_iterable(self.postings[low:high]))))
+        return (rank for rank, _ in groupby(heapq.merge(*self.postings[low:high])))
+
+    def _ranks(self, prefix: str) -> Iterator[int]:
+        if len(prefix) <= self.SHORT_PREFIX:
+            return iter(self.short.get(prefix, []))
+        return self._merged(prefix)
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Записи, у которых каждое слово запроса - начало какого-либо слова названия"""
+        limit = min(limit, self.top_k) if limit and limit > 0 else self.top_k
+        query_words = normalize(query).split()
+        if not query_words:
+            return []
+
+        # По индексу ищется самое длинное (самое избирательное) слово, остальные - проверкой
+        pivot = max(query_words, key=len)
+        others = list(query_words)
+        others.remove(pivot)
+        if len(pivot) <= self.SHORT_PREFIX and others:
+            # Все слова запроса короткие - просмотр записей по рангу
+            candidates: Iterable[int] = range(len(self.entries))
+            others = query_words
+        else:
+            candidates = self._ranks(pivot)
+        others = [' ' + word for word in others]
+
+        result = []
+        for rank in candidates:
+            name = self.names[rank]
+            if all(other in name for other in others):
+                result.append(self.entries[rank])
+                if len(result) >= limit:
+                    break
+        return result
+
+
+class AutocompleteService:
+    """
+    Индексы автодополнения (в памяти процесса).
+
+    Изменение авторов, издательств и хэштегов (сигналы post_save/post_delete)
+    увеличивает счетчик поколений справочника в кэше Django - индекс
+    перестраивается при следующем запросе, в том числе в других процессах.
+    Популярность (количество книг) обновляется раз в AUTOCOMPLETE_REFRESH_SECONDS.
+    Устаревший индекс перестраивается в фоновом потоке, запросы до окончания
+    построения отвечают по нему (AUTOCOMPLETE_BACKGROUND_REFRESH=False - синхронно).
+    """
+
+    GENERATION_CACHE_KEY = 'autocomplete:generation:{kind}'
+
+    # Справочник -> (поле названия, загрузка записей)
+    SOURCES: Dict[str, Tuple[str, Callable[[], List[Dict[str, Any]]]]] = {
+        'authors': ('full_name', lambda: list(
+            Author.objects.annotate(books_count=Count('bookauthor'))
+            .values('id', 'full_name', 'birth_year', 'death_year', 'books_count')
+        )),
+        'publishers': ('name', lambda: list(
+            Publisher.objects.annotate(books_count=Count('books'))
+            .values('id', 'name', 'city', 'books_count')
+        )),
+        'hashtags': ('name', lambda: list(
+            Hashtag.objects.annotate(books_count=Count('book_hashtags'))
+            .values('id', 'name', 'slug', 'books_count')
+        )),
+    }
+
+    # Справочник -> (поколение, время построения, индекс)
+    _indexes: Dict[str, Tuple[int, float, PrefixIndex]] = {}
+    _locks = {kind: threading.Lock() for kind in SOURCES}
+
+    @classmethod
+    def _generation(cls, kind: str) -> int:
+        return cache.get(cls.GENERATION_CACHE_KEY.format(kind=kind)) or 0
+
+    @classmethod
+    def _is_fresh(cls, memo: Optional[Tuple[int, float, PrefixIndex]], generation: int) -> bool:
+        refresh = getattr(settings, 'AUTOCOMPLETE_REFRESH_SECONDS', 300)
+        return memo is not None and memo[0] == generation and time.monotonic() - memo[1] < refresh
+
+    @classmethod
+    def get_index(cls, kind: str) -> PrefixIndex:
+        """Актуальный индекс справочника (строится одним запросом при необходимости)"""
+        generation = cls._generation(kind)
+        memo = cls._indexes.get(kind)
+        if cls._is_fresh(memo, generation):
+            return memo[2]
+
+        if memo is not None and getattr(settings, 'AUTOCOMPLETE_BACKGROUND_REFRESH', True):
+            # Устаревший индекс перестраивается в фоне, запрос отвечает по нему
+            if cls._locks[kind].acquire(blocking=False):
+                threading.Thread(
+                    target=cls._rebuild_in_background, args=(kind, generation), name=f'autocomplete-{kind}', daemon=True
+                ).start()
+            return memo[2]
+
+        with cls._locks[kind]:
+            memo = cls._indexes.get(kind)
+            if cls._is_fresh(memo, generation):
+                return memo[2]
+            return cls._build(kind, generation)
+
+    @classmethod
+    def _build(cls, kind: str, generation: int) -> PrefixIndex:
+        name_field, load = cls.SOURCES[kind]
+        index = PrefixIndex(load(), name_field, getattr(settings, 'AUTOCOMPLETE_MAX_RESULTS', 20))
+        cls._indexes[kind] = (generation, time.monotonic(), index)
+        return index
+
+    @classmethod
+    def _rebuild_in_background(cls, kind: str, generation: int) -> None:
+        """Фоновое построение (блокировка справочника уже захвачена вызывающим потоком)"""
+        try:
+            cls._build(kind, generation)
+        finally:
+            cls._locks[kind].release()
+            connection.close()
+
+    @classmethod
+    def search(cls, kind: str, query: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Top-K записей справочника по популярности, подходящих под префиксы слов запроса"""
+        return cls.get_index(kind).search(query, limit)
+
+    @classmethod
+    def invalidate(cls, kind: str) -> None:
+        """Помечает индекс справочника устаревшим (вызывается сигналами)"""
+        memo = cls._indexes.get(kind)
+        if memo is not None:
+            cls._indexes[kind] = (-1, memo[1], memo[2])
+        key = cls.GENERATION_CACHE_KEY.format(kind=kind)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
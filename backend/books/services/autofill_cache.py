@@ -0,0 +1,145 @@
+"""
+Кэш результатов автозаполнения через LLM
+Ключ кэша: отсортированные хэши содержимого изображений + версия промпта + модель
+"""
+import hashlib
+import threading
+from datetime import timedelta
+from typing import Dict, List, Optional, Any
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from ..models import AutoFillCacheEntry
+
+
+class AutoFillCacheService:
+    """Сервис для кэширования ответов LLM при автозаполнении книг"""
+
+    # Счетчики попаданий/промахов (в рамках процесса)
+    _stats = {'hits': 0, 'misses': 0, 'stores': 0}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """Включен ли кэш в настройках"""
+        return getattr(settings, 'LLM_AUTOFILL_CACHE_ENABLED', True)
+
+    @staticmethod
+    def get_ttl() -> timedelta:
+        """Время жизни записи кэша"""
+        return timedelta(seconds=getattr(settings, 'LLM_AUTOFILL_CACHE_TTL', 30 * 24 * 3600))
+
+    @staticmethod
+    def get_max_entries() -> int:
+        """Максимальное количество записей в кэше"""
+        return getattr(settings, 'LLM_AUTOFILL_CACHE_MAX_ENTRIES', 5000)
+
+    @staticmethod
+    def hash_content(data: bytes) -> str:
+        """SHA-256 хэш содержимого изображения"""
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def build_key(image_hashes: List[str], prompt_version: str, model: str) -> str:
+        """
+        Строит ключ кэша.
+        Хэши сортируются, поэтому порядок изображений не влияет на ключ.
+        """
+        raw = '|'.join([model, prompt_version, *sorted(image_hashes)])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def _increment(cls, counter: str) -> None:
+        with cls._lock:
+            cls._stats[counter] += 1
+
+    @classmethod
+    def get(cls, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает закэшированный результат или None.
+        Просроченные записи удаляются при обращении.
+        """
+        entry = AutoFillCacheEntry.objects.filter(key=key).first()
+        if entry is None:
+            cls._increment('misses')
+            return None
+
+        if entry.created_at < timezone.now() - cls.get_ttl():
+            entry.delete()
+            cls._increment('misses')
+            return None
+
+        AutoFillCacheEntry.objects.filter(pk=entry.pk).update(
+            hits=F('hits') + 1,
+            last_hit_at=timezone.now()
+        )
+        cls._increment('hits')
+        return entry.result
+
+    @classmethod
+    def set(
+        cls,
+        key: str,
+        result: Dict[str, Any],
+        model: str,
+        prompt_version: str,
+        images_count: int = 0
+    ) -> None:
+        """Сохраняет результат и применяет ограничения по TTL и размеру"""
+        AutoFillCacheEntry.objects.update_or_create(
+            key=key,
+            defaults={
+                'result': result,
+                'model_name': model,
+                'prompt_version': prompt_version,
+                'images_count': images_count,
+            }
+        )
+        cls._increment('stores')
+        cls.evict()
+
+    @classmethod
+    def evict(cls) -> int:
+        """
+        Удаляет просроченные записи и самые старые записи сверх лимита.
+        Returns: количество удаленных записей
+        """
+        deleted, _ = AutoFillCacheEntry.objects.filter(
+            created_at__lt=timezone.now() - cls.get_ttl()
+        ).delete()
+
+        max_entries = cls.get_max_entries()
+        if AutoFillCacheEntry.objects.count() > max_entries:
+            stale_ids = list(
+                AutoFillCacheEntry.objects.order_by('-created_at', '-id')
+                .values_list('id', flat=True)[max_entries:]
+            )
+            extra, _ = AutoFillCacheEntry.objects.filter(id__in=stale_ids).delete()
+            deleted += extra
+
+        return deleted
+
+    @classmethod
+    def clear(cls) -> int:
+        """Очищает кэш. Returns: количество удаленных записей"""
+        deleted, _ = AutoFillCacheEntry.objects.all().delete()
+        return deleted
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """Счетчики попаданий/промахов и текущий размер кэша"""
+        with cls._lock:
+            stats = dict(cls._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['entries'] = AutoFillCacheEntry.objects.count()
+        stats['max_entries'] = cls.get_max_entries()
+        stats['ttl_seconds'] = int(cls.get_ttl().total_seconds())
+        return stats
+
+    @classmethod
+    def reset_stats(cls) -> None:
+        """Сбрасывает счетчики (используется в тестах)"""
+        with cls._lock:
+            for counter in cls._stats:
+                cls._stats[counter] = 0
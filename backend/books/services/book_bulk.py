@@ -0,0 +1,121 @@
+"""
+Массовые операции над книгами и страницами для действий админки
+
+Обработчики получают пачку id (BulkJobQueue вызывает их в отдельной
+транзакции на пачку) и работают запросами на всю пачку: queryset.update,
+bulk_create и _raw_delete вместо сохранения каждой книги. Сигналы при этом
+не отправляются, поэтому частоты хэштегов (HashtagCategoryCount) и статистика
+чтения обновляются явно через HashtagCountService и ReadingStatsService.
+"""
+from collections import Counter
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from ..constants import MAX_HASHTAGS_PER_BOOK
+from ..exceptions import TransferError
+from ..models import Book, BookHashtag, BookPage, Library
+from .book_service import BookService
+from .bulk_jobs import BulkJob, BulkJobQueue
+from .hashtag_counts import HashtagCountService
+from .reading_stats import ReadingStatsService
+
+User = get_user_model()
+
+
+class BookBulkService:
+    """Передача, изменение хэштегов и повторная обработка страниц пачками"""
+
+    # Обработка страницы - секунды OpenCV: пачка страниц меньше, чтобы не держать долгую транзакцию
+    REPROCESS_BATCH_SIZE = 20
+
+    @staticmethod
+    def transfer(book_ids: List[int], library_id: Optional[int] = None, owner_id: Optional[int] = None) -> int:
+        """Передает книги в библиотеку и (или) пользователю. Returns: количество книг"""
+        changes = {'updated_at': timezone.now()}
+        if library_id:
+            HashtagCountService.books_moved_to_library(book_ids, library_id)
+            changes['library_id'] = library_id
+        if owner_id:
+            ReadingStatsService.books_transferred(book_ids, owner_id)
+            changes['owner_id'] = owner_id
+        return Book.objects.filter(id__in=book_ids).update(**changes)
+
+    @staticmethod
+    def retag(book_ids: List[int], add_ids: Iterable[int] = (), remove_ids: Iterable[int] = ()) -> int:
+        """
+        Добавляет и удаляет хэштеги книг. Книге добавляется не больше хэштегов,
+        чем позволяет MAX_HASHTAGS_PER_BOOK (в порядке add_ids).
+        Returns: количество добавленных и удаленных связей
+        """
+        add_ids, remove_ids = list(add_ids), list(remove_ids)
+        changed = 0
+        if remove_ids:
+            links = BookHashtag.objects.filter(book_id__in=book_ids, hashtag_id__in=remove_ids)
+            HashtagCountService.links_changed(links, -1)
+            changed += links.order_by()._raw_delete(links.db)
+        if not add_ids:
+            return changed
+
+        current: Dict[int, set] = {book_id: set() for book_id in book_ids}
+        for book_id, hashtag_id in BookHashtag.objects.filter(book_id__in=book_ids).values_list('book_id', 'hashtag_id'):
+            current[book_id].add(hashtag_id)
+        locations: Dict[int, Tuple[Optional[int], Optional[int]]] = {
+            book_id: (library_id, category_id)
+            for book_id, library_id, category_id in
+            Book.objects.filter(id__in=book_ids).values_list('id', 'library_id', 'category_id')
+        }
+
+        links = []
+        deltas: Counter = Counter()
+        for book_id, location in locations.items():
+            free = MAX_HASHTAGS_PER_BOOK - len(current[book_id])
+            new_ids = [hashtag_id for hashtag_id in add_ids if hashtag_id not in current[book_id]][:max(free, 0)]
+            for hashtag_id in new_ids:
+                links.append(BookHashtag(book_id=book_id, hashtag_id=hashtag_id))
+                deltas[(hashtag_id, *location)] += 1
+        BookHashtag.objects.bulk_create(links, batch_size=1000)
+        HashtagCountService.apply(deltas)
+        return changed + len(links)
+
+    @staticmethod
+    def reprocess_pages(page_ids: List[int]) -> int:
+        """Повторная обработка страниц (BookService.process_page). Returns: количество страниц"""
+        pages = list(BookPage.objects.filter(id__in=page_ids))
+        for page in pages:
+            BookService.process_page(page)
+        return len(pages)
+
+    # Постановка в очередь (действия админки)
+
+    @staticmethod
+    def enqueue_transfer(books: QuerySet, library_id: Optional[int] = None, owner_id: Optional[int] = None) -> BulkJob:
+        """Передача книг queryset'а; библиотека и пользователь проверяются сразу (TransferError)"""
+        if not library_id and not owner_id:
+            raise TransferError('Необходимо указать library или user')
+        if library_id and not Library.objects.filter(id=library_id).exists():
+            raise TransferError('Библиотека не найдена')
+        if owner_id and not User.objects.filter(id=owner_id).exists():
+            raise TransferError('Пользователь не найден')
+        return BulkJobQueue.enqueue(
+            'Передача книг', books,
+            partial(BookBulkService.transfer, library_id=library_id, owner_id=owner_id),
+        )
+
+    @staticmethod
+    def enqueue_retag(books: QuerySet, add_ids: Iterable[int] = (), remove_ids: Iterable[int] = ()) -> BulkJob:
+        return BulkJobQueue.enqueue(
+            'Изменение хэштегов', books,
+            partial(BookBulkService.retag, add_ids=list(add_ids), remove_ids=list(remove_ids)),
+        )
+
+    @staticmethod
+    def enqueue_reprocess(pages: QuerySet) -> BulkJob:
+        """Обработка страниц queryset'а заново (в том числе уже обработанных и с ошибкой)"""
+        return BulkJobQueue.enqueue(
+            'Повторная обработка страниц', pages, BookBulkService.reprocess_pages,
+            batch_size=BookBulkService.REPROCESS_BATCH_SIZE,
+        )
@@ -0,0 +1,211 @@
+"""
+Быстрая сериализация списка книг: проекция .values() вместо моделей Book
+
+BookListSerializer создает для каждой строки модель Book, модели связанных
+объектов select_related и prefetch, и вызывает SerializerMethodField'ы
+(авторы, хэштеги, обложка, рейтинг). Для списка из десятков книг это основная
+часть времени CPU ответа. BookListProjection выбирает только нужные столбцы
+(.values()), загружает авторов, хэштеги и первые страницы всей страницы
+списка тремя запросами по id книг и собирает словари, совпадающие
+с BookListSerializer поле в поле (проверяется тестами на совпадение).
+
+Поля и их порядок берутся из BookListSerializer: новое поле сериализатора
+попадает в проекцию автоматически, новый SerializerMethodField нужно
+добавить в METHOD_FIELDS. Используется BookViewSet.list_response
+(BOOK_LIST_FAST_PATH), сравнение времени - json_render_benchmark.
+"""
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import F, QuerySet, Window
+from django.db.models.functions import RowNumber
+from rest_framework import serializers
+
+from ..models import BookAuthor, BookHashtag, BookPage
+from ..serializers import BookListSerializer
+
+
+class Column(NamedTuple):
+    """Поле BookListSerializer и столбец проекции, по которому оно вычисляется"""
+    name: str
+    # None - SerializerMethodField (вычисляется BookListProjection.serialize)
+    lookup: Optional[str]
+    field: serializers.Field
+    # Для полей связанного объекта (category.name): столбец внешнего ключа
+    fk_lookup: Optional[str]
+    # Поле возвращает значение как есть (str/int без преобразования)
+    passthrough: bool
+
+
+# Поля, которые DRF для str/int возвращает без изменений
+PASSTHROUGH_FIELDS = (
+    serializers.CharField, serializers.IntegerField, serializers.ChoiceField, serializers.PrimaryKeyRelatedField
+)
+
+
+@lru_cache(maxsize=None)
+def list_columns() -> Tuple[Column, ...]:
+    """Поля BookListSerializer в порядке вывода со столбцами проекции"""
+    columns = []
+    for name, field in BookListSerializer().fields.items():
+        if isinstance(field, serializers.SerializerMethodField):
+            if name not in BookListProjection.METHOD_FIELDS:
+                raise ValueError(f'BookListProjection: поле {name} не поддерживается')
+            columns.append(Column(name, None, field, None, False))
+            continue
+        attrs = field.source_attrs
+        fk_lookup = None
+        if len(attrs) == 2:
+            fk_lookup = f'{attrs[0]}_id'
+        elif len(attrs) != 1:
+            raise ValueError(f'BookListProjection: неподдерживаемый source поля {name}: {field.source}')
+        columns.append(Column(
+            name=name,
+            lookup='__'.join(attrs),
+            field=field,
+            fk_lookup=fk_lookup,
+            passthrough=isinstance(field, PASSTHROUGH_FIELDS),
+        ))
+    return tuple(columns)
+
+
+def is_fast_list_enabled() -> bool:
+    return getattr(settings, 'BOOK_LIST_FAST_PATH', True)
+
+
+class BookListProjection:
+    """Словари списка книг из .values() и пакетных запросов, идентичные BookListSerializer"""
+
+    # SerializerMethodField'ы BookListSerializer, вычисляемые проекцией
+    METHOD_FIELDS = ('authors', 'hashtags', 'first_page_url', 'average_rating')
+    # Аннотации BookViewSet.queryset, без которых проекция невозможна
+    ANNOTATIONS = (
+        'images_count_annotated', 'reviews_count_annotated',
+        'electronic_versions_count_annotated', 'average_rating_annotated',
+    )
+    COVER_COLUMNS = ('cover_page_id', 'cover_page__processed_image', 'cover_page__original_image')
+    # BookListSerializer.get_authors: первые три автора
+    AUTHORS_LIMIT = 3
+
+    def __init__(self, context: Optional[Dict[str, Any]] = None):
+        self.request = (context or {}).get('request')
+        self.columns = list_columns()
+        self._image_fields = {
+            name: BookPage._meta.get_field(name) for name in ('processed_image', 'original_image')
+        }
+
+    @classmethod
+    def supports(cls, queryset: QuerySet) -> bool:
+        """Queryset списка BookViewSet (с аннотациями счетчиков и рейтинга), еще не спроецированный"""
+        return (
+            queryset._fields is None
+            and not queryset.query.values_select
+            and all(name in queryset.query.annotations for name in cls.ANNOTATIONS)
+        )
+
+    def project(self, queryset: QuerySet) -> QuerySet:
+        """Queryset словарей с нужными столбцами (сортировка и фильтры сохраняются)"""
+        lookups = {column.lookup for column in self.columns if column.lookup}
+        lookups.update(column.fk_lookup for column in self.columns if column.fk_lookup)
+        lookups.update(self.ANNOTATIONS)
+        lookups.update(self.COVER_COLUMNS)
+        # Поля курсорной пагинации
+        lookups.update(('id', 'created_at', 'updated_at', 'title'))
+        return queryset.prefetch_related(None).values(*sorted(lookups))
+
+    def serialize(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Данные списка книг (как BookListSerializer(many=True).data)"""
+        rows = list(rows)
+        ids = [row['id'] for row in rows]
+        authors = self.authors_by_book(ids)
+        hashtags = self.hashtags_by_book(ids)
+        first_pages = self.first_pages_by_book([row['id'] for row in rows if row['cover_page_id'] is None])
+
+        data = []
+        for row in rows:
+            book_id = row['id']
+            if row['cover_page_id'] is not None:
+                images = (row['cover_page__processed_image'], row['cover_page__original_image'])
+            else:
+                images = first_pages.get(book_id, (None, None))
+            rating = row['average_rating_annotated']
+            computed = {
+                'authors': authors.get(book_id, []),
+                'hashtags': hashtags.get(book_id, []),
+                'first_page_url': self.image_url(*images),
+                'average_rating': round(rating, 2) if rating else None,
+            }
+
+            item = {}
+            for column in self.columns:
+                if column.lookup is None:
+                    item[column.name] = computed[column.name]
+                    continue
+                if column.fk_lookup and row[column.fk_lookup] is None:
+                    # Как DRF: нет связанного объекта - None при allow_null, иначе поле пропускается
+                    if column.field.allow_null:
+                        item[column.name] = None
+                    continue
+                value = row[column.lookup]
+                if value is None or (column.passthrough and type(value) in (str, int)):
+                    item[column.name] = value
+                else:
+                    item[column.name] = column.field.to_representation(value)
+            data.append(item)
+        return data
+
+    def image_url(self, processed: Optional[str], original: Optional[str]) -> Optional[str]:
+        """URL обложки: processed_image, затем original_image (как get_first_page_url)"""
+        if processed:
+            url = self._image_fields['processed_image'].storage.url(processed)
+        elif original:
+            url = self._image_fields['original_image'].storage.url(original)
+        else:
+            return None
+        return self.request.build_absolute_uri(url) if self.request else url
+
+    def authors_by_book(self, book_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """Первые AUTHORS_LIMIT авторов книг (порядок Author.Meta.ordering) одним запросом"""
+        result = defaultdict(list)
+        if not book_ids:
+            return result
+        links = (
+            BookAuthor.objects.filter(book_id__in=book_ids)
+            .order_by('author__full_name', 'author_id')
+            .values_list('book_id', 'author_id', 'author__full_name')
+        )
+        for book_id, author_id, full_name in links:
+            authors = result[book_id]
+            if len(authors) < self.AUTHORS_LIMIT:
+                authors.append({'id': author_id, 'full_name': full_name})
+        return result
+
+    @staticmethod
+    def hashtags_by_book(book_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """Хэштеги книг (порядок Hashtag.Meta.ordering) одним запросом"""
+        result = defaultdict(list)
+        if not book_ids:
+            return result
+        links = (
+            BookHashtag.objects.filter(book_id__in=book_ids)
+            .order_by('hashtag__name', 'hashtag_id')
+            .values_list('book_id', 'hashtag_id', 'hashtag__name', 'hashtag__slug')
+        )
+        for book_id, hashtag_id, name, slug in links:
+            result[book_id].append({'id': hashtag_id, 'name': name, 'slug': slug})
+        return result
+
+    @staticmethod
+    def first_pages_by_book(book_ids: List[int]) -> Dict[int, Tuple[Optional[str], Optional[str]]]:
+        """Изображения первой страницы (по page_number) книг без обложки одним запросом"""
+        if not book_ids:
+            return {}
+        pages = (
+            BookPage.objects.filter(book_id__in=book_ids)
+            .annotate(row_number=Window(RowNumber(), partition_by=F('book_id'), order_by=F('page_number').asc()))
+            .filter(row_number=1)
+            .values_list('book_id', 'processed_image', 'original_image')
+        )
+        return {book_id: (processed, original) for book_id, processed, original in pages}
@@ -0,0 +1,185 @@
+"""
+Быстрое удаление книг пачками по диапазонам ID
+
+В отличие от Book.objects.delete() связанные строки не загружаются в память:
+для каждой пачки выполняется DELETE по подзапросу в порядке зависимостей.
+Файлы (изображения, страницы, электронные версии) удаляются из хранилища
+фоновой очередью после фиксации транзакции пачки.
+Сигналы delete не отправляются, частоты хэштегов затронутых библиотек
+и статистика чтения владельцев книг пересчитываются в конце.
+"""
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Any
+
+from django.db import router, transaction
+from django.db.models import Max, Min
+
+from ..models import (
+    Book, BookAuthor, BookElectronic, BookHashtag, BookImage, BookPage, BookReadingDate, BookReview,
+)
+from .hashtag_counts import HashtagCountService
+from .reading_stats import ReadingStatsService
+
+
+class MediaDeletionQueue:
+    """Фоновое удаление файлов из хранилища (один поток-обработчик)"""
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue()
+        self.deleted = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._worker, name='media-deletion', daemon=True)
+        self._thread.start()
+
+    def put(self, storage, name: str) -> None:
+        if name:
+            self._queue.put((storage, name))
+
+    def _worker(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            storage, name = item
+            try:
+                storage.delete(name)
+                self.deleted += 1
+            except Exception:
+                self.failed += 1
+            finally:
+                self._queue.task_done()
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def close(self, wait: bool = True) -> None:
+        """Останавливает обработчик (wait=True - после удаления всех файлов в очереди)"""
+        self._queue.put(None)
+        if wait:
+            self._thread.join()
+
+
+class BookPurgeService:
+    """Удаление книг пачками с каскадом по связанным таблицам"""
+
+    # Таблицы, ссылающиеся на книгу, в порядке удаления
+    DEPENDENT_MODELS = (
+        ('book_hashtags', BookHashtag),
+        ('book_authors', BookAuthor),
+        ('reviews', BookReview),
+        ('reading_dates', BookReadingDate),
+        ('images', BookImage),
+        ('electronic', BookElectronic),
+        ('pages', BookPage),
+    )
+
+    # Файловые поля: модель -> поля
+    FILE_FIELDS = (
+        (BookImage, ('image',)),
+        (BookPage, ('original_image', 'processed_image')),
+        (BookElectronic, ('file',)),
+    )
+
+    @staticmethod
+    def scoped_queryset(library_ids: Optional[Iterable[int]] = None, owner_ids: Optional[Iterable[int]] = None):
+        """Книги для удаления (все или только указанных библиотек и владельцев)"""
+        queryset = Book.objects.all()
+        if library_ids:
+            queryset = queryset.filter(library_id__in=list(library_ids))
+        if owner_ids:
+            queryset = queryset.filter(owner_id__in=list(owner_ids))
+        return queryset.order_by()
+
+    @classmethod
+    def purge(
+        cls,
+        library_ids: Optional[Iterable[int]] = None,
+        owner_ids: Optional[Iterable[int]] = None,
+        batch_size: int = 5000,
+        delete_files: bool = True,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Удаляет книги пачками по диапазонам ID.
+
+        Args:
+            library_ids: Только книги этих библиотек
+            owner_ids: Только книги этих владельцев
+            batch_size: Ширина диапазона ID одной пачки (одна транзакция)
+            delete_files: Удалять файлы из хранилища (фоновая очередь)
+            progress: Вызывается после каждой пачки со статистикой
+
+        Returns:
+            Количество удаленных строк по таблицам, файлов и время
+        """
+        books = cls.scoped_queryset(library_ids, owner_ids)
+        using = router.db_for_write(Book)
+        bounds = books.aggregate(low=Min('id'), high=Max('id'))
+        # Библиотеки, частоты хэштегов которых нужно пересчитать (_raw_delete не отправляет сигналы)
+        affected_library_ids = set(books.exclude(library_id=None).values_list('library_id', flat=True).distinct())
+        # Владельцы книг с датами прочтения - для пересчета статистики чтения
+        affected_owner_ids = set(
+            books.filter(owner__isnull=False, reading_dates__isnull=False).values_list('owner_id', flat=True).distinct()
+        )
+
+        stats: Dict[str, Any] = {key: 0 for key, _ in cls.DEPENDENT_MODELS}
+        stats.update({'books': 0, 'files_queued': 0, 'files_deleted': 0, 'files_failed': 0})
+        media_queue = MediaDeletionQueue() if delete_files else None
+        started = time.perf_counter()
+
+        try:
+            if bounds['low'] is not None:
+                for low in range(bounds['low'], bounds['high'] + 1, batch_size):
+                    batch = books.filter(id__gte=low, id__lt=low + batch_size)
+                    cls._purge_batch(batch, using, stats, media_queue)
+                    if progress:
+                        progress(dict(
+                            stats, elapsed_s=time.perf_counter() - started, low_id=low, high_id=bounds['high']
+                        ))
+        finally:
+            if media_queue is not None:
+                media_queue.close(wait=True)
+                stats['files_deleted'] = media_queue.deleted
+                stats['files_failed'] = media_queue.failed
+
+        if affected_library_ids:
+            HashtagCountService.rebuild(library_ids=affected_library_ids)
+        if affected_owner_ids:
+            ReadingStatsService.rebuild(user_ids=affected_owner_ids)
+
+        stats['elapsed_s'] = round(time.perf_counter() - started, 3)
+        return stats
+
+    @classmethod
+    def _purge_batch(
+        cls, batch, using: str, stats: Dict[str, Any], media_queue: Optional[MediaDeletionQueue]
+    ) -> None:
+        batch_ids = batch.values('id')
+
+        files: List[tuple] = []
+        if media_queue is not None:
+            for model, field_names in cls.FILE_FIELDS:
+                for values in model.objects.filter(book__in=batch_ids).values_list(*field_names):
+                    for field_name, name in zip(field_names, values):
+                        if name:
+                            files.append((model._meta.get_field(field_name).storage, name))
+
+        with transaction.atomic(using=using):
+            # Book.cover_page ссылается на BookPage - обнуляем до удаления страниц
+            batch.filter(cover_page__isnull=False).update(cover_page=None)
+            for key, model in cls.DEPENDENT_MODELS:
+                stats[key] += model.objects.filter(book__in=batch_ids)._raw_delete(using)
+            stats['books'] += batch._raw_delete(using)
+
+            if media_queue is not None and files:
+                stats['files_queued'] += len(files)
+
+                def enqueue_files():
+                    for storage, name in files:
+                        media_queue.put(storage, name)
+
+                # Файлы удаляются только если удаление строк зафиксировано
+                transaction.on_commit(enqueue_files, using=using)
@@ -5,7 +5,7 @@ import os
 import shutil
 import sys
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, List, Optional
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from django.utils import timezone
@@ -75,6 +75,52 @@ class BookService:
         # Создаем новые
         BookService._create_book_authors(book, author_ids)
     
+    @staticmethod
+    def process_page(page: BookPage, process: Optional[Callable] = None) -> Optional[str]:
+        """
+        Обрабатывает страницу (выравнивание документа) и сохраняет результат в processed_image.
+        Статус страницы: processing на время обработки, затем completed или failed.
+        
+        Args:
+            page: Страница с original_image
+            process: Функция обработки (input_path, output_path) -> (width, height),
+                по умолчанию document_processor.process_document
+        
+        Returns:
+            None при успехе, иначе текст ошибки (сохраняется в error_message)
+        """
+        if process is None:
+            from .document_processor import process_document as process
+        
+        try:
+            page.processing_status = 'processing'
+            page.save()
+            
+            # Входной файл
+            input_path = page.original_image.path
+            
+            # Выходной файл
+            output_filename = f"processed_{page.id}_{os.path.basename(input_path)}"
+            output_dir = Path(settings.MEDIA_ROOT) / 'books' / 'pages' / 'processed'
+            output_dir.mkdir(parents=True, exist_ok=True)
+            output_path = output_dir / output_filename
+            
+            width, height = process(input_path, output_path)
+            
+            # Сохраняем относительный путь
+            page.processed_image = str(output_path.relative_to(settings.MEDIA_ROOT))
+            page.width = width
+            page.height = height
+            page.processing_status = 'completed'
+            page.processed_at = timezone.now()
+            page.save()
+            return None
+        except Exception as e:
+            page.processing_status = 'failed'
+            page.error_message = str(e)
+            page.save()
+            return str(e)
+    
     @staticmethod
     def process_normalized_pages(book: Book, normalized_image_urls: List[str], cover_page_index: int = 0) -> None:
         """
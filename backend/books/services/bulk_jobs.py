@@ -0,0 +1,182 @@
+"""
+Фоновые массовые операции (действия админки над тысячами книг и страниц)
+
+Действие админки не выполняет работу в запросе: оно ставит задачу в очередь
+и сразу возвращает ответ. Задача обходит queryset пачками по возрастанию pk
+(keyset, без OFFSET и без загрузки всех id в память) и вызывает обработчик
+для каждой пачки в отдельной транзакции: прерванная задача оставляет
+примененными уже обработанные пачки.
+
+Задачи выполняются по одной в фоновом потоке процесса (как удаление файлов
+BookPurgeService), история последних задач хранится в памяти процесса и
+доступна в GET /api/profiling/. При BULK_JOBS_BACKGROUND = False задача
+выполняется сразу в вызывающем потоке (тесты, management-команды).
+"""
+import itertools
+import logging
+import queue
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class BulkJob:
+    """Массовая операция: обработчик пачек id queryset'а и итоговый вызов finish"""
+
+    def __init__(
+        self,
+        job_id: int,
+        name: str,
+        queryset: QuerySet,
+        handler: Callable[[List[int]], int],
+        batch_size: int,
+        finish: Optional[Callable[[], None]] = None,
+    ):
+        self.id = job_id
+        self.name = name
+        self.queryset = queryset.order_by()
+        self.handler = handler
+        self.batch_size = batch_size
+        self.finish = finish
+        self.status = 'queued'
+        self.batches = 0
+        self.processed = 0
+        self.error: Optional[str] = None
+        self.created_at = timezone.now()
+        self.started_at = None
+        self.finished_at = None
+
+    def run(self) -> None:
+        self.status = 'running'
+        self.started_at = timezone.now()
+        try:
+            last_pk = None
+            while True:
+                batch = self.queryset if last_pk is None else self.queryset.filter(pk__gt=last_pk)
+                ids = list(batch.order_by('pk').values_list('pk', flat=True)[:self.batch_size])
+                if not ids:
+                    break
+                with transaction.atomic(using=self.queryset.db):
+                    self.processed += self.handler(ids)
+                self.batches += 1
+                last_pk = ids[-1]
+            if self.finish is not None:
+                self.finish()
+            self.status = 'done'
+        except Exception as e:
+            logger.exception('Массовая операция #%s "%s" прервана', self.id, self.name)
+            self.status = 'failed'
+            self.error = str(e)
+        finally:
+            self.finished_at = timezone.now()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'batches': self.batches,
+            'processed': self.processed,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class BulkJobQueue:
+    """Очередь массовых операций процесса (один фоновый поток-обработчик)"""
+
+    # Сколько завершенных задач хранить в истории
+    MAX_HISTORY = 50
+
+    _jobs: 'OrderedDict[int, BulkJob]' = OrderedDict()
+    _ids = itertools.count(1)
+    _queue: queue.Queue = queue.Queue()
+    _thread: Optional[threading.Thread] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def enqueue(
+        cls,
+        name: str,
+        queryset: QuerySet,
+        handler: Callable[[List[int]], int],
+        finish: Optional[Callable[[], None]] = None,
+        batch_size: Optional[int] = None,
+    ) -> BulkJob:
+        """
+        Ставит операцию в очередь.
+
+        Args:
+            name: Название для истории и сообщений
+            queryset: Объекты операции (вычисляется пачками при выполнении)
+            handler: Обрабатывает пачку id, возвращает количество обработанных объектов
+            finish: Вызывается после всех пачек (пересчет счетчиков и т.п.)
+            batch_size: Размер пачки (по умолчанию BULK_JOB_BATCH_SIZE)
+        """
+        with cls._lock:
+            job = BulkJob(
+                next(cls._ids), name, queryset, handler,
+                batch_size or get_batch_size(), finish,
+            )
+            cls._jobs[job.id] = job
+            while len(cls._jobs) > cls.MAX_HISTORY:
+                oldest = next(iter(cls._jobs.values()))
+                if oldest.status in ('queued', 'running'):
+                    break
+                cls._jobs.popitem(last=False)
+        if not is_background():
+            job.run()
+            return job
+        cls._ensure_worker()
+        cls._queue.put(job)
+        return job
+
+    @classmethod
+    def get(cls, job_id: int) -> Optional[BulkJob]:
+        return cls._jobs.get(job_id)
+
+    @classmethod
+    def stats(cls) -> List[Dict[str, Any]]:
+        """История задач процесса, новые первыми"""
+        return [job.as_dict() for job in reversed(list(cls._jobs.values()))]
+
+    @classmethod
+    def reset(cls) -> None:
+        """Очищает историю (задачи в очереди будут выполнены)"""
+        with cls._lock:
+            cls._jobs.clear()
+
+    @classmethod
+    def _ensure_worker(cls) -> None:
+        with cls._lock:
+            if cls._thread is None or not cls._thread.is_alive():
+                cls._thread = threading.Thread(target=cls._worker, name='bulk-jobs', daemon=True)
+                cls._thread.start()
+
+    @classmethod
+    def _worker(cls) -> None:
+        while True:
+            job = cls._queue.get()
+            try:
+                job.run()
+            finally:
+                # Соединения потока не переиспользуются запросами - закрываем после каждой задачи
+                connections.close_all()
+                cls._queue.task_done()
+
+
+def is_background() -> bool:
+    return getattr(settings, 'BULK_JOBS_BACKGROUND', True)
+
+
+def get_batch_size() -> int:
+    return getattr(settings, 'BULK_JOB_BATCH_SIZE', 1000)
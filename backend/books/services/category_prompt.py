@@ -0,0 +1,154 @@
+"""
+Раздел категорий для промпта автозаполнения
+Компактный формат "id|путь", мемоизация с инвалидацией при изменении категорий и версия раздела
+"""
+import hashlib
+import json
+import threading
+from typing import Dict, List, Optional, Any, Tuple
+from django.core.cache import cache
+from ..models import Category
+
+try:
+    import tiktoken
+except ImportError:  # Токенизатор опционален, без него используется оценка
+    tiktoken = None
+
+
+class CategoryPromptService:
+    """
+    Сервис раздела категорий для промпта LLM.
+
+    Раздел строится одним запросом и хранится в памяти процесса. Изменение
+    категории (сигналы post_save/post_delete) сбрасывает его и увеличивает
+    счетчик поколений в кэше Django, чтобы другие процессы тоже перестроили раздел.
+    """
+
+    GENERATION_CACHE_KEY = 'category_prompt:generation'
+    PATH_SEPARATOR = ' → '
+
+    # (поколение, текст раздела, версия)
+    _memo: Optional[Tuple[int, str, str]] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def load_categories() -> List[Dict[str, Any]]:
+        """Категории в порядке отображения (один запрос)"""
+        return list(
+            Category.objects.order_by('order', 'name')
+            .values('id', 'name', 'parent_category_id')
+        )
+
+    @classmethod
+    def build_paths(cls, categories: List[Dict[str, Any]]) -> List[Tuple[int, str]]:
+        """
+        Полные пути категорий ("Родитель → Дочерняя") без дополнительных запросов
+        Returns: список (id, путь) в исходном порядке
+        """
+        by_id = {cat['id']: cat for cat in categories}
+        paths = []
+        for cat in categories:
+            names = [cat['name']]
+            seen = {cat['id']}
+            parent_id = cat['parent_category_id']
+            while parent_id and parent_id in by_id and parent_id not in seen:
+                seen.add(parent_id)
+                parent = by_id[parent_id]
+                names.append(parent['name'])
+                parent_id = parent['parent_category_id']
+            paths.append((cat['id'], cls.PATH_SEPARATOR.join(reversed(names))))
+        return paths
+
+    @classmethod
+    def format_lines(cls, categories: List[Dict[str, Any]]) -> str:
+        """Компактный формат: одна категория на строку, "id|путь" """
+        return '\n'.join(f"{cat_id}|{path}" for cat_id, path in cls.build_paths(categories))
+
+    @classmethod
+    def format_json(cls, categories: List[Dict[str, Any]], indent: Optional[int] = None) -> str:
+        """Прежний JSON-формат {"categories": [{"id", "name"}]} (для сравнения размеров)"""
+        data = {
+            "categories": [
+                {"id": cat_id, "name": path} for cat_id, path in cls.build_paths(categories)
+            ]
+        }
+        if indent is None:
+            return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+        return json.dumps(data, ensure_ascii=False, indent=indent)
+
+    @staticmethod
+    def _current_generation() -> int:
+        return cache.get(CategoryPromptService.GENERATION_CACHE_KEY) or 0
+
+    @classmethod
+    def get_section(cls) -> Tuple[str, str]:
+        """
+        Раздел категорий и его версия.
+        Returns: (текст "id|путь", версия - первые 12 символов SHA-256 текста)
+        """
+        generation = cls._current_generation()
+        memo = cls._memo
+        if memo is not None and memo[0] == generation:
+            return memo[1], memo[2]
+
+        with cls._lock:
+            memo = cls._memo
+            if memo is not None and memo[0] == generation:
+                return memo[1], memo[2]
+            text = cls.format_lines(cls.load_categories())
+            version = hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]
+            cls._memo = (generation, text, version)
+            return text, version
+
+    @classmethod
+    def get_version(cls) -> str:
+        """Версия текущего раздела категорий"""
+        return cls.get_section()[1]
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Сбрасывает раздел (вызывается сигналами при изменении категорий)"""
+        with cls._lock:
+            cls._memo = None
+        try:
+            cache.incr(cls.GENERATION_CACHE_KEY)
+        except ValueError:
+            cache.set(cls.GENERATION_CACHE_KEY, 1, None)
+
+    @staticmethod
+    def count_tokens(text: str) -> Tuple[int, bool]:
+        """
+        Количество токенов в тексте.
+        Returns: (токены, точное ли значение). Без tiktoken - оценка по байтам UTF-8
+        """
+        if tiktoken is not None:
+            try:
+                encoding = tiktoken.get_encoding('o200k_base')
+                return len(encoding.encode(text)), True
+            except Exception:
+                pass
+        return max(1, len(text.encode('utf-8')) // 4) if text else 0, False
+
+    @classmethod
+    def size_report(cls) -> List[Dict[str, Any]]:
+        """
+        Размер раздела категорий в разных форматах.
+        Returns: список {"variant", "chars", "bytes", "tokens", "tokens_exact"}
+        """
+        categories = cls.load_categories()
+        variants = [
+            ('json_indent', cls.format_json(categories, indent=2)),
+            ('json_compact', cls.format_json(categories)),
+            ('lines', cls.format_lines(categories)),
+        ]
+        report = []
+        for name, text in variants:
+            tokens, exact = cls.count_tokens(text)
+            report.append({
+                'variant': name,
+                'chars': len(text),
+                'bytes': len(text.encode('utf-8')),
+                'tokens': tokens,
+                'tokens_exact': exact,
+            })
+        return report
@@ -0,0 +1,224 @@
+"""
+Пул соединений с БД для многопоточных и ASGI-развертываний
+
+Django 4.2 не имеет встроенного пула: при CONN_MAX_AGE > 0 соединение
+закрепляется за потоком, и при сотнях потоков (ASGI, sync_to_async) база
+получает столько же соединений. Пул ограничивает их число (max_size),
+держит прогретыми min_size и отдает освободившееся соединение следующему
+потоку. Пул не зависит от драйвера: соединения создает, проверяет и
+сбрасывает переданные функции (см. config.postgresql_pool).
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+
+class PoolTimeout(Exception):
+    """Свободное соединение не появилось за timeout секунд"""
+    pass
+
+
+class ConnectionPool:
+    """
+    Потокобезопасный пул соединений.
+
+    connect() создает соединение; check(conn) проверяет соединение, бывшее
+    в простое дольше check_idle секунд (исключение - соединение закрывается
+    и создается новое); reset(conn) готовит соединение к возврату в пул
+    (исключение или False - соединение закрывается); close(conn) закрывает.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        *,
+        min_size: int = 0,
+        max_size: int = 10,
+        timeout: float = 30.0,
+        max_idle: float = 600.0,
+        check: Optional[Callable[[Any], None]] = None,
+        check_idle: float = 0.0,
+        reset: Optional[Callable[[Any], bool]] = None,
+        close: Callable[[Any], None] = lambda conn: conn.close(),
+        name: str = 'default',
+    ):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError('Размер пула: 0 <= min_size <= max_size, max_size >= 1')
+        self.name = name
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.check_idle = check_idle
+        self._connect = connect
+        self._check = check
+        self._reset = reset
+        self._close = close
+
+        self._condition = threading.Condition()
+        # Свободные соединения: (соединение, время возврата), последние возвращенные - справа
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._size = 0  # Открытые соединения (свободные + выданные)
+        self._waiting = 0
+        self._counters = {
+            'created': 0, 'closed': 0, 'acquired': 0, 'waited': 0, 'timeouts': 0, 'check_failures': 0,
+        }
+        self._wait_seconds = 0.0
+
+    def acquire(self, connect: Optional[Callable[[], Any]] = None) -> Any:
+        """
+        Свободное соединение из пула или новое (ожидание не дольше timeout).
+        connect - создание соединения вместо переданного в конструктор
+        """
+        deadline = time.monotonic() + self.timeout
+        waited_since = None
+        with self._condition:
+            while True:
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn, returned_at = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters['timeouts'] += 1
+                    raise PoolTimeout(
+                        f'Пул "{self.name}": нет свободного соединения за {self.timeout} с '
+                        f'(max_size={self.max_size})'
+                    )
+                if waited_since is None:
+                    waited_since = time.monotonic()
+                    self._counters['waited'] += 1
+                self._waiting += 1
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            if waited_since is not None:
+                self._wait_seconds += time.monotonic() - waited_since
+            self._counters['acquired'] += 1
+
+        # Создание и проверка - вне блокировки: другие потоки не ждут сетевых операций
+        if conn is not None:
+            idle_for = time.monotonic() - returned_at
+            if idle_for > self.max_idle:
+                self._discard(conn, reserve=True)
+                conn = None
+            elif self._check is not None and idle_for >= self.check_idle:
+                try:
+                    self._check(conn)
+                except Exception:
+                    with self._condition:
+                        self._counters['check_failures'] += 1
+                    self._discard(conn, reserve=True)
+                    conn = None
+        if conn is None:
+            conn = self._create(connect)
+        return conn
+
+    def release(self, conn: Any) -> None:
+        """Возвращает соединение в пул (или закрывает, если его не удалось сбросить)"""
+        try:
+            reusable = self._reset is None or self._reset(conn) is not False
+        except Exception:
+            reusable = False
+        if not reusable:
+            self._discard(conn)
+            return
+        with self._condition:
+            self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    def discard(self, conn: Any) -> None:
+        """Закрывает выданное соединение (например, после ошибки) и освобождает место"""
+        self._discard(conn)
+
+    def fill(self) -> None:
+        """Открывает соединения до min_size"""
+        while True:
+            with self._condition:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            self.release(self._create())
+
+    def close_all(self) -> None:
+        """Закрывает свободные соединения (выданные закроются при возврате)"""
+        with self._condition:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики пула: размер, выданные, свободные, ожидающие и накопленные счетчики"""
+        with self._condition:
+            idle = len(self._idle)
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': self._size - idle,
+                'idle': idle,
+                'waiting': self._waiting,
+                **self._counters,
+                'wait_ms_total': round(self._wait_seconds * 1000, 1),
+            }
+
+    def _create(self, connect: Optional[Callable[[], Any]] = None) -> Any:
+        """Новое соединение на уже зарезервированное место (при ошибке место освобождается)"""
+        try:
+            conn = (connect or self._connect)()
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._counters['created'] += 1
+        return conn
+
+    def _discard(self, conn: Any, reserve: bool = False) -> None:
+        """Закрывает соединение; reserve=True - место остается за вызывающим (для замены)"""
+        try:
+            self._close(conn)
+        except Exception:
+            pass
+        with self._condition:
+            self._counters['closed'] += 1
+            if not reserve:
+                self._size -= 1
+                self._condition.notify()
+
+
+class PoolRegistry:
+    """Пулы процесса по алиасам баз (создаются при первом подключении)"""
+
+    _pools: Dict[str, ConnectionPool] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, alias: str, factory: Callable[[], ConnectionPool]) -> ConnectionPool:
+        pool = cls._pools.get(alias)
+        if pool is None:
+            with cls._lock:
+                pool = cls._pools.get(alias)
+                if pool is None:
+                    pool = cls._pools[alias] = factory()
+        return pool
+
+    @classmethod
+    def stats(cls) -> Dict[str, Dict[str, Any]]:
+        """Метрики всех пулов процесса: {алиас: метрики}"""
+        return {alias: pool.stats() for alias, pool in sorted(cls._pools.items())}
+
+    @classmethod
+    def close_all(cls) -> None:
+        with cls._lock:
+            pools = list(cls._pools.values())
+            cls._pools.clear()
+        for pool in pools:
+            pool.close_all()
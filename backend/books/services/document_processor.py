@@ -2,6 +2,7 @@
 Сервис обработки документов
 Использует OpenCV для обнаружения границ документа (без платных SDK)
 """
+import asyncio
 import cv2
 import numpy as np
 import uuid
@@ -316,6 +317,105 @@ def process_document(input_path, output_path):
     return (new_w, new_h)
 
 
+def normalize_page_file(input_path, output_path):
+    """
+    Нормализация сохраненной страницы мастера: проверка, обработка, удаление исходного файла
+    Функция уровня модуля без обращения к Django - выполняется и в пуле процессов (offload)
+    
+    Returns:
+        tuple: (width, height) размер нормализованного изображения
+    
+    Raises:
+        ValueError: Если файл пуст, не читается или документ не найден
+    """
+    import sys
+    input_path = Path(input_path)
+    try:
+        file_size = input_path.stat().st_size
+        print(f"📊 Размер сохраненного файла: {file_size} байт", file=sys.stderr)
+        sys.stderr.flush()
+        
+        if file_size == 0:
+            raise ValueError(f"Файл пуст: {input_path}")
+        
+        # Проверяем, что файл можно прочитать как изображение
+        test_image = cv2.imread(str(input_path))
+        if test_image is None:
+            raise ValueError(f"Не удалось загрузить изображение через OpenCV: {input_path}. Возможно, файл поврежден или формат не поддерживается.")
+        print(f"✓ Изображение успешно загружено через OpenCV: {test_image.shape}", file=sys.stderr)
+        sys.stderr.flush()
+        
+        return process_document(input_path, output_path)
+    finally:
+        # Удаляем временный исходный файл
+        if input_path.exists():
+            input_path.unlink()
+
+
+def _save_upload(file, temp_dir):
+    """
+    Сохраняет загруженный файл во временную директорию
+    
+    Returns:
+        tuple: (file_id, путь исходного файла, имя файла нормализованного изображения)
+    """
+    import sys
+    # Генерируем уникальный ID для файла
+    file_id = str(uuid.uuid4())
+    
+    # Определяем расширение из оригинального имени файла
+    original_ext = Path(file.name).suffix.lower()
+    if not original_ext or original_ext not in ['.jpg', '.jpeg', '.png', '.webp']:
+        original_ext = '.jpg'  # По умолчанию jpg
+    
+    # Сохраняем исходный файл во временную директорию с оригинальным расширением
+    temp_input_path = temp_dir / f'temp_{file_id}_input{original_ext}'
+    print(f"📁 Сохранение файла: {file.name} -> {temp_input_path}", file=sys.stderr)
+    sys.stderr.flush()
+    with open(temp_input_path, 'wb') as f:
+        for chunk in file.chunks():
+            f.write(chunk)
+    
+    # Путь для нормализованного изображения (всегда jpg для результата)
+    return file_id, temp_input_path, f'normalized_{file_id}.jpg'
+
+
+def _page_result(file_id, original_filename, normalized_filename, size):
+    width, height = size
+    return {
+        'id': file_id,
+        'original_filename': original_filename,
+        # URL для доступа к нормализованному изображению
+        'normalized_url': f"{settings.MEDIA_URL}temp/normalized/{normalized_filename}",
+        'width': width,
+        'height': height
+    }
+
+
+def _page_error(original_filename, error):
+    """Результат для файла, который не удалось обработать (остальные файлы обрабатываются)"""
+    import traceback
+    import sys
+    print(f"⚠️ Ошибка обработки файла {original_filename}: {error}", file=sys.stderr)
+    print(f"⚠️ Traceback:\n{''.join(traceback.format_exception(error))}", file=sys.stderr)
+    sys.stderr.flush()
+    return {
+        'id': str(uuid.uuid4()),
+        'original_filename': original_filename,
+        'error': str(error),
+        'normalized_url': None,
+        'width': None,
+        'height': None
+    }
+
+
+def _normalized_dir():
+    """Временная директория для нормализованных изображений"""
+    temp_dir = Path(settings.MEDIA_ROOT) / 'temp' / 'normalized'
+    temp_dir.mkdir(parents=True, exist_ok=True)
+    return temp_dir
+
+
 def normalize_pages_batch(files):
     """
     Пакетная нормализация страниц для мастера создания книги
@@ -332,99 +432,45 @@ def normalize_pages_batch(files):
                 'width': int,
                 'height': int
             }
-    
-    Raises:
-        ValueError: Если не удалось обработать файл
     """
-    # Создаем временную директорию для нормализованных изображений
-    temp_dir = Path(settings.MEDIA_ROOT) / 'temp' / 'normalized'
-    temp_dir.mkdir(parents=True, exist_ok=True)
-    
-    results = []
+    temp_dir = _normalized_dir()
     
     import sys
     print(f"🔵 normalize_pages_batch вызван с {len(files)} файлами", file=sys.stderr)
     sys.stderr.flush()
     
+    results = []
     for file in files:
         try:
-            # Генерируем уникальный ID для файла
-            file_id = str(uuid.uuid4())
-            original_filename = file.name
-            
-            # Определяем расширение из оригинального имени файла
-            original_ext = Path(original_filename).suffix.lower()
-            if not original_ext or original_ext not in ['.jpg', '.jpeg', '.png', '.webp']:
-                original_ext = '.jpg'  # По умолчанию jpg
-            
-            # Сохраняем исходный файл во временную директорию с оригинальным расширением
-            temp_input_path = temp_dir / f'temp_{file_id}_input{original_ext}'
-            import sys
-            print(f"📁 Сохранение файла: {original_filename} -> {temp_input_path}", file=sys.stderr)
-            sys.stderr.flush()
-            with open(temp_input_path, 'wb') as f:
-                for chunk in file.chunks():
-                    f.write(chunk)
-            
-            # Проверяем, что файл действительно сохранился
-            if not temp_input_path.exists():
-                raise ValueError(f"Файл не был сохранен: {temp_input_path}")
-            
-            file_size = temp_input_path.stat().st_size
-            import sys
-            print(f"📊 Размер сохраненного файла: {file_size} байт", file=sys.stderr)
-            sys.stderr.flush()
-            
-            if file_size == 0:
-                raise ValueError(f"Файл пуст: {temp_input_path}")
-            
-            # Проверяем, что файл можно прочитать как изображение
-            test_image = cv2.imread(str(temp_input_path))
-            if test_image is None:
-                raise ValueError(f"Не удалось загрузить изображение через OpenCV: {temp_input_path}. Возможно, файл поврежден или формат не поддерживается.")
-            print(f"✓ Изображение успешно загружено через OpenCV: {test_image.shape}", file=sys.stderr)
-            sys.stderr.flush()
-            
-            # Путь для нормализованного изображения (всегда jpg для результата)
-            normalized_filename = f'normalized_{file_id}.jpg'
-            normalized_path = temp_dir / normalized_filename
-            
-            # Обрабатываем документ
-            width, height = process_document(temp_input_path, normalized_path)
-            
-            # Удаляем временный исходный файл
-            if temp_input_path.exists():
-                temp_input_path.unlink()
-            
-            # Формируем URL для доступа к нормализованному изображению
-            normalized_url = f"{settings.MEDIA_URL}temp/normalized/{normalized_filename}"
-            
-            results.append({
-                'id': file_id,
-                'original_filename': original_filename,
-                'normalized_url': normalized_url,
-                'width': width,
-                'height': height
-            })
-            
+            file_id, input_path, normalized_filename = _save_upload(file, temp_dir)
+            size = normalize_page_file(input_path, temp_dir / normalized_filename)
+            results.append(_page_result(file_id, file.name, normalized_filename, size))
         except Exception as e:
             # Если обработка не удалась, пропускаем файл и продолжаем
-            import traceback
-            import sys
-            error_trace = traceback.format_exc()
-            error_msg = f"⚠️ Ошибка обработки файла {file.name}: {e}"
-            print(error_msg, file=sys.stderr)
-            print(f"⚠️ Traceback:\n{error_trace}", file=sys.stderr)
-            sys.stderr.flush()
-            # Можно добавить информацию об ошибке в результат
-            results.append({
-                'id': str(uuid.uuid4()),
-                'original_filename': file.name,
-                'error': str(e),
-                'normalized_url': None,
-                'width': None,
-                'height': None
-            })
+            results.append(_page_error(file.name, e))
     
     return results
 
+
+async def anormalize_pages_batch(files):
+    """
+    Асинхронный вариант normalize_pages_batch (тот же результат)
+    Файлы сохраняются в потоке, страницы нормализуются параллельно в пуле процессов
+    (books.services.offload) - event loop и потоки сервера не заняты OpenCV
+    """
+    from asgiref.sync import sync_to_async
+    from .offload import run_cpu
+    
+    temp_dir = await sync_to_async(_normalized_dir, thread_sensitive=False)()
+    
+    async def normalize(file):
+        try:
+            file_id, input_path, normalized_filename = await sync_to_async(_save_upload, thread_sensitive=False)(
+                file, temp_dir
+            )
+            size = await run_cpu(normalize_page_file, str(input_path), str(temp_dir / normalized_filename))
+            return _page_result(file_id, file.name, normalized_filename, size)
+        except Exception as e:
+            return _page_error(file.name, e)
+    
+    return list(await asyncio.gather(*(normalize(file) for file in files)))
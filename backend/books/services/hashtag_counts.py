@@ -0,0 +1,259 @@
+"""
+Частоты хэштегов по библиотекам и категориям (облако хэштегов)
+
+Таблица HashtagCategoryCount хранит количество книг с хэштегом для каждой
+пары (библиотека, категория) и поддерживается сигналами: добавление и
+удаление BookHashtag, перенос книги в другую библиотеку или категорию,
+удаление книги и категории. Массовые операции без сигналов (bulk_create,
+_raw_delete, queryset.update) должны вызывать rebuild().
+"""
+import hashlib
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, QuerySet, Sum
+
+from ..models import Book, BookHashtag, HashtagCategoryCount
+
+# (hashtag_id, library_id, category_id)
+CountKey = Tuple[int, int, Optional[int]]
+
+
+class HashtagCountService:
+    """Поддержка таблицы частот хэштегов и облако хэштегов по ней"""
+
+    GENERATION_CACHE_KEY = 'hashtag_counts:generation'
+    RESPONSE_CACHE_PREFIX = 'hashtag_counts:cloud'
+
+    @classmethod
+    def apply(cls, deltas: Dict[CountKey, int]) -> None:
+        """Прибавляет изменения к счетчикам (отсутствующие строки создаются)"""
+        deltas = {key: delta for key, delta in deltas.items() if delta and key[1] is not None}
+        if not deltas:
+            return
+        with transaction.atomic():
+            for (hashtag_id, library_id, category_id), delta in deltas.items():
+                rows = HashtagCategoryCount.objects.filter(
+                    hashtag_id=hashtag_id, library_id=library_id, category_id=category_id
+                )
+                if rows.update(count=F('count') + delta) or delta < 0:
+                    continue
+                try:
+                    with transaction.atomic():
+                        HashtagCategoryCount.objects.create(
+                            hashtag_id=hashtag_id, library_id=library_id, category_id=category_id, count=delta
+                        )
+                except IntegrityError:
+                    # Строку создал параллельный запрос
+                    rows.update(count=F('count') + delta)
+        cls.invalidate()
+
+    @classmethod
+    def book_hashtag_changed(cls, book_id: int, hashtag_id: int, delta: int) -> None:
+        """Хэштег добавлен к книге (delta=1) или удален (delta=-1)"""
+        location = Book.objects.filter(id=book_id).values_list('library_id', 'category_id').first()
+        if location is not None:
+            cls.apply({(hashtag_id, *location): delta})
+
+    @classmethod
+    def book_hashtags_added(cls, book: Book, hashtag_ids: Iterable[int]) -> None:
+        """Хэштеги добавлены к книге через book.hashtags.add()"""
+        cls.apply({(hashtag_id, book.library_id, book.category_id): 1 for hashtag_id in hashtag_ids})
+
+    @classmethod
+    def book_moved(
+        cls,
+        book_id: int,
+        old_location: Tuple[Optional[int], Optional[int]],
+        new_location: Tuple[Optional[int], Optional[int]],
+    ) -> None:
+        """Книга перенесена в другую библиотеку или категорию: (library_id, category_id)"""
+        if old_location == new_location:
+            return
+        hashtag_ids = list(BookHashtag.objects.filter(book_id=book_id).values_list('hashtag_id', flat=True))
+        if not hashtag_ids:
+            return
+        deltas: Counter = Counter()
+        for hashtag_id in hashtag_ids:
+            deltas[(hashtag_id, *old_location)] -= 1
+            deltas[(hashtag_id, *new_location)] += 1
+        cls.apply(deltas)
+
+    @classmethod
+    def books_moved_to_library(cls, book_ids: Iterable[int], library_id: int) -> None:
+        """Книги переносятся в библиотеку через queryset.update() (вызывается до обновления)"""
+        rows = (
+            BookHashtag.objects.filter(book_id__in=list(book_ids)).exclude(book__library_id=library_id)
+            .order_by().values('hashtag_id', 'book__library_id', 'book__category_id')
+            .annotate(count=Count('id'))
+        )
+        deltas: Counter = Counter()
+        for row in rows:
+            deltas[(row['hashtag_id'], row['book__library_id'], row['book__category_id'])] -= row['count']
+            deltas[(row['hashtag_id'], library_id, row['book__category_id'])] += row['count']
+        cls.apply(deltas)
+
+    @classmethod
+    def links_changed(cls, links: QuerySet, delta: int) -> None:
+        """
+        Хэштеги книг добавлены (delta=1, вызывается после bulk_create) или удаляются
+        (delta=-1, до _raw_delete) без сигналов: links - queryset BookHashtag
+        """
+        rows = (
+            links.order_by().values('hashtag_id', 'book__library_id', 'book__category_id')
+            .annotate(count=Count('id'))
+        )
+        cls.apply({
+            (row['hashtag_id'], row['book__library_id'], row['book__category_id']): delta * row['count']
+            for row in rows
+        })
+
+    @classmethod
+    def book_deleted(cls, book: Book) -> None:
+        """Книга удаляется (вызывается до удаления ее хэштегов): один UPDATE на все хэштеги книги"""
+        if book.library_id is None:
+            return
+        updated = HashtagCategoryCount.objects.filter(
+            library_id=book.library_id,
+            category_id=book.category_id,
+            hashtag_id__in=BookHashtag.objects.filter(book_id=book.id).values('hashtag_id'),
+        ).update(count=F('count') - 1)
+        if updated:
+            cls.invalidate()
+
+    @classmethod
+    def move_category(cls, category_id: int, new_category_id: Optional[int] = None) -> None:
+        """Счетчики категории переносятся в другую (при удалении категории книги остаются без категории)"""
+        rows = list(
+            HashtagCategoryCount.objects.filter(category_id=category_id, count__gt=0)
+            .values_list('hashtag_id', 'library_id', 'count')
+        )
+        deltas: Counter = Counter()
+        for hashtag_id, library_id, count in rows:
+            deltas[(hashtag_id, library_id, category_id)] -= count
+            deltas[(hashtag_id, library_id, new_category_id)] += count
+        cls.apply(deltas)
+
+    @classmethod
+    def rebuild(cls, library_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Пересчитывает таблицу по BookHashtag (целиком или для указанных библиотек).
+        Returns: количество строк таблицы после пересчета
+        """
+        counts = HashtagCategoryCount.objects.all()
+        links = BookHashtag.objects.filter(book__library__isnull=False)
+        if library_ids is not None:
+            library_ids = list(library_ids)
+            counts = counts.filter(library_id__in=library_ids)
+            links = links.filter(book__library_id__in=library_ids)
+
+        rows = [
+            HashtagCategoryCount(
+                hashtag_id=row['hashtag_id'],
+                library_id=row['book__library_id'],
+                category_id=row['book__category_id'],
+                count=row['count'],
+            )
+            for row in links.order_by().values('hashtag_id', 'book__library_id', 'book__category_id')
+            .annotate(count=Count('id'))
+        ]
+        with transaction.atomic():
+            counts.delete()
+            HashtagCategoryCount.objects.bulk_create(rows, batch_size=5000)
+        cls.invalidate()
+        return len(rows)
+
+    @classmethod
+    def schedule_rebuild(cls, origin: Any = None, library_id: Optional[int] = None) -> None:
+        """
+        Пересчет затронутых библиотек после фиксации транзакции (массовое удаление книг
+        через Collector). Для одного origin планируется один пересчет по всем собранным библиотекам
+        """
+        pending = getattr(origin, '_hashtag_counts_rebuild', None) if origin is not None else None
+        if pending is None:
+            pending = set()
+            if origin is not None:
+                try:
+                    origin._hashtag_counts_rebuild = pending
+                except AttributeError:
+                    pass
+            transaction.on_commit(lambda: cls._rebuild_pending(pending))
+        if library_id is not None:
+            pending.add(library_id)
+
+    @classmethod
+    def _rebuild_pending(cls, library_ids: set) -> None:
+        if library_ids:
+            cls.rebuild(set(library_ids))
+
+    @classmethod
+    def cloud(
+        cls,
+        library_ids: List[int],
+        category_ids: Optional[List[int]] = None,
+        limit: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Облако хэштегов: хэштеги с количеством книг в библиотеках (и категориях)
+        по убыванию количества, не более limit (None - без ограничения)
+        """
+        rows = HashtagCategoryCount.objects.filter(library_id__in=library_ids)
+        if category_ids is not None:
+            rows = rows.filter(category_id__in=category_ids)
+        rows = (
+            rows.values('hashtag_id', 'hashtag__name', 'hashtag__slug')
+            .annotate(total=Sum('count'))
+            .filter(total__gt=0)
+            .order_by('-total', 'hashtag__name')
+        )
+        if limit:
+            rows = rows[:limit]
+
+        hashtags = [
+            {'id': row['hashtag_id'], 'name': row['hashtag__name'], 'slug': row['hashtag__slug'], 'count': row['total']}
+            for row in rows
+        ]
+        counts = [hashtag['count'] for hashtag in hashtags]
+        return {
+            'hashtags': hashtags,
+            'max_count': max(counts, default=1),
+            'min_count': min(counts, default=1),
+        }
+
+    @classmethod
+    def cached_cloud(
+        cls,
+        library_ids: List[int],
+        category_ids: Optional[List[int]] = None,
+        limit: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        cloud() с кэшированием ответа на HASHTAG_CLOUD_CACHE_TIMEOUT секунд (0 - без кэша).
+        Любое изменение счетчиков увеличивает поколение, и закэшированные ответы перестают использоваться
+        """
+        timeout = getattr(settings, 'HASHTAG_CLOUD_CACHE_TIMEOUT', 0)
+        if not timeout:
+            return cls.cloud(library_ids, category_ids, limit)
+
+        generation = cache.get(cls.GENERATION_CACHE_KEY) or 0
+        categories = ','.join(map(str, sorted(category_ids))) if category_ids is not None else '*'
+        params = f"{','.join(map(str, sorted(set(library_ids))))}:{categories}:{limit or 0}"
+        key = f"{cls.RESPONSE_CACHE_PREFIX}:{generation}:{hashlib.md5(params.encode()).hexdigest()}"
+        data = cache.get(key)
+        if data is None:
+            data = cls.cloud(library_ids, category_ids, limit)
+            cache.set(key, data, timeout)
+        return data
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Сбрасывает закэшированные облака хэштегов (если кэширование включено)"""
+        if not getattr(settings, 'HASHTAG_CLOUD_CACHE_TIMEOUT', 0):
+            return
+        try:
+            cache.incr(cls.GENERATION_CACHE_KEY)
+        except ValueError:
+            cache.set(cls.GENERATION_CACHE_KEY, 1, None)
@@ -0,0 +1,249 @@
+"""
+HTTP-клиент для OpenAI chat completions API
+Пул keep-alive соединений, настраиваемые таймауты и ограничение параллельных запросов.
+AsyncLLMClient - асинхронный вариант для ASGI (httpx, опционально)
+"""
+import asyncio
+import threading
+import weakref
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from typing import Dict, Optional, Any, Set, Tuple, Union
+
+try:
+    import httpx
+except ImportError:  # Без httpx асинхронные view выполняют синхронный клиент в потоке
+    httpx = None
+
+
+class LLMClient:
+    """
+    Клиент OpenAI с переиспользуемой сессией requests.
+
+    Одна сессия на процесс: TLS-соединение устанавливается один раз и
+    переиспользуется между запросами. Семафор ограничивает количество
+    одновременных запросов к API (семафор держится только на время HTTP-запроса,
+    не во время backoff между попытками).
+    """
+
+    def __init__(
+        self,
+        base_url: str = 'https://api.openai.com/v1',
+        connect_timeout: float = 10.0,
+        read_timeout: float = 60.0,
+        pool_size: int = 10,
+        max_concurrency: int = 4
+    ):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = pool_size
+        self.max_concurrency = max(1, max_concurrency)
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        self._state_lock = threading.Lock()
+        self._in_flight = 0
+        self._requests_total = 0
+
+        self.session = requests.Session()
+        # Ретраи выполняет вызывающий код (с разбором ответа), адаптер не повторяет запросы
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @property
+    def chat_completions_url(self) -> str:
+        return f"{self.base_url}/chat/completions"
+
+    def post_chat_completion(self, payload: Union[Dict[str, Any], bytes], api_key: str) -> requests.Response:
+        """
+        Отправляет запрос chat completions.
+        payload - словарь или заранее сериализованное тело запроса (JSON в UTF-8),
+        которое можно переиспользовать между повторными попытками.
+
+        Raises:
+            requests.RequestException: При сетевых ошибках и таймаутах
+        """
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        if isinstance(payload, bytes):
+            body = {'data': payload}
+        else:
+            body = {'json': payload}
+        with self._semaphore:
+            with self._state_lock:
+                self._in_flight += 1
+                self._requests_total += 1
+            try:
+                return self.session.post(
+                    self.chat_completions_url,
+                    headers=headers,
+                    timeout=self.timeout,
+                    **body
+                )
+            finally:
+                with self._state_lock:
+                    self._in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Текущее состояние клиента"""
+        with self._state_lock:
+            return {
+                'base_url': self.base_url,
+                'max_concurrency': self.max_concurrency,
+                'pool_size': self.pool_size,
+                'in_flight': self._in_flight,
+                'requests_total': self._requests_total,
+            }
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class AsyncLLMClient:
+    """
+    Асинхронный клиент OpenAI (httpx.AsyncClient) для одного event loop.
+
+    Ожидание ответа LLM не занимает поток: один процесс ASGI держит много
+    запросов мастера одновременно. Семафор ограничивает одновременные запросы
+    к API (LLM_MAX_CONCURRENCY) в пределах event loop, независимо от
+    синхронного LLMClient.
+    """
+
+    def __init__(
+        self,
+        base_url: str = 'https://api.openai.com/v1',
+        connect_timeout: float = 10.0,
+        read_timeout: float = 60.0,
+        pool_size: int = 10,
+        max_concurrency: int = 4
+    ):
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.max_concurrency = max(1, max_concurrency)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._in_flight = 0
+        self._requests_total = 0
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    @property
+    def chat_completions_url(self) -> str:
+        return f"{self.base_url}/chat/completions"
+
+    async def post_chat_completion(self, payload: Union[Dict[str, Any], bytes], api_key: str) -> 'httpx.Response':
+        """
+        Отправляет запрос chat completions (см. LLMClient.post_chat_completion).
+
+        Raises:
+            httpx.HTTPError: При сетевых ошибках и таймаутах
+        """
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        body = {'content': payload} if isinstance(payload, bytes) else {'json': payload}
+        async with self._semaphore:
+            self._in_flight += 1
+            self._requests_total += 1
+            try:
+                return await self.client.post(self.chat_completions_url, headers=headers, **body)
+            finally:
+                self._in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'base_url': self.base_url,
+            'max_concurrency': self.max_concurrency,
+            'pool_size': self.pool_size,
+            'in_flight': self._in_flight,
+            'requests_total': self._requests_total,
+        }
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def aclose_when_idle(self) -> None:
+        """Закрывает клиент, когда завершатся запросы, уже занявшие или ожидающие слот"""
+        for _ in range(self.max_concurrency):
+            await self._semaphore.acquire()
+        try:
+            await self.client.aclose()
+        finally:
+            for _ in range(self.max_concurrency):
+                self._semaphore.release()
+
+
+def get_client_config() -> Dict[str, Any]:
+    """Параметры клиента из настроек Django"""
+    return {
+        'base_url': getattr(settings, 'OPENAI_BASE_URL', 'https://api.openai.com/v1'),
+        'connect_timeout': getattr(settings, 'LLM_CONNECT_TIMEOUT', 10.0),
+        'read_timeout': getattr(settings, 'LLM_READ_TIMEOUT', 60.0),
+        'pool_size': getattr(settings, 'LLM_POOL_SIZE', 10),
+        'max_concurrency': getattr(settings, 'LLM_MAX_CONCURRENCY', 4),
+    }
+
+
+_client: Optional[LLMClient] = None
+_client_config: Optional[Tuple] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """
+    Возвращает общий для процесса клиент.
+    Клиент пересоздается, если изменились настройки (например, в тестах).
+    """
+    global _client, _client_config
+    config = get_client_config()
+    config_key = tuple(sorted(config.items()))
+    with _client_lock:
+        if _client is None or _client_config != config_key:
+            if _client is not None:
+                _client.close()
+            _client = LLMClient(**config)
+            _client_config = config_key
+        return _client
+
+
+def reset_llm_client() -> None:
+    """Закрывает общий клиент (следующий вызов get_llm_client создаст новый)"""
+    global _client, _client_config
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        _client_config = None
+
+
+# Асинхронные клиенты по event loop: httpx.AsyncClient и семафор привязаны к циклу
+_async_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[Tuple, AsyncLLMClient]]' = (
+    weakref.WeakKeyDictionary()
+)
+# Задачи закрытия замененных клиентов (ссылки, чтобы задачи не были собраны до завершения)
+_closing_tasks: Set['asyncio.Task'] = set()
+
+
+def get_async_llm_client() -> Optional[AsyncLLMClient]:
+    """
+    Асинхронный клиент текущего event loop (None, если httpx не установлен).
+    Клиент пересоздается, если изменились настройки
+    """
+    if httpx is None:
+        return None
+    loop = asyncio.get_running_loop()
+    config = get_client_config()
+    config_key = tuple(sorted(config.items()))
+    memo = _async_clients.get(loop)
+    if memo is None or memo[0] != config_key:
+        if memo is not None:
+            # Пул соединений старого клиента закрывается на том же цикле после его запросов
+            task = loop.create_task(memo[1].aclose_when_idle())
+            _closing_tasks.add(task)
+            task.add_done_callback(_closing_tasks.discard)
+        memo = _async_clients[loop] = (config_key, AsyncLLMClient(**config))
+    return memo[1]
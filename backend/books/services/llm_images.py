@@ -0,0 +1,171 @@
+"""
+Подготовка изображений для отправки в LLM
+Уменьшение до максимального размера, перекодирование в JPEG и (опционально) перевод в оттенки серого
+"""
+import base64
+import io
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Any, Tuple
+from django.conf import settings
+from PIL import Image, ImageOps, ImageStat
+
+
+GRAYSCALE_NEVER = 'never'
+GRAYSCALE_ALWAYS = 'always'
+GRAYSCALE_AUTO = 'auto'
+
+# Порог средней насыщенности (0-255), ниже которого страница считается текстовой (режим auto)
+TEXT_PAGE_SATURATION_THRESHOLD = 20
+
+
+def get_image_config() -> Dict[str, Any]:
+    """Параметры подготовки изображений из настроек Django"""
+    return {
+        'max_dimension': getattr(settings, 'LLM_IMAGE_MAX_DIMENSION', 2048),
+        'jpeg_quality': getattr(settings, 'LLM_IMAGE_JPEG_QUALITY', 85),
+        'grayscale': getattr(settings, 'LLM_IMAGE_GRAYSCALE', GRAYSCALE_NEVER),
+    }
+
+
+def is_text_page(img: Image.Image) -> bool:
+    """
+    Похожа ли страница на текстовую (почти без цвета).
+    Оценивается средняя насыщенность уменьшенной копии изображения.
+    """
+    sample = img.copy()
+    sample.thumbnail((128, 128))
+    saturation = ImageStat.Stat(sample.convert('HSV').getchannel('S')).mean[0]
+    return saturation < TEXT_PAGE_SATURATION_THRESHOLD
+
+
+def prepare_image(
+    image_data: bytes,
+    max_dimension: int = 2048,
+    jpeg_quality: int = 85,
+    grayscale: str = GRAYSCALE_NEVER
+) -> bytes:
+    """
+    Уменьшает и перекодирует изображение перед отправкой в LLM.
+
+    Изображение вписывается в квадрат max_dimension (0 - без уменьшения)
+    и сохраняется в JPEG. Если перекодирование не уменьшило исходный JPEG,
+    возвращаются исходные байты. Нечитаемые изображения возвращаются как есть.
+
+    Args:
+        image_data: Исходные байты изображения
+        max_dimension: Максимальная сторона в пикселях
+        jpeg_quality: Качество JPEG (1-95)
+        grayscale: 'never', 'always' или 'auto' (только для текстовых страниц)
+
+    Returns:
+        bytes: Байты JPEG для отправки
+    """
+    try:
+        with Image.open(io.BytesIO(image_data)) as img:
+            source_format = img.format
+            img = ImageOps.exif_transpose(img)
+            resized = bool(max_dimension) and max(img.size) > max_dimension
+            if resized:
+                img.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+            if img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+
+            to_grayscale = img.mode != 'L' and (
+                grayscale == GRAYSCALE_ALWAYS
+                or (grayscale == GRAYSCALE_AUTO and is_text_page(img))
+            )
+            if to_grayscale:
+                img = img.convert('L')
+
+            buffer = io.BytesIO()
+            img.save(buffer, format='JPEG', quality=jpeg_quality, optimize=True)
+    except Exception:
+        return image_data
+
+    prepared = buffer.getvalue()
+    if source_format == 'JPEG' and not resized and not to_grayscale and len(prepared) >= len(image_data):
+        return image_data
+    return prepared
+
+
+class EncodedImageCache:
+    """
+    LRU-кэш подготовленных изображений в формате data URL (в рамках процесса).
+    Ключ - хэш исходного содержимого и параметры подготовки, поэтому повторное
+    автозаполнение тех же страниц (например, с bypass_cache) не кодирует их заново.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple, str]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Tuple, value: str) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_encoded_images = EncodedImageCache()
+
+
+def encode_image_for_llm(image_data: bytes, content_hash: str) -> Tuple[str, bool]:
+    """
+    Подготавливает изображение и кодирует его в data URL для OpenAI.
+
+    Args:
+        image_data: Исходные байты изображения
+        content_hash: Хэш исходного содержимого (ключ кэша кодирования)
+
+    Returns:
+        tuple: (data URL, взят ли результат из кэша кодирования)
+    """
+    config = get_image_config()
+    key = (content_hash, config['max_dimension'], config['jpeg_quality'], config['grayscale'])
+    data_url = _encoded_images.get(key)
+    if data_url is not None:
+        return data_url, True
+
+    prepared = prepare_image(image_data, **config)
+    data_url = f"data:image/jpeg;base64,{base64.b64encode(prepared).decode('utf-8')}"
+    _encoded_images.set(key, data_url)
+    return data_url, False
+
+
+async def aencode_image_for_llm(image_data: bytes, content_hash: str) -> Tuple[str, bool]:
+    """
+    Асинхронный вариант encode_image_for_llm: уменьшение и перекодирование
+    выполняются в пуле процессов (books.services.offload), кэш кодирования общий
+    """
+    from .offload import run_cpu
+
+    config = get_image_config()
+    key = (content_hash, config['max_dimension'], config['jpeg_quality'], config['grayscale'])
+    data_url = _encoded_images.get(key)
+    if data_url is not None:
+        return data_url, True
+
+    prepared = await run_cpu(prepare_image, image_data, **config)
+    data_url = f"data:image/jpeg;base64,{base64.b64encode(prepared).decode('utf-8')}"
+    _encoded_images.set(key, data_url)
+    return data_url, False
+
+
+def clear_encoded_images() -> None:
+    """Очищает кэш закодированных изображений"""
+    _encoded_images.clear()
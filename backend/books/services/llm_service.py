@@ -2,63 +2,93 @@
 Сервис для работы с OpenAI GPT-4o API
 Автозаполнение данных книги на основе изображений страниц
 """
+import asyncio
 import json
 import os
+import sys
 import time
 import base64
 import requests
+from dataclasses import dataclass
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from typing import Dict, List, Optional, Any
+from django.db import connection
+from typing import Dict, List, Optional, Any, Tuple
+from .llm_client import get_llm_client, get_async_llm_client, httpx
+from .llm_images import encode_image_for_llm, aencode_image_for_llm
+
+
+# Версия промпта: увеличивать при любом изменении текста build_prompt,
+# чтобы не использовать закэшированные ответы на старый промпт.
+# Версия раздела категорий добавляется автоматически (см. get_prompt_version)
+PROMPT_VERSION = '2'
+
+
+def get_llm_model() -> str:
+    """Модель OpenAI для автозаполнения"""
+    return getattr(settings, 'OPENAI_MODEL', 'gpt-4o')
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Пауза перед повторной попыткой (exponential backoff, база настраивается)"""
+    return getattr(settings, 'LLM_RETRY_BACKOFF_BASE', 1.0) * (2 ** attempt)
+
+
+def _backoff(attempt: int) -> None:
+    delay = _backoff_delay(attempt)
+    if delay > 0:
+        time.sleep(delay)
+
+
+async def _abackoff(attempt: int) -> None:
+    delay = _backoff_delay(attempt)
+    if delay > 0:
+        await asyncio.sleep(delay)
 
 
 def load_categories_json() -> Dict:
     """
-    Загружает категории из базы данных с их ID для передачи в LLM
+    Загружает категории из базы данных с их ID (прежний JSON-формат раздела категорий)
     
     Returns:
-        dict: Словарь с категориями в формате {"categories": [{"id": ..., "code": ..., "name": ..., ...}]}
+        dict: Словарь с категориями в формате {"categories": [{"id": ..., "name": "Родитель → Дочерняя"}]}
     """
-    # Импортируем модель только здесь, чтобы избежать циклических импортов
-    from books.models import Category
-    
-    # Загружаем все категории из БД с их ID
-    categories = Category.objects.all().order_by('order', 'name')
-    
-    # Преобразуем в упрощенный список словарей - только id и name для лучшей читаемости LLM
-    categories_list = []
-    for cat in categories:
-        # Упрощенный формат: только id и name, с указанием родительской категории если есть
-        if cat.parent_category:
-            category_dict = {
-                "id": cat.id,
-                "name": f"{cat.parent_category.name} → {cat.name}"  # Иерархия в названии
-            }
-        else:
-            category_dict = {
-                "id": cat.id,
-                "name": cat.name
-            }
-        categories_list.append(category_dict)
+    from .category_prompt import CategoryPromptService
     
-    return {"categories": categories_list}
+    categories = CategoryPromptService.load_categories()
+    return {
+        "categories": [
+            {"id": cat_id, "name": path}
+            for cat_id, path in CategoryPromptService.build_paths(categories)
+        ]
+    }
 
 
-def encode_image_to_base64(image_path: str) -> str:
+def get_prompt_version() -> str:
+    """Версия промпта для ключа кэша: PROMPT_VERSION + версия раздела категорий"""
+    from .category_prompt import CategoryPromptService
+    
+    return f"{PROMPT_VERSION}.{CategoryPromptService.get_version()}"
+
+
+def load_image_bytes(image_path: str) -> bytes:
     """
-    Кодирует изображение в base64 для отправки в OpenAI API
+    Загружает содержимое изображения
     
     Args:
         image_path: Путь к изображению (может быть URL или локальный путь)
     
     Returns:
-        str: Base64 строка изображения
+        bytes: Содержимое файла изображения
     """
     # Если это полный URL, скачиваем изображение
     if image_path.startswith('http://') or image_path.startswith('https://'):
         response = requests.get(image_path, timeout=30)
         response.raise_for_status()
-        image_data = response.content
+        return response.content
     elif image_path.startswith('/media/'):
         # Относительный путь от MEDIA_ROOT
         relative_path = image_path.replace('/media/', '')
@@ -66,30 +96,42 @@ def encode_image_to_base64(image_path: str) -> str:
         if not full_path.exists():
             raise FileNotFoundError(f"Изображение не найдено: {full_path}")
         with open(full_path, 'rb') as f:
-            image_data = f.read()
+            return f.read()
     else:
         # Пробуем как абсолютный путь
         full_path = Path(image_path)
         if not full_path.exists():
             raise FileNotFoundError(f"Изображение не найдено: {image_path}")
         with open(full_path, 'rb') as f:
-            image_data = f.read()
+            return f.read()
+
+
+def encode_image_to_base64(image_path: str) -> str:
+    """
+    Кодирует изображение в base64 для отправки в OpenAI API
+    
+    Args:
+        image_path: Путь к изображению (может быть URL или локальный путь)
     
-    return base64.b64encode(image_data).decode('utf-8')
+    Returns:
+        str: Base64 строка изображения
+    """
+    return base64.b64encode(load_image_bytes(image_path)).decode('utf-8')
 
 
-def build_prompt(categories_json: Dict) -> str:
+@lru_cache(maxsize=4)
+def build_prompt(categories_section: str) -> str:
     """
     Строит промпт для LLM на основе шаблона из плана
+    Результат мемоизируется: текст меняется только вместе с разделом категорий
     
     Args:
-        categories_json: JSON с категориями
+        categories_section: Категории в формате "id|путь", по одной на строку
+            (CategoryPromptService.get_section)
     
     Returns:
         str: Промпт для LLM
     """
-    categories_str = json.dumps(categories_json, ensure_ascii=False, indent=2)
-    
     prompt = f"""Ты - эксперт по анализу книг и классификации литературы. Проанализируй предоставленные изображения страниц книги и извлеки ВСЮ возможную информацию.
 
 ШАГ 1: СНАЧАЛА ПРОАНАЛИЗИРУЙ КНИГУ
@@ -103,14 +145,14 @@ def build_prompt(categories_json: Dict) -> str:
 ШАГ 2: ОПРЕДЕЛИ КАТЕГОРИЮ
 На основе анализа книги определи, к какой категории она относится. Используй свой экспертный опыт в классификации литературы.
 
-ДОСТУПНЫЕ КАТЕГОРИИ (используй поле "id" для category_id):
-{categories_str}
+ДОСТУПНЫЕ КАТЕГОРИИ (одна категория на строку в формате id|название):
+{categories_section}
 
 ВАЖНО ДЛЯ ВЫБОРА КАТЕГОРИИ:
-- Каждая категория имеет поле "id" (это ЧИСЛО) - именно это число используй в category_id
-- Каждая категория имеет поле "name" (название на русском) - используй его для поиска подходящей категории
+- Число перед "|" - это id категории, именно это число используй в category_id
+- Текст после "|" - название категории на русском, используй его для поиска подходящей категории
 - Стрелка "→" в названии означает иерархию (родительская → дочерняя категория)
-- Пример: если выбрал категорию с name="Психология → Детская психология" и id=150, то category_id = 150
+- Пример: если выбрал строку "150|Психология → Детская психология", то category_id = 150
 
 ЗАДАЧА - извлечь ВСЕ доступные данные о книге:
 1. Название книги (title) - ОБЯЗАТЕЛЬНО, даже если неполное
@@ -123,7 +165,7 @@ def build_prompt(categories_json: Dict) -> str:
 8. Рубрика (category_id) - КРИТИЧЕСКИ ВАЖНО: 
    Сначала определи тематику книги (психология, художественная литература, история, детская литература и т.д.).
    Затем найди наиболее подходящую категорию в списке выше, сравнивая тематику книги с названиями категорий.
-   Используй поле "id" (число) из выбранной категории.
+   Используй id (число перед "|") выбранной категории.
    Если категория точно не подходит - верни null, НЕ выбирай случайную категорию.
 9. Язык текста (language_name) - полное название языка: "Русский", "Английский", "Немецкий" и т.д.
 10. Страниц (pages_info) - количество страниц, иллюстраций, схем, карт
@@ -143,7 +185,7 @@ def build_prompt(categories_json: Dict) -> str:
   1. Проанализируй книгу: название, авторов, описание содержания, тематику
   2. Определи основную тематику (психология, художественная литература, история, детская литература, наука, образование и т.д.)
   3. Просмотри список категорий выше и найди категорию, название которой наиболее точно соответствует тематике книги
-  4. Используй поле "id" (число) из найденной категории
+  4. Используй id (число перед "|") найденной категории
   5. Если не уверен или не нашел подходящую категорию - верни null
   6. НЕ выбирай категорию наугад, лучше верни null
 - Для binding_type используй ТОЛЬКО: paper, selfmade, cardboard, hard, fabric, owner, halfleather, composite, leather
@@ -161,7 +203,7 @@ def build_prompt(categories_json: Dict) -> str:
 {{
   "title": string (ОБЯЗАТЕЛЬНО, минимум 1 символ),
   "subtitle": string или null,
-  "category_id": integer или null (ОБЯЗАТЕЛЬНО используй поле "id" из категории, это число, НЕ "code" и НЕ "slug"),
+  "category_id": integer или null (ОБЯЗАТЕЛЬНО используй id категории - число перед "|"),
   "authors": array of strings или [],
   "publisher_name": string или null,
   "publication_place": string или null,
@@ -187,7 +229,19 @@ def build_prompt(categories_json: Dict) -> str:
     return prompt
 
 
-def auto_fill_book_data(image_urls: List[str], max_retries: int = 3) -> Dict[str, Any]:
+@dataclass
+class AutoFillRequest:
+    """Подготовленный запрос автозаполнения (до кодирования изображений)"""
+    api_key: str
+    model: str
+    prompt: str
+    prompt_version: str
+    cache_key: Optional[str]
+    # (URL, байты локального изображения или None для внешнего URL, хэш содержимого)
+    image_sources: List[Tuple[str, Optional[bytes], str]]
+
+
+def auto_fill_book_data(image_urls: List[str], max_retries: int = 3, use_cache: bool = True) -> Dict[str, Any]:
     """
     Отправляет изображения и категории в OpenAI GPT-4o
     и получает структурированные данные о книге
@@ -195,6 +249,7 @@ def auto_fill_book_data(image_urls: List[str], max_retries: int = 3) -> Dict[str
     Args:
         image_urls: Список URL нормализованных изображений
         max_retries: Максимальное количество попыток при ошибке
+        use_cache: Использовать кэш ответов (False - всегда запрашивать LLM и обновить кэш)
     
     Returns:
         dict: Словарь с данными книги и метаданными:
@@ -202,69 +257,127 @@ def auto_fill_book_data(image_urls: List[str], max_retries: int = 3) -> Dict[str
                 "success": bool,
                 "data": {...},  # Данные книги
                 "error": str или None,
-                "confidence": float (опционально)
+                "confidence": float (опционально),
+                "cached": bool (только при success=True),
+                "metrics": {  # Только при обращении к LLM
+                    "images": int,
+                    "original_bytes": int,  # Размер исходных локальных изображений
+                    "payload_bytes": int,   # Размер тела запроса
+                    "encode_ms": float,     # Время подготовки и кодирования
+                    "attempts": int,        # Количество попыток запроса к API
+                    "llm_ms": float         # Время запроса к API с повторными попытками
+                }
             }
     
     Raises:
         ValueError: Если не указан API ключ OpenAI
         requests.RequestException: При ошибках сети
     """
+    request, early_result = _prepare_auto_fill(image_urls, use_cache)
+    if early_result is not None:
+        return early_result
+    
+    # Уменьшаем, перекодируем и кодируем изображения в base64 (один раз на запрос,
+    # тело запроса переиспользуется во всех попытках)
+    encode_started = time.perf_counter()
+    data_urls = [
+        url if image_data is None else encode_image_for_llm(image_data, content_hash)[0]
+        for url, image_data, content_hash in request.image_sources
+    ]
+    body, metrics = _build_request_body(request, data_urls, encode_started)
+    
+    # Общий клиент с пулом keep-alive соединений
+    llm_started = time.perf_counter()
+    result = _request_book_data(get_llm_client(), body, request.api_key, max_retries, metrics)
+    metrics["llm_ms"] = round((time.perf_counter() - llm_started) * 1000, 1)
+    
+    return _finish_auto_fill(request, result, metrics)
+
+
+async def aauto_fill_book_data(image_urls: List[str], max_retries: int = 3, use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Асинхронный вариант auto_fill_book_data для ASGI-view (тот же результат).
+    
+    Чтение файлов, категории и кэш - в потоке (sync_to_async), перекодирование
+    изображений - в пуле процессов, запрос к API - асинхронным клиентом (httpx):
+    ожидание LLM не занимает поток. Без httpx вызов целиком выполняется в потоке.
+    """
+    client = get_async_llm_client()
+    if client is None:
+        return await sync_to_async(auto_fill_book_data)(image_urls, max_retries=max_retries, use_cache=use_cache)
+    
+    request, early_result = await sync_to_async(_prepare_auto_fill)(image_urls, use_cache)
+    if early_result is not None:
+        return early_result
+    
+    encode_started = time.perf_counter()
+    encoded = await asyncio.gather(*(
+        aencode_image_for_llm(image_data, content_hash)
+        for _, image_data, content_hash in request.image_sources if image_data is not None
+    ))
+    encoded_urls = iter(data_url for data_url, _ in encoded)
+    data_urls = [
+        url if image_data is None else next(encoded_urls)
+        for url, image_data, _ in request.image_sources
+    ]
+    # Сериализация тела (мегабайты base64) - вне event loop
+    body, metrics = await sync_to_async(_build_request_body, thread_sensitive=False)(
+        request, data_urls, encode_started
+    )
+    
+    llm_started = time.perf_counter()
+    result = await _arequest_book_data(client, body, request.api_key, max_retries, metrics)
+    metrics["llm_ms"] = round((time.perf_counter() - llm_started) * 1000, 1)
+    
+    return await sync_to_async(_finish_auto_fill)(request, result, metrics)
+
+
+def _prepare_auto_fill(
+    image_urls: List[str],
+    use_cache: bool
+) -> Tuple[Optional[AutoFillRequest], Optional[Dict[str, Any]]]:
+    """
+    Загрузка изображений, раздел категорий и проверка кэша
+    
+    Returns:
+        tuple: (запрос, None) или (None, готовый результат - ошибка или ответ из кэша)
+    
+    Raises:
+        ValueError: Если не указан API ключ OpenAI
+    """
+    from .autofill_cache import AutoFillCacheService
+    from .category_prompt import CategoryPromptService
+    
     api_key = os.environ.get('OPENAI_API_KEY')
     if not api_key:
         raise ValueError("OPENAI_API_KEY не установлен в переменных окружения")
     
-    # Загружаем категории
-    try:
-        categories_data = load_categories_json()
-    except Exception as e:
-        return {
-            "success": False,
-            "data": None,
-            "error": f"Ошибка загрузки категорий: {str(e)}",
-            "confidence": None
-        }
-    
-    # Строим промпт
-    prompt = build_prompt(categories_data)
+    model = get_llm_model()
     
-    # Подготавливаем изображения для API
-    image_contents = []
+    # Загружаем изображения. Кодирование выполняется только при промахе кэша
+    image_sources = []
+    # Хэши содержимого изображений для ключа кэша
+    image_hashes = []
     import sys
     for url in image_urls[:10]:  # OpenAI API поддерживает до 10 изображений
         try:
             print(f"🔵 Обработка изображения: {url}", file=sys.stderr)
             sys.stderr.flush()
             
-            # Всегда кодируем в base64, так как OpenAI не может получить доступ к localhost
-            # Если это полный URL (http://localhost:8000/media/...), загружаем и кодируем
+            # Локальные изображения всегда кодируем в base64, так как OpenAI не может получить доступ к localhost
             if url.startswith('http://localhost') or url.startswith('http://127.0.0.1'):
-                # Локальный URL - загружаем и кодируем в base64
-                print(f"🔵 Локальный URL обнаружен, кодируем в base64...", file=sys.stderr)
-                sys.stderr.flush()
-                base64_image = encode_image_to_base64(url)
-                image_contents.append({
-                    "type": "image_url",
-                    "image_url": {
-                        "url": f"data:image/jpeg;base64,{base64_image}"
-                    }
-                })
+                image_data = load_image_bytes(url)
+                image_hashes.append(AutoFillCacheService.hash_content(image_data))
             elif url.startswith('http://') or url.startswith('https://'):
                 # Внешний URL - используем напрямую (если OpenAI может получить доступ)
-                image_contents.append({
-                    "type": "image_url",
-                    "image_url": {
-                        "url": url
-                    }
-                })
+                # Содержимое не загружаем, поэтому в ключ кэша идет хэш самого URL
+                image_data = None
+                image_hashes.append(AutoFillCacheService.hash_content(url.encode('utf-8')))
             else:
-                # Локальный путь - кодируем в base64
-                base64_image = encode_image_to_base64(url)
-                image_contents.append({
-                    "type": "image_url",
-                    "image_url": {
-                        "url": f"data:image/jpeg;base64,{base64_image}"
-                    }
-                })
+                # Локальный путь
+                image_data = load_image_bytes(url)
+                image_hashes.append(AutoFillCacheService.hash_content(image_data))
+            image_sources.append((url, image_data, image_hashes[-1]))
             print(f"✓ Изображение обработано успешно", file=sys.stderr)
             sys.stderr.flush()
         except Exception as e:
@@ -274,202 +387,373 @@ def auto_fill_book_data(image_urls: List[str], max_retries: int = 3) -> Dict[str
             sys.stderr.flush()
             continue
     
-    if not image_contents:
-        return {
-            "success": False,
-            "data": None,
-            "error": "Не удалось обработать ни одного изображения",
-            "confidence": None
-        }
+    if not image_sources:
+        return None, _failure("Не удалось обработать ни одного изображения")
+    
+    # Раздел категорий (мемоизирован, версия раздела входит в ключ кэша)
+    try:
+        categories_section, categories_version = CategoryPromptService.get_section()
+    except Exception as e:
+        return None, _failure(f"Ошибка загрузки категорий: {str(e)}")
+    prompt_version = f"{PROMPT_VERSION}.{categories_version}"
+    
+    # Проверяем кэш до запроса к API.
+    # При use_cache=False кэш не читается, но свежий ответ перезаписывает запись
+    cache_key = None
+    if AutoFillCacheService.is_enabled():
+        cache_key = AutoFillCacheService.build_key(image_hashes, prompt_version, model)
+    if cache_key and use_cache:
+        cached_result = AutoFillCacheService.get(cache_key)
+        if cached_result is not None:
+            print(f"✓ Результат автозаполнения взят из кэша", file=sys.stderr)
+            sys.stderr.flush()
+            return None, {**cached_result, "cached": True}
+    
+    return AutoFillRequest(
+        api_key=api_key,
+        model=model,
+        prompt=build_prompt(categories_section),
+        prompt_version=prompt_version,
+        cache_key=cache_key,
+        image_sources=image_sources,
+    ), None
+
+
+def _build_request_body(
+    request: AutoFillRequest,
+    data_urls: List[str],
+    encode_started: float
+) -> Tuple[bytes, Dict[str, Any]]:
+    """Тело запроса к API (JSON в UTF-8) и метрики подготовки"""
+    import sys
+    image_contents = [{"type": "image_url", "image_url": {"url": data_url}} for data_url in data_urls]
     
     # Формируем сообщения для API
     messages = [
         {
             "role": "user",
             "content": [
-                {"type": "text", "text": prompt},
+                {"type": "text", "text": request.prompt},
                 *image_contents
             ]
         }
     ]
     
-    # Параметры запроса
-    api_url = "https://api.openai.com/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
     payload = {
-        "model": "gpt-4o",
+        "model": request.model,
         "messages": messages,
         "max_tokens": 8000,  # Увеличено для полного описания книги
         "temperature": 0.3,  # Низкая температура для более точных результатов
         "response_format": {"type": "json_object"}  # JSON mode
     }
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
     
-    # Выполняем запрос с retry механизмом
-    last_error = None
-    import sys
-    for attempt in range(max_retries):
-        try:
-            print(f"🔵 Отправка запроса в OpenAI API (попытка {attempt + 1}/{max_retries})...", file=sys.stderr)
-            sys.stderr.flush()
-            
-            response = requests.post(
-                api_url,
-                headers=headers,
-                json=payload,
-                timeout=60
-            )
-            
-            print(f"🔵 Ответ от OpenAI API: статус {response.status_code}", file=sys.stderr)
-            sys.stderr.flush()
-            
-            response.raise_for_status()
-            
-            result = response.json()
-            
-            # Извлекаем ответ
-            if 'choices' in result and len(result['choices']) > 0:
-                content = result['choices'][0]['message']['content']
-                
-                # Парсим JSON ответ
-                try:
-                    book_data = json.loads(content)
-                    
-                    # Валидация обязательных полей
-                    if 'title' not in book_data or not book_data.get('title'):
-                        return {
-                            "success": False,
-                            "data": None,
-                            "error": "LLM не смог определить название книги",
-                            "confidence": None
-                        }
-                    
-                    # Нормализация данных: заменяем пустые строки на null для полей, которые могут быть null
-                    nullable_fields = [
-                        'subtitle', 'publisher_name', 'publication_place', 'year_approx',
-                        'pages_info', 'language_name', 'binding_type', 'binding_details',
-                        'format', 'condition', 'condition_details', 'isbn', 'description'
-                    ]
-                    for field in nullable_fields:
-                        if field in book_data and book_data[field] == '':
-                            book_data[field] = None
-                    
-                    # Нормализация числовых полей
-                    if 'year' in book_data and book_data['year'] == '':
-                        book_data['year'] = None
-                    if 'circulation' in book_data and book_data['circulation'] == '':
-                        book_data['circulation'] = None
-                    if 'category_id' in book_data and book_data['category_id'] == '':
-                        book_data['category_id'] = None
-                    
-                    # Нормализация массива авторов
-                    if 'authors' not in book_data:
-                        book_data['authors'] = []
-                    elif not isinstance(book_data['authors'], list):
-                        # Если пришла строка, разбиваем по запятым
-                        if isinstance(book_data['authors'], str):
-                            book_data['authors'] = [a.strip() for a in book_data['authors'].split(',') if a.strip()]
-                        else:
-                            book_data['authors'] = []
-                    
-                    # Вычисляем confidence на основе заполненных полей
-                    filled_fields = sum(1 for k, v in book_data.items() if v is not None and v != "")
-                    total_fields = len(book_data)
-                    confidence = filled_fields / total_fields if total_fields > 0 else 0.0
-                    
-                    print(f"✓ Успешно получены данные от LLM (confidence: {confidence:.2f})", file=sys.stderr)
-                    sys.stderr.flush()
-                    
-                    return {
-                        "success": True,
-                        "data": book_data,
-                        "error": None,
-                        "confidence": confidence
-                    }
-                    
-                except json.JSONDecodeError as e:
-                    error_msg = f"Ошибка парсинга JSON ответа от LLM: {str(e)}"
-                    print(f"⚠️ {error_msg}", file=sys.stderr)
-                    print(f"⚠️ Ответ LLM: {content[:500]}", file=sys.stderr)
-                    sys.stderr.flush()
-                    last_error = error_msg
-                    if attempt < max_retries - 1:
-                        time.sleep(2 ** attempt)  # Exponential backoff
-                        continue
-                    else:
-                        return {
-                            "success": False,
-                            "data": None,
-                            "error": error_msg,
-                            "confidence": None
-                        }
-            else:
-                error_msg = "Неожиданный формат ответа от OpenAI API"
-                print(f"⚠️ {error_msg}: {result}", file=sys.stderr)
-                sys.stderr.flush()
-                last_error = error_msg
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
-                    continue
-                else:
-                    return {
-                        "success": False,
-                        "data": None,
-                        "error": error_msg,
-                        "confidence": None
-                    }
-                    
-        except requests.exceptions.Timeout:
-            error_msg = "Таймаут запроса к OpenAI API"
-            print(f"⚠️ {error_msg}", file=sys.stderr)
-            sys.stderr.flush()
-            last_error = error_msg
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)
-                continue
-            else:
-                return {
-                    "success": False,
-                    "data": None,
-                    "error": error_msg,
-                    "confidence": None
-                }
-                
-        except requests.exceptions.RequestException as e:
-            error_msg = f"Ошибка запроса к OpenAI API: {str(e)}"
-            print(f"⚠️ {error_msg}", file=sys.stderr)
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_detail = e.response.json()
-                    print(f"⚠️ Детали ошибки: {error_detail}", file=sys.stderr)
-                    
-                    # Специальная обработка ошибки "unsupported_country_region_territory"
-                    if 'error' in error_detail and isinstance(error_detail['error'], dict):
-                        error_code = error_detail['error'].get('code', '')
-                        if error_code == 'unsupported_country_region_territory':
-                            error_msg = "OpenAI API недоступен в вашем регионе. Используйте VPN или обратитесь в поддержку OpenAI."
-                except:
-                    print(f"⚠️ Текст ответа: {e.response.text[:500]}", file=sys.stderr)
-            sys.stderr.flush()
-            last_error = error_msg
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)
-                continue
-            else:
-                return {
-                    "success": False,
-                    "data": None,
-                    "error": error_msg,
-                    "confidence": None
-                }
+    metrics = {
+        "images": len(image_contents),
+        "original_bytes": sum(len(image_data) for _, image_data, _ in request.image_sources if image_data is not None),
+        "payload_bytes": len(body),
+        "encode_ms": round((time.perf_counter() - encode_started) * 1000, 1),
+    }
+    print(
+        f"🔵 Размер запроса: {metrics['payload_bytes']} байт "
+        f"(исходные изображения: {metrics['original_bytes']} байт), "
+        f"кодирование: {metrics['encode_ms']} мс",
+        file=sys.stderr
+    )
+    sys.stderr.flush()
+    return body, metrics
+
+
+def _finish_auto_fill(request: AutoFillRequest, result: Dict[str, Any], metrics: Dict[str, Any]) -> Dict[str, Any]:
+    """Кэширует успешный ответ и добавляет метрики"""
+    from .autofill_cache import AutoFillCacheService
     
+    # Кэшируем только успешные ответы
+    if result["success"] and request.cache_key:
+        AutoFillCacheService.set(
+            request.cache_key,
+            result,
+            model=request.model,
+            prompt_version=request.prompt_version,
+            images_count=metrics["images"]
+        )
+    
+    return {**result, "cached": False, "metrics": metrics}
+
+
+def _failure(error: Optional[str]) -> Dict[str, Any]:
     return {
         "success": False,
         "data": None,
-        "error": f"Не удалось получить ответ после {max_retries} попыток. Последняя ошибка: {last_error}",
+        "error": error,
         "confidence": None
     }
 
+
+def _parse_completion(result: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Разбирает ответ chat completions
+    
+    Returns:
+        tuple: (результат, None) - ответ разобран (в том числе неуспешно, без повтора);
+               (None, ошибка) - ответ некорректен, попытку стоит повторить
+    """
+    import sys
+    # Извлекаем ответ
+    if not ('choices' in result and len(result['choices']) > 0):
+        error_msg = "Неожиданный формат ответа от OpenAI API"
+        print(f"⚠️ {error_msg}: {result}", file=sys.stderr)
+        sys.stderr.flush()
+        return None, error_msg
+    
+    content = result['choices'][0]['message']['content']
+    
+    # Парсим JSON ответ
+    try:
+        book_data = json.loads(content)
+    except json.JSONDecodeError as e:
+        error_msg = f"Ошибка парсинга JSON ответа от LLM: {str(e)}"
+        print(f"⚠️ {error_msg}", file=sys.stderr)
+        print(f"⚠️ Ответ LLM: {content[:500]}", file=sys.stderr)
+        sys.stderr.flush()
+        return None, error_msg
+    
+    # Валидация обязательных полей
+    if 'title' not in book_data or not book_data.get('title'):
+        return _failure("LLM не смог определить название книги"), None
+    
+    # Нормализация данных: заменяем пустые строки на null для полей, которые могут быть null
+    nullable_fields = [
+        'subtitle', 'publisher_name', 'publication_place', 'year_approx',
+        'pages_info', 'language_name', 'binding_type', 'binding_details',
+        'format', 'condition', 'condition_details', 'isbn', 'description'
+    ]
+    for field in nullable_fields:
+        if field in book_data and book_data[field] == '':
+            book_data[field] = None
+    
+    # Нормализация числовых полей
+    if 'year' in book_data and book_data['year'] == '':
+        book_data['year'] = None
+    if 'circulation' in book_data and book_data['circulation'] == '':
+        book_data['circulation'] = None
+    if 'category_id' in book_data and book_data['category_id'] == '':
+        book_data['category_id'] = None
+    
+    # Нормализация массива авторов
+    if 'authors' not in book_data:
+        book_data['authors'] = []
+    elif not isinstance(book_data['authors'], list):
+        # Если пришла строка, разбиваем по запятым
+        if isinstance(book_data['authors'], str):
+            book_data['authors'] = [a.strip() for a in book_data['authors'].split(',') if a.strip()]
+        else:
+            book_data['authors'] = []
+    
+    # Вычисляем confidence на основе заполненных полей
+    filled_fields = sum(1 for k, v in book_data.items() if v is not None and v != "")
+    total_fields = len(book_data)
+    confidence = filled_fields / total_fields if total_fields > 0 else 0.0
+    
+    print(f"✓ Успешно получены данные от LLM (confidence: {confidence:.2f})", file=sys.stderr)
+    sys.stderr.flush()
+    
+    return {
+        "success": True,
+        "data": book_data,
+        "error": None,
+        "confidence": confidence
+    }, None
+
+
+def _request_error_message(error: Exception, response) -> str:
+    """Сообщение об ошибке запроса к API (response - ответ с ошибкой, если есть)"""
+    import sys
+    error_msg = f"Ошибка запроса к OpenAI API: {str(error)}"
+    print(f"⚠️ {error_msg}", file=sys.stderr)
+    if response is not None:
+        try:
+            error_detail = response.json()
+            print(f"⚠️ Детали ошибки: {error_detail}", file=sys.stderr)
+            
+            # Специальная обработка ошибки "unsupported_country_region_territory"
+            if 'error' in error_detail and isinstance(error_detail['error'], dict):
+                error_code = error_detail['error'].get('code', '')
+                if error_code == 'unsupported_country_region_territory':
+                    error_msg = "OpenAI API недоступен в вашем регионе. Используйте VPN или обратитесь в поддержку OpenAI."
+        except:
+            print(f"⚠️ Текст ответа: {response.text[:500]}", file=sys.stderr)
+    sys.stderr.flush()
+    return error_msg
+
+
+class _BookDataAttempts:
+    """
+    Попытки запроса к OpenAI - общая часть синхронного и асинхронного вариантов:
+    метрики, разбор ответа, выбор сообщения об ошибке и результат после последней попытки.
+    Отправка запроса и пауза между попытками выполняются вызывающим кодом
+    """
+
+    def __init__(self, max_retries: int, metrics: Optional[Dict[str, Any]]):
+        self.max_retries = max_retries
+        self.metrics = metrics
+        self.last_error: Optional[str] = None
+        self.made = 0
+
+    def start(self, attempt: int) -> None:
+        self.made = attempt + 1
+        if self.metrics is not None:
+            self.metrics["attempts"] = attempt + 1
+        print(f"🔵 Отправка запроса в OpenAI API (попытка {attempt + 1}/{self.max_retries})...", file=sys.stderr)
+        sys.stderr.flush()
+
+    def completed(self, response) -> Optional[Dict[str, Any]]:
+        """Разбирает ответ API; None - ответ некорректен, попытку стоит повторить"""
+        print(f"🔵 Ответ от OpenAI API: статус {response.status_code}", file=sys.stderr)
+        sys.stderr.flush()
+        response.raise_for_status()
+        result, self.last_error = _parse_completion(response.json())
+        return result
+
+    def failed(self, error: Exception) -> None:
+        """Ошибка транспорта (requests или httpx): запоминает сообщение для ответа"""
+        if isinstance(error, requests.exceptions.Timeout) or (
+            httpx is not None and isinstance(error, httpx.TimeoutException)
+        ):
+            self.last_error = "Таймаут запроса к OpenAI API"
+            print(f"⚠️ {self.last_error}", file=sys.stderr)
+            sys.stderr.flush()
+        else:
+            # ValueError (тело ответа не JSON) и сетевые ошибки httpx - без ответа
+            self.last_error = _request_error_message(error, getattr(error, 'response', None))
+
+    def is_last(self, attempt: int) -> bool:
+        return attempt >= self.max_retries - 1
+
+    def failure(self) -> Dict[str, Any]:
+        if self.made:
+            return _failure(self.last_error)
+        return _failure(
+            f"Не удалось получить ответ после {self.max_retries} попыток. Последняя ошибка: {self.last_error}"
+        )
+
+
+def _request_book_data(
+    client,
+    body: bytes,
+    api_key: str,
+    max_retries: int,
+    metrics: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Отправляет подготовленный запрос в OpenAI с повторными попытками и разбирает ответ
+    
+    Args:
+        metrics: Словарь метрик запроса, в него записывается количество попыток (attempts)
+    
+    Returns:
+        dict: {"success", "data", "error", "confidence"}
+    """
+    attempts = _BookDataAttempts(max_retries, metrics)
+    for attempt in range(max_retries):
+        attempts.start(attempt)
+        try:
+            result = attempts.completed(client.post_chat_completion(body, api_key))
+            if result is not None:
+                return result
+        except requests.exceptions.RequestException as e:
+            attempts.failed(e)
+        if attempts.is_last(attempt):
+            break
+        _backoff(attempt)  # Exponential backoff
+    return attempts.failure()
+
+
+async def _arequest_book_data(
+    client,
+    body: bytes,
+    api_key: str,
+    max_retries: int,
+    metrics: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Асинхронный вариант _request_book_data (AsyncLLMClient, httpx)"""
+    attempts = _BookDataAttempts(max_retries, metrics)
+    for attempt in range(max_retries):
+        attempts.start(attempt)
+        try:
+            result = attempts.completed(await client.post_chat_completion(body, api_key))
+            if result is not None:
+                return result
+        except (httpx.HTTPError, ValueError) as e:
+            attempts.failed(e)
+        if attempts.is_last(attempt):
+            break
+        await _abackoff(attempt)
+    return attempts.failure()
+
+
+def auto_fill_books_batch(
+    image_url_batches: List[List[str]],
+    max_retries: int = 3,
+    use_cache: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Параллельное автозаполнение нескольких книг
+    
+    Книги обрабатываются в пуле потоков размером LLM_MAX_CONCURRENCY.
+    Общий лимит одновременных запросов к API соблюдается клиентом
+    (в том числе вместе с одиночными вызовами auto_fill_book_data).
+    
+    Args:
+        image_url_batches: Список списков URL изображений (один список на книгу)
+        max_retries: Максимальное количество попыток для каждой книги
+        use_cache: Использовать кэш ответов
+    
+    Returns:
+        list: Результаты auto_fill_book_data в том же порядке, что и входные данные
+    
+    Raises:
+        ValueError: Если не указан API ключ OpenAI
+    """
+    if not os.environ.get('OPENAI_API_KEY'):
+        raise ValueError("OPENAI_API_KEY не установлен в переменных окружения")
+    
+    if not image_url_batches:
+        return []
+    
+    def run(image_urls: List[str]) -> Dict[str, Any]:
+        try:
+            return auto_fill_book_data(image_urls, max_retries=max_retries, use_cache=use_cache)
+        except Exception as e:
+            return _failure(f"Ошибка обработки: {str(e)}")
+        finally:
+            # Каждый поток открывает свое соединение с БД (категории, кэш) - закрываем его
+            connection.close()
+    
+    max_workers = min(len(image_url_batches), get_llm_client().max_concurrency)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-autofill') as executor:
+        return list(executor.map(run, image_url_batches))
+
+
+async def aauto_fill_books_batch(
+    image_url_batches: List[List[str]],
+    max_retries: int = 3,
+    use_cache: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Асинхронный вариант auto_fill_books_batch: книги обрабатываются конкурентно
+    в event loop, лимит одновременных запросов к API - семафор AsyncLLMClient
+    
+    Raises:
+        ValueError: Если не указан API ключ OpenAI
+    """
+    if not os.environ.get('OPENAI_API_KEY'):
+        raise ValueError("OPENAI_API_KEY не установлен в переменных окружения")
+    
+    async def run(image_urls: List[str]) -> Dict[str, Any]:
+        try:
+            return await aauto_fill_book_data(image_urls, max_retries=max_retries, use_cache=use_cache)
+        except Exception as e:
+            return _failure(f"Ошибка обработки: {str(e)}")
+    
+    return list(await asyncio.gather(*(run(image_urls) for image_urls in image_url_batches)))
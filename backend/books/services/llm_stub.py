@@ -0,0 +1,161 @@
+"""
+Локальная заглушка OpenAI chat completions API
+Для нагрузочного тестирования автозаполнения без обращения к OpenAI
+"""
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Any, Tuple
+
+
+# Строки раздела категорий промпта: "id|путь"
+CATEGORY_LINE_RE = re.compile(r'^(\d+)\|', re.MULTILINE)
+
+STUB_BOOK_DATA = {
+    'title': 'Тестовая книга',
+    'subtitle': None,
+    'category_id': None,
+    'authors': ['Иванов И.И.'],
+    'publisher_name': 'Тестовое издательство',
+    'publication_place': 'Москва',
+    'year': 1985,
+    'year_approx': None,
+    'pages_info': '256 стр.',
+    'circulation': 10000,
+    'language_name': 'Русский',
+    'binding_type': 'hard',
+    'binding_details': None,
+    'format': 'regular',
+    'condition': 'good',
+    'condition_details': None,
+    'isbn': None,
+    'description': 'Ответ локальной заглушки LLM',
+}
+
+
+@dataclass
+class StubConfig:
+    """Поведение заглушки"""
+    latency: float = 0.5          # Базовая задержка ответа, секунды
+    jitter: float = 0.0           # Случайная добавка к задержке (0..jitter), секунды
+    error_rate: float = 0.0       # Доля ответов 500
+    malformed_rate: float = 0.0   # Доля ответов с некорректным JSON в content
+    seed: Optional[int] = None
+
+
+class LLMStubServer(ThreadingHTTPServer):
+    """HTTP-сервер заглушки со счетчиками ответов"""
+
+    daemon_threads = True
+
+    def __init__(self, address, config: StubConfig):
+        super().__init__(address, LLMStubHandler)
+        self.config = config
+        self.random = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self.counters = {'requests': 0, 'ok': 0, 'errors': 0, 'malformed': 0}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def choose_outcome(self) -> Tuple[str, float]:
+        """Тип ответа (ok, errors или malformed) и задержка"""
+        with self._lock:
+            roll = self.random.random()
+            delay = self.config.latency + self.random.random() * self.config.jitter
+        if roll < self.config.error_rate:
+            outcome = 'errors'
+        elif roll < self.config.error_rate + self.config.malformed_rate:
+            outcome = 'malformed'
+        else:
+            outcome = 'ok'
+        with self._lock:
+            self.counters['requests'] += 1
+            self.counters[outcome] += 1
+        return outcome, delay
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters)
+
+
+class LLMStubHandler(BaseHTTPRequestHandler):
+    """Обработчик POST /v1/chat/completions"""
+
+    server: LLMStubServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length)
+
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': 'Not found', 'code': 'not_found'}})
+            return
+
+        outcome, delay = self.server.choose_outcome()
+        if delay > 0:
+            time.sleep(delay)
+
+        if outcome == 'errors':
+            self._send_json(500, {'error': {'message': 'Stub server error', 'code': 'stub_error'}})
+            return
+
+        if outcome == 'malformed':
+            content = '{"title": "Тестовая книга", "authors": ['
+        else:
+            book_data = dict(STUB_BOOK_DATA)
+            book_data['category_id'] = self._pick_category(raw)
+            content = json.dumps(book_data, ensure_ascii=False)
+
+        self._send_json(200, {
+            'id': 'chatcmpl-stub',
+            'object': 'chat.completion',
+            'model': 'stub',
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+        })
+
+    def _pick_category(self, raw: bytes) -> Optional[int]:
+        """Случайная категория из раздела категорий промпта"""
+        try:
+            payload = json.loads(raw)
+            parts = payload['messages'][0]['content']
+            text = next(part['text'] for part in parts if part.get('type') == 'text')
+        except (ValueError, KeyError, IndexError, TypeError, StopIteration):
+            return None
+        ids = CATEGORY_LINE_RE.findall(text)
+        if not ids:
+            return None
+        with self.server._lock:
+            return int(self.server.random.choice(ids))
+
+
+def start_stub_server(host: str = '127.0.0.1', port: int = 0, config: Optional[StubConfig] = None) -> LLMStubServer:
+    """
+    Запускает заглушку в фоновом потоке.
+    port=0 - свободный порт (адрес в server.base_url). Остановка: server.shutdown()
+    """
+    server = LLMStubServer((host, port), config or StubConfig())
+    thread = threading.Thread(target=server.serve_forever, name='llm-stub', daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,71 @@
+"""
+Вынос CPU-работы (OpenCV, Pillow) из event loop в пул процессов
+
+Асинхронные view мастера создания книги не должны выполнять нормализацию
+страниц и перекодирование изображений в потоке event loop: GIL и секунды
+OpenCV остановили бы все остальные запросы процесса. run_cpu выполняет
+функцию в пуле процессов (CPU_POOL_WORKERS), при CPU_POOL_WORKERS = 0 -
+в потоке (тесты, окружения без fork/spawn).
+
+Функции и аргументы передаются в дочерний процесс через pickle: это должны
+быть функции уровня модуля без обращения к БД и настройкам Django.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def get_cpu_workers() -> int:
+    """Размер пула процессов (0 - выполнение в потоке)"""
+    return getattr(settings, 'CPU_POOL_WORKERS', min(4, os.cpu_count() or 1))
+
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """Общий для процесса пул (пересоздается при изменении CPU_POOL_WORKERS)"""
+    global _executor, _executor_workers
+    workers = get_cpu_workers()
+    if workers <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            # spawn: дочерний процесс не наследует соединения с БД и потоки родителя
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _executor_workers = workers
+        return _executor
+
+
+def shutdown_process_pool() -> None:
+    """Останавливает пул (следующий вызов run_cpu создаст новый)"""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        _executor_workers = 0
+
+
+async def run_cpu(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Выполняет func(*args, **kwargs) в пуле процессов, не блокируя event loop"""
+    call = partial(func, *args, **kwargs)
+    pool = get_process_pool()
+    if pool is None:
+        return await asyncio.to_thread(call)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, call)
+    except BrokenProcessPool:
+        # Дочерний процесс завершился аварийно - следующий вызов получит новый пул
+        shutdown_process_pool()
+        raise
@@ -0,0 +1,234 @@
+"""
+Профилирование запросов: SQL-запросы, время и размер ответа по маршрутам
+Используется ProfilingMiddleware и эндпоинтом /api/profiling/
+"""
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Any
+from django.conf import settings
+from django.db import connections
+
+
+_IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+_NUMBER_RE = re.compile(r'\b\d+\b')
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_SPACES_RE = re.compile(r'\s+')
+
+# Накопитель времени сериализации текущего запроса, мс (None - время не измеряется)
+_serialize_ms: ContextVar[Optional[List[float]]] = ContextVar('profiling_serialize_ms', default=None)
+# Внутри измеряемого блока: вложенные сериализаторы не суммируются
+_serializing: ContextVar[bool] = ContextVar('profiling_serializing', default=False)
+
+
+def fingerprint_sql(sql: str) -> str:
+    """
+    Отпечаток SQL-запроса без значений параметров.
+    Списки IN (%s, %s, ...) сворачиваются, чтобы одинаковые запросы с разным
+    количеством параметров давали один отпечаток.
+    """
+    sql = _STRING_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    return _SPACES_RE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """
+    Записывает SQL-запросы всех подключений к БД (connection.execute_wrapper).
+    Используется как контекстный менеджер вокруг обработки запроса.
+    """
+
+    def __init__(self):
+        self.queries: List[Dict[str, Any]] = []
+        self._stack: Optional[ExitStack] = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'params': params,
+                'alias': context['connection'].alias,
+                'duration_ms': (time.perf_counter() - started) * 1000,
+            })
+
+    def __enter__(self) -> 'QueryRecorder':
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stack.close()
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(query['duration_ms'] for query in self.queries)
+
+    def duplicates(self) -> Dict[str, int]:
+        """Отпечатки запросов, выполненных больше одного раза (признак N+1)"""
+        counts = Counter(fingerprint_sql(query['sql']) for query in self.queries)
+        return {fingerprint: count for fingerprint, count in counts.items() if count > 1}
+
+
+@contextmanager
+def serialization_timer() -> Iterator[List[float]]:
+    """
+    Накопитель времени сериализации на время обработки запроса (ProfilingMiddleware).
+    Возвращает список из одного значения - суммарного времени в мс
+    """
+    total = [0.0]
+    token = _serialize_ms.set(total)
+    try:
+        yield total
+    finally:
+        _serialize_ms.reset(token)
+
+
+@contextmanager
+def timed_serialization() -> Iterator[None]:
+    """
+    Время блока учитывается как сериализация ответа (serializer.data или сборка
+    данных без сериализатора). Вложенные блоки не суммируются
+    """
+    total = _serialize_ms.get()
+    if total is None or _serializing.get():
+        yield
+        return
+    token = _serializing.set(True)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        total[0] += (time.perf_counter() - started) * 1000
+        _serializing.reset(token)
+
+
+def install_serializer_timing() -> None:
+    """
+    Оборачивает BaseSerializer.data в timed_serialization (вызывается из BooksConfig.ready).
+    Serializer.data и ListSerializer.data обращаются к нему через super(), поэтому
+    измеряются все сериализаторы; без открытого накопителя обертка только читает ContextVar
+    """
+    from rest_framework.serializers import BaseSerializer
+
+    data = BaseSerializer.data
+    if getattr(data.fget, 'profiling_timed', False):
+        return
+
+    def timed_data(self):
+        with timed_serialization():
+            return data.fget(self)
+
+    timed_data.profiling_timed = True
+    BaseSerializer.data = property(timed_data)
+
+
+class ProfileStore:
+    """Сводка профилирования по маршрутам (в памяти процесса)"""
+
+    _routes: Dict[str, Dict[str, Any]] = {}
+    _lock = threading.Lock()
+
+    # Сколько отпечатков дублирующихся запросов хранить на маршрут
+    MAX_FINGERPRINTS = 10
+
+    @classmethod
+    def record(cls, route: str, profile: Dict[str, Any]) -> None:
+        """Добавляет результат одного запроса в сводку маршрута"""
+        with cls._lock:
+            summary = cls._routes.get(route)
+            if summary is None:
+                summary = cls._routes[route] = {
+                    'route': route,
+                    'requests': 0,
+                    'queries_total': 0,
+                    'queries_max': 0,
+                    'db_ms_total': 0.0,
+                    'db_ms_max': 0.0,
+                    'view_ms_total': 0.0,
+                    'serialize_ms_total': 0.0,
+                    'render_ms_total': 0.0,
+                    'total_ms_total': 0.0,
+                    'total_ms_max': 0.0,
+                    'response_bytes_max': 0,
+                    'budget_exceeded': 0,
+                    'duplicates': Counter(),
+                }
+            summary['requests'] += 1
+            summary['queries_total'] += profile['queries']
+            summary['queries_max'] = max(summary['queries_max'], profile['queries'])
+            summary['db_ms_total'] += profile['db_ms']
+            summary['db_ms_max'] = max(summary['db_ms_max'], profile['db_ms'])
+            summary['view_ms_total'] += profile['view_ms']
+            summary['serialize_ms_total'] += profile['serialize_ms']
+            summary['render_ms_total'] += profile['render_ms']
+            summary['total_ms_total'] += profile['total_ms']
+            summary['total_ms_max'] = max(summary['total_ms_max'], profile['total_ms'])
+            summary['response_bytes_max'] = max(summary['response_bytes_max'], profile['response_bytes'])
+            if profile.get('budget_exceeded'):
+                summary['budget_exceeded'] += 1
+            for fingerprint, count in profile['duplicates'].items():
+                summary['duplicates'][fingerprint] = max(summary['duplicates'][fingerprint], count)
+
+    @classmethod
+    def summary(cls) -> List[Dict[str, Any]]:
+        """Сводка по маршрутам, отсортированная по среднему количеству запросов"""
+        with cls._lock:
+            routes = [dict(summary, duplicates=Counter(summary['duplicates'])) for summary in cls._routes.values()]
+
+        result = []
+        for summary in routes:
+            requests = summary['requests']
+            result.append({
+                'route': summary['route'],
+                'requests': requests,
+                'queries_avg': round(summary['queries_total'] / requests, 2),
+                'queries_max': summary['queries_max'],
+                'db_ms_avg': round(summary['db_ms_total'] / requests, 2),
+                'db_ms_max': round(summary['db_ms_max'], 2),
+                'view_ms_avg': round(summary['view_ms_total'] / requests, 2),
+                'serialize_ms_avg': round(summary['serialize_ms_total'] / requests, 2),
+                'render_ms_avg': round(summary['render_ms_total'] / requests, 2),
+                'total_ms_avg': round(summary['total_ms_total'] / requests, 2),
+                'total_ms_max': round(summary['total_ms_max'], 2),
+                'response_bytes_max': summary['response_bytes_max'],
+                'budget_exceeded': summary['budget_exceeded'],
+                'duplicate_queries': [
+                    {'fingerprint': fingerprint, 'count': count}
+                    for fingerprint, count in summary['duplicates'].most_common(cls.MAX_FINGERPRINTS)
+                ],
+            })
+        result.sort(key=lambda item: item['queries_avg'], reverse=True)
+        return result
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._routes.clear()
+
+
+def is_profiling_enabled() -> bool:
+    """Включено ли профилирование (по умолчанию только при DEBUG)"""
+    return getattr(settings, 'PROFILING_ENABLED', settings.DEBUG)
+
+
+def get_query_budget(view_name: Optional[str]) -> Optional[int]:
+    """
+    Бюджет SQL-запросов для маршрута: PROFILING_QUERY_BUDGETS[view_name]
+    или PROFILING_DEFAULT_QUERY_BUDGET (None - без ограничения)
+    """
+    budgets = getattr(settings, 'PROFILING_QUERY_BUDGETS', {})
+    if view_name and view_name in budgets:
+        return budgets[view_name]
+    return getattr(settings, 'PROFILING_DEFAULT_QUERY_BUDGET', None)
@@ -0,0 +1,355 @@
+"""
+Статистика чтения пользователя: прочтения по годам, месяцам, категориям и авторам
+
+Даты прочтения (BookReadingDate) хранятся по книгам, читатель - владелец книги.
+Подсчет по BookReadingDate для активного читателя - чтение всех его дат
+прочтения на каждый запрос, поэтому статистика хранится в сводных таблицах:
+ReadingMonthCount - прочтения и повторные прочтения за (пользователь, год,
+месяц, категория), ReadingAuthorCount - прочтения книг автора пользователем.
+Ответ собирается двумя запросами к сводным таблицам, их размер зависит от числа
+месяцев, категорий и авторов, а не от числа прочтений.
+
+Повторное прочтение - любая дата прочтения книги, кроме самой ранней.
+
+Таблицы поддерживаются сигналами: добавление и удаление даты прочтения,
+смена владельца или категории книги, изменение авторов книги, удаление книги
+и категории. Массовые операции без сигналов (bulk_create, _raw_delete,
+queryset.update) должны вызывать rebuild() или books_transferred().
+"""
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min, Model
+from django.utils import timezone
+
+from ..models import Book, BookAuthor, BookReadingDate, ReadingAuthorCount, ReadingMonthCount
+
+# (user_id, year, month, category_id)
+MonthKey = Tuple[int, int, int, Optional[int]]
+# (owner_id, category_id)
+ReaderLocation = Tuple[Optional[int], Optional[int]]
+
+
+@dataclass
+class ReadingDeltas:
+    """Изменения сводных таблиц: прочтения и повторные прочтения по месяцам, прочтения по авторам"""
+    # MonthKey -> изменение
+    reads: Counter = field(default_factory=Counter)
+    rereads: Counter = field(default_factory=Counter)
+    # (user_id, author_id) -> изменение
+    authors: Counter = field(default_factory=Counter)
+
+    def update(self, other: 'ReadingDeltas') -> None:
+        self.reads.update(other.reads)
+        self.rereads.update(other.rereads)
+        self.authors.update(other.authors)
+
+
+def add_counts(model: type[Model], lookup: Dict[str, Any], changes: Dict[str, int]) -> None:
+    """Прибавляет изменения к строке счетчиков (отсутствующая строка создается)"""
+    changes = {name: delta for name, delta in changes.items() if delta}
+    if not changes:
+        return
+    rows = model.objects.filter(**lookup)
+    increments = {name: F(name) + delta for name, delta in changes.items()}
+    if rows.update(**increments) or all(delta < 0 for delta in changes.values()):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **changes)
+    except IntegrityError:
+        # Строку создал параллельный запрос
+        rows.update(**increments)
+
+
+def read_date(reading: BookReadingDate) -> date:
+    """Дата прочтения как date (objects.create() сохраняет строку '2024-01-31' без преобразования)"""
+    return BookReadingDate._meta.get_field('date').to_python(reading.date)
+
+
+class ReadingStatsService:
+    """Поддержка сводных таблиц статистики чтения и ответ /api/users/me/reading-stats/"""
+
+    # Авторов в ответе (по убыванию прочтений)
+    AUTHORS_LIMIT = 20
+    # Книг на запрос при пересчете
+    REBUILD_BATCH_SIZE = 1000
+
+    @staticmethod
+    def apply(deltas: ReadingDeltas) -> None:
+        """Прибавляет изменения к сводным таблицам"""
+        with transaction.atomic():
+            for key in set(deltas.reads) | set(deltas.rereads):
+                user_id, year, month, category_id = key
+                add_counts(
+                    ReadingMonthCount,
+                    {'user_id': user_id, 'year': year, 'month': month, 'category_id': category_id},
+                    {'reads': deltas.reads[key], 'rereads': deltas.rereads[key]},
+                )
+            for (user_id, author_id), delta in deltas.authors.items():
+                add_counts(ReadingAuthorCount, {'user_id': user_id, 'author_id': author_id}, {'reads': delta})
+
+    @staticmethod
+    def contributions(
+        book_ids: Iterable[int],
+        sign: int = 1,
+        locations: Optional[Dict[int, ReaderLocation]] = None,
+    ) -> ReadingDeltas:
+        """
+        Вклад книг в сводные таблицы по их датам прочтения (sign=-1 - для вычитания).
+        locations: {book_id: (owner_id, category_id)} вместо текущих владельца и категории книги
+        """
+        deltas = ReadingDeltas()
+        reads_by_book: Counter = Counter()
+        owners: Dict[int, int] = {}
+        rows = (
+            BookReadingDate.objects.filter(book_id__in=book_ids).order_by('book_id', 'date')
+            .values_list('book_id', 'date', 'book__owner_id', 'book__category_id')
+        )
+        previous_book_id = None
+        for book_id, read_on, owner_id, category_id in rows.iterator(chunk_size=5000):
+            if locations is not None and book_id in locations:
+                owner_id, category_id = locations[book_id]
+            # Самая ранняя дата книги - первое прочтение, остальные - повторные
+            is_reread = book_id == previous_book_id
+            previous_book_id = book_id
+            if owner_id is None:
+                continue
+            key = (owner_id, read_on.year, read_on.month, category_id)
+            deltas.reads[key] += sign
+            if is_reread:
+                deltas.rereads[key] += sign
+            reads_by_book[book_id] += 1
+            owners[book_id] = owner_id
+
+        if reads_by_book:
+            links = BookAuthor.objects.filter(book_id__in=list(reads_by_book)).values_list('book_id', 'author_id')
+            for book_id, author_id in links:
+                deltas.authors[(owners[book_id], author_id)] += sign * reads_by_book[book_id]
+        return deltas
+
+    @classmethod
+    def reading_added(cls, reading: BookReadingDate) -> None:
+        """Дата прочтения добавлена (вызывается после сохранения)"""
+        cls._reading_changed(reading.book_id, read_date(reading), 1, exclude_id=reading.pk)
+
+    @classmethod
+    def reading_removed(cls, reading: BookReadingDate) -> None:
+        """Дата прочтения удалена (вызывается после удаления, книга еще существует)"""
+        cls._reading_changed(reading.book_id, read_date(reading), -1)
+
+    @classmethod
+    def _reading_changed(cls, book_id: int, read_on: date, delta: int, exclude_id: Optional[int] = None) -> None:
+        location = Book.objects.filter(id=book_id).values_list('owner_id', 'category_id').first()
+        if location is None or location[0] is None:
+            return
+        owner_id, category_id = location
+        others = BookReadingDate.objects.filter(book_id=book_id)
+        if exclude_id is not None:
+            others = others.exclude(id=exclude_id)
+        earliest = others.aggregate(earliest=Min('date'))['earliest']
+
+        deltas = ReadingDeltas()
+        key = (owner_id, read_on.year, read_on.month, category_id)
+        deltas.reads[key] += delta
+        if earliest is not None:
+            if earliest < read_on:
+                # Дата не первая - повторное прочтение
+                deltas.rereads[key] += delta
+            else:
+                # Дата раньше остальных: прежнее первое прочтение становится повторным (или наоборот)
+                deltas.rereads[(owner_id, earliest.year, earliest.month, category_id)] += delta
+        for author_id in BookAuthor.objects.filter(book_id=book_id).values_list('author_id', flat=True):
+            deltas.authors[(owner_id, author_id)] += delta
+        cls.apply(deltas)
+
+    @classmethod
+    def book_author_changed(cls, book_id: int, author_id: int, delta: int) -> None:
+        """Автор добавлен к книге (delta=1) или удален (delta=-1)"""
+        row = (
+            Book.objects.filter(id=book_id, owner__isnull=False)
+            .annotate(reads=Count('reading_dates')).values_list('owner_id', 'reads').first()
+        )
+        if row is not None and row[1]:
+            deltas = ReadingDeltas()
+            deltas.authors[(row[0], author_id)] += delta * row[1]
+            cls.apply(deltas)
+
+    @classmethod
+    def book_moved(cls, book_id: int, old_location: ReaderLocation) -> None:
+        """Владелец или категория книги изменились (вызывается после сохранения): (owner_id, category_id)"""
+        deltas = cls.contributions([book_id], -1, {book_id: old_location})
+        deltas.update(cls.contributions([book_id]))
+        cls.apply(deltas)
+
+    @classmethod
+    def books_transferred(cls, book_ids: Iterable[int], owner_id: int) -> None:
+        """Книги передаются пользователю через queryset.update() (вызывается до обновления)"""
+        book_ids = list(book_ids)
+        locations = {
+            book_id: (owner_id, category_id)
+            for book_id, category_id in
+            Book.objects.filter(id__in=book_ids).exclude(owner_id=owner_id).values_list('id', 'category_id')
+        }
+        if not locations:
+            return
+        deltas = cls.contributions(list(locations), -1)
+        deltas.update(cls.contributions(list(locations), 1, locations))
+        cls.apply(deltas)
+
+    @classmethod
+    def book_deleted(cls, book: Book) -> None:
+        """Книга удаляется (вызывается до удаления ее дат прочтения)"""
+        if book.owner_id is not None:
+            cls.apply(cls.contributions([book.id], -1))
+
+    @classmethod
+    def move_category(cls, category_id: int, new_category_id: Optional[int] = None) -> None:
+        """Прочтения категории переносятся в другую (при удалении категории книги остаются без категории)"""
+        rows = ReadingMonthCount.objects.filter(category_id=category_id).values_list(
+            'user_id', 'year', 'month', 'reads', 'rereads'
+        )
+        deltas = ReadingDeltas()
+        for user_id, year, month, reads, rereads in rows:
+            deltas.reads[(user_id, year, month, category_id)] -= reads
+            deltas.rereads[(user_id, year, month, category_id)] -= rereads
+            deltas.reads[(user_id, year, month, new_category_id)] += reads
+            deltas.rereads[(user_id, year, month, new_category_id)] += rereads
+        cls.apply(deltas)
+
+    @classmethod
+    def rebuild(cls, user_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Пересчитывает сводные таблицы по датам прочтения (целиком или для указанных пользователей).
+        Returns: количество строк таблиц после пересчета
+        """
+        months = ReadingMonthCount.objects.all()
+        authors = ReadingAuthorCount.objects.all()
+        books = Book.objects.filter(owner__isnull=False, reading_dates__isnull=False).distinct()
+        if user_ids is not None:
+            user_ids = list(user_ids)
+            months = months.filter(user_id__in=user_ids)
+            authors = authors.filter(user_id__in=user_ids)
+            books = books.filter(owner_id__in=user_ids)
+
+        book_ids = list(books.order_by('id').values_list('id', flat=True))
+        deltas = ReadingDeltas()
+        for start in range(0, len(book_ids), cls.REBUILD_BATCH_SIZE):
+            deltas.update(cls.contributions(book_ids[start:start + cls.REBUILD_BATCH_SIZE]))
+
+        month_rows = []
+        for key, reads in deltas.reads.items():
+            user_id, year, month, category_id = key
+            month_rows.append(ReadingMonthCount(
+                user_id=user_id, year=year, month=month, category_id=category_id,
+                reads=reads, rereads=deltas.rereads[key],
+            ))
+        author_rows = [
+            ReadingAuthorCount(user_id=user_id, author_id=author_id, reads=reads)
+            for (user_id, author_id), reads in deltas.authors.items()
+        ]
+        with transaction.atomic():
+            months.delete()
+            authors.delete()
+            ReadingMonthCount.objects.bulk_create(month_rows, batch_size=5000)
+            ReadingAuthorCount.objects.bulk_create(author_rows, batch_size=5000)
+        return len(month_rows) + len(author_rows)
+
+    @classmethod
+    def schedule_rebuild(cls, origin: Any, user_id: Optional[int] = None, book_id: Optional[int] = None) -> None:
+        """
+        Пересчет статистики пользователя (владельца книги) после фиксации транзакции -
+        для массовых удалений через Collector. Для одного origin планируется один пересчет
+        """
+        pending = getattr(origin, '_reading_stats_rebuild', None)
+        if pending is None:
+            pending = {'users': set(), 'books': set()}
+            try:
+                origin._reading_stats_rebuild = pending
+            except AttributeError:
+                pass
+            transaction.on_commit(lambda: cls._rebuild_pending(pending))
+        if user_id is not None:
+            pending['users'].add(user_id)
+        if book_id is not None:
+            pending['books'].add(book_id)
+
+    @classmethod
+    def _rebuild_pending(cls, pending: Dict[str, set]) -> None:
+        user_ids = set(pending['users'])
+        if pending['books']:
+            user_ids.update(
+                Book.objects.filter(id__in=pending['books'], owner__isnull=False).values_list('owner_id', flat=True)
+            )
+        if user_ids:
+            cls.rebuild(user_ids)
+
+    @classmethod
+    def stats(cls, user_id: int, today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Статистика чтения пользователя (два запроса к сводным таблицам)
+
+        Returns:
+            {'total_reads', 'rereads', 'books_read', 'by_year', 'by_month', 'by_category',
+             'by_author', 'streaks': {'current_months', 'longest_months'}}
+        """
+        rows = (
+            ReadingMonthCount.objects.filter(user_id=user_id, reads__gt=0)
+            .values_list('year', 'month', 'category_id', 'category__name', 'reads', 'rereads')
+        )
+        by_year: Dict[int, List[int]] = {}
+        by_month: Dict[Tuple[int, int], List[int]] = {}
+        by_category: Dict[Optional[int], Dict[str, Any]] = {}
+        for year, month, category_id, category_name, reads, rereads in rows:
+            for totals in (by_year.setdefault(year, [0, 0]), by_month.setdefault((year, month), [0, 0])):
+                totals[0] += reads
+                totals[1] += rereads
+            category = by_category.setdefault(category_id, {'id': category_id, 'name': category_name, 'reads': 0})
+            category['reads'] += reads
+
+        authors = (
+            ReadingAuthorCount.objects.filter(user_id=user_id, reads__gt=0)
+            .order_by('-reads', 'author__full_name')
+            .values('author_id', 'author__full_name', 'reads')[:cls.AUTHORS_LIMIT]
+        )
+        total_reads = sum(reads for reads, _ in by_year.values())
+        rereads = sum(count for _, count in by_year.values())
+        return {
+            'total_reads': total_reads,
+            'rereads': rereads,
+            'books_read': total_reads - rereads,
+            'by_year': [
+                {'year': year, 'reads': reads, 'rereads': count}
+                for year, (reads, count) in sorted(by_year.items())
+            ],
+            'by_month': [
+                {'year': year, 'month': month, 'reads': reads, 'rereads': count}
+                for (year, month), (reads, count) in sorted(by_month.items())
+            ],
+            'by_category': sorted(by_category.values(), key=lambda item: (-item['reads'], item['name'] or '')),
+            'by_author': [
+                {'id': row['author_id'], 'full_name': row['author__full_name'], 'reads': row['reads']}
+                for row in authors
+            ],
+            'streaks': month_streaks(by_month, today or timezone.localdate()),
+        }
+
+
+def month_streaks(months: Iterable[Tuple[int, int]], today: date) -> Dict[str, int]:
+    """
+    Серии месяцев подряд с прочтениями: самая длинная и текущая
+    (заканчивается в текущем или прошлом месяце - текущий месяц еще не закончился)
+    """
+    indexes = sorted(year * 12 + month - 1 for year, month in months)
+    longest = run = 0
+    previous = None
+    for index in indexes:
+        run = run + 1 if previous is not None and index == previous + 1 else 1
+        longest = max(longest, run)
+        previous = index
+    this_month = today.year * 12 + today.month - 1
+    current = run if previous is not None and this_month - previous <= 1 else 0
+    return {'current_months': current, 'longest_months': longest}
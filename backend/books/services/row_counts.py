@@ -0,0 +1,84 @@
+"""
+Количество строк больших таблиц без полного COUNT(*)
+
+COUNT(*) в PostgreSQL читает всю таблицу (или весь индекс): для миллионов
+книг и страниц это секунды на каждый запрос списка. Для таблицы без фильтров
+используется оценка планировщика pg_class.reltuples (обновляется VACUUM и
+ANALYZE), для отфильтрованного queryset - COUNT не дальше заданного предела.
+На других СУБД оценки нет - используется bounded_count.
+
+approximate_count объединяет оба способа для списков API: точное количество
+до предела, дальше - оценка (reltuples или EXPLAIN) с признаком is_estimate.
+"""
+import json
+import logging
+from typing import Optional, Tuple
+
+from django.db import connections, router
+from django.db.models import Model, QuerySet
+
+logger = logging.getLogger(__name__)
+
+
+def table_row_estimate(model: type[Model], using: Optional[str] = None) -> Optional[int]:
+    """
+    Оценка количества строк таблицы модели по статистике PostgreSQL.
+    None - оценки нет (другая СУБД, таблица еще не анализировалась)
+    """
+    using = using or router.db_for_read(model)
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [connection.ops.quote_name(model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    # reltuples = -1 (PostgreSQL 14+) или 0 - таблица после создания не анализировалась
+    if row is None or row[0] <= 0:
+        return None
+    return row[0]
+
+
+def bounded_count(queryset: QuerySet, limit: int) -> int:
+    """min(количество строк queryset, limit): COUNT по подзапросу с LIMIT"""
+    return queryset.order_by()[:limit].count()
+
+
+def planner_estimate(queryset: QuerySet) -> Optional[int]:
+    """
+    Оценка количества строк queryset планировщиком PostgreSQL (EXPLAIN без
+    выполнения запроса, "Plan Rows" верхнего узла плана). None - другая СУБД
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    try:
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+    except Exception:
+        logger.warning('Не удалось получить оценку планировщика', exc_info=True)
+        return None
+
+
+def approximate_count(queryset: QuerySet, limit: int) -> Tuple[int, bool]:
+    """
+    Количество строк queryset не дороже COUNT по limit + 1 строкам.
+
+    Returns: (количество, is_estimate). До limit строк включительно - точное
+    количество. Больше - оценка: для queryset без фильтров pg_class.reltuples
+    (тогда COUNT не выполняется вовсе), для отфильтрованного - EXPLAIN;
+    без оценки (другая СУБД) или с оценкой не больше limit - сам limit
+    («limit+» строк)
+    """
+    if not queryset.query.has_filters():
+        estimate = table_row_estimate(queryset.model, queryset.db)
+        if estimate is not None and estimate > limit:
+            return estimate, True
+    count = bounded_count(queryset, limit + 1)
+    if count <= limit:
+        return count, False
+    estimate = planner_estimate(queryset)
+    if estimate is not None and estimate > limit:
+        return estimate, True
+    return limit, True
@@ -0,0 +1,69 @@
+"""
+Сводка по пользователю: количество книг по статусам, библиотек и отзывов
+
+Все значения считаются одним запросом - коррелированными подзапросами COUNT
+к строке пользователя (каждый использует индекс по владельцу), без загрузки
+книг и без перемножения строк, как при нескольких JOIN в одном GROUP BY.
+"""
+from typing import Any, Dict, Optional
+
+from django.contrib.auth import get_user_model
+from django.db.models import Func, IntegerField, OuterRef, QuerySet, Subquery
+
+from ..models import Book, BookReview, Library
+
+
+def count_subquery(queryset: QuerySet) -> Subquery:
+    """
+    Коррелированный COUNT(*) по queryset (фильтр по OuterRef задает вызывающий).
+    Агрегат без GROUP BY всегда возвращает одну строку - 0, если строк нет
+    """
+    return Subquery(
+        queryset.order_by().annotate(count=Func('pk', function='COUNT')).values('count'),
+        output_field=IntegerField(),
+    )
+
+
+class UserSummaryService:
+    """Счетчики пользователя для профилей и сводки"""
+
+    @staticmethod
+    def annotations(user_ref: str = 'pk') -> Dict[str, Subquery]:
+        """
+        Аннотации books_count_annotated и libraries_count_annotated для queryset,
+        в котором user_ref - ссылка на пользователя ('pk' для User, 'user_id' для UserProfile)
+        """
+        return {
+            'books_count_annotated': count_subquery(Book.objects.filter(owner_id=OuterRef(user_ref))),
+            'libraries_count_annotated': count_subquery(Library.objects.filter(owner_id=OuterRef(user_ref))),
+        }
+
+    @staticmethod
+    def summary(user_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Сводка пользователя одним запросом (None, если пользователя нет)
+
+        Returns:
+            {'books_count', 'books_by_status': {статус: количество}, 'libraries_count', 'reviews_count'}
+        """
+        books = Book.objects.filter(owner_id=OuterRef('pk'))
+        statuses = [value for value, _ in Book.STATUS_CHOICES]
+        row = (
+            get_user_model().objects.filter(pk=user_id)
+            .annotate(
+                **UserSummaryService.annotations(),
+                reviews_count_annotated=count_subquery(BookReview.objects.filter(user_id=OuterRef('pk'))),
+                **{f'status_{value}': count_subquery(books.filter(status=value)) for value in statuses},
+            )
+            .values('books_count_annotated', 'libraries_count_annotated', 'reviews_count_annotated',
+                    *(f'status_{value}' for value in statuses))
+            .first()
+        )
+        if row is None:
+            return None
+        return {
+            'books_count': row['books_count_annotated'],
+            'books_by_status': {value: row[f'status_{value}'] for value in statuses},
+            'libraries_count': row['libraries_count_annotated'],
+            'reviews_count': row['reviews_count_annotated'],
+        }
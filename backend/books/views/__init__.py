@@ -12,6 +12,8 @@ from .users import UserProfileViewSet
 from .libraries import LibraryViewSet
 from .hashtags import HashtagViewSet
 from .reviews import BookReviewViewSet
+from .profiling import ProfilingViewSet
+from .wizard import NormalizePagesView, AutoFillView, AutoFillBatchView, UploadPagesView
 
 __all__ = [
     'CategoryViewSet',
@@ -25,5 +27,10 @@ __all__ = [
     'LibraryViewSet',
     'HashtagViewSet',
     'BookReviewViewSet',
+    'ProfilingViewSet',
+    'NormalizePagesView',
+    'AutoFillView',
+    'AutoFillBatchView',
+    'UploadPagesView',
 ]
 
@@ -1,11 +1,12 @@
 """
 ViewSet для авторов
 """
-from rest_framework import viewsets
+from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from ..models import Author
-from ..serializers import AuthorSerializer, BookSerializer
+from ..serializers import AuthorSerializer
+from ..services.autocomplete import AutocompleteService
 
 
 class AuthorViewSet(viewsets.ModelViewSet):
@@ -87,13 +88,28 @@ class AuthorViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """
+        Автодополнение по началу слов ФИО автора (самые популярные по числу книг)
+        
+        Query params:
+            q - начало слов ФИО, например "пуш алекс" (без учета регистра, ё = е)
+            limit - максимум результатов (по умолчанию и не более AUTOCOMPLETE_MAX_RESULTS)
+        """
+        try:
+            limit = int(request.query_params.get('limit') or 0) or None
+        except ValueError:
+            return Response({'error': 'limit должен быть числом'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(AutocompleteService.search('authors', request.query_params.get('q', ''), limit))
+    
     @action(detail=True, methods=['get'])
     def books(self, request, pk=None):
-        """Получить все книги автора"""
+        """
+        Книги автора: фильтры, пагинация (в том числе ?pagination=cursor)
+        и BookListSerializer - как у списка книг
+        """
         from .books import BookViewSet
         author = self.get_object()
-        # Используем оптимизированный queryset из BookViewSet
-        books_queryset = BookViewSet.queryset.filter(authors=author)
-        serializer = BookSerializer(books_queryset, many=True, context={'request': request})
-        return Response(serializer.data)
+        return BookViewSet.list_for(request, authors=author)
 
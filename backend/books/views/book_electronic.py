@@ -2,8 +2,9 @@
 ViewSet для электронных версий книг
 """
 from rest_framework import viewsets
-from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.parsers import MultiPartParser, FormParser
 from ..models import BookElectronic
+from ..parsers import FastJSONParser
 from ..serializers import BookElectronicSerializer
 
 
@@ -11,7 +12,7 @@ class BookElectronicViewSet(viewsets.ModelViewSet):
     """API для электронных версий книг"""
     queryset = BookElectronic.objects.select_related('book')
     serializer_class = BookElectronicSerializer
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    parser_classes = (MultiPartParser, FormParser, FastJSONParser)
     
     def get_queryset(self):
         queryset = super().get_queryset()
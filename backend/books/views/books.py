@@ -1,15 +1,12 @@
 """
 ViewSet для книг (основной, самый сложный)
 """
-import os
-from pathlib import Path
-from django.conf import settings
 from django.utils import timezone
-from django.db.models import Q, Count, Prefetch
+from django.db.models import Avg, Count, Prefetch, Q
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.parsers import MultiPartParser, FormParser
 
 from ..models import Book, BookPage, BookImage, BookElectronic, Category, Hashtag, BookReview, BookReadingDate
 from ..serializers import (
@@ -19,15 +16,19 @@ from ..serializers import (
     BookElectronicSerializer, HashtagSerializer, LibrarySerializer,
     BookReadingDateSerializer
 )
+from ..parsers import FastJSONParser
 from ..permissions import IsOwnerOrReadOnly
-from rest_framework.permissions import AllowAny, IsAuthenticated
-from ..services.document_processor import process_document, normalize_pages_batch
+from rest_framework.permissions import AllowAny, IsAdminUser
+from ..services.document_processor import process_document
 from ..services.hashtag_service import HashtagService
 from ..services.transfer_service import TransferService
-from ..services.llm_service import auto_fill_book_data
+from ..services.autofill_cache import AutoFillCacheService
+from ..services.book_list import BookListProjection, is_fast_list_enabled
+from ..services.book_service import BookService
+from ..services.profiling import timed_serialization
 from ..exceptions import HashtagLimitExceeded, TransferError
 from ..constants import MIN_IMAGE_ORDER, MAX_IMAGE_ORDER
-from ..pagination import ConditionalBookPagination
+from ..pagination import BookCursorPagination, ConditionalBookPagination
 
 
 class BookViewSet(viewsets.ModelViewSet):
@@ -40,9 +41,12 @@ class BookViewSet(viewsets.ModelViewSet):
     ).annotate(
         reviews_count_annotated=Count('reviews', distinct=True),
         electronic_versions_count_annotated=Count('electronic_versions', distinct=True),
-        images_count_annotated=Count('images', distinct=True)
+        images_count_annotated=Count('images', distinct=True),
+        # Среднее по уже присоединенным отзывам: повторы строк из-за других JOIN
+        # одинаковы для всех отзывов книги и на среднее не влияют, NULL не учитывается
+        average_rating_annotated=Avg('reviews__rating')
     )
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    parser_classes = (MultiPartParser, FormParser, FastJSONParser)
     # Разрешаем чтение всем, редактирование только владельцам
     permission_classes = [IsOwnerOrReadOnly]
     # Используем условную пагинацию: если книг > 30, применяется пагинация
@@ -52,13 +56,13 @@ class BookViewSet(viewsets.ModelViewSet):
         """
         Переопределяем права доступа для разных действий.
         Для list и retrieve - AllowAny (все могут просматривать)
-        Для normalize_pages - IsAuthenticated (требуется авторизация, но не проверка владельца)
+        Для auto_fill_cache_stats - IsAdminUser (статистика кэша только для администраторов)
         Для остальных действий - IsOwnerOrReadOnly (только владелец может редактировать)
         """
         if self.action in ['list', 'retrieve']:
             return [AllowAny()]
-        elif self.action == 'normalize_pages':
-            return [IsAuthenticated()]
+        elif self.action == 'auto_fill_cache_stats':
+            return [IsAdminUser()]
         return [IsOwnerOrReadOnly()]
     
     def get_serializer_class(self):
@@ -74,24 +78,51 @@ class BookViewSet(viewsets.ModelViewSet):
             return BookListSerializer
         return BookSerializer
     
+    @property
+    def paginator(self):
+        """Курсорная пагинация при ?pagination=cursor (и в ссылках с cursor), иначе условная"""
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            use_cursor = 'cursor' in params or params.get('pagination') == 'cursor'
+            self._paginator = BookCursorPagination() if use_cursor else self.pagination_class()
+        return self._paginator
+    
     def list(self, request, *args, **kwargs):
         """
         Переопределяем метод list для явного использования пагинатора
         """
-        queryset = self.filter_queryset(self.get_queryset())
+        return self.list_response(self.filter_queryset(self.get_queryset()))
+    
+    def list_response(self, queryset):
+        """
+        Ответ списка книг: пагинация и BookListSerializer.
+        При BOOK_LIST_FAST_PATH книги выбираются проекцией .values() и собираются
+        BookListProjection (те же данные без создания моделей)
+        """
+        projection = None
+        if is_fast_list_enabled() and BookListProjection.supports(queryset):
+            projection = BookListProjection(self.get_serializer_context())
+            queryset = projection.project(queryset)
         
         page = self.paginate_queryset(queryset)
-        if page is not None:
-            # Пагинация применена
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        
         # Пагинация не применена (книг <= 30) - возвращаем все книги
-        serializer = self.get_serializer(queryset, many=True)
-        # Используем пагинатор для формирования ответа даже без пагинации
-        paginator = self.pagination_class()
-        paginator.count = queryset.count()
-        return paginator.get_paginated_response(serializer.data)
+        books = page if page is not None else queryset
+        if projection is not None:
+            with timed_serialization():
+                data = projection.serialize(books)
+        else:
+            data = BookListSerializer(books, many=True, context=self.get_serializer_context()).data
+        # Без пагинации пагинатор тоже формирует ответ (count уже посчитан)
+        return self.paginator.get_paginated_response(data)
+    
+    @classmethod
+    def list_for(cls, request, **filters):
+        """
+        Список книг с дополнительным условием для вложенных действий (книги библиотеки,
+        автора, издательства): те же фильтры, пагинация и сериализатор, что у list
+        """
+        view = cls(request=request, args=(), kwargs={}, format_kwarg=None, action='list')
+        return view.list_response(view.filter_queryset(view.get_queryset()).filter(**filters))
     
     def create(self, request, *args, **kwargs):
         """Создание книги с авторами и хэштегами"""
@@ -157,12 +188,13 @@ class BookViewSet(viewsets.ModelViewSet):
                 'reading_dates'
             )
         # Для list загружаем обложку (cover_page) и первую страницу каждой книги для отображения в карточке
+        # (срез в Prefetch - только одна страница на книгу, а не все страницы)
         elif self.action == 'list':
             queryset = queryset.select_related('cover_page').prefetch_related(
                 Prefetch(
                     'pages_set', 
-                    queryset=BookPage.objects.order_by('page_number'),
-                    to_attr='all_pages'
+                    queryset=BookPage.objects.order_by('page_number')[:1],
+                    to_attr='first_pages'
                 )
             )
         # Для list НЕ загружаем изображения через prefetch - это слишком медленно для большого количества книг
@@ -342,179 +374,24 @@ class BookViewSet(viewsets.ModelViewSet):
         
         return queryset
     
-    @action(detail=False, methods=['post'], url_path='normalize-pages', parser_classes=[MultiPartParser, FormParser])
-    def normalize_pages(self, request):
-        """
-        Нормализация страниц для мастера создания книги
-        POST /api/books/normalize-pages/
-        Content-Type: multipart/form-data
-        
-        Body:
-        - files: List[File] - загруженные изображения
-        
-        Response:
-        {
-            "normalized_images": [
-                {
-                    "id": "uuid",
-                    "original_filename": "page1.jpg",
-                    "normalized_url": "/media/temp/normalized/normalized_uuid.jpg",
-                    "width": 1920,
-                    "height": 2560
-                },
-                ...
-            ],
-            "total": 5,
-            "processed": 5
-        }
-        """
-        import sys
-        import traceback
-        print("=" * 80, file=sys.stderr)
-        print("🔵 normalize_pages ENDPOINT ВЫЗВАН!", file=sys.stderr)
-        print(f"🔵 request.method: {request.method}", file=sys.stderr)
-        print(f"🔵 request.FILES: {list(request.FILES.keys())}", file=sys.stderr)
-        print(f"🔵 request.data: {list(request.data.keys()) if hasattr(request.data, 'keys') else 'N/A'}", file=sys.stderr)
-        sys.stderr.flush()
-        
-        files = request.FILES.getlist('files')
-        
-        if not files:
-            return Response(
-                {'error': 'Файлы не найдены'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        try:
-            print(f"🔵 normalize_pages endpoint вызван с {len(files)} файлами", file=sys.stderr)
-            for i, f in enumerate(files):
-                print(f"  Файл {i+1}: {f.name}, размер: {f.size} байт, тип: {f.content_type}", file=sys.stderr)
-            sys.stderr.flush()
-            
-            # Обрабатываем файлы
-            normalized_images = normalize_pages_batch(files)
-            
-            print(f"🔵 normalize_pages_batch вернул {len(normalized_images)} результатов", file=sys.stderr)
-            sys.stderr.flush()
-            
-            # Фильтруем успешно обработанные изображения
-            successful = [img for img in normalized_images if img.get('normalized_url')]
-            failed = [img for img in normalized_images if img.get('error')]
-            
-            print(f"🔵 Успешно: {len(successful)}, Ошибок: {len(failed)}", file=sys.stderr)
-            sys.stderr.flush()
-            
-            return Response({
-                'normalized_images': normalized_images,
-                'total': len(normalized_images),
-                'processed': len(successful),
-                'failed': len(failed),
-                'errors': [{'filename': img['original_filename'], 'error': img.get('error')} 
-                          for img in failed] if failed else None
-            }, status=status.HTTP_200_OK)
-            
-        except Exception as e:
-            error_trace = traceback.format_exc()
-            print(f"🔴 ОШИБКА в normalize_pages endpoint: {str(e)}", file=sys.stderr)
-            print(f"🔴 Traceback:\n{error_trace}", file=sys.stderr)
-            sys.stderr.flush()
-            return Response(
-                {'error': f'Ошибка обработки: {str(e)}', 'traceback': error_trace if settings.DEBUG else None},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-    
-    @action(detail=False, methods=['post'], url_path='auto-fill')
-    def auto_fill(self, request):
+    @action(detail=False, methods=['get'], url_path='auto-fill/cache-stats')
+    def auto_fill_cache_stats(self, request):
         """
-        Автозаполнение данных книги через OpenAI GPT-4o
-        POST /api/books/auto-fill/
-        Content-Type: application/json
-        
-        Body:
-        {
-            "normalized_image_urls": [
-                "/media/temp/normalized/normalized_uuid1.jpg",
-                "/media/temp/normalized/normalized_uuid2.jpg",
-                ...
-            ]
-        }
+        Статистика кэша автозаполнения (только для администраторов)
+        GET /api/books/auto-fill/cache-stats/
         
         Response:
         {
-            "success": true,
-            "data": {
-                "title": "...",
-                "subtitle": "...",
-                "category_id": 1,
-                "authors": ["...", "..."],
-                ...
-            },
-            "confidence": 0.85,
-            "error": null
+            "hits": 10,
+            "misses": 4,
+            "stores": 4,
+            "hit_rate": 0.7143,
+            "entries": 4,
+            "max_entries": 5000,
+            "ttl_seconds": 2592000
         }
         """
-        import sys
-        
-        normalized_image_urls = request.data.get('normalized_image_urls', [])
-        
-        if not normalized_image_urls:
-            return Response(
-                {'error': 'Необходимо указать normalized_image_urls'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        if not isinstance(normalized_image_urls, list):
-            return Response(
-                {'error': 'normalized_image_urls должен быть массивом'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        print(f"🔵 auto_fill endpoint вызван с {len(normalized_image_urls)} изображениями", file=sys.stderr)
-        sys.stderr.flush()
-        
-        try:
-            result = auto_fill_book_data(normalized_image_urls)
-            
-            if result['success']:
-                return Response(result, status=status.HTTP_200_OK)
-            else:
-                return Response(
-                    {
-                        'success': False,
-                        'data': None,
-                        'error': result.get('error', 'Неизвестная ошибка'),
-                        'confidence': None
-                    },
-                    status=status.HTTP_200_OK  # 200, но с success=false для фронтенда
-                )
-                
-        except ValueError as e:
-            # Ошибка конфигурации (нет API ключа)
-            return Response(
-                {
-                    'success': False,
-                    'data': None,
-                    'error': str(e),
-                    'confidence': None
-                },
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-        except Exception as e:
-            import traceback
-            error_trace = traceback.format_exc()
-            print(f"🔴 ОШИБКА в auto_fill endpoint: {str(e)}", file=sys.stderr)
-            print(f"🔴 Traceback: {error_trace}", file=sys.stderr)
-            sys.stderr.flush()
-            
-            return Response(
-                {
-                    'success': False,
-                    'data': None,
-                    'error': f'Ошибка обработки: {str(e)}',
-                    'confidence': None
-                },
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        return Response(AutoFillCacheService.stats())
     
     @action(detail=False, methods=['get'])
     def stats(self, request):
@@ -613,24 +490,18 @@ class BookViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def my_books(self, request):
-        """Получить свои книги"""
-        books = self.get_queryset().filter(owner=request.user)
-        serializer = self.get_serializer(books, many=True)
-        return Response(serializer.data)
+        """Получить свои книги (как list: фильтры, пагинация, BookListSerializer)"""
+        return self.list_for(request, owner=request.user)
     
     @action(detail=False, methods=['get'], url_path='my-books/read')
     def my_books_read(self, request):
         """Получить прочитанные книги"""
-        books = self.get_queryset().filter(owner=request.user, status='read')
-        serializer = self.get_serializer(books, many=True)
-        return Response(serializer.data)
+        return self.list_for(request, owner=request.user, status='read')
     
     @action(detail=False, methods=['get'], url_path='my-books/want-to-read')
     def my_books_want_to_read(self, request):
         """Получить книги "Буду читать" """
-        books = self.get_queryset().filter(owner=request.user, status='want_to_read')
-        serializer = self.get_serializer(books, many=True)
-        return Response(serializer.data)
+        return self.list_for(request, owner=request.user, status='want_to_read')
     
     @action(detail=True, methods=['post'])
     def transfer(self, request, pk=None):
@@ -932,45 +803,6 @@ class BookViewSet(viewsets.ModelViewSet):
         serializer = BookPageSerializer(pages, many=True, context={'request': request})
         return Response(serializer.data)
     
-    @action(detail=True, methods=['post'], parser_classes=[MultiPartParser])
-    def upload_pages(self, request, pk=None):
-        """Загрузка страниц книги"""
-        book = self.get_object()
-        files = request.FILES.getlist('pages')
-        
-        if not files:
-            return Response(
-                {'error': 'Файлы не найдены'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        created_pages = []
-        
-        for idx, file in enumerate(files):
-            # Определяем номер страницы
-            page_number = book.pages_set.count() + idx + 1
-            
-            # Создаем страницу
-            page = BookPage.objects.create(
-                book=book,
-                page_number=page_number,
-                original_image=file,
-                processing_status='pending'
-            )
-            
-            created_pages.append(page)
-        
-        serializer = BookPageSerializer(
-            created_pages, 
-            many=True,
-            context={'request': request}
-        )
-        
-        return Response({
-            'message': f'Загружено {len(created_pages)} страниц',
-            'pages': serializer.data
-        }, status=status.HTTP_201_CREATED)
-    
     @action(detail=True, methods=['post'])
     def process_pages(self, request, pk=None):
         """Обработка страниц книги"""
@@ -995,41 +827,15 @@ class BookViewSet(viewsets.ModelViewSet):
         errors = []
         
         for page in pages:
-            try:
-                page.processing_status = 'processing'
-                page.save()
-                
-                # Входной файл
-                input_path = page.original_image.path
-                
-                # Выходной файл
-                output_filename = f"processed_{page.id}_{os.path.basename(input_path)}"
-                output_dir = Path(settings.MEDIA_ROOT) / 'books' / 'pages' / 'processed'
-                output_dir.mkdir(parents=True, exist_ok=True)
-                output_path = output_dir / output_filename
-                
-                # Обрабатываем документ через сервис
-                width, height = process_document(input_path, output_path)
-                
-                # Сохраняем относительный путь
-                rel_path = str(output_path.relative_to(settings.MEDIA_ROOT))
-                page.processed_image = rel_path
-                page.width = width
-                page.height = height
-                page.processing_status = 'completed'
-                page.processed_at = timezone.now()
-                page.save()
-                
+            # Обрабатываем документ через сервис
+            error = BookService.process_page(page, process_document)
+            if error is None:
                 processed_count += 1
-                    
-            except Exception as e:
-                page.processing_status = 'failed'
-                page.error_message = str(e)
-                page.save()
+            else:
                 errors.append({
                     'page_id': page.id,
                     'page_number': page.page_number,
-                    'error': str(e)
+                    'error': error
                 })
         
         return Response({
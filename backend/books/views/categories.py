@@ -13,14 +13,17 @@ from ..serializers import CategorySerializer, CategoryTreeSerializer
 class CategoryViewSet(viewsets.ModelViewSet):
     """API для категорий"""
     from django.db.models import Count, Prefetch
-    from ..models import Book
+    # Подкатегории - с теми же аннотациями количества книг (без загрузки самих книг)
     queryset = Category.objects.prefetch_related(
-        'subcategories',
-        Prefetch('subcategories__books', queryset=Book.objects.all())
+        Prefetch('subcategories', queryset=Category.objects.annotate(
+            books_count_annotated=Count('books', distinct=True),
+            subcategories_books_count_annotated=Count('subcategories__books', distinct=True)
+        )),
+        'subcategories__subcategories'
     ).annotate(
         books_count_annotated=Count('books', distinct=True),
         subcategories_books_count_annotated=Count('subcategories__books', distinct=True)
-    )
+    ).order_by('order', 'name')
     serializer_class = CategorySerializer
     lookup_field = 'slug'
     permission_classes = [AllowAny]  # Категории доступны для чтения всем
@@ -163,11 +166,8 @@ class CategoryViewSet(viewsets.ModelViewSet):
     def subcategories(self, request, slug=None):
         """Возвращает подкатегории для данной категории"""
         category = self.get_object()
-        # Используем prefetch если доступен
-        if hasattr(category, '_prefetched_objects_cache') and 'subcategories' in category._prefetched_objects_cache:
-            subcategories = category.subcategories.all().order_by('name')
-        else:
-            subcategories = category.subcategories.all().order_by('name')
+        # Подкатегории из prefetch queryset (с аннотациями количества книг), сортировка в памяти
+        subcategories = sorted(category.subcategories.all(), key=lambda subcategory: subcategory.name)
         serializer = CategorySerializer(subcategories, many=True)
         return Response(serializer.data)
 
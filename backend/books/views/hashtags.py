@@ -5,10 +5,13 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from django.db.models import Count, Q
-from ..models import Hashtag, Book, Category
+from django.conf import settings
+from django.db.models import Q
+from ..models import Hashtag, Category
 from ..serializers import HashtagSerializer
 from ..services.hashtag_service import HashtagService
+from ..services.hashtag_counts import HashtagCountService
+from ..services.autocomplete import AutocompleteService
 
 
 class HashtagViewSet(viewsets.ReadOnlyModelViewSet):
@@ -37,15 +40,37 @@ class HashtagViewSet(viewsets.ReadOnlyModelViewSet):
         
         return queryset
     
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """
+        Автодополнение по началу слов названия хэштега (самые популярные по числу книг)
+        
+        Query params:
+            q - начало слов названия, # не обязателен (без учета регистра, ё = е)
+            limit - максимум результатов (по умолчанию и не более AUTOCOMPLETE_MAX_RESULTS)
+        """
+        try:
+            limit = int(request.query_params.get('limit') or 0) or None
+        except ValueError:
+            return Response({'error': 'limit должен быть числом'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(AutocompleteService.search('hashtags', request.query_params.get('q', ''), limit))
+    
     @action(detail=False, methods=['get'])
     def by_category(self, request):
         """
         Возвращает хэштеги с частотой упоминания для выбранной категории
+        (из таблицы частот HashtagCategoryCount, без подсчета по книгам)
         
         Query params:
             category_id - ID категории (если не указан, используются все категории)
             libraries - ID библиотек (можно передать несколько через запятую или массивом)
+            limit - максимум хэштегов, самые частые (по умолчанию HASHTAG_CLOUD_LIMIT)
         """
+        empty = {
+            'hashtags': [],
+            'max_count': 1,
+            'min_count': 1,
+        }
         category_id = request.query_params.get('category_id')
         
         # Получаем список библиотек из параметров запроса
@@ -56,83 +81,40 @@ class HashtagViewSet(viewsets.ReadOnlyModelViewSet):
             if libraries_str:
                 libraries_param = [lib.strip() for lib in libraries_str.split(',') if lib.strip()]
         
-        # Базовый queryset для книг
-        books_queryset = Book.objects.all()
+        # ВАЖНО: Если библиотеки НЕ указаны или не валидны, возвращаем пустой список
+        # (не показываем все хэштеги, если библиотеки не выбраны)
+        try:
+            library_ids = [int(lib_id) for lib_id in libraries_param if lib_id]
+        except (ValueError, TypeError):
+            return Response(empty)
+        if not library_ids:
+            return Response(empty)
         
-        # ВАЖНО: Фильтруем по библиотекам ТОЛЬКО если они указаны
-        # Если библиотеки не указаны, возвращаем пустой список (не все хэштеги!)
-        if libraries_param:
+        category_ids = None
+        if category_id:
             try:
-                library_ids = [int(lib_id) for lib_id in libraries_param if lib_id]
-                if library_ids:
-                    books_queryset = books_queryset.filter(library_id__in=library_ids)
-                else:
-                    # Если библиотеки указаны, но не валидны, возвращаем пустой список
-                    return Response({
-                        'hashtags': [],
-                        'max_count': 1,
-                        'min_count': 1,
-                    })
+                category_id = int(category_id)
             except (ValueError, TypeError):
-                # Если не удалось преобразовать в числа, возвращаем пустой список
-                return Response({
-                    'hashtags': [],
-                    'max_count': 1,
-                    'min_count': 1,
-                })
-        else:
-            # Если библиотеки НЕ указаны, возвращаем пустой список
-            # (не показываем все хэштеги, если библиотеки не выбраны)
-            return Response({
-                'hashtags': [],
-                'max_count': 1,
-                'min_count': 1,
-            })
+                return Response(empty)
+            # Категория и ее подкатегории
+            category_ids = list(
+                Category.objects.filter(Q(id=category_id) | Q(parent_category_id=category_id))
+                .values_list('id', flat=True)
+            )
+            if not category_ids:
+                return Response(empty)
         
-        if category_id:
+        limit = getattr(settings, 'HASHTAG_CLOUD_LIMIT', None)
+        if request.query_params.get('limit'):
             try:
-                # Используем утилиту для получения queryset категории
-                from ..utils import get_category_queryset
-                category_queryset = get_category_queryset(category_id, include_subcategories=True)
-                # Применяем фильтр категории к уже отфильтрованному по библиотекам queryset
-                books_queryset = books_queryset.filter(id__in=category_queryset.values_list('id', flat=True))
-            except Category.DoesNotExist:
+                limit = max(int(request.query_params['limit']), 1)
+            except ValueError:
                 return Response(
-                    {'error': 'Категория не найдена'},
-                    status=status.HTTP_404_NOT_FOUND
+                    {'error': 'limit должен быть числом'},
+                    status=status.HTTP_400_BAD_REQUEST
                 )
         
-        # Получаем хэштеги с подсчетом частоты для книг в категории и библиотеках
-        hashtags = Hashtag.objects.filter(
-            books__in=books_queryset
-        ).annotate(
-            count=Count('books', filter=Q(books__in=books_queryset))
-        ).distinct().order_by('-count', 'name')
-        
-        # Формируем ответ с частотой
-        result = []
-        max_count = 0
-        min_count = float('inf')
-        
-        for hashtag in hashtags:
-            count = hashtag.count
-            max_count = max(max_count, count)
-            min_count = min(min_count, count)
-            result.append({
-                'id': hashtag.id,
-                'name': hashtag.name,
-                'slug': hashtag.slug,
-                'count': count,
-            })
-        
-        # Добавляем информацию о диапазоне для расчета размера шрифта
-        response_data = {
-            'hashtags': result,
-            'max_count': max_count if max_count > 0 else 1,
-            'min_count': min_count if min_count != float('inf') else 1,
-        }
-        
-        return Response(response_data)
+        return Response(HashtagCountService.cached_cloud(library_ids, category_ids, limit))
     
     def create(self, request, *args, **kwargs):
         """Создать новый хэштег"""
@@ -5,16 +5,18 @@ from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from ..models import Library
-from ..serializers import LibrarySerializer, BookSerializer
+from django.db.models import OuterRef
+from ..models import Book, Library
+from ..serializers import LibrarySerializer
 from ..permissions import IsLibraryOwner
+from ..services.user_summary import count_subquery
 
 
 class LibraryViewSet(viewsets.ModelViewSet):
     """API для библиотек"""
-    from django.db.models import Count
+    # Количество книг - коррелированным подзапросом COUNT (без JOIN и GROUP BY по всем полям)
     queryset = Library.objects.select_related('owner').annotate(
-        books_count_annotated=Count('books', distinct=True)
+        books_count_annotated=count_subquery(Book.objects.filter(library_id=OuterRef('pk')))
     )
     serializer_class = LibrarySerializer
     permission_classes = [IsLibraryOwner]
@@ -56,11 +58,11 @@ class LibraryViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'])
     def books(self, request, pk=None):
-        """Получить книги в библиотеке"""
+        """
+        Книги в библиотеке: фильтры, пагинация (в том числе ?pagination=cursor)
+        и BookListSerializer - как у списка книг
+        """
         from .books import BookViewSet
         library = self.get_object()
-        # Используем оптимизированный queryset из BookViewSet
-        books_queryset = BookViewSet.queryset.filter(library=library)
-        serializer = BookSerializer(books_queryset, many=True, context={'request': request})
-        return Response(serializer.data)
+        return BookViewSet.list_for(request, library=library)
 
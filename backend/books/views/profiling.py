@@ -0,0 +1,36 @@
+"""
+ViewSet для сводки профилирования запросов (только администраторы)
+"""
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from ..services.admission import AdmissionController
+from ..services.bulk_jobs import BulkJobQueue
+from ..services.db_pool import PoolRegistry
+from ..services.profiling import ProfileStore, is_profiling_enabled
+
+
+class ProfilingViewSet(viewsets.ViewSet):
+    """API сводки ProfilingMiddleware по маршрутам"""
+    permission_classes = [IsAdminUser]
+    
+    def list(self, request):
+        """
+        Сводка по маршрутам: количество и время SQL-запросов, дублирующиеся запросы,
+        время view/рендеринга, размер ответа; метрики пулов соединений с БД,
+        слотов контроля допуска и массовые операции админки
+        """
+        return Response({
+            'enabled': is_profiling_enabled(),
+            'routes': ProfileStore.summary(),
+            'db_pools': PoolRegistry.stats(),
+            'admission': AdmissionController.stats(),
+            'bulk_jobs': BulkJobQueue.stats(),
+        })
+    
+    @action(detail=False, methods=['post'])
+    def reset(self, request):
+        """Очищает сводку"""
+        ProfileStore.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
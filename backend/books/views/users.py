@@ -5,20 +5,23 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.parsers import MultiPartParser, FormParser
 from ..models import UserProfile
+from ..parsers import FastJSONParser
 from ..serializers import UserProfileSerializer
+from ..services.reading_stats import ReadingStatsService
+from ..services.user_summary import UserSummaryService
 
 
 class UserProfileViewSet(viewsets.ModelViewSet):
     """API для профилей пользователей"""
-    queryset = UserProfile.objects.select_related('user').prefetch_related(
-        'user__libraries',
-        'user__owned_books'
-    )
+    # Количество книг и библиотек - подзапросами COUNT, без загрузки книг
+    queryset = UserProfile.objects.select_related('user').annotate(
+        **UserSummaryService.annotations('user_id')
+    ).order_by('id')
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]  # Профиль доступен только авторизованным
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    parser_classes = (MultiPartParser, FormParser, FastJSONParser)
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -33,10 +36,10 @@ class UserProfileViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get', 'put', 'patch'])
     def me(self, request):
         """Получить или обновить свой профиль"""
-        try:
-            profile = request.user.profile
-        except UserProfile.DoesNotExist:
-            profile = UserProfile.objects.create(user=request.user)
+        profile = self.get_queryset().filter(user=request.user).first()
+        if profile is None:
+            UserProfile.objects.get_or_create(user=request.user)
+            profile = self.get_queryset().get(user=request.user)
         
         if request.method == 'GET':
             serializer = self.get_serializer(profile, context={'request': request})
@@ -52,4 +55,24 @@ class UserProfileViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         serializer.save()
         return Response(serializer.data)
-
+    
+    @action(detail=False, methods=['get'], url_path='me/summary')
+    def my_summary(self, request):
+        """Сводка по своим книгам, библиотекам и отзывам (один запрос)"""
+        return Response(UserSummaryService.summary(request.user.id))
+    
+    @action(detail=False, methods=['get'], url_path='me/reading-stats')
+    def my_reading_stats(self, request):
+        """Статистика чтения своих книг: по годам, месяцам, категориям, авторам, серии и повторные прочтения"""
+        return Response(ReadingStatsService.stats(request.user.id))
+    
+    @action(detail=True, methods=['get'])
+    def summary(self, request, pk=None):
+        """
+        Сводка пользователя профиля:
+        количество книг всего и по статусам, библиотек и отзывов
+        """
+        user_id = self.get_queryset().filter(pk=pk).values_list('user_id', flat=True).first()
+        if user_id is None:
+            return Response({'error': 'Профиль не найден'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(UserSummaryService.summary(user_id))
@@ -0,0 +1,309 @@
+"""
+Асинхронные view мастера создания книги: нормализация страниц, автозаполнение, загрузка страниц
+
+Под ASGI (config.asgi) ожидание OpenCV и LLM не занимает поток сервера:
+нормализация и перекодирование выполняются в пуле процессов, запросы к
+LLM - асинхронным клиентом. Под WSGI view работают так же (Django выполняет
+их в отдельном event loop). Маршруты - в config/urls.py, перед роутером BookViewSet.
+"""
+from asgiref.sync import sync_to_async
+from rest_framework import generics, status
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..constants import MAX_AUTOFILL_BATCH_SIZE
+from ..models import Book, BookPage
+from ..parsers import FastJSONParser
+from ..permissions import IsOwnerOrReadOnly
+from ..serializers import BookPageSerializer
+from ..services.document_processor import anormalize_pages_batch
+from ..services.llm_service import aauto_fill_book_data, aauto_fill_books_batch
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView с асинхронными обработчиками (async def post/get).
+
+    Аутентификация, права, throttling и разбор тела запроса DRF синхронны
+    (обращаются к БД и читают поток) - они выполняются в потоке через
+    sync_to_async, обработчик - в event loop. Ошибки обрабатываются
+    и ответ рендерится как в APIView.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if hasattr(response, '__await__'):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    @staticmethod
+    async def get_data(request):
+        """Разобранное тело запроса (request.data) - разбор в потоке"""
+        return await sync_to_async(lambda: request.data)()
+
+
+class NormalizePagesView(AsyncAPIView):
+    """
+    Нормализация страниц для мастера создания книги
+    POST /api/books/normalize-pages/
+    Content-Type: multipart/form-data
+
+    Body:
+    - files: List[File] - загруженные изображения
+
+    Response:
+    {
+        "normalized_images": [
+            {
+                "id": "uuid",
+                "original_filename": "page1.jpg",
+                "normalized_url": "/media/temp/normalized/normalized_uuid.jpg",
+                "width": 1920,
+                "height": 2560
+            },
+            ...
+        ],
+        "total": 5,
+        "processed": 5
+    }
+    """
+    parser_classes = [MultiPartParser, FormParser]
+    permission_classes = [IsAuthenticated]
+
+    async def post(self, request):
+        await self.get_data(request)
+        files = request.FILES.getlist('files')
+
+        if not files:
+            return Response(
+                {'error': 'Файлы не найдены'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        normalized_images = await anormalize_pages_batch(files)
+
+        # Успешно обработанные и неудачные изображения
+        successful = [img for img in normalized_images if img.get('normalized_url')]
+        failed = [img for img in normalized_images if img.get('error')]
+
+        return Response({
+            'normalized_images': normalized_images,
+            'total': len(normalized_images),
+            'processed': len(successful),
+            'failed': len(failed),
+            'errors': [{'filename': img['original_filename'], 'error': img.get('error')}
+                       for img in failed] if failed else None
+        }, status=status.HTTP_200_OK)
+
+
+class AutoFillView(AsyncAPIView):
+    """
+    Автозаполнение данных книги через OpenAI GPT-4o
+    POST /api/books/auto-fill/
+    Content-Type: application/json
+
+    Body:
+    {
+        "normalized_image_urls": [
+            "/media/temp/normalized/normalized_uuid1.jpg",
+            ...
+        ],
+        "bypass_cache": false  # опционально: игнорировать кэш и заново запросить LLM
+    }
+
+    Response:
+    {
+        "success": true,
+        "data": {"title": "...", "category_id": 1, "authors": ["..."], ...},
+        "confidence": 0.85,
+        "error": null,
+        "cached": false,
+        "metrics": {"attempts": 1, "llm_ms": 950.0, ...}  # только при обращении к LLM
+    }
+    """
+    parser_classes = [FastJSONParser, MultiPartParser, FormParser]
+    permission_classes = [IsOwnerOrReadOnly]
+
+    async def post(self, request):
+        data = await self.get_data(request)
+        normalized_image_urls = data.get('normalized_image_urls', [])
+        bypass_cache = str(data.get('bypass_cache', '')).lower() in ('true', '1', 'yes')
+
+        if not normalized_image_urls:
+            return Response(
+                {'error': 'Необходимо указать normalized_image_urls'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if not isinstance(normalized_image_urls, list):
+            return Response(
+                {'error': 'normalized_image_urls должен быть массивом'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            result = await aauto_fill_book_data(normalized_image_urls, use_cache=not bypass_cache)
+        except ValueError as e:
+            # Ошибка конфигурации (нет API ключа)
+            return Response(
+                {'success': False, 'data': None, 'error': str(e), 'confidence': None},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        except Exception as e:
+            return Response(
+                {'success': False, 'data': None, 'error': f'Ошибка обработки: {str(e)}', 'confidence': None},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        if result['success']:
+            return Response(result, status=status.HTTP_200_OK)
+        # 200, но с success=false для фронтенда
+        return Response(
+            {
+                'success': False,
+                'data': None,
+                'error': result.get('error', 'Неизвестная ошибка'),
+                'confidence': None,
+                'metrics': result.get('metrics'),
+            },
+            status=status.HTTP_200_OK
+        )
+
+
+class AutoFillBatchView(AsyncAPIView):
+    """
+    Пакетное автозаполнение нескольких книг (конкурентно, с лимитом LLM_MAX_CONCURRENCY)
+    POST /api/books/auto-fill-batch/
+    Content-Type: application/json
+
+    Body:
+    {
+        "books": [
+            {"key": "book-1", "normalized_image_urls": ["/media/temp/normalized/...jpg", ...]},
+            ...
+        ],
+        "bypass_cache": false
+    }
+
+    Response:
+    {
+        "results": [
+            {"key": "book-1", "success": true, "data": {...}, "confidence": 0.85, "error": null, "cached": false},
+            ...
+        ],
+        "total": 2,
+        "succeeded": 1,
+        "failed": 1
+    }
+    """
+    parser_classes = [FastJSONParser, MultiPartParser, FormParser]
+    permission_classes = [IsAuthenticated]
+
+    async def post(self, request):
+        data = await self.get_data(request)
+        books = data.get('books', [])
+        bypass_cache = str(data.get('bypass_cache', '')).lower() in ('true', '1', 'yes')
+
+        if not books or not isinstance(books, list):
+            return Response(
+                {'error': 'Необходимо указать books (массив)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if len(books) > MAX_AUTOFILL_BATCH_SIZE:
+            return Response(
+                {'error': f'Не более {MAX_AUTOFILL_BATCH_SIZE} книг в одном запросе'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        keys = []
+        url_batches = []
+        for idx, item in enumerate(books):
+            urls = item.get('normalized_image_urls') if isinstance(item, dict) else None
+            if not urls or not isinstance(urls, list):
+                return Response(
+                    {'error': f'books[{idx}]: необходимо указать normalized_image_urls (массив)'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            keys.append(item.get('key', idx))
+            url_batches.append(urls)
+
+        try:
+            results = await aauto_fill_books_batch(url_batches, use_cache=not bypass_cache)
+        except ValueError as e:
+            # Ошибка конфигурации (нет API ключа)
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        succeeded = sum(1 for result in results if result.get('success'))
+        return Response({
+            'results': [{'key': key, **result} for key, result in zip(keys, results)],
+            'total': len(results),
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+        }, status=status.HTTP_200_OK)
+
+
+class UploadPagesView(AsyncAPIView, generics.GenericAPIView):
+    """
+    Загрузка страниц книги
+    POST /api/books/{id}/upload_pages/
+    Content-Type: multipart/form-data (pages: List[File])
+    """
+    queryset = Book.objects.all()
+    parser_classes = [MultiPartParser]
+    permission_classes = [IsOwnerOrReadOnly]
+    lookup_url_kwarg = 'pk'
+
+    async def post(self, request, pk=None):
+        book = await sync_to_async(self.get_object)()
+        await self.get_data(request)
+        files = request.FILES.getlist('pages')
+
+        if not files:
+            return Response(
+                {'error': 'Файлы не найдены'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Сохранение файлов в хранилище, записи страниц и сериализация - в потоке
+        pages = await sync_to_async(self.create_pages)(book, files)
+
+        return Response({
+            'message': f'Загружено {len(pages)} страниц',
+            'pages': pages
+        }, status=status.HTTP_201_CREATED)
+
+    def create_pages(self, book, files):
+        # Номера новых страниц - после уже загруженных
+        first_number = book.pages_set.count() + 1
+        created_pages = [
+            BookPage.objects.create(
+                book=book,
+                page_number=first_number + idx,
+                original_image=file,
+                processing_status='pending'
+            )
+            for idx, file in enumerate(files)
+        ]
+        return BookPageSerializer(created_pages, many=True, context={'request': self.request}).data
@@ -0,0 +1,16 @@
+"""
+ASGI точка входа
+
+Запуск: uvicorn config.asgi:application --workers 2
+Асинхронные view мастера создания книги (books.views.wizard) выполняются в
+event loop: нормализация страниц - в пуле процессов (CPU_POOL_WORKERS),
+запросы к LLM - асинхронным HTTP-клиентом. Остальные view синхронны и
+выполняются Django в потоках.
+"""
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+application = get_asgi_application()
@@ -0,0 +1,3 @@
+"""
+Бэкенд PostgreSQL с пулом соединений (ENGINE = 'config.postgresql_pool')
+"""
@@ -0,0 +1,88 @@
+"""
+PostgreSQL (psycopg2) с пулом соединений процесса (books.services.db_pool)
+
+Соединение берется из пула при первом запросе к БД и возвращается в пул
+вместо закрытия (конец HTTP-запроса при CONN_MAX_AGE = 0). Параметры пула -
+ключ POOL в настройках базы: MIN_SIZE, MAX_SIZE, TIMEOUT, MAX_IDLE.
+При CONN_HEALTH_CHECKS соединение, простоявшее в пуле дольше CHECK_IDLE
+секунд, перед выдачей проверяется запросом SELECT 1.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+from books.services.db_pool import ConnectionPool, PoolRegistry, PoolTimeout
+
+
+def reset_connection(connection) -> bool:
+    """Откат незавершенной транзакции перед возвратом в пул (False - соединение непригодно)"""
+    if connection.closed:
+        return False
+    status = connection.info.transaction_status
+    if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+        return False
+    if status != extensions.TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+    return True
+
+
+def check_connection(connection) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, settings_dict, *args, **kwargs):
+        super().__init__(settings_dict, *args, **kwargs)
+        if settings_dict.get('CONN_MAX_AGE'):
+            # Постоянное соединение потока держало бы место в пуле между запросами
+            raise ImproperlyConfigured(
+                f'База "{self.alias}": пул соединений требует CONN_MAX_AGE = 0'
+            )
+
+    @property
+    def pool(self) -> ConnectionPool:
+        return PoolRegistry.get(self.alias, self._create_pool)
+
+    def _create_pool(self) -> ConnectionPool:
+        options = self.settings_dict.get('POOL') or {}
+        params = self.get_connection_params()
+        return ConnectionPool(
+            lambda: base.DatabaseWrapper.get_new_connection(self, params),
+            min_size=int(options.get('MIN_SIZE', 0)),
+            max_size=int(options.get('MAX_SIZE', 10)),
+            timeout=float(options.get('TIMEOUT', 30)),
+            max_idle=float(options.get('MAX_IDLE', 600)),
+            check=check_connection if self.settings_dict.get('CONN_HEALTH_CHECKS') else None,
+            check_idle=float(options.get('CHECK_IDLE', 1)),
+            reset=reset_connection,
+            name=self.alias,
+        )
+
+    def get_new_connection(self, conn_params):
+        created = []
+
+        def connect():
+            created.append(super(DatabaseWrapper, self).get_new_connection(conn_params))
+            return created[0]
+
+        pool = self.pool
+        try:
+            connection = pool.acquire(connect=connect)
+        except PoolTimeout as error:
+            raise self.Database.OperationalError(str(error)) from error
+        if created and pool.min_size:
+            pool.fill()  # Первое подключение прогревает пул до MIN_SIZE
+        if not created:
+            # Уровень изоляции задается базовым классом при создании соединения
+            level = self.settings_dict['OPTIONS'].get('isolation_level')
+            self.isolation_level = (
+                base.IsolationLevel(level) if level is not None else base.IsolationLevel.READ_COMMITTED
+            )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.release(self.connection)
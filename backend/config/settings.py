@@ -35,8 +35,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'books.middleware.CompressionMiddleware',
+    'books.middleware.ReplicaRoutingMiddleware',
+    'books.middleware.ProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'books.middleware.AdmissionControlMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -73,9 +77,45 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD', 'postgres'),
         'HOST': os.environ.get('DB_HOST', 'localhost'),
         'PORT': os.environ.get('DB_PORT', '5432'),
+        # Постоянные соединения: секунды жизни соединения потока (0 - новое на каждый запрос, None - без ограничения)
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        # Проверка постоянного соединения перед повторным использованием (после обрыва - переподключение)
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', 'true').lower() in ('true', '1', 'yes'),
     }
 }
 
+# Пул соединений процесса (многопоточные и ASGI-развертывания): DB_POOL_MAX_SIZE > 0 включает
+# config.postgresql_pool, соединения возвращаются в пул в конце запроса вместо постоянных соединений потоков
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 0))
+if DB_POOL_MAX_SIZE > 0:
+    DATABASES['default'].update({
+        'ENGINE': 'config.postgresql_pool',
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 0)),
+            'MAX_SIZE': DB_POOL_MAX_SIZE,
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),  # секунды ожидания свободного соединения
+            'MAX_IDLE': float(os.environ.get('DB_POOL_MAX_IDLE', 600)),  # секунды простоя до закрытия
+        },
+    })
+
+# Реплики для чтения (GET/HEAD): DB_REPLICA_HOSTS="host1,host2:5433"
+# Алиасы replica1..N, остальные параметры - как у основной базы
+for _number, _host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    _host, _, _port = _host.strip().partition(':')
+    DATABASES[f'replica{_number}'] = {
+        **DATABASES['default'],
+        'HOST': _host,
+        'PORT': _port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['books.db_router.ReplicaRouter']
+# Сколько секунд после записи клиент читает из основной базы (read-your-writes)
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+# На сколько секунд реплика с ошибкой подключения исключается из чтения
+REPLICA_RETRY_SECONDS = int(os.environ.get('REPLICA_RETRY_SECONDS', 30))
+
 LANGUAGE_CODE = 'ru-ru'
 TIME_ZONE = 'Europe/Moscow'
 USE_I18N = True
@@ -97,6 +137,16 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 50,
+    # JSON через orjson (без установленного orjson - стандартный json, тот же результат)
+    'DEFAULT_RENDERER_CLASSES': (
+        'books.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'books.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 # JWT настройки
@@ -119,3 +169,92 @@ REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'] = (
     'config.authentication.OptionalJWTAuthentication',
 )
 
+
+# Автозаполнение книг через LLM
+OPENAI_MODEL = os.environ.get('OPENAI_MODEL', 'gpt-4o')
+OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL', 'https://api.openai.com/v1')
+
+# HTTP-клиент LLM: пул keep-alive соединений, таймауты, лимит параллельных запросов
+LLM_CONNECT_TIMEOUT = float(os.environ.get('LLM_CONNECT_TIMEOUT', 10))  # секунды
+LLM_READ_TIMEOUT = float(os.environ.get('LLM_READ_TIMEOUT', 60))  # секунды
+LLM_POOL_SIZE = int(os.environ.get('LLM_POOL_SIZE', 10))
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 4))
+LLM_RETRY_BACKOFF_BASE = float(os.environ.get('LLM_RETRY_BACKOFF_BASE', 1))  # секунды, пауза = база * 2^попытка
+
+# Пул процессов для CPU-работы асинхронных view (OpenCV, Pillow), 0 - выполнение в потоке
+CPU_POOL_WORKERS = int(os.environ.get('CPU_POOL_WORKERS', min(4, os.cpu_count() or 1)))
+
+# Контроль допуска к тяжелым эндпоинтам (AdmissionControlMiddleware): слоты параллельности
+# на пользователя и всего, лимит частоты на пользователя; лимиты действуют в каждом воркере
+ADMISSION_CONTROL_ENABLED = os.environ.get('ADMISSION_CONTROL_ENABLED', 'true').lower() in ('true', '1', 'yes')
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 5))  # секунды ожидания слота, затем 429
+ADMISSION_ENDPOINT_CLASSES = {  # Имя маршрута -> класс лимитов
+    'book-normalize-pages': 'pages',
+    'book-upload-pages': 'pages',
+    'book-process-pages': 'pages',
+    'book-auto-fill': 'llm',
+    'book-auto-fill-batch': 'llm',
+}
+ADMISSION_LIMITS = {
+    # OpenCV и запись файлов: ограничены пулом процессов
+    'pages': {
+        'global_slots': int(os.environ.get('ADMISSION_PAGES_GLOBAL_SLOTS', max(CPU_POOL_WORKERS, 1) * 2)),
+        'user_slots': int(os.environ.get('ADMISSION_PAGES_USER_SLOTS', 1)),
+        'rate_per_minute': int(os.environ.get('ADMISSION_PAGES_RATE', 20)),
+        'burst': 5,
+        'max_queue': 16,
+    },
+    # Запросы к LLM: ограничены LLM_MAX_CONCURRENCY и квотой API
+    'llm': {
+        'global_slots': int(os.environ.get('ADMISSION_LLM_GLOBAL_SLOTS', LLM_MAX_CONCURRENCY * 2)),
+        'user_slots': int(os.environ.get('ADMISSION_LLM_USER_SLOTS', 2)),
+        'rate_per_minute': int(os.environ.get('ADMISSION_LLM_RATE', 20)),
+        'burst': 5,
+        'max_queue': 32,
+    },
+}
+
+# Кэш ответов автозаполнения (ключ - хэши содержимого изображений + версия промпта + модель)
+LLM_AUTOFILL_CACHE_ENABLED = os.environ.get('LLM_AUTOFILL_CACHE_ENABLED', 'true').lower() in ('true', '1', 'yes')
+LLM_AUTOFILL_CACHE_TTL = int(os.environ.get('LLM_AUTOFILL_CACHE_TTL', 30 * 24 * 3600))  # секунды
+LLM_AUTOFILL_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_AUTOFILL_CACHE_MAX_ENTRIES', 5000))
+
+# Подготовка изображений перед отправкой в LLM
+LLM_IMAGE_MAX_DIMENSION = int(os.environ.get('LLM_IMAGE_MAX_DIMENSION', 2048))  # пиксели, 0 - без уменьшения
+LLM_IMAGE_JPEG_QUALITY = int(os.environ.get('LLM_IMAGE_JPEG_QUALITY', 85))
+LLM_IMAGE_GRAYSCALE = os.environ.get('LLM_IMAGE_GRAYSCALE', 'never')  # never / always / auto (только текстовые страницы)
+
+# Облако хэштегов (GET /api/hashtags/by_category/)
+HASHTAG_CLOUD_LIMIT = int(os.environ.get('HASHTAG_CLOUD_LIMIT', 200))  # Самых частых хэштегов в ответе, 0 - все
+HASHTAG_CLOUD_CACHE_TIMEOUT = int(os.environ.get('HASHTAG_CLOUD_CACHE_TIMEOUT', 0))  # секунды, 0 - без кэша ответов
+
+# Автодополнение авторов, издательств и хэштегов (GET /api/<справочник>/autocomplete/?q=)
+AUTOCOMPLETE_MAX_RESULTS = int(os.environ.get('AUTOCOMPLETE_MAX_RESULTS', 20))
+AUTOCOMPLETE_REFRESH_SECONDS = int(os.environ.get('AUTOCOMPLETE_REFRESH_SECONDS', 300))  # Обновление популярности
+AUTOCOMPLETE_BACKGROUND_REFRESH = True  # Устаревший индекс перестраивается в фоне, ответы - по предыдущему
+
+# Список книг: проекция .values() и пакетные запросы вместо BookListSerializer (books.services.book_list)
+BOOK_LIST_FAST_PATH = os.environ.get('BOOK_LIST_FAST_PATH', 'true').lower() in ('true', '1', 'yes')
+
+# Количество книг в списках: точно до BOOK_LIST_EXACT_COUNT_LIMIT, дальше - оценка PostgreSQL (count_is_estimate)
+BOOK_LIST_APPROXIMATE_COUNT = os.environ.get('BOOK_LIST_APPROXIMATE_COUNT', 'true').lower() in ('true', '1', 'yes')
+BOOK_LIST_EXACT_COUNT_LIMIT = int(os.environ.get('BOOK_LIST_EXACT_COUNT_LIMIT', 10000))
+
+# Админка больших таблиц: без фильтров - оценка количества строк PostgreSQL, иначе COUNT не дальше предела
+ADMIN_EXACT_COUNT_LIMIT = int(os.environ.get('ADMIN_EXACT_COUNT_LIMIT', 10000))
+
+# Массовые операции действий админки (books.services.bulk_jobs): в фоновом потоке процесса, пачками по id
+BULK_JOBS_BACKGROUND = os.environ.get('BULK_JOBS_BACKGROUND', 'true').lower() in ('true', '1', 'yes')
+BULK_JOB_BATCH_SIZE = int(os.environ.get('BULK_JOB_BATCH_SIZE', 1000))
+
+# Сжатие ответов (CompressionMiddleware): brotli для JSON при установленном пакете brotli, иначе gzip
+RESPONSE_COMPRESSION_ENABLED = os.environ.get('RESPONSE_COMPRESSION_ENABLED', 'true').lower() in ('true', '1', 'yes')
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESSION_MIN_BYTES', 1024))  # gzip - не меньше 200
+RESPONSE_COMPRESSION_BROTLI_QUALITY = int(os.environ.get('RESPONSE_COMPRESSION_BROTLI_QUALITY', 5))  # 0-11
+
+# Профилирование запросов (ProfilingMiddleware, сводка: GET /api/profiling/)
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', str(DEBUG)).lower() in ('true', '1', 'yes')
+PROFILING_STRICT = os.environ.get('PROFILING_STRICT', 'false').lower() in ('true', '1', 'yes')  # Исключение при превышении бюджета
+PROFILING_SERVER_TIMING = True  # Заголовок Server-Timing
+PROFILING_DEFAULT_QUERY_BUDGET = None  # Бюджет SQL-запросов по умолчанию (None - без ограничения)
+PROFILING_QUERY_BUDGETS = {}  # Бюджеты по имени маршрута, например {'book-list': 10}
@@ -22,7 +22,12 @@ from books.views import (
     UserProfileViewSet,
     LibraryViewSet,
     HashtagViewSet,
-    BookReviewViewSet
+    BookReviewViewSet,
+    ProfilingViewSet,
+    NormalizePagesView,
+    AutoFillView,
+    AutoFillBatchView,
+    UploadPagesView,
 )
 
 # API Router
@@ -38,6 +43,7 @@ router.register(r'user-profiles', UserProfileViewSet, basename='user-profile')
 router.register(r'libraries', LibraryViewSet, basename='library')
 router.register(r'hashtags', HashtagViewSet, basename='hashtag')
 router.register(r'book-reviews', BookReviewViewSet, basename='book-review')
+router.register(r'profiling', ProfilingViewSet, basename='profiling')
 
 urlpatterns = [
     # Django Admin
@@ -45,6 +51,17 @@ urlpatterns = [
     # JWT аутентификация (перед роутером для приоритета)
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    # Асинхронные действия мастера создания книги (перед роутером для приоритета)
+    path('api/books/normalize-pages/', NormalizePagesView.as_view(), name='book-normalize-pages'),
+    path('api/books/auto-fill/', AutoFillView.as_view(), name='book-auto-fill'),
+    path('api/books/auto-fill-batch/', AutoFillBatchView.as_view(), name='book-auto-fill-batch'),
+    path('api/books/<pk>/upload_pages/', UploadPagesView.as_view(), name='book-upload-pages'),
+    # Статистика чтения текущего пользователя (то же действие, что /api/user-profiles/me/reading-stats/)
+    path(
+        'api/users/me/reading-stats/',
+        UserProfileViewSet.as_view({'get': 'my_reading_stats'}),
+        name='user-reading-stats',
+    ),
     # API Router
     path('api/', include(router.urls)),
 ]
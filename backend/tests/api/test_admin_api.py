@@ -0,0 +1,128 @@
+"""
+Тесты админки больших таблиц: списки без запросов на строку, оценка количества, массовые действия
+"""
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+
+from books.models import Book, BookAuthor, BookHashtag, BookPage, Hashtag, Library
+
+
+@pytest.fixture
+def staff_client(db):
+    """Клиент с сессией суперпользователя (админка не использует JWT)"""
+    admin = get_user_model().objects.create_superuser(username='root', email='root@test.com', password='pass')
+    client = Client()
+    client.force_login(admin)
+    return client
+
+
+def create_books(count, owner, library, category, author):
+    start = Book.objects.count()
+    for i in range(start, start + count):
+        book = Book.objects.create(owner=owner, library=library, category=category, title=f'Книга {i}')
+        BookAuthor.objects.create(book=book, author=author, order=1)
+        BookPage.objects.create(book=book, page_number=1, original_image=f'books/pages/original/{i}.jpg')
+        tag = Hashtag.objects.create(name=f'#тег{i}', slug=f'tag-{i}')
+        BookHashtag.objects.create(book=book, hashtag=tag)
+
+
+@pytest.mark.django_db
+class TestAdminChangelists:
+    """Списки админки"""
+
+    URLS = [
+        '/admin/books/book/',
+        '/admin/books/bookpage/',
+        '/admin/books/bookauthor/',
+        '/admin/books/bookhashtag/',
+        '/admin/books/hashtag/',
+    ]
+
+    @pytest.mark.parametrize('url', URLS)
+    def test_queries_do_not_grow_with_rows(self, staff_client, user, library, category, author, url):
+        """Количество запросов не зависит от числа строк (list_select_related, без Book.__str__)"""
+        create_books(2, user, library, category, author)
+        with CaptureQueriesContext(connection) as few:
+            assert staff_client.get(url).status_code == 200
+
+        create_books(6, user, library, category, author)
+        with CaptureQueriesContext(connection) as many:
+            assert staff_client.get(url).status_code == 200
+
+        assert len(many) == len(few)
+
+    def test_estimated_count_without_filters(self, staff_client, book, monkeypatch):
+        """Без фильтров - оценка PostgreSQL, с фильтром - COUNT не дальше ADMIN_EXACT_COUNT_LIMIT"""
+        monkeypatch.setattr('books.admin.table_row_estimate', lambda model, using=None: 1234567)
+
+        response = staff_client.get('/admin/books/book/')
+        assert response.context['cl'].result_count == 1234567
+
+        response = staff_client.get(f'/admin/books/book/?category__id__exact={book.category_id}')
+        assert response.context['cl'].result_count == 1
+
+    def test_bounded_count(self, staff_client, user, library, category, author, settings):
+        """Количество ограничено пределом, полный COUNT для «Показать все» не выполняется"""
+        settings.ADMIN_EXACT_COUNT_LIMIT = 3
+        create_books(5, user, library, category, author)
+
+        response = staff_client.get('/admin/books/book/?q=Книга')
+
+        assert response.context['cl'].result_count == 3
+        assert response.context['cl'].full_result_count is None
+
+    def test_autocomplete(self, staff_client, book):
+        """Книга на формах страниц выбирается автодополнением"""
+        response = staff_client.get(
+            '/admin/autocomplete/',
+            {'app_label': 'books', 'model_name': 'bookpage', 'field_name': 'book', 'term': 'Тестовая'},
+        )
+
+        assert response.status_code == 200
+        assert [item['id'] for item in response.json()['results']] == [str(book.id)]
+
+
+@pytest.mark.django_db
+class TestAdminBulkActions:
+    """Массовые действия (BULK_JOBS_BACKGROUND = False в тестах - выполняются сразу)"""
+
+    def run_action(self, client, url, action, ids, **params):
+        return client.post(url, {'action': action, '_selected_action': ids, 'index': 0, **params}, follow=True)
+
+    def test_transfer(self, staff_client, book, user2):
+        library = Library.objects.create(owner=user2, name='Новая', address='Адрес')
+
+        response = self.run_action(
+            staff_client, '/admin/books/book/', 'transfer_books', [book.id], library_id=library.id, owner_id=user2.id
+        )
+
+        book.refresh_from_db()
+        assert (book.library_id, book.owner_id) == (library.id, user2.id)
+        assert 'Передача книг: обработано 1' in response.content.decode()
+
+    def test_transfer_validation(self, staff_client, book, library):
+        response = self.run_action(staff_client, '/admin/books/book/', 'transfer_books', [book.id], library_id=999999)
+
+        book.refresh_from_db()
+        assert book.library_id == library.id
+        assert 'Библиотека не найдена' in response.content.decode()
+
+    def test_add_and_remove_hashtags(self, staff_client, book):
+        self.run_action(staff_client, '/admin/books/book/', 'add_hashtags', [book.id], hashtags='#редкие, архив')
+        assert sorted(book.hashtags.values_list('name', flat=True)) == ['#архив', '#редкие']
+
+        self.run_action(staff_client, '/admin/books/book/', 'remove_hashtags', [book.id], hashtags='архив')
+        assert list(book.hashtags.values_list('name', flat=True)) == ['#редкие']
+
+    def test_reprocess_pages(self, staff_client, book, monkeypatch):
+        page = BookPage.objects.create(book=book, page_number=1, original_image='books/pages/original/1.jpg',
+                                       processing_status='failed')
+        monkeypatch.setattr('books.services.document_processor.process_document', lambda src, dst: (640, 480))
+
+        self.run_action(staff_client, '/admin/books/bookpage/', 'reprocess_pages', [page.id])
+
+        page.refresh_from_db()
+        assert (page.processing_status, page.width, page.height) == ('completed', 640, 480)
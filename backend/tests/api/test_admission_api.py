@@ -0,0 +1,115 @@
+"""
+API тесты для AdmissionControlMiddleware (контроль допуска к тяжелым эндпоинтам)
+"""
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from books.services.admission import AdmissionController
+
+
+@pytest.fixture
+def admission(settings):
+    """Включает контроль допуска без ожидания в очереди и сбрасывает слоты"""
+    settings.ADMISSION_CONTROL_ENABLED = True
+    settings.ADMISSION_QUEUE_TIMEOUT = 0
+    settings.ADMISSION_LIMITS = {
+        'llm': {'global_slots': 4, 'user_slots': 1, 'rate_per_minute': 60, 'burst': 2},
+        'pages': {'global_slots': 4, 'user_slots': 1, 'rate_per_minute': 0},
+    }
+    AdmissionController.reset()
+    yield settings
+    AdmissionController.reset()
+
+
+@pytest.fixture
+def jwt_client(user):
+    """Клиент с JWT: middleware определяет пользователя по токену, без него - по IP"""
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+@pytest.mark.django_db
+class TestAdmissionControl:
+    """Тесты лимитов частоты и слотов параллельности"""
+
+    def test_rate_limit_returns_429(self, authenticated_client, admission):
+        """Сверх burst запрос получает 429 с Retry-After"""
+        for _ in range(2):
+            response = authenticated_client.post('/api/books/auto-fill/', {}, format='json')
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        response = authenticated_client.post('/api/books/auto-fill/', {}, format='json')
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert response['Retry-After'] == '1'
+        assert 'detail' in response.json()
+
+    def test_busy_user_slot_returns_429(self, jwt_client, authenticated_client, user, book, admission):
+        """Пока у пользователя занят слот класса, второй запрос отклоняется; другой класс доступен"""
+        pages = AdmissionController.for_view('book-process-pages')
+        pages.acquire(f'user:{user.id}', timeout=0)
+
+        response = jwt_client.post(f'/api/books/{book.id}/process_pages/', {}, format='json')
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+        response = jwt_client.post('/api/books/auto-fill/', {}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        # Запрос без токена - другой ключ (IP), слот свободен
+        response = authenticated_client.post(f'/api/books/{book.id}/process_pages/', {}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+
+        pages.release(f'user:{user.id}')
+        response = jwt_client.post(f'/api/books/{book.id}/process_pages/', {}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_slot_released_after_response(self, authenticated_client, admission):
+        """Слот освобождается после ответа, в том числе с ошибкой"""
+        authenticated_client.post('/api/books/normalize-pages/', {}, format='multipart')
+
+        stats = AdmissionController.stats()['pages']
+        assert (stats['active'], stats['admitted']) == (0, 1)
+
+    def test_reads_and_other_routes_not_limited(self, authenticated_client, book, admission):
+        """GET и маршруты вне ADMISSION_ENDPOINT_CLASSES не ограничиваются"""
+        for _ in range(3):
+            assert authenticated_client.get(f'/api/books/{book.id}/').status_code == status.HTTP_200_OK
+        assert AdmissionController.stats() == {}
+
+    def test_disabled_by_setting(self, authenticated_client, admission):
+        """Без ADMISSION_CONTROL_ENABLED лимиты не действуют"""
+        admission.ADMISSION_CONTROL_ENABLED = False
+        for _ in range(3):
+            response = authenticated_client.post('/api/books/auto-fill/', {}, format='json')
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_metrics_in_profiling(self, authenticated_client, admin_client, admission):
+        """Занятость слотов - в GET /api/profiling/"""
+        authenticated_client.post('/api/books/auto-fill/', {}, format='json')
+
+        response = admin_client.get('/api/profiling/')
+
+        llm = response.data['admission']['llm']
+        assert llm['global_slots'] == 4
+        assert (llm['active'], llm['waiting'], llm['admitted']) == (0, 0, 1)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAdmissionControlAsgi:
+    """Асинхронная цепочка middleware (ASGI)"""
+
+    def test_rate_limit_returns_429(self, user, admission):
+        """Лимит частоты действует и под ASGI"""
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncClient
+
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+        post = async_to_sync(AsyncClient().post)
+        statuses = [
+            post('/api/books/auto-fill/', {}, content_type='application/json', headers=headers).status_code
+            for _ in range(3)
+        ]
+
+        assert statuses == [400, 400, 429]
@@ -72,5 +72,18 @@ class TestAuthorAPI:
         """Получение книг автора"""
         response = authenticated_client.get(f'/api/authors/{author.id}/books/')
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) >= 1
-
+        assert response.data['count'] == 1
+        assert response.data['results'][0]['authors'] == [{'id': author.id, 'full_name': author.full_name}]
+    
+    def test_autocomplete_authors(self, api_client, author):
+        """Автодополнение по началу слов ФИО"""
+        response = api_client.get('/api/authors/autocomplete/?q=тест ив')
+        assert response.status_code == status.HTTP_200_OK
+        assert [a['id'] for a in response.data] == [author.id]
+        assert response.data[0]['full_name'] == author.full_name
+        
+        response = api_client.get('/api/authors/autocomplete/?q=петров')
+        assert response.data == []
+        
+        response = api_client.get('/api/authors/autocomplete/?q=тест&limit=abc')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -198,20 +198,54 @@ class TestBookAPI:
         response = authenticated_client.get('/api/books/?price_min=500&price_max=1500')
         assert response.status_code == status.HTTP_200_OK
     
+    def test_cursor_pagination(self, api_client, user, library, category):
+        """?pagination=cursor: страницы по ссылкам next без COUNT, книги не повторяются"""
+        from books.models import Book
+        Book.objects.bulk_create([
+            Book(owner=user, library=library, category=category, title=f'Книга {i:02d}') for i in range(35)
+        ])
+        
+        response = api_client.get('/api/books/?pagination=cursor&ordering=title&page_size=20')
+        assert response.status_code == status.HTTP_200_OK
+        assert 'count' not in response.data
+        titles = [item['title'] for item in response.data['results']]
+        
+        response = api_client.get(response.data['next'])
+        titles += [item['title'] for item in response.data['results']]
+        assert response.data['next'] is None
+        assert titles == [f'Книга {i:02d}' for i in range(35)]
+    
+    def test_list_average_rating(self, api_client, book, user, user2):
+        """Средний рейтинг в списке - аннотацией, совпадает со свойством модели"""
+        from books.models import BookElectronic, BookReview
+        BookReview.objects.create(book=book, user=user, rating=5)
+        BookReview.objects.create(book=book, user=user2, rating=2)
+        BookElectronic.objects.create(book=book, format='pdf', url='https://example.com/1.pdf')
+        BookElectronic.objects.create(book=book, format='epub', url='https://example.com/1.epub')
+        
+        response = api_client.get('/api/books/')
+        item = response.data['results'][0]
+        assert item['average_rating'] == book.average_rating == 3.5
+        assert (item['reviews_count'], item['electronic_versions_count']) == (2, 2)
+    
     # Custom actions
-    def test_my_books(self, authenticated_client, user, book):
+    def test_my_books(self, authenticated_client, user, user2, book):
         """Получение своих книг"""
+        Book.objects.create(owner=user2, title='Чужая книга')
         response = authenticated_client.get('/api/books/my_books/')
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) >= 1
+        assert [item['id'] for item in response.data['results']] == [book.id]
+        assert response.data['count'] == 1
     
     def test_my_books_read(self, authenticated_client, user, book):
         """Получение прочитанных книг"""
         book.status = 'read'
         book.save()
+        Book.objects.create(owner=user, title='Непрочитанная')
         
         response = authenticated_client.get('/api/books/my-books/read/')
         assert response.status_code == status.HTTP_200_OK
+        assert [item['id'] for item in response.data['results']] == [book.id]
     
     def test_my_books_want_to_read(self, authenticated_client, user, book):
         """Получение книг 'Буду читать'"""
@@ -470,3 +504,280 @@ class TestBookAPI:
         response = client.patch(f'/api/books/{book.id}/', data)
         assert response.status_code == status.HTTP_403_FORBIDDEN
 
+    
+    def test_auto_fill_cache_stats_admin_only(self, authenticated_client):
+        """Статистика кэша автозаполнения недоступна обычному пользователю"""
+        response = authenticated_client.get('/api/books/auto-fill/cache-stats/')
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+    
+    def test_auto_fill_cache_stats(self, admin_client):
+        """Администратор получает счетчики кэша автозаполнения"""
+        response = admin_client.get('/api/books/auto-fill/cache-stats/')
+        assert response.status_code == status.HTTP_200_OK
+        assert 'hits' in response.data
+        assert 'misses' in response.data
+        assert 'entries' in response.data
+    
+    def test_auto_fill_batch_requires_auth(self, api_client):
+        """Пакетное автозаполнение требует авторизации"""
+        response = api_client.post('/api/books/auto-fill-batch/', {'books': []}, format='json')
+        assert response.status_code in [status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN]
+    
+    def test_auto_fill_batch_validation(self, authenticated_client):
+        """Пакет без normalized_image_urls отклоняется"""
+        response = authenticated_client.post(
+            '/api/books/auto-fill-batch/',
+            {'books': [{'key': 'a'}]},
+            format='json'
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_auto_fill_batch(self, authenticated_client, monkeypatch):
+        """Результаты пакета возвращаются с ключами в исходном порядке"""
+        async def fake_batch(url_batches, use_cache=True):
+            return [
+                {'success': True, 'data': {'title': urls[0]}, 'error': None, 'confidence': 1.0}
+                for urls in url_batches
+            ]
+        
+        monkeypatch.setattr('books.views.wizard.aauto_fill_books_batch', fake_batch)
+        
+        response = authenticated_client.post(
+            '/api/books/auto-fill-batch/',
+            {'books': [
+                {'key': 'first', 'normalized_image_urls': ['/media/a.jpg']},
+                {'key': 'second', 'normalized_image_urls': ['/media/b.jpg']},
+            ]},
+            format='json'
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['total'] == 2
+        assert response.data['succeeded'] == 2
+        assert [r['key'] for r in response.data['results']] == ['first', 'second']
+        assert response.data['results'][1]['data']['title'] == '/media/b.jpg'
+    
+    def test_upload_pages_not_owner(self, book, user2, sample_image):
+        """Загрузка страниц в чужую книгу запрещена"""
+        from rest_framework.test import APIClient
+        client = APIClient()
+        client.force_authenticate(user=user2)
+        
+        response = client.post(f'/api/books/{book.id}/upload_pages/', {'pages': [sample_image]}, format='multipart')
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert not book.pages_set.exists()
+    
+    def test_normalize_pages(self, authenticated_client, sample_image, monkeypatch):
+        """Нормализация страниц мастера возвращает URL и размеры"""
+        def fake_process(input_path, output_path):
+            with open(output_path, 'wb') as output:
+                output.write(b'normalized')
+            return 640, 480
+        
+        monkeypatch.setattr('books.services.document_processor.process_document', fake_process)
+        
+        response = authenticated_client.post(
+            '/api/books/normalize-pages/',
+            {'files': [sample_image]},
+            format='multipart'
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['processed'] == 1
+        image = response.data['normalized_images'][0]
+        assert image['original_filename'] == 'test_image.jpg'
+        assert image['normalized_url'].endswith('.jpg')
+        assert (image['width'], image['height']) == (640, 480)
+    
+    def test_normalize_pages_requires_files(self, authenticated_client):
+        """Без файлов нормализация отклоняется"""
+        response = authenticated_client.post('/api/books/normalize-pages/', {}, format='multipart')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_auto_fill_validation(self, authenticated_client):
+        """Автозаполнение без normalized_image_urls отклоняется"""
+        response = authenticated_client.post('/api/books/auto-fill/', {}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.fixture
+def varied_books(book, user, user2, library, category):
+    """Книги со всеми вариантами полей списка: без связей, с обложкой, со страницами, с 4 авторами"""
+    from books.models import Author, BookPage, BookReview
+    bare = Book.objects.create(title='Без связей', status='read', price_rub=Decimal('12.50'))
+    covered = Book.objects.create(owner=user2, library=library, category=category, title='С обложкой', year=1999)
+    cover = BookPage.objects.create(
+        book=covered, page_number=3,
+        original_image='books/pages/original/cover.jpg', processed_image='books/pages/processed/cover.jpg'
+    )
+    covered.cover_page = cover
+    covered.save()
+    paged = Book.objects.create(owner=user, title='Со страницами')
+    BookPage.objects.create(book=paged, page_number=2, original_image='books/pages/original/p2.jpg')
+    BookPage.objects.create(book=paged, page_number=1, original_image='books/pages/original/p1 ё.jpg')
+    
+    for order, name in enumerate(['Яковлев', 'Борисов', 'Алексеев', 'Васильев']):
+        BookAuthor.objects.create(book=paged, author=Author.objects.create(full_name=name), order=order)
+    for name in ['поэзия', 'архив']:
+        tag = Hashtag.objects.create(name=name, slug=f'tag-{name}', creator=user)
+        BookHashtag.objects.create(book=book, hashtag=tag)
+        BookHashtag.objects.create(book=covered, hashtag=tag)
+    BookReview.objects.create(book=book, user=user, rating=5)
+    BookReview.objects.create(book=book, user=user2, rating=4)
+    BookReview.objects.create(book=covered, user=user, rating=None, review_text='Без оценки')
+    return [book, bare, covered, paged]
+
+
+@pytest.mark.django_db
+class TestBookListFastPath:
+    """Проекция .values() (BOOK_LIST_FAST_PATH) отдает тот же ответ, что BookListSerializer"""
+    
+    def get_both(self, client, settings, url):
+        responses = []
+        for enabled in (False, True):
+            settings.BOOK_LIST_FAST_PATH = enabled
+            response = client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            responses.append(response)
+        return responses
+    
+    @pytest.mark.parametrize('url', [
+        '/api/books/',
+        '/api/books/?ordering=title',
+        '/api/books/?search=книга',
+        '/api/books/?hashtag=поэзия',
+    ])
+    def test_same_response(self, api_client, settings, varied_books, url):
+        """Ответ совпадает побайтно: поля, их порядок, пропуск полей без связей, обложки, авторы"""
+        model, fast = self.get_both(api_client, settings, url)
+        
+        assert fast.data['results']
+        assert fast.content == model.content
+    
+    def test_fields(self, api_client, settings, varied_books, monkeypatch):
+        """Значения полей, вычисляемых проекцией (BookListSerializer не вызывается)"""
+        from books.serializers import BookListSerializer
+        monkeypatch.setattr(BookListSerializer, 'to_representation', None)
+        settings.BOOK_LIST_FAST_PATH = True
+        response = api_client.get('/api/books/?ordering=title')
+        items = {item['title']: item for item in response.data['results']}
+        
+        bare = items['Без связей']
+        assert 'category_name' not in bare and 'owner_username' not in bare
+        assert (bare['library_name'], bare['language_name'], bare['price_rub']) == (None, None, '12.50')
+        assert items['С обложкой']['first_page_url'].endswith('/books/pages/processed/cover.jpg')
+        assert items['Со страницами']['first_page_url'].endswith('/books/pages/original/p1%20%D1%91.jpg')
+        assert [a['full_name'] for a in items['Со страницами']['authors']] == ['Алексеев', 'Борисов', 'Васильев']
+        assert [h['name'] for h in items['Тестовая книга']['hashtags']] == ['архив', 'поэзия']
+        assert items['Тестовая книга']['average_rating'] == 4.5
+        assert items['С обложкой']['average_rating'] is None
+    
+    def test_cursor_pagination(self, api_client, settings, varied_books):
+        """Курсорная пагинация по словарям: те же страницы и ссылки"""
+        url = '/api/books/?pagination=cursor&ordering=-updated_at&page_size=2'
+        model, fast = self.get_both(api_client, settings, url)
+        assert fast.content == model.content
+        
+        model, fast = self.get_both(api_client, settings, fast.data['next'])
+        assert fast.content == model.content
+        assert len(fast.data['results']) == 2
+    
+    def test_nested_lists(self, api_client, settings, varied_books, library, author):
+        """Книги библиотеки и автора (BookViewSet.list_for) - тоже через проекцию"""
+        for url in (f'/api/libraries/{library.id}/books/', f'/api/authors/{author.id}/books/'):
+            model, fast = self.get_both(api_client, settings, url)
+            assert fast.content == model.content
+    
+    def test_query_count(self, api_client, settings, varied_books, django_assert_max_num_queries):
+        """Столько же запросов, сколько с prefetch: COUNT, книги, авторы, хэштеги, первые страницы"""
+        settings.BOOK_LIST_FAST_PATH = True
+        with django_assert_max_num_queries(5):
+            api_client.get('/api/books/')
+
+
+@pytest.mark.django_db
+class TestBookListCount:
+    """Количество книг в списке: точно до BOOK_LIST_EXACT_COUNT_LIMIT, дальше - оценка"""
+    
+    @pytest.fixture
+    def many_books(self, user, library, category):
+        Book.objects.bulk_create([
+            Book(owner=user, library=library, category=category, title=f'Книга {i:02d}') for i in range(35)
+        ])
+    
+    def test_exact_below_limit(self, api_client, many_books):
+        response = api_client.get('/api/books/?search=Книга')
+        assert (response.data['count'], response.data['count_is_estimate']) == (35, False)
+        
+        response = api_client.get('/api/books/?search=Книга 01')
+        assert (response.data['count'], response.data['count_is_estimate']) == (1, False)
+    
+    def test_capped_count(self, api_client, settings, many_books):
+        """Больше предела - количество равно пределу, страницы листаются по заполненности"""
+        settings.BOOK_LIST_EXACT_COUNT_LIMIT = 31
+        response = api_client.get('/api/books/', {'search': 'Книга', 'ordering': 'title'})
+        assert (response.data['count'], response.data['count_is_estimate']) == (31, True)
+        assert response.data['paginated'] is True
+        
+        response = api_client.get(response.data['next'])
+        assert [item['title'] for item in response.data['results']] == [f'Книга {i}' for i in range(30, 35)]
+        assert response.data['next'] is None
+        # Страница за оценкой - пустая, а не 404
+        response = api_client.get('/api/books/', {'search': 'Книга', 'page': 5})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['results'] == []
+    
+    def test_estimate_beyond_limit(self, api_client, settings, many_books, monkeypatch):
+        """Без фильтров - pg_class.reltuples без COUNT, с фильтрами - оценка EXPLAIN"""
+        settings.BOOK_LIST_EXACT_COUNT_LIMIT = 31
+        monkeypatch.setattr('books.services.row_counts.table_row_estimate', lambda model, using=None: 2000000)
+        monkeypatch.setattr('books.services.row_counts.planner_estimate', lambda queryset: 900)
+        
+        response = api_client.get('/api/books/')
+        assert (response.data['count'], response.data['count_is_estimate']) == (2000000, True)
+        
+        response = api_client.get('/api/books/', {'search': 'Книга'})
+        assert (response.data['count'], response.data['count_is_estimate']) == (900, True)
+        assert 'page=2' in response.data['next']
+    
+    def test_exact_mode(self, api_client, settings, many_books):
+        settings.BOOK_LIST_APPROXIMATE_COUNT = False
+        settings.BOOK_LIST_EXACT_COUNT_LIMIT = 31
+        response = api_client.get('/api/books/?search=Книга')
+        assert (response.data['count'], response.data['count_is_estimate']) == (35, False)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBookAPIAsgi:
+    """
+    Асинхронные view мастера через ASGI-обработчик (полная цепочка middleware)
+    Тесты транзакционные: ASGI-обработчик выполняет синхронный код в отдельном потоке со своим соединением
+    """
+    
+    def test_auto_fill_batch_with_jwt(self, user, monkeypatch):
+        """JWT-аутентификация и ответ асинхронного view под ASGI"""
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncClient
+        from rest_framework_simplejwt.tokens import AccessToken
+        
+        async def fake_batch(url_batches, use_cache=True):
+            return [{'success': True, 'data': None, 'error': None, 'confidence': 1.0} for _ in url_batches]
+        
+        monkeypatch.setattr('books.views.wizard.aauto_fill_books_batch', fake_batch)
+        
+        response = async_to_sync(AsyncClient().post)(
+            '/api/books/auto-fill-batch/',
+            {'books': [{'key': 'a', 'normalized_image_urls': ['/media/a.jpg']}]},
+            content_type='application/json',
+            headers={'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['succeeded'] == 1
+    
+    def test_unauthenticated(self):
+        """Без токена асинхронный view отвечает 401"""
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncClient
+        
+        response = async_to_sync(AsyncClient().post)(
+            '/api/books/auto-fill-batch/', {'books': []}, content_type='application/json'
+        )
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -61,3 +61,67 @@ class TestCategoryAPI:
         response = authenticated_client.delete(f'/api/categories/{category.slug}/')
         assert response.status_code == status.HTTP_204_NO_CONTENT
 
+    
+    def test_list_query_count_independent_of_subcategories(self, api_client, user, library, category):
+        """Подкатегории и их количество книг - из prefetch, а не запросами на каждую категорию"""
+        from books.models import Book, Category
+        from books.services.profiling import QueryRecorder
+        
+        def list_categories():
+            with QueryRecorder() as recorder:
+                response = api_client.get('/api/categories/')
+            assert response.status_code == status.HTTP_200_OK
+            return recorder.count, response.data['results']
+        
+        def add_subcategory(i):
+            subcategory = Category.objects.create(
+                code=f'sub{i}', name=f'Подкатегория {3 - i}', slug=f'sub{i}', parent_category=category
+            )
+            Book.objects.create(owner=user, library=library, category=subcategory, title=f'Книга {i}')
+        
+        add_subcategory(0)
+        queries, _ = list_categories()
+        add_subcategory(1)
+        add_subcategory(2)
+        
+        count, results = list_categories()
+        assert count == queries
+        parent = next(item for item in results if item['id'] == category.id)
+        assert parent['books_count'] == 3
+        assert [sub['name'] for sub in parent['subcategories']] == [f'Подкатегория {i}' for i in (1, 2, 3)]
+        assert [sub['books_count'] for sub in parent['subcategories']] == [1, 1, 1]
+    
+    def test_tree_query_count_independent_of_categories(self, api_client, user, library, category):
+        """Дерево категорий: подкатегории из prefetch, запросов не больше при росте числа категорий"""
+        from books.models import Book, Category
+        from books.services.profiling import QueryRecorder
+        
+        def tree(url):
+            with QueryRecorder() as recorder:
+                response = api_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            return recorder.count, response.data
+        
+        def add_parent(i):
+            parent = Category.objects.create(code=f'parent{i}', name=f'Родитель {i}', slug=f'parent{i}')
+            for j in range(2):
+                subcategory = Category.objects.create(
+                    code=f'sub{i}_{j}', name=f'Подкатегория {i} {1 - j}', slug=f'sub{i}_{j}', parent_category=parent
+                )
+                Book.objects.create(owner=user, library=library, category=subcategory, title=f'Книга {i} {j}')
+            # Подкатегория без книг в дерево не попадает
+            Category.objects.create(code=f'empty{i}', name=f'Пустая {i}', slug=f'empty{i}', parent_category=parent)
+        
+        urls = (f'/api/categories/tree/?libraries={library.id}', '/api/categories/tree/all/')
+        add_parent(0)
+        queries = [tree(url)[0] for url in urls]
+        add_parent(1)
+        add_parent(2)
+        
+        for url, expected in zip(urls, queries):
+            count, data = tree(url)
+            assert count == expected
+            parent = next(item for item in data if item['code'] == 'parent2')
+            assert parent['books_count'] == 2
+            assert [sub['name'] for sub in parent['subcategories']] == ['Подкатегория 2 0', 'Подкатегория 2 1']
+            assert [sub['books_count'] for sub in parent['subcategories']] == [1, 1]
@@ -0,0 +1,89 @@
+"""
+API тесты для CompressionMiddleware (сжатие ответов gzip/brotli)
+"""
+import gzip
+import json
+import types
+import zlib
+
+import pytest
+from rest_framework import status
+
+from books import middleware
+
+
+@pytest.fixture
+def compression(settings):
+    settings.RESPONSE_COMPRESSION_ENABLED = True
+    settings.RESPONSE_COMPRESSION_MIN_BYTES = 1024
+    return settings
+
+
+@pytest.fixture
+def fake_brotli(monkeypatch):
+    """Замена пакета brotli (необязательная зависимость): zlib вместо brotli"""
+    calls = []
+
+    def compress(data, quality):
+        calls.append(quality)
+        return zlib.compress(data)
+
+    monkeypatch.setattr(middleware, 'brotli', types.SimpleNamespace(compress=compress))
+    return calls
+
+
+@pytest.fixture
+def categories(db):
+    """Список категорий больше порога сжатия"""
+    from books.models import Category
+    Category.objects.bulk_create([
+        Category(code=f'C{idx}', name=f'Категория с длинным названием {idx}', slug=f'category-{idx}')
+        for idx in range(40)
+    ])
+
+
+@pytest.mark.django_db
+class TestCompression:
+    """Тесты сжатия ответов"""
+
+    def test_gzip(self, api_client, categories, compression):
+        """Большой ответ сжимается gzip, если клиент его принимает"""
+        response = api_client.get('/api/categories/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response['Vary']
+        assert int(response['Content-Length']) == len(response.content)
+        data = json.loads(gzip.decompress(response.content))
+        assert len(data['results'] if isinstance(data, dict) else data) == 40
+
+    def test_small_response_not_compressed(self, api_client, categories, compression):
+        """Ответ меньше RESPONSE_COMPRESSION_MIN_BYTES не сжимается"""
+        compression.RESPONSE_COMPRESSION_MIN_BYTES = 10 ** 6
+        response = api_client.get('/api/categories/', HTTP_ACCEPT_ENCODING='gzip')
+        assert not response.has_header('Content-Encoding')
+
+    def test_without_accept_encoding(self, api_client, categories, compression):
+        """Без Accept-Encoding ответ не сжимается"""
+        response = api_client.get('/api/categories/')
+        assert not response.has_header('Content-Encoding')
+
+    def test_disabled_by_setting(self, api_client, categories, compression):
+        compression.RESPONSE_COMPRESSION_ENABLED = False
+        response = api_client.get('/api/categories/', HTTP_ACCEPT_ENCODING='gzip')
+        assert not response.has_header('Content-Encoding')
+
+    def test_brotli_for_json(self, api_client, categories, compression, fake_brotli):
+        """JSON сжимается brotli, если клиент принимает br и пакет установлен"""
+        compression.RESPONSE_COMPRESSION_BROTLI_QUALITY = 4
+        response = api_client.get('/api/categories/', HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+
+        assert response['Content-Encoding'] == 'br'
+        assert fake_brotli == [4]
+        assert json.loads(zlib.decompress(response.content))
+
+    def test_brotli_not_accepted_uses_gzip(self, api_client, categories, compression, fake_brotli):
+        response = api_client.get('/api/categories/', HTTP_ACCEPT_ENCODING='gzip')
+
+        assert response['Content-Encoding'] == 'gzip'
+        assert fake_brotli == []
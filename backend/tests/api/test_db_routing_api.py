@@ -0,0 +1,152 @@
+"""
+API тесты для маршрутизации чтения на реплики (ReplicaRoutingMiddleware, ReplicaRouter)
+
+Реплика - вторая in-memory база 'replica' без репликации: данные, созданные
+только в ней (или только в основной базе), показывают, откуда читал запрос.
+Тесты транзакционные: внутри транзакции теста чтение всегда шло бы в основную базу.
+"""
+import pytest
+from django.db import OperationalError, connections
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from books import db_router
+from books.models import Category
+from books.views.categories import CategoryViewSet
+
+
+@pytest.fixture
+def replicas(settings):
+    """Включает реплику 'replica' и сбрасывает состояние реплик"""
+    settings.DATABASE_REPLICAS = ['replica']
+    settings.REPLICA_PIN_SECONDS = 5
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    db_router.ReplicaHealth.reset()
+    yield settings
+    db_router.ReplicaHealth.reset()
+
+
+def category_names(response):
+    results = response.data['results'] if isinstance(response.data, dict) else response.data
+    return {item['name'] for item in results}
+
+
+@pytest.mark.django_db(databases=['default', 'replica'], transaction=True)
+class TestReplicaRouting:
+    """Тесты выбора базы для чтения и записи"""
+
+    def test_get_reads_from_replica(self, api_client, replicas):
+        """GET читает из реплики"""
+        Category.objects.using('replica').create(code='R', name='Только в реплике', slug='replica-only')
+        Category.objects.create(code='P', name='Только в основной', slug='primary-only')
+
+        response = api_client.get('/api/categories/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert category_names(response) == {'Только в реплике'}
+        assert db_router.PIN_COOKIE_NAME not in response.cookies
+
+    def test_without_replicas_reads_primary(self, api_client):
+        """Без DATABASE_REPLICAS маршрутизация не меняется"""
+        Category.objects.using('replica').create(code='R', name='Только в реплике', slug='replica-only')
+        Category.objects.create(code='P', name='Только в основной', slug='primary-only')
+
+        response = api_client.get('/api/categories/')
+
+        assert category_names(response) == {'Только в основной'}
+        assert db_router.PIN_COOKIE_NAME not in response.cookies
+
+    def test_write_goes_to_primary_and_pins_client(self, api_client, replicas):
+        """POST пишет в основную базу, следующий GET этого клиента читает из нее (cookie)"""
+        response = api_client.post('/api/categories/', {'code': 'N', 'name': 'Новая', 'slug': 'new'})
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Category.objects.using('default').filter(slug='new').exists()
+        assert not Category.objects.using('replica').filter(slug='new').exists()
+        assert response.cookies[db_router.PIN_COOKIE_NAME]['max-age'] == 5
+
+        # Клиент хранит cookie - чтение своей записи
+        assert category_names(api_client.get('/api/categories/')) == {'Новая'}
+        # Другой клиент по-прежнему читает из реплики
+        assert category_names(APIClient().get('/api/categories/')) == set()
+
+    def test_write_pins_jwt_user(self, user, replicas):
+        """Запись с JWT закрепляет пользователя за основной базой и без cookie"""
+        token = str(AccessToken.for_user(user))
+        writer = APIClient()
+        writer.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        writer.post('/api/categories/', {'code': 'N', 'name': 'Новая', 'slug': 'new'})
+
+        reader = APIClient()
+        reader.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        assert category_names(reader.get('/api/categories/')) == {'Новая'}
+
+    def test_pin_expires(self, api_client, replicas):
+        """Без cookie и ключа в кэше закрепление не действует"""
+        api_client.post('/api/categories/', {'code': 'N', 'name': 'Новая', 'slug': 'new'})
+        api_client.cookies.pop(db_router.PIN_COOKIE_NAME)
+
+        assert category_names(api_client.get('/api/categories/')) == set()
+
+    def test_unavailable_replica_falls_back_to_primary(self, api_client, replicas, monkeypatch):
+        """Реплика без подключения исключается, запрос читает из основной базы"""
+        Category.objects.create(code='P', name='Только в основной', slug='primary-only')
+
+        def fail():
+            raise OperationalError('replica is down')
+
+        monkeypatch.setattr(connections['replica'], 'ensure_connection', fail)
+
+        response = api_client.get('/api/categories/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert category_names(response) == {'Только в основной'}
+        assert not db_router.ReplicaHealth.is_available('replica')
+
+    def test_replica_error_during_view_retried_on_primary(self, api_client, replicas, monkeypatch):
+        """Ошибка реплики во время view - запрос повторяется на основной базе"""
+        Category.objects.create(code='P', name='Только в основной', slug='primary-only')
+        original_list = CategoryViewSet.list
+
+        def flaky_list(self, request, *args, **kwargs):
+            Category.objects.exists()  # Первое чтение выбирает реплику
+            if db_router.current_state().replica is not None:
+                raise OperationalError('connection lost')
+            return original_list(self, request, *args, **kwargs)
+
+        monkeypatch.setattr(CategoryViewSet, 'list', flaky_list)
+
+        response = api_client.get('/api/categories/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert category_names(response) == {'Только в основной'}
+        assert not db_router.ReplicaHealth.is_available('replica')
+
+    def test_asgi_read_and_pin(self, replicas):
+        """Под ASGI (асинхронная цепочка middleware) чтение идет с реплики, запись закрепляет клиента"""
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncClient
+
+        Category.objects.using('replica').create(code='R', name='Только в реплике', slug='replica-only')
+        client = AsyncClient()
+
+        response = async_to_sync(client.get)('/api/categories/')
+        response.data = response.json()
+        assert category_names(response) == {'Только в реплике'}
+
+        response = async_to_sync(client.post)('/api/categories/', {'code': 'N', 'name': 'Новая', 'slug': 'new'})
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.cookies[db_router.PIN_COOKIE_NAME]['max-age'] == 5
+
+    def test_atomic_block_reads_primary(self, replicas):
+        """Внутри транзакции основной базы чтение идет в нее"""
+        from django.db import transaction
+
+        router = db_router.ReplicaRouter()
+        with db_router.routing(use_replica=True):
+            assert router.db_for_read(Category) == 'replica'
+        with db_router.routing(use_replica=True), transaction.atomic():
+            assert router.db_for_read(Category) == 'default'
+        # Вне HTTP-запроса роутер не вмешивается
+        assert router.db_for_read(Category) is None
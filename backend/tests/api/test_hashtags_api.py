@@ -46,3 +46,50 @@ class TestHashtagAPI:
         response = authenticated_client.post('/api/hashtags/', data)
         assert response.status_code == status.HTTP_400_BAD_REQUEST
 
+    
+    def test_by_category_counts(self, api_client, user, book, library, category):
+        """Облако хэштегов: частоты по библиотеке, категории с подкатегориями и limit"""
+        from books.models import Book, Category
+        from books.services.hashtag_service import HashtagService
+        subcategory = Category.objects.create(
+            code='sub', name='Подкатегория', slug='sub', parent_category=category
+        )
+        other = Category.objects.create(code='other', name='Другая', slug='other')
+        HashtagService.add_hashtags_to_book(book, ['фантастика', 'приключения'], user)
+        for book_category in (subcategory, other):
+            extra = Book.objects.create(owner=user, library=library, category=book_category, title='Еще')
+            HashtagService.add_hashtags_to_book(extra, ['фантастика'], user)
+        
+        response = api_client.get(f'/api/hashtags/by_category/?libraries={library.id}')
+        assert response.status_code == status.HTTP_200_OK
+        assert [(h['name'], h['count']) for h in response.data['hashtags']] == [
+            ('#фантастика', 3), ('#приключения', 1)
+        ]
+        assert (response.data['max_count'], response.data['min_count']) == (3, 1)
+        
+        response = api_client.get(
+            f'/api/hashtags/by_category/?libraries={library.id}&category_id={category.id}&limit=1'
+        )
+        assert [(h['name'], h['count']) for h in response.data['hashtags']] == [('#фантастика', 2)]
+    
+    def test_by_category_without_libraries(self, api_client, user, book):
+        """Без библиотек - пустое облако"""
+        from books.services.hashtag_service import HashtagService
+        HashtagService.add_hashtags_to_book(book, ['фантастика'], user)
+        
+        for query in ('', '?libraries=abc', f'?libraries={book.library_id}&category_id=999999'):
+            response = api_client.get(f'/api/hashtags/by_category/{query}')
+            assert response.status_code == status.HTTP_200_OK
+            assert response.data['hashtags'] == []
+    
+    def test_autocomplete_hashtags(self, api_client, user, book):
+        """Автодополнение хэштегов: # в запросе не обязателен, популярные - выше"""
+        from books.models import Hashtag
+        from books.services.hashtag_service import HashtagService
+        Hashtag.objects.create(name='#фэнтези', slug='fentezi', creator=user)
+        HashtagService.add_hashtags_to_book(book, ['фантастика'], user)
+        
+        for query in ('ф', '#Ф'):
+            response = api_client.get('/api/hashtags/autocomplete/', {'q': query})
+            assert response.status_code == status.HTTP_200_OK
+            assert [h['name'] for h in response.data] == ['#фантастика', '#фэнтези']
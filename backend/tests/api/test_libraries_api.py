@@ -58,6 +58,28 @@ class TestLibraryAPI:
         """Получение книг библиотеки"""
         response = authenticated_client.get(f'/api/libraries/{library.id}/books/')
         assert response.status_code == status.HTTP_200_OK
+        assert [item['id'] for item in response.data['results']] == [book.id]
+    
+    def test_library_books_paginated_and_filtered(self, authenticated_client, user, library, category):
+        """Книги библиотеки - с пагинацией и фильтрами списка книг"""
+        from books.models import Book
+        Book.objects.bulk_create([
+            Book(owner=user, library=library, category=category, title=f'Книга {i}', status='read' if i < 5 else 'none')
+            for i in range(40)
+        ])
+        
+        response = authenticated_client.get(f'/api/libraries/{library.id}/books/')
+        assert response.data['count'] == 40
+        assert response.data['paginated'] is True
+        assert len(response.data['results']) == 30
+        assert 'first_page_url' in response.data['results'][0]
+        
+        response = authenticated_client.get(f'/api/libraries/{library.id}/books/?status=read')
+        assert response.data['count'] == 5
+        
+        response = authenticated_client.get(f'/api/libraries/{library.id}/books/?pagination=cursor&page_size=25')
+        assert len(response.data['results']) == 25
+        assert response.data['next'] is not None
     
     def test_filter_libraries_by_owner(self, authenticated_client, user, library):
         """Фильтрация библиотек по владельцу"""
@@ -69,4 +91,18 @@ class TestLibraryAPI:
         library_id = library.id
         response = authenticated_client.delete(f'/api/libraries/{library_id}/')
         assert response.status_code == status.HTTP_204_NO_CONTENT
-
+    
+    def test_books_count_without_per_library_queries(self, authenticated_client, user, library, category):
+        """books_count - аннотацией: число запросов my_libraries не зависит от числа библиотек"""
+        from books.models import Book, Library
+        from books.services.profiling import QueryRecorder
+        Book.objects.create(owner=user, library=library, category=category, title='Книга')
+        with QueryRecorder() as recorder:
+            authenticated_client.get('/api/libraries/my_libraries/')
+        queries = recorder.count
+        
+        Library.objects.create(owner=user, name='Вторая', address='Адрес')
+        with QueryRecorder() as recorder:
+            response = authenticated_client.get('/api/libraries/my_libraries/')
+        assert recorder.count == queries
+        assert sorted(item['books_count'] for item in response.data) == [0, 1]
@@ -0,0 +1,175 @@
+"""
+API тесты для ProfilingMiddleware и ProfilingViewSet
+"""
+import pytest
+from django.db import connection
+from rest_framework import status
+
+from books.exceptions import QueryBudgetExceeded
+from books.models import Category
+from books.services.profiling import ProfileStore, QueryRecorder, fingerprint_sql
+
+
+@pytest.fixture
+def profiling(settings):
+    """Включает профилирование и очищает сводку"""
+    settings.PROFILING_ENABLED = True
+    settings.PROFILING_STRICT = False
+    settings.PROFILING_QUERY_BUDGETS = {}
+    ProfileStore.reset()
+    yield settings
+    ProfileStore.reset()
+
+
+def route_summary(client, route):
+    response = client.get('/api/profiling/')
+    return next(item for item in response.data['routes'] if item['route'] == route)
+
+
+@pytest.mark.django_db
+class TestProfilingMiddleware:
+    """Тесты middleware профилирования"""
+    
+    def test_server_timing_header(self, api_client, category, profiling):
+        """Ответ содержит заголовок Server-Timing с количеством запросов"""
+        response = api_client.get('/api/categories/')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert 'db;dur=' in response['Server-Timing']
+        assert 'queries"' in response['Server-Timing']
+        assert 'serialize;dur=' in response['Server-Timing']
+        assert 'total;dur=' in response['Server-Timing']
+    
+    def test_async_view_under_asgi(self, user, profiling):
+        """Асинхронный view под ASGI профилируется вместе с SQL-запросами аутентификации"""
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncClient
+        from rest_framework_simplejwt.tokens import AccessToken
+        
+        response = async_to_sync(AsyncClient().post)(
+            '/api/books/auto-fill/', {}, content_type='application/json',
+            headers={'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+        )
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert '1 queries"' in response['Server-Timing']
+    
+    def test_disabled_by_setting(self, api_client, category, settings):
+        """Без PROFILING_ENABLED заголовок не добавляется"""
+        settings.PROFILING_ENABLED = False
+        response = api_client.get('/api/categories/')
+        assert 'Server-Timing' not in response
+    
+    def test_route_summary(self, api_client, admin_client, category, profiling):
+        """Сводка по маршруту содержит запросы, время и размер ответа"""
+        api_client.get('/api/categories/')
+        api_client.get('/api/categories/')
+        
+        summary = route_summary(admin_client, 'GET category-list')
+        assert summary['requests'] == 2
+        assert summary['queries_max'] >= 1
+        assert summary['response_bytes_max'] > 0
+        assert summary['total_ms_avg'] >= summary['db_ms_avg']
+        assert summary['total_ms_avg'] >= summary['view_ms_avg'] + summary['serialize_ms_avg']
+    
+    def test_duplicate_queries_reported(self, api_client, admin_client, profiling):
+        """Повторяющиеся запросы попадают в сводку с отпечатком"""
+        parent = Category.objects.create(code='p', name='Родитель', slug='p')
+        for idx in range(3):
+            Category.objects.create(code=f'c{idx}', name=f'Дочерняя {idx}', slug=f'c{idx}', parent_category=parent)
+        
+        with QueryRecorder() as recorder:
+            for category in Category.objects.filter(parent_category__isnull=False):
+                category.parent_category.name
+        
+        assert recorder.count == 4
+        assert list(recorder.duplicates().values()) == [3]
+    
+    def test_strict_mode_raises_over_budget(self, api_client, category, profiling):
+        """Строгий режим: превышение бюджета запросов вызывает исключение"""
+        profiling.PROFILING_STRICT = True
+        profiling.PROFILING_QUERY_BUDGETS = {'category-list': 0}
+        
+        with pytest.raises(QueryBudgetExceeded):
+            api_client.get('/api/categories/')
+    
+    def test_budget_exceeded_counted_without_strict(self, api_client, admin_client, category, profiling):
+        """Без строгого режима превышение бюджета только учитывается в сводке"""
+        profiling.PROFILING_QUERY_BUDGETS = {'category-list': 0}
+        response = api_client.get('/api/categories/')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert route_summary(admin_client, 'GET category-list')['budget_exceeded'] == 1
+
+
+@pytest.mark.django_db
+class TestProfilingAPI:
+    """Тесты эндпоинта сводки"""
+    
+    def test_requires_admin(self, authenticated_client, api_client):
+        """Сводка доступна только администраторам"""
+        assert api_client.get('/api/profiling/').status_code in (
+            status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN
+        )
+        assert authenticated_client.get('/api/profiling/').status_code == status.HTTP_403_FORBIDDEN
+    
+    def test_reset(self, api_client, admin_client, category, profiling):
+        """Сброс сводки"""
+        api_client.get('/api/categories/')
+        response = admin_client.post('/api/profiling/reset/')
+        
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        routes = [item['route'] for item in admin_client.get('/api/profiling/').data['routes']]
+        assert 'GET category-list' not in routes
+    
+    def test_db_pool_metrics(self, admin_client):
+        """Сводка содержит метрики пулов соединений"""
+        from books.services.db_pool import ConnectionPool, PoolRegistry
+        PoolRegistry.get('test-pool', lambda: ConnectionPool(object, max_size=4))
+        try:
+            pools = admin_client.get('/api/profiling/').data['db_pools']
+        finally:
+            PoolRegistry.close_all()
+        
+        assert pools['test-pool']['max_size'] == 4
+        assert pools['test-pool']['in_use'] == 0
+
+
+class TestSerializationTimer:
+    """Тесты учета времени сериализации"""
+    
+    def test_serializer_data_measured_once(self, category):
+        """serializer.data учитывается, вложенные блоки не суммируются"""
+        import time
+        from books.serializers import CategorySerializer
+        from books.services.profiling import serialization_timer, timed_serialization
+        
+        with serialization_timer() as total:
+            with timed_serialization():
+                time.sleep(0.02)
+                with timed_serialization():
+                    time.sleep(0.02)
+        assert 40 <= total[0] < 80
+        
+        with serialization_timer() as total:
+            CategorySerializer([category], many=True).data
+        assert total[0] > 0
+    
+    def test_not_measured_outside_request(self, category):
+        """Без накопителя обертка serializer.data ничего не учитывает"""
+        from books.serializers import CategorySerializer
+        from books.services.profiling import serialization_timer
+        
+        CategorySerializer(category).data
+        with serialization_timer() as total:
+            pass
+        assert total == [0.0]
+
+
+class TestFingerprint:
+    """Тесты отпечатков SQL"""
+    
+    def test_values_removed(self):
+        """Литералы и списки IN сворачиваются"""
+        assert fingerprint_sql("SELECT * FROM t WHERE id = 5 AND name = 'x'") == 'SELECT * FROM t WHERE id = ? AND name = ?'
+        assert fingerprint_sql('SELECT * FROM t WHERE id IN (%s, %s, %s)') == fingerprint_sql('SELECT * FROM t WHERE id IN (%s)')
@@ -54,4 +54,16 @@ class TestPublisherAPI:
         """Получение книг издательства"""
         response = authenticated_client.get(f'/api/publishers/{publisher.id}/books/')
         assert response.status_code == status.HTTP_200_OK
-
+        assert [item['id'] for item in response.data['results']] == [book.id]
+    
+    def test_autocomplete_publishers(self, api_client, publisher):
+        """Автодополнение по началу слов названия"""
+        from books.models import Publisher
+        Publisher.objects.create(name='Издательство Тест', city='Казань')
+        
+        response = api_client.get('/api/publishers/autocomplete/?q=ИЗД&limit=1')
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data) == 1
+        
+        response = api_client.get('/api/publishers/autocomplete/?q=тестов')
+        assert [(p['id'], p['city']) for p in response.data] == [(publisher.id, 'Москва')]
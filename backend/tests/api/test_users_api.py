@@ -50,4 +50,67 @@ class TestUserProfileAPI:
             status.HTTP_200_OK,
             status.HTTP_400_BAD_REQUEST
         ]
-
+    
+    def test_counts_and_summary(self, authenticated_client, user, user2, library, category):
+        """Счетчики профилей - аннотациями, число запросов не зависит от числа книг"""
+        from books.models import Book, BookReview, Library
+        from books.services.profiling import QueryRecorder
+        
+        def list_profiles():
+            with QueryRecorder() as recorder:
+                response = authenticated_client.get('/api/user-profiles/')
+            assert response.status_code == status.HTTP_200_OK
+            return recorder.count
+        
+        queries = list_profiles()
+        Library.objects.create(owner=user, name='Вторая', address='Адрес')
+        books = [
+            Book.objects.create(owner=user, library=library, category=category, title=f'Книга {i}', status=book_status)
+            for i, book_status in enumerate(['read', 'read', 'reading'])
+        ]
+        BookReview.objects.create(book=books[0], user=user, rating=5)
+        assert list_profiles() == queries
+        
+        response = authenticated_client.get('/api/user-profiles/me/')
+        assert (response.data['books_count'], response.data['libraries_count']) == (3, 2)
+        
+        with QueryRecorder() as recorder:
+            response = authenticated_client.get('/api/user-profiles/me/summary/')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['books_count'] == 3
+        assert response.data['books_by_status'] == {
+            'none': 0, 'reading': 1, 'read': 2, 'want_to_read': 0, 'want_to_reread': 0
+        }
+        assert (response.data['libraries_count'], response.data['reviews_count']) == (2, 1)
+        assert recorder.count == 1
+        
+        response = authenticated_client.get(f'/api/user-profiles/{user2.profile.id}/summary/')
+        assert (response.data['books_count'], response.data['libraries_count']) == (0, 0)
+        assert authenticated_client.get('/api/user-profiles/999999/summary/').status_code == status.HTTP_404_NOT_FOUND
+    
+    def test_reading_stats(self, authenticated_client, user, user2, book, author):
+        """Статистика чтения своих книг - по сводным таблицам, без чтения дат прочтения"""
+        from books.models import BookReadingDate
+        from books.services.profiling import QueryRecorder
+        for value in ('2024-01-10', '2024-02-10'):
+            response = authenticated_client.post(f'/api/books/{book.id}/reading_dates/', {'date': value})
+            assert response.status_code == status.HTTP_201_CREATED
+        
+        with QueryRecorder() as recorder:
+            response = authenticated_client.get('/api/users/me/reading-stats/')
+        assert response.status_code == status.HTTP_200_OK
+        assert (response.data['total_reads'], response.data['rereads']) == (2, 1)
+        assert response.data['by_author'] == [{'id': author.id, 'full_name': author.full_name, 'reads': 2}]
+        assert not any('books_bookreadingdate' in query['sql'] for query in recorder.queries)
+        
+        reading = BookReadingDate.objects.get(book=book, date='2024-02-10')
+        authenticated_client.delete(f'/api/books/{book.id}/reading_dates/{reading.id}/')
+        response = authenticated_client.get('/api/user-profiles/me/reading-stats/')
+        assert (response.data['total_reads'], response.data['rereads']) == (1, 0)
+        
+        authenticated_client.force_authenticate(user=user2)
+        assert authenticated_client.get('/api/users/me/reading-stats/').data['total_reads'] == 0
+    
+    def test_reading_stats_requires_auth(self, api_client):
+        response = api_client.get('/api/users/me/reading-stats/')
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
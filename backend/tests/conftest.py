@@ -12,6 +12,27 @@ from PIL import Image
 import io
 
 
+def pytest_addoption(parser):
+    parser.addoption(
+        '--run-performance', action='store_true', default=False,
+        help='Запускать тесты производительности (tests/performance, маркер performance)'
+    )
+    parser.addoption(
+        '--update-perf-baselines', action='store_true', default=False,
+        help='Перезаписать базовые отношения времени ответа (tests/performance/baselines.json)'
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Тесты производительности пропускаются без --run-performance"""
+    if config.getoption('--run-performance'):
+        return
+    skip_performance = pytest.mark.skip(reason='тест производительности (нужен --run-performance)')
+    for item in items:
+        if item.get_closest_marker('performance'):
+            item.add_marker(skip_performance)
+
+
 # Временная папка для медиа файлов в тестах
 @pytest.fixture(scope='session')
 def tmp_media_root():
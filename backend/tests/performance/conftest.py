@@ -0,0 +1,148 @@
+"""
+Фикстуры уровня производительности
+
+Набор данных (тысячи книг, авторов и хэштегов) создается один раз на пакет
+через TestDataFactory и удаляется после тестов пакета.
+Запуск: pytest tests/performance --run-performance
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from django.core.management import call_command
+from django.db.models import Count
+from rest_framework.test import APIClient
+
+from books.services.profiling import QueryRecorder
+from .endpoints import ENDPOINTS
+
+# test_data_factory лежит в корне репозитория
+REPO_ROOT = Path(__file__).resolve().parents[3]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+# Размер набора данных (переменные окружения)
+BOOKS_PER_CATEGORY = int(os.environ.get('PERF_BOOKS_PER_CATEGORY', 5))
+GROWTH_BOOKS_PER_CATEGORY = int(os.environ.get('PERF_GROWTH_BOOKS_PER_CATEGORY', 5))
+EXTRA_AUTHORS = int(os.environ.get('PERF_AUTHORS', 2000))
+HASHTAGS = int(os.environ.get('PERF_HASHTAGS', 2000))
+# Сколько новых книг привязывается к измеряемым автору, издательству и хэштегу
+LINKED_BOOKS = int(os.environ.get('PERF_LINKED_BOOKS', 50))
+
+BASELINES_PATH = Path(__file__).parent / 'baselines.json'
+
+
+class PerfDataset:
+    """Набор данных и объекты, по которым строятся URL эндпоинтов"""
+
+    def __init__(self, factory):
+        from books.models import Author, Book, BookReview, Category, Hashtag, Publisher
+
+        self.factory = factory
+        self.user = factory.user
+        self.library = factory.library
+        self.libraries_query = '&'.join(f'libraries={library.id}' for library in factory.all_libraries)
+        self.book = Book.objects.filter(owner=self.user).order_by('id').first()
+        self.category = (
+            Category.objects.filter(parent_category__isnull=True)
+            .annotate(subcategories_count=Count('subcategories'))
+            .order_by('-subcategories_count', 'id')
+            .first()
+        )
+        self.author = Author.objects.filter(books__isnull=False).order_by('id').first()
+        self.publisher = Publisher.objects.filter(books__isnull=False).order_by('id').first()
+        self.hashtag = Hashtag.objects.filter(creator=self.user, books__isnull=False).order_by('id').first()
+        self.review = BookReview.objects.order_by('id').first()
+        self.profile = self.user.profile
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.query_counts = {}
+
+    def grow(self) -> None:
+        """Добавляет книги во все категории и библиотеки и к измеряемым объектам"""
+        from books.models import Book, BookAuthor, BookHashtag, BookReview
+
+        last_id = Book.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        self.factory.generate_books_for_all_categories(
+            books_per_category=GROWTH_BOOKS_PER_CATEGORY, with_media=False
+        )
+        new_ids = list(
+            Book.objects.filter(id__gt=last_id, owner=self.user).order_by('id').values_list('id', flat=True)
+        )[:LINKED_BOOKS]
+
+        Book.objects.filter(id__in=new_ids).update(publisher=self.publisher)
+        BookAuthor.objects.bulk_create(
+            [BookAuthor(book_id=book_id, author=self.author, order=9) for book_id in new_ids],
+            ignore_conflicts=True
+        )
+        BookHashtag.objects.bulk_create(
+            [BookHashtag(book_id=book_id, hashtag=self.hashtag) for book_id in new_ids],
+            ignore_conflicts=True
+        )
+        BookReview.objects.bulk_create(
+            [BookReview(book_id=book_id, user=self.user, rating=5) for book_id in new_ids],
+            ignore_conflicts=True
+        )
+
+    def get(self, url: str):
+        response = self.client.get(url)
+        assert response.status_code == 200, f'{url}: {response.status_code}'
+        return response
+
+    def count_queries(self, url: str) -> int:
+        self.get(url)  # прогрев (кэши ContentType, ленивые импорты)
+        with QueryRecorder() as recorder:
+            self.get(url)
+        return recorder.count
+
+    def wall_time_ms(self, url: str, repeat: int) -> float:
+        """
+        Минимальное время ответа по repeat запросам: минимум меньше медианы
+        зависит от фоновой нагрузки машины
+        """
+        self.get(url)
+        durations = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            self.get(url)
+            durations.append((time.perf_counter() - started) * 1000)
+        return min(durations)
+
+
+def seed_factory():
+    from test_data_factory.factory import TestDataFactory
+
+    call_command('sync_categories', stdout=io.StringIO())
+    factory = TestDataFactory()
+    factory.ensure_user_and_library()
+    factory.create_multiple_users_and_libraries(num_users=4, libraries_per_user=2)
+    factory.load_data()
+    factory.ensure_authors_and_publishers_in_db()
+    factory.generate_authors(EXTRA_AUTHORS)
+    factory.generate_hashtags(HASHTAGS)
+    factory.generate_books_for_all_categories(books_per_category=BOOKS_PER_CATEGORY, with_media=False)
+    return factory
+
+
+@pytest.fixture(scope='package')
+def perf_dataset(django_db_setup, django_db_blocker):
+    """
+    Набор данных пакета. Количество запросов каждого эндпоинта измеряется
+    до и после роста данных: perf_dataset.query_counts[name] = (до, после)
+    """
+    with django_db_blocker.unblock():
+        with contextlib.redirect_stdout(io.StringIO()):
+            dataset = PerfDataset(seed_factory())
+            before = {endpoint.name: dataset.count_queries(endpoint.url(dataset)) for endpoint in ENDPOINTS}
+            dataset.grow()
+        for endpoint in ENDPOINTS:
+            dataset.query_counts[endpoint.name] = (before[endpoint.name], dataset.count_queries(endpoint.url(dataset)))
+
+        yield dataset
+
+        call_command('flush', interactive=False, verbosity=0)
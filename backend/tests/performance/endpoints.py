@@ -0,0 +1,68 @@
+"""
+Эндпоинты уровня производительности и их бюджеты SQL-запросов
+
+Бюджет - точное количество запросов на большом наборе данных. Количество
+не должно зависеть от числа строк: оно сравнивается до и после роста данных.
+scales=True - известный N+1 (тест помечен xfail(strict=True): после исправления
+нужно обновить бюджет и снять отметку)
+"""
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    name: str
+    url: Callable[['PerfDataset'], str]  # noqa: F821
+    budget: int
+    scales: bool = False
+    reason: Optional[str] = None
+
+
+ENDPOINTS = [
+    # Категории
+    Endpoint('categories-list', lambda d: '/api/categories/', 4),
+    Endpoint('categories-detail', lambda d: f'/api/categories/{d.category.slug}/', 3),
+    Endpoint('categories-tree', lambda d: f'/api/categories/tree/?{d.libraries_query}', 2),
+    Endpoint('categories-tree-all', lambda d: '/api/categories/tree/all/', 2),
+    Endpoint('categories-subcategories', lambda d: f'/api/categories/{d.category.slug}/subcategories/', 3),
+
+    # Авторы и издательства
+    Endpoint('authors-list', lambda d: '/api/authors/', 2),
+    Endpoint('authors-detail', lambda d: f'/api/authors/{d.author.id}/', 1),
+    Endpoint('authors-books', lambda d: f'/api/authors/{d.author.id}/books/', 6),
+    Endpoint('publishers-list', lambda d: '/api/publishers/', 2),
+    Endpoint('publishers-detail', lambda d: f'/api/publishers/{d.publisher.id}/', 1),
+    Endpoint('publishers-books', lambda d: f'/api/publishers/{d.publisher.id}/books/', 6),
+
+    # Книги
+    Endpoint('books-list', lambda d: '/api/books/', 5),
+    Endpoint('books-list-libraries', lambda d: f'/api/books/?{d.libraries_query}', 5),
+    Endpoint('books-detail', lambda d: f'/api/books/{d.book.id}/', 9),
+    Endpoint('books-stats', lambda d: f'/api/books/stats/?{d.libraries_query}', 8),
+    Endpoint('books-my-books', lambda d: '/api/books/my_books/', 5),
+    Endpoint('books-my-books-read', lambda d: '/api/books/my-books/read/', 5),
+
+    # Библиотеки
+    Endpoint('libraries-list', lambda d: '/api/libraries/', 2),
+    Endpoint('libraries-detail', lambda d: f'/api/libraries/{d.library.id}/', 1),
+    Endpoint('libraries-books', lambda d: f'/api/libraries/{d.library.id}/books/', 6),
+    Endpoint('libraries-my-libraries', lambda d: '/api/libraries/my_libraries/', 1),
+
+    # Хэштеги
+    Endpoint('hashtags-list', lambda d: '/api/hashtags/', 3),
+    Endpoint('hashtags-detail', lambda d: f'/api/hashtags/{d.hashtag.slug}/', 2),
+    Endpoint('hashtags-by-category', lambda d: f'/api/hashtags/by_category/?{d.libraries_query}', 1),
+    Endpoint(
+        'hashtags-by-category-filtered',
+        lambda d: f'/api/hashtags/by_category/?{d.libraries_query}&category_id={d.category.id}', 2
+    ),
+
+    # Пользователи и отзывы
+    Endpoint('user-profiles-list', lambda d: '/api/user-profiles/', 2),
+    Endpoint('user-profiles-me', lambda d: '/api/user-profiles/me/', 1),
+    Endpoint('user-profiles-detail', lambda d: f'/api/user-profiles/{d.profile.id}/', 1),
+    Endpoint('users-reading-stats', lambda d: '/api/users/me/reading-stats/', 2),
+    Endpoint('book-reviews-list', lambda d: '/api/book-reviews/', 2),
+    Endpoint('book-reviews-detail', lambda d: f'/api/book-reviews/{d.review.id}/', 1),
+]
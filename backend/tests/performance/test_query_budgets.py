@@ -0,0 +1,29 @@
+"""
+Количество SQL-запросов эндпоинтов на большом наборе данных
+"""
+import pytest
+from .endpoints import ENDPOINTS
+
+pytestmark = [pytest.mark.performance, pytest.mark.slow, pytest.mark.django_db]
+
+
+def _params():
+    for endpoint in ENDPOINTS:
+        marks = []
+        if endpoint.scales:
+            marks.append(pytest.mark.xfail(strict=True, reason=f'N+1: {endpoint.reason}'))
+        yield pytest.param(endpoint, id=endpoint.name, marks=marks)
+
+
+@pytest.mark.parametrize('endpoint', _params())
+def test_query_count_is_fixed(perf_dataset, endpoint):
+    """Количество запросов не зависит от числа строк и равно бюджету"""
+    before, after = perf_dataset.query_counts[endpoint.name]
+
+    assert before == after, (
+        f'{endpoint.name}: количество запросов растет с данными ({before} -> {after})'
+    )
+    assert after == endpoint.budget, (
+        f'{endpoint.name}: {after} SQL-запросов, бюджет {endpoint.budget} '
+        '(при уменьшении обновите бюджет в tests/performance/endpoints.py)'
+    )
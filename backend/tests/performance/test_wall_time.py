@@ -0,0 +1,80 @@
+"""
+Время ответа эндпоинтов относительно сохраненных базовых значений
+
+Абсолютное время зависит от машины, поэтому в tests/performance/baselines.json
+хранится отношение времени эндпоинта к времени опорного эндпоинта (REFERENCE_ENDPOINT),
+измеренного в том же тесте. Время - минимум по PERF_REPEAT запросам.
+Обновление: pytest tests/performance --run-performance --update-perf-baselines
+Допустимое замедление: PERF_REGRESSION_THRESHOLD (доля, по умолчанию 1.0 = +100%)
+плюс PERF_MIN_SLACK_MS (по умолчанию 20 мс) на шум быстрых эндпоинтов
+"""
+import json
+import os
+
+import pytest
+from .conftest import BASELINES_PATH
+from .endpoints import ENDPOINTS
+
+pytestmark = [pytest.mark.performance, pytest.mark.slow, pytest.mark.django_db]
+
+REGRESSION_THRESHOLD = float(os.environ.get('PERF_REGRESSION_THRESHOLD', 1.0))
+MIN_SLACK_MS = float(os.environ.get('PERF_MIN_SLACK_MS', 20))
+REPEAT = int(os.environ.get('PERF_REPEAT', 15))
+# Эндпоинт, относительно которого хранятся базовые значения
+REFERENCE_ENDPOINT = 'books-detail'
+
+
+@pytest.fixture(scope='module')
+def baselines(request, perf_dataset):
+    """Базовые отношения; при --update-perf-baselines новые значения записываются в файл"""
+    data = json.loads(BASELINES_PATH.read_text(encoding='utf-8')) if BASELINES_PATH.exists() else {}
+    updating = request.config.getoption('--update-perf-baselines')
+    recorded = data.get('ratios', {}) if data.get('reference') == REFERENCE_ENDPOINT else {}
+    measured = {}
+
+    yield recorded, measured, updating
+
+    if updating and measured:
+        from books.models import Author, Book, Hashtag
+        ratios = dict(recorded)
+        ratios.update({name: round(value, 3) for name, value in measured.items()})
+        BASELINES_PATH.write_text(json.dumps({
+            'reference': REFERENCE_ENDPOINT,
+            'ratios': dict(sorted(ratios.items())),
+            'dataset': {
+                'books': Book.objects.count(),
+                'authors': Author.objects.count(),
+                'hashtags': Hashtag.objects.count(),
+            },
+        }, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+
+
+@pytest.fixture
+def reference_ms(perf_dataset):
+    """Время опорного эндпоинта непосредственно перед измерением (учитывает текущую нагрузку машины)"""
+    reference = next(endpoint for endpoint in ENDPOINTS if endpoint.name == REFERENCE_ENDPOINT)
+    return perf_dataset.wall_time_ms(reference.url(perf_dataset), REPEAT)
+
+
+@pytest.mark.parametrize('endpoint', ENDPOINTS, ids=[endpoint.name for endpoint in ENDPOINTS])
+def test_wall_time_within_baseline(perf_dataset, baselines, reference_ms, endpoint):
+    recorded, measured, updating = baselines
+    elapsed_ms = perf_dataset.wall_time_ms(endpoint.url(perf_dataset), REPEAT)
+
+    if updating:
+        measured[endpoint.name] = elapsed_ms / reference_ms
+        return
+
+    baseline_ratio = recorded.get(endpoint.name)
+    # Эндпоинт без базового значения не должен молча пропускаться
+    assert baseline_ratio is not None, (
+        f'нет базового значения для {endpoint.name}: запустите с --update-perf-baselines '
+        'и закоммитьте baselines.json вместе с эндпоинтом'
+    )
+
+    limit_ms = baseline_ratio * reference_ms * (1 + REGRESSION_THRESHOLD) + MIN_SLACK_MS
+    assert elapsed_ms <= limit_ms, (
+        f'{endpoint.name}: {elapsed_ms:.1f} мс ({elapsed_ms / reference_ms:.2f} × {REFERENCE_ENDPOINT}), '
+        f'базовое отношение {baseline_ratio:.2f}, порог {limit_ms:.1f} мс '
+        f'({REFERENCE_ENDPOINT}: {reference_ms:.1f} мс)'
+    )
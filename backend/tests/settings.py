@@ -9,8 +9,15 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': ':memory:',
-    }
+    },
+    # Вторая база для тестов маршрутизации чтения на реплики (books.db_router)
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    },
 }
+# Реплики включаются в отдельных тестах
+DATABASE_REPLICAS = []
 
 # Отключаем миграции в тестах (используем только create_table)
 class DisableMigrations:
@@ -32,6 +39,18 @@ CACHES = {
     }
 }
 
+# Без пауз между повторными попытками запросов к LLM
+LLM_RETRY_BACKOFF_BASE = 0
+
+# CPU-работа асинхронных view - в потоке, без запуска дочерних процессов
+CPU_POOL_WORKERS = 0
+
+# Контроль допуска включается в своих тестах (состояние слотов общее для процесса)
+ADMISSION_CONTROL_ENABLED = False
+
+# Массовые операции админки выполняются сразу, без фонового потока
+BULK_JOBS_BACKGROUND = False
+
 # Ускоряем пароли в тестах
 PASSWORD_HASHERS = [
     'django.contrib.auth.hashers.MD5PasswordHasher',
@@ -52,3 +71,9 @@ CSRF_COOKIE_SECURE = False
 CELERY_TASK_ALWAYS_EAGER = True
 CELERY_TASK_EAGER_PROPAGATES = True
 
+
+# Профилирование запросов включается в отдельных тестах
+PROFILING_ENABLED = False
+
+# Индекс автодополнения перестраивается синхронно - результаты сразу видят изменения
+AUTOCOMPLETE_BACKGROUND_REFRESH = False
@@ -0,0 +1,531 @@
+"""
+Тесты для llm_service и кэша автозаполнения
+"""
+import io
+import json
+import threading
+import time
+import pytest
+from asgiref.sync import async_to_sync
+from datetime import timedelta
+from django.utils import timezone
+from PIL import Image
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from books.models import AutoFillCacheEntry, Category
+from books.services import llm_images, llm_service
+from books.services.autofill_cache import AutoFillCacheService
+from books.services.category_prompt import CategoryPromptService
+from books.services.llm_client import LLMClient, get_async_llm_client, get_llm_client
+from books.services.llm_stub import StubConfig, start_stub_server
+from books.services.llm_images import prepare_image, is_text_page, clear_encoded_images
+
+
+LLM_BOOK_DATA = {
+    'title': 'Мастер и Маргарита',
+    'subtitle': '',
+    'category_id': None,
+    'authors': ['Булгаков М.А.'],
+    'year': 1973,
+}
+
+
+class FakeResponse:
+    """Минимальная замена requests.Response для ответа OpenAI"""
+
+    def __init__(self, content, status_code=200):
+        self.status_code = status_code
+        self._payload = {'choices': [{'message': {'content': content}}]}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._payload
+
+
+@pytest.fixture
+def page_images(tmp_path):
+    """Две страницы книги на диске"""
+    paths = []
+    for idx, color in enumerate(['white', 'gray'], start=1):
+        path = tmp_path / f'page_{idx}.jpg'
+        Image.new('RGB', (60, 80), color=color).save(path)
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def openai_calls(monkeypatch):
+    """Подменяет HTTP-запрос к OpenAI и считает вызовы"""
+    calls = []
+
+    def fake_post(session, url, **kwargs):
+        calls.append(kwargs.get('data'))
+        return FakeResponse(json.dumps(LLM_BOOK_DATA, ensure_ascii=False))
+
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+    monkeypatch.setattr('requests.Session.post', fake_post)
+    AutoFillCacheService.reset_stats()
+    CategoryPromptService.invalidate()
+    clear_encoded_images()
+    return calls
+
+
+def image_bytes(size, color, fmt='JPEG'):
+    """Изображение в памяти"""
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color=color).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+class TestAutoFillCacheService:
+    """Тесты AutoFillCacheService"""
+
+    def test_build_key_ignores_image_order(self):
+        """Порядок изображений не влияет на ключ"""
+        key1 = AutoFillCacheService.build_key(['a', 'b'], '1', 'gpt-4o')
+        key2 = AutoFillCacheService.build_key(['b', 'a'], '1', 'gpt-4o')
+        assert key1 == key2
+
+    def test_build_key_depends_on_prompt_and_model(self):
+        """Версия промпта и модель входят в ключ"""
+        base = AutoFillCacheService.build_key(['a'], '1', 'gpt-4o')
+        assert base != AutoFillCacheService.build_key(['a'], '2', 'gpt-4o')
+        assert base != AutoFillCacheService.build_key(['a'], '1', 'gpt-4o-mini')
+
+    def test_get_and_set(self, db):
+        """Сохранение и чтение записи с подсчетом попаданий"""
+        AutoFillCacheService.reset_stats()
+        assert AutoFillCacheService.get('missing') is None
+
+        AutoFillCacheService.set('k1', {'success': True}, model='gpt-4o', prompt_version='1')
+        assert AutoFillCacheService.get('k1') == {'success': True}
+
+        stats = AutoFillCacheService.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['entries'] == 1
+        assert AutoFillCacheEntry.objects.get(key='k1').hits == 1
+
+    def test_expired_entry_is_miss(self, db, settings):
+        """Просроченная запись удаляется и считается промахом"""
+        settings.LLM_AUTOFILL_CACHE_TTL = 60
+        AutoFillCacheService.set('old', {'success': True}, model='gpt-4o', prompt_version='1')
+        AutoFillCacheEntry.objects.filter(key='old').update(
+            created_at=timezone.now() - timedelta(seconds=120)
+        )
+
+        assert AutoFillCacheService.get('old') is None
+        assert not AutoFillCacheEntry.objects.filter(key='old').exists()
+
+    def test_max_entries_evicts_oldest(self, db, settings):
+        """При превышении лимита удаляются самые старые записи"""
+        settings.LLM_AUTOFILL_CACHE_MAX_ENTRIES = 2
+        for idx in range(3):
+            AutoFillCacheService.set(f'k{idx}', {'n': idx}, model='gpt-4o', prompt_version='1')
+
+        keys = set(AutoFillCacheEntry.objects.values_list('key', flat=True))
+        assert keys == {'k1', 'k2'}
+
+
+class TestAutoFillBookData:
+    """Тесты auto_fill_book_data с кэшем"""
+
+    def test_repeat_call_served_from_cache(self, db, page_images, openai_calls):
+        """Повторное автозаполнение тех же изображений не обращается к LLM"""
+        first = llm_service.auto_fill_book_data(page_images)
+        second = llm_service.auto_fill_book_data(list(reversed(page_images)))
+
+        assert first['success'] is True
+        assert first['cached'] is False
+        assert second['cached'] is True
+        assert second['data'] == first['data']
+        assert len(openai_calls) == 1
+
+    def test_bypass_cache(self, db, page_images, openai_calls):
+        """use_cache=False всегда обращается к LLM"""
+        llm_service.auto_fill_book_data(page_images)
+        result = llm_service.auto_fill_book_data(page_images, use_cache=False)
+
+        assert result['cached'] is False
+        assert len(openai_calls) == 2
+
+    def test_cache_disabled(self, db, page_images, openai_calls, settings):
+        """Отключенный кэш ничего не сохраняет"""
+        settings.LLM_AUTOFILL_CACHE_ENABLED = False
+        llm_service.auto_fill_book_data(page_images)
+        llm_service.auto_fill_book_data(page_images)
+
+        assert len(openai_calls) == 2
+        assert AutoFillCacheEntry.objects.count() == 0
+
+    def test_failed_response_not_cached(self, db, page_images, monkeypatch):
+        """Неуспешный ответ LLM не кэшируется"""
+        monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+        monkeypatch.setattr(
+            'requests.Session.post',
+            lambda *args, **kwargs: FakeResponse(json.dumps({'title': None}))
+        )
+
+        result = llm_service.auto_fill_book_data(page_images)
+
+        assert result['success'] is False
+        assert AutoFillCacheEntry.objects.count() == 0
+
+
+class TestImagePreparation:
+    """Тесты подготовки изображений для LLM"""
+
+    def test_large_image_downscaled(self):
+        """Большое изображение вписывается в максимальный размер"""
+        prepared = prepare_image(image_bytes((3000, 1500), 'white', fmt='PNG'), max_dimension=1000)
+
+        with Image.open(io.BytesIO(prepared)) as img:
+            assert img.format == 'JPEG'
+            assert img.size == (1000, 500)
+
+    def test_small_jpeg_kept_when_recompression_does_not_help(self):
+        """Маленький JPEG не перекодируется, если это не уменьшает размер"""
+        buffer = io.BytesIO()
+        Image.effect_noise((100, 100), 64).convert('RGB').save(buffer, format='JPEG', quality=30)
+        original = buffer.getvalue()
+        assert prepare_image(original, max_dimension=1000, jpeg_quality=95) == original
+
+    def test_invalid_data_returned_as_is(self):
+        """Нечитаемые данные отправляются без изменений"""
+        assert prepare_image(b'not an image') == b'not an image'
+
+    def test_grayscale_auto_only_for_text_pages(self):
+        """В режиме auto в оттенки серого переводятся только бесцветные страницы"""
+        text_page = prepare_image(image_bytes((200, 200), (250, 250, 245)), grayscale='auto')
+        cover = prepare_image(image_bytes((200, 200), (200, 30, 30)), grayscale='auto')
+
+        with Image.open(io.BytesIO(text_page)) as img:
+            assert img.mode == 'L'
+        with Image.open(io.BytesIO(cover)) as img:
+            assert img.mode == 'RGB'
+
+    def test_is_text_page(self):
+        """Определение текстовой страницы по насыщенности"""
+        assert is_text_page(Image.new('RGB', (100, 100), color=(240, 240, 240)))
+        assert not is_text_page(Image.new('RGB', (100, 100), color=(20, 120, 220)))
+
+    def test_auto_fill_reports_payload_metrics(self, db, tmp_path, openai_calls, settings):
+        """Результат содержит размер запроса; изображение уменьшено до отправки"""
+        settings.LLM_IMAGE_MAX_DIMENSION = 200
+        path = tmp_path / 'scan.png'
+        Image.new('RGB', (2000, 2000), color=(180, 20, 20)).save(path)
+
+        result = llm_service.auto_fill_book_data([str(path)])
+
+        metrics = result['metrics']
+        assert metrics['images'] == 1
+        assert metrics['original_bytes'] == path.stat().st_size
+        assert metrics['payload_bytes'] == len(openai_calls[0])
+        assert metrics['encode_ms'] >= 0
+
+    def test_cached_result_has_no_metrics(self, db, page_images, openai_calls):
+        """Ответ из кэша не кодирует изображения"""
+        llm_service.auto_fill_book_data(page_images)
+        result = llm_service.auto_fill_book_data(page_images)
+
+        assert result['cached'] is True
+        assert 'metrics' not in result
+
+    def test_encoded_images_reused(self, db, page_images, openai_calls, monkeypatch):
+        """Повторный запрос без кэша ответов не кодирует изображения заново"""
+        calls = []
+        original_prepare = llm_images.prepare_image
+
+        def counting_prepare(*args, **kwargs):
+            calls.append(1)
+            return original_prepare(*args, **kwargs)
+
+        monkeypatch.setattr(llm_images, 'prepare_image', counting_prepare)
+        llm_service.auto_fill_book_data(page_images, use_cache=False)
+        llm_service.auto_fill_book_data(page_images, use_cache=False)
+
+        assert len(calls) == len(page_images)
+        assert openai_calls[0] == openai_calls[1]
+
+
+@pytest.fixture
+def category_tree(db):
+    """Родительская категория с подкатегорией"""
+    parent = Category.objects.create(code='psy', name='Психология', slug='psy', order=1)
+    child = Category.objects.create(
+        code='psy-kids', name='Детская психология', slug='psy-kids', order=2, parent_category=parent
+    )
+    return parent, child
+
+
+class TestCategoryPrompt:
+    """Тесты раздела категорий промпта"""
+
+    def test_section_format(self, category_tree):
+        """Компактный формат id|путь"""
+        parent, child = category_tree
+        section, _ = CategoryPromptService.get_section()
+
+        assert section.splitlines() == [
+            f'{parent.id}|Психология',
+            f'{child.id}|Психология → Детская психология',
+        ]
+
+    def test_section_memoized(self, category_tree):
+        """Повторное построение раздела не обращается к БД"""
+        CategoryPromptService.get_section()
+        with CaptureQueriesContext(connection) as ctx:
+            CategoryPromptService.get_section()
+        assert len(ctx.captured_queries) == 0
+
+    def test_single_query(self, category_tree):
+        """Раздел строится одним запросом (без N+1 по parent_category)"""
+        CategoryPromptService.invalidate()
+        with CaptureQueriesContext(connection) as ctx:
+            CategoryPromptService.get_section()
+        assert len(ctx.captured_queries) == 1
+
+    def test_invalidated_on_change(self, category_tree):
+        """Изменение категории меняет раздел и его версию"""
+        parent, _ = category_tree
+        _, version = CategoryPromptService.get_section()
+
+        parent.name = 'Психология и педагогика'
+        parent.save()
+        section, new_version = CategoryPromptService.get_section()
+
+        assert new_version != version
+        assert 'Психология и педагогика → Детская психология' in section
+
+        parent.delete()
+        assert CategoryPromptService.get_section()[0] == ''
+
+    def test_category_change_changes_cache_key(self, category_tree, page_images, openai_calls):
+        """После изменения категорий закэшированный ответ не используется"""
+        llm_service.auto_fill_book_data(page_images)
+        Category.objects.create(code='hist', name='История', slug='hist', order=3)
+        result = llm_service.auto_fill_book_data(page_images)
+
+        assert result['cached'] is False
+        assert len(openai_calls) == 2
+
+    def test_prompt_contains_section(self, category_tree):
+        """Промпт содержит раздел категорий"""
+        section, _ = CategoryPromptService.get_section()
+        assert section in llm_service.build_prompt(section)
+
+    def test_load_categories_json(self, category_tree):
+        """Прежний JSON-формат сохраняет пути категорий"""
+        names = [cat['name'] for cat in llm_service.load_categories_json()['categories']]
+        assert names == ['Психология', 'Психология → Детская психология']
+
+    def test_size_report(self, category_tree):
+        """Компактный формат меньше JSON с отступами"""
+        report = {row['variant']: row for row in CategoryPromptService.size_report()}
+
+        assert set(report) == {'json_indent', 'json_compact', 'lines'}
+        assert report['lines']['bytes'] < report['json_compact']['bytes'] < report['json_indent']['bytes']
+        assert report['lines']['tokens'] > 0
+
+
+class TestLLMClient:
+    """Тесты HTTP-клиента LLM"""
+
+    def test_shared_client_reused(self, settings):
+        """Клиент (и его пул соединений) переиспользуется между вызовами"""
+        settings.OPENAI_BASE_URL = 'http://127.0.0.1:9/v1'
+        assert get_llm_client() is get_llm_client()
+        assert get_llm_client().chat_completions_url == 'http://127.0.0.1:9/v1/chat/completions'
+
+    def test_client_rebuilt_on_settings_change(self, settings):
+        """Изменение настроек пересоздает клиент"""
+        settings.LLM_MAX_CONCURRENCY = 2
+        client = get_llm_client()
+        settings.LLM_MAX_CONCURRENCY = 3
+        assert get_llm_client() is not client
+        assert get_llm_client().max_concurrency == 3
+
+    def test_timeouts(self):
+        """Таймауты подключения и чтения передаются в requests"""
+        client = LLMClient(connect_timeout=2, read_timeout=30)
+        assert client.timeout == (2, 30)
+
+    def test_async_client_per_event_loop(self, settings):
+        """Асинхронный клиент общий в пределах event loop"""
+        settings.OPENAI_BASE_URL = 'http://127.0.0.1:9/v1'
+
+        async def two_clients():
+            return get_async_llm_client(), get_async_llm_client()
+
+        first, second = async_to_sync(two_clients)()
+        assert first is second
+        assert first.chat_completions_url == 'http://127.0.0.1:9/v1/chat/completions'
+
+    def test_async_client_closed_on_settings_change(self, settings):
+        """Замененный асинхронный клиент закрывает пул соединений на своем event loop"""
+        import asyncio
+        settings.OPENAI_BASE_URL = 'http://127.0.0.1:9/v1'
+
+        async def replace_client():
+            old = get_async_llm_client()
+            settings.OPENAI_BASE_URL = 'http://127.0.0.1:10/v1'
+            new = get_async_llm_client()
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            return old, new
+
+        old, new = async_to_sync(replace_client)()
+        assert new is not old
+        assert old.client.is_closed
+        assert not new.client.is_closed
+
+
+@pytest.fixture
+def llm_stub(settings, monkeypatch):
+    """Запускает локальную заглушку OpenAI и направляет на нее клиент"""
+    servers = []
+
+    def start(**config):
+        server = start_stub_server(config=StubConfig(latency=0, seed=1, **config))
+        servers.append(server)
+        settings.OPENAI_BASE_URL = server.base_url
+        settings.LLM_AUTOFILL_CACHE_ENABLED = False
+        monkeypatch.setenv('OPENAI_API_KEY', 'stub-key')
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class TestLLMStub:
+    """Тесты автозаполнения через локальную заглушку OpenAI"""
+
+    def test_success(self, db, page_images, llm_stub, category_tree):
+        """Успешный ответ заглушки с категорией из промпта"""
+        server = llm_stub()
+        result = llm_service.auto_fill_book_data(page_images)
+
+        assert result['success'] is True
+        assert result['data']['category_id'] in {category.id for category in category_tree}
+        assert result['metrics']['attempts'] == 1
+        assert server.stats() == {'requests': 1, 'ok': 1, 'errors': 0, 'malformed': 0}
+
+    def test_server_errors_retried(self, db, page_images, llm_stub):
+        """Ошибки 500 повторяются до max_retries"""
+        server = llm_stub(error_rate=1.0)
+        result = llm_service.auto_fill_book_data(page_images, max_retries=3)
+
+        assert result['success'] is False
+        assert result['metrics']['attempts'] == 3
+        assert server.stats()['errors'] == 3
+
+    def test_malformed_json(self, db, page_images, llm_stub):
+        """Некорректный JSON в ответе приводит к ошибке парсинга"""
+        llm_stub(malformed_rate=1.0)
+        result = llm_service.auto_fill_book_data(page_images, max_retries=2)
+
+        assert result['success'] is False
+        assert 'JSON' in result['error']
+        assert result['metrics']['attempts'] == 2
+
+    def test_async_success(self, db, page_images, llm_stub, category_tree):
+        """Асинхронное автозаполнение (httpx) дает тот же результат"""
+        server = llm_stub()
+        result = async_to_sync(llm_service.aauto_fill_book_data)(page_images)
+
+        assert result['success'] is True
+        assert result['data']['category_id'] in {category.id for category in category_tree}
+        assert result['metrics']['attempts'] == 1
+        assert server.stats()['ok'] == 1
+
+    def test_async_server_errors_retried(self, db, page_images, llm_stub):
+        """Асинхронный клиент повторяет ошибки 500 до max_retries"""
+        server = llm_stub(error_rate=1.0)
+        result = async_to_sync(llm_service.aauto_fill_book_data)(page_images, max_retries=2)
+
+        assert result['success'] is False
+        assert result['metrics']['attempts'] == 2
+        assert server.stats()['errors'] == 2
+
+    @pytest.mark.parametrize('config', [{'error_rate': 1.0}, {'malformed_rate': 1.0}])
+    def test_sync_and_async_failures_match(self, db, page_images, llm_stub, settings, config):
+        """Синхронный и асинхронный варианты используют общую логику попыток"""
+        settings.LLM_RETRY_BACKOFF_BASE = 0
+        llm_stub(**config)
+        sync_result = llm_service.auto_fill_book_data(page_images, max_retries=2)
+        async_result = async_to_sync(llm_service.aauto_fill_book_data)(page_images, max_retries=2)
+
+        assert sync_result['success'] is async_result['success'] is False
+        assert sync_result['metrics']['attempts'] == async_result['metrics']['attempts'] == 2
+        if 'error_rate' in config:
+            # Текст исключения содержит название библиотеки - сравниваем начало сообщения
+            assert sync_result['error'].split(':')[0] == async_result['error'].split(':')[0]
+        else:
+            assert sync_result['error'] == async_result['error']
+
+    def test_timeout_message_for_both_transports(self):
+        """Таймаут requests и httpx дает одно сообщение"""
+        import requests
+        from books.services.llm_client import httpx
+        if httpx is None:
+            pytest.skip('httpx не установлен')
+        for error in (requests.exceptions.ReadTimeout(), httpx.ReadTimeout('timeout')):
+            attempts = llm_service._BookDataAttempts(max_retries=1, metrics={})
+            attempts.start(0)
+            attempts.failed(error)
+            assert attempts.failure()['error'] == 'Таймаут запроса к OpenAI API'
+
+    def test_async_batch(self, db, page_images, llm_stub):
+        """Асинхронный пакет возвращает результаты в исходном порядке"""
+        llm_stub()
+        results = async_to_sync(llm_service.aauto_fill_books_batch)([page_images[:1], page_images[1:]])
+
+        assert [result['success'] for result in results] == [True, True]
+
+
+class TestAutoFillBooksBatch:
+    """Тесты параллельного автозаполнения"""
+
+    def test_batch_respects_concurrency_limit(self, transactional_db, tmp_path, monkeypatch, settings):
+        """Одновременно выполняется не больше LLM_MAX_CONCURRENCY запросов"""
+        settings.LLM_MAX_CONCURRENCY = 2
+        settings.LLM_AUTOFILL_CACHE_ENABLED = False
+        monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+
+        lock = threading.Lock()
+        state = {'in_flight': 0, 'max_in_flight': 0}
+
+        def slow_post(session, url, **kwargs):
+            with lock:
+                state['in_flight'] += 1
+                state['max_in_flight'] = max(state['max_in_flight'], state['in_flight'])
+            time.sleep(0.05)
+            with lock:
+                state['in_flight'] -= 1
+            return FakeResponse(json.dumps(LLM_BOOK_DATA, ensure_ascii=False))
+
+        monkeypatch.setattr('requests.Session.post', slow_post)
+
+        batches = []
+        for idx in range(5):
+            path = tmp_path / f'book_{idx}.jpg'
+            Image.new('RGB', (40, 40), color=(idx * 40, 0, 0)).save(path)
+            batches.append([str(path)])
+
+        results = llm_service.auto_fill_books_batch(batches)
+
+        assert len(results) == 5
+        assert all(result['success'] for result in results)
+        assert state['max_in_flight'] <= 2
+
+    def test_batch_requires_api_key(self, monkeypatch):
+        """Без API ключа пакет не запускается"""
+        monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+        with pytest.raises(ValueError):
+            llm_service.auto_fill_books_batch([['/tmp/missing.jpg']])
@@ -3,6 +3,7 @@
 """
 import pytest
 import json
+import os
 from pathlib import Path
 from io import StringIO
 from django.core.management import call_command
@@ -27,6 +28,135 @@ class TestSyncCategoriesCommand:
         except Exception as e:
             # Если файла нет или другая ошибка - пропускаем
             pytest.skip(f"Команда sync_categories не может быть выполнена: {e}")
+    
+    def test_sync_is_idempotent(self, db):
+        """Повторная синхронизация ничего не записывает"""
+        from books.services.profiling import QueryRecorder
+        call_command('sync_categories', stdout=StringIO())
+        total = Category.objects.count()
+        out = StringIO()
+        
+        with QueryRecorder() as recorder:
+            call_command('sync_categories', stdout=out)
+        
+        assert f'обновлено 0, без изменений {total}' in out.getvalue()
+        assert recorder.count <= 3
+    
+    def test_sync_updates_only_changed(self, db, monkeypatch):
+        """Изменившиеся категории обновляются, кэш раздела категорий сбрасывается"""
+        from books.services.category_prompt import CategoryPromptService
+        call_command('sync_categories', stdout=StringIO())
+        child = Category.objects.filter(parent_category__isnull=False).first()
+        original_name, original_parent = child.name, child.parent_category_id
+        Category.objects.filter(id=child.id).update(name='Изменено', parent_category=None)
+        invalidations = []
+        monkeypatch.setattr(CategoryPromptService, 'invalidate', classmethod(lambda cls: invalidations.append(1)))
+        out = StringIO()
+        
+        call_command('sync_categories', stdout=out)
+        
+        child.refresh_from_db()
+        assert (child.name, child.parent_category_id) == (original_name, original_parent)
+        assert 'обновлено 1,' in out.getvalue()
+        assert invalidations
+    
+    def test_missing_archive_and_delete(self, db):
+        """Категории, отсутствующие в JSON: архивация и удаление"""
+        call_command('sync_categories', stdout=StringIO())
+        extra = Category.objects.create(code='extra', name='Лишняя', slug='extra')
+        extra_child = Category.objects.create(code='extra-child', name='Лишняя дочерняя', slug='extra-child',
+                                              parent_category=extra)
+        
+        call_command('sync_categories', '--missing', 'keep', stdout=StringIO())
+        extra.refresh_from_db()
+        assert extra.parent_category is None
+        
+        call_command('sync_categories', '--missing', 'archive', stdout=StringIO())
+        extra.refresh_from_db()
+        extra_child.refresh_from_db()
+        assert extra.parent_category.code == 'archive'
+        assert extra_child.parent_category_id == extra.id
+        
+        call_command('sync_categories', '--missing', 'delete', '--dry-run', stdout=StringIO())
+        assert Category.objects.filter(code='extra').exists()
+        
+        call_command('sync_categories', '--missing', 'delete', stdout=StringIO())
+        assert not Category.objects.filter(code__in=['extra', 'extra-child']).exists()
+
+
+class TestCategoryPromptReportCommand:
+    """Тесты команды category_prompt_report"""
+    
+    def test_report_json(self, db, category):
+        """Отчет о размере раздела категорий в формате JSON"""
+        out = StringIO()
+        call_command('category_prompt_report', '--json', stdout=out)
+        report = json.loads(out.getvalue())
+        
+        assert [row['variant'] for row in report['variants']] == ['json_indent', 'json_compact', 'lines']
+        assert report['prompt']['tokens'] > 0
+    
+    def test_report_table(self, db, category):
+        """Табличный отчет"""
+        out = StringIO()
+        call_command('category_prompt_report', stdout=out)
+        assert 'lines' in out.getvalue()
+
+
+class TestAutoFillLoadTestCommand:
+    """Тесты команды autofill_load_test"""
+    
+    def test_load_test_with_stub(self, transactional_db, settings, monkeypatch, tmp_path):
+        """Нагрузочный тест POST /api/books/auto-fill/ против встроенной заглушки LLM"""
+        settings.LLM_AUTOFILL_CACHE_ENABLED = False
+        settings.MEDIA_ROOT = tmp_path
+        monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+        base_url = settings.OPENAI_BASE_URL
+        out = StringIO()
+        call_command(
+            'autofill_load_test', '--stub', '--requests', '6', '--concurrency', '3',
+            '--stub-latency', '0', '--json', stdout=out
+        )
+        report = json.loads(out.getvalue())
+        
+        assert report['url'] == '/api/books/auto-fill/'
+        assert report['requests'] == 6
+        assert report['succeeded'] == 6
+        assert report['status_codes'] == {'200': 6}
+        assert report['attempts'] == {'1': 6}
+        assert report['stub']['requests'] == 6
+        assert report['latency_ms']['p50'] <= report['latency_ms']['p99']
+        assert settings.OPENAI_BASE_URL == base_url
+        assert 'OPENAI_API_KEY' not in os.environ
+        assert not User.objects.filter(username__startswith='autofill_load_test_').exists()
+        assert list((tmp_path / 'temp' / 'load_test').iterdir()) == []
+    
+    def test_load_test_reports_retries(self, transactional_db, settings, monkeypatch, tmp_path):
+        """Ответы 500 заглушки повторяются - попытки видны в отчете через эндпоинт"""
+        settings.LLM_AUTOFILL_CACHE_ENABLED = False
+        settings.MEDIA_ROOT = tmp_path
+        settings.LLM_RETRY_BACKOFF_BASE = 0
+        monkeypatch.setenv('OPENAI_API_KEY', 'real-key')
+        out = StringIO()
+        call_command(
+            'autofill_load_test', '--stub', '--requests', '4', '--concurrency', '2',
+            '--stub-latency', '0', '--stub-error-rate', '1', '--json', stdout=out
+        )
+        report = json.loads(out.getvalue())
+        
+        assert report['succeeded'] == 0
+        assert report['attempts'] == {'3': 4}
+        assert report['retried'] == 4
+        assert os.environ['OPENAI_API_KEY'] == 'real-key'
+    
+    def test_percentile(self):
+        """Перцентиль методом ближайшего ранга"""
+        from books.management.commands.autofill_load_test import percentile
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 95) == 95
+        assert percentile(values, 99) == 99
+        assert percentile([], 50) == 0.0
 
 
 class TestLoadAuthorsAndPublishersCommand:
@@ -67,6 +197,91 @@ class TestLoadAuthorsAndPublishersCommand:
             assert publishers_count1 == publishers_count2
         except Exception as e:
             pytest.skip(f"Команда не может быть выполнена: {e}")
+    
+    @staticmethod
+    def _write_json(path, items):
+        path.write_text(json.dumps(items, ensure_ascii=False), encoding='utf-8')
+        return str(path)
+    
+    def _files(self, tmp_path, authors):
+        return [
+            '--authors-file', self._write_json(tmp_path / 'authors.json', authors),
+            '--publishers-file', self._write_json(tmp_path / 'publishers.json', [
+                {'Название': 'Наука', 'Город': 'Москва', 'ссылка на сайт': None, 'Описание': ''},
+            ]),
+        ]
+    
+    def test_bulk_load_skips_existing_and_duplicates(self, db, tmp_path):
+        """Существующие имена и повторы внутри файла не создаются, запросов - константа"""
+        from books.services.profiling import QueryRecorder
+        Author.objects.create(full_name='Пушкин Александр Сергеевич')
+        authors = [
+            {'Фамилия': 'Пушкин', 'Имя': 'Александр', 'Отчество': 'Сергеевич', 'год рождения': 1799},
+            {'Фамилия': 'Гоголь', 'Имя': 'Николай', 'Отчество': 'Васильевич'},
+            {'Фамилия': 'Гоголь', 'Имя': 'Николай', 'Отчество': 'Васильевич'},
+        ] + [{'Фамилия': f'Автор{i}', 'Имя': 'Тест'} for i in range(50)]
+        files = self._files(tmp_path, authors)
+        
+        with QueryRecorder() as recorder:
+            call_command('load_authors_and_publishers', *files, '--batch-size', '20', stdout=StringIO())
+        
+        assert Author.objects.count() == 52
+        assert Author.objects.filter(full_name='Гоголь Николай Васильевич').count() == 1
+        assert Author.objects.get(full_name='Пушкин Александр Сергеевич').birth_year is None
+        assert Publisher.objects.filter(name='Наука').count() == 1
+        assert recorder.count < 20
+    
+    def test_update_changed_fields(self, db, tmp_path):
+        """--update обновляет изменившиеся поля, пустые значения из JSON не затирают данные"""
+        Author.objects.create(full_name='Пушкин Александр Сергеевич', biography='Поэт', death_year=1837)
+        files = self._files(tmp_path, [
+            {'Фамилия': 'Пушкин', 'Имя': 'Александр', 'Отчество': 'Сергеевич',
+             'год рождения': 1799, 'год смерти': None, 'короткая биография': ''},
+        ])
+        
+        call_command('load_authors_and_publishers', *files, stdout=StringIO())
+        assert Author.objects.get().birth_year is None
+        
+        out = StringIO()
+        call_command('load_authors_and_publishers', *files, '--update', stdout=out)
+        
+        author = Author.objects.get()
+        assert (author.birth_year, author.death_year, author.biography) == (1799, 1837, 'Поэт')
+        assert 'обновлено 1' in out.getvalue()
+
+
+class TestRebuildHashtagCountsCommand:
+    """Тесты команды rebuild_hashtag_counts"""
+    
+    def test_rebuild_restores_counts(self, book, user):
+        """Счетчики, испорченные операциями без сигналов, пересчитываются"""
+        from books.models import HashtagCategoryCount
+        from books.services.hashtag_service import HashtagService
+        HashtagService.add_hashtags_to_book(book, ['фантастика'], user)
+        HashtagCategoryCount.objects.update(count=0)
+        out = StringIO()
+        
+        call_command('rebuild_hashtag_counts', '--library', str(book.library_id), stdout=out)
+        
+        assert list(HashtagCategoryCount.objects.values_list('count', flat=True)) == [1]
+        assert '1 строк' in out.getvalue()
+
+
+class TestRebuildReadingStatsCommand:
+    """Тесты команды rebuild_reading_stats"""
+    
+    def test_rebuild_restores_stats(self, book, user):
+        """Даты прочтения, созданные без сигналов, учитываются после пересчета"""
+        from datetime import date
+        from books.models import BookReadingDate, ReadingMonthCount
+        BookReadingDate.objects.bulk_create([BookReadingDate(book=book, date=date(2024, 5, 1))])
+        assert not ReadingMonthCount.objects.exists()
+        out = StringIO()
+        
+        call_command('rebuild_reading_stats', '--user', str(user.id), stdout=out)
+        
+        assert list(ReadingMonthCount.objects.values_list('year', 'month', 'reads')) == [(2024, 5, 1)]
+        assert '2 строк' in out.getvalue()
 
 
 class TestGenerateTestBooksCommand:
@@ -89,4 +304,158 @@ class TestGenerateTestBooksCommand:
             assert books_after >= books_before
         except Exception as e:
             pytest.skip(f"Команда generate_test_books не может быть выполнена: {e}")
+    
+    def test_generate_test_books_bulk(self, db, category):
+        """Быстрый режим: книги и связанные строки создаются пачками"""
+        from books.models import BookAuthor, BookImage, BookReview
+        out = StringIO()
+        
+        call_command(
+            'generate_test_books',
+            '--bulk', '--total', '25', '--batch-size', '10', '--create-users', '2',
+            stdout=out,
+            stderr=StringIO()
+        )
+        
+        assert Book.objects.count() == 25
+        assert BookAuthor.objects.values('book').distinct().count() == 25
+        assert BookReview.objects.exists()
+        assert BookImage.objects.count() == 0
+        assert 'строк/с' in out.getvalue()
+    
+    def test_generate_test_books_bulk_with_images(self, db, category):
+        """Быстрый режим с изображениями, отрисованными в пуле процессов"""
+        from books.models import BookImage
+        
+        call_command(
+            'generate_test_books',
+            '--bulk', '--total', '2', '--images', 'pool', '--workers', '2', '--create-users', '1',
+            stdout=StringIO(),
+            stderr=StringIO()
+        )
+        
+        assert BookImage.objects.count() == 6
+        assert all(image.image.storage.exists(image.image.name) for image in BookImage.objects.all())
+    
+    def test_generate_test_books_bulk_with_image_variants(self, db, category):
+        """Варианты изображений: файлы книг - жесткие ссылки на небольшой пул"""
+        import os
+        from books.models import BookImage
+        
+        call_command(
+            'generate_test_books',
+            '--bulk', '--total', '4', '--images', 'pool', '--image-variants', '1', '--workers', '1',
+            '--create-users', '1',
+            stdout=StringIO(),
+            stderr=StringIO()
+        )
+        
+        covers = BookImage.objects.filter(order=1)
+        assert covers.count() == 4
+        assert len({image.image.name for image in covers}) == 4
+        assert len({os.stat(image.image.path).st_ino for image in covers}) == 1
+
+
+
+class TestDeleteAllBooksCommand:
+    """Тесты команды delete_all_books"""
+    
+    @pytest.fixture
+    def book_with_media(self, book, sample_image):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from books.models import BookImage, BookPage
+        content = sample_image.read()
+        image = BookImage.objects.create(
+            book=book, image=SimpleUploadedFile('cover.jpg', content, content_type='image/jpeg'), order=1
+        )
+        page = BookPage.objects.create(
+            book=book, page_number=1,
+            original_image=SimpleUploadedFile('page.jpg', content, content_type='image/jpeg')
+        )
+        book.cover_page = page
+        book.save(update_fields=['cover_page'])
+        return book, [image.image, page.original_image]
+    
+    def test_requires_confirm(self, book):
+        """Без --confirm ничего не удаляется"""
+        call_command('delete_all_books', stdout=StringIO())
+        
+        assert Book.objects.filter(id=book.id).exists()
+    
+    def test_delete(self, book):
+        """Обычный режим удаляет книги через Collector"""
+        call_command('delete_all_books', '--confirm', stdout=StringIO())
+        
+        assert not Book.objects.exists()
+        assert Author.objects.exists()
+    
+    @pytest.mark.django_db(transaction=True)
+    def test_purge_deletes_rows_and_files(self, book_with_media):
+        """--purge удаляет книги, связанные строки и файлы (после фиксации транзакции пачки)"""
+        from books.models import BookAuthor, BookImage, BookPage
+        book, files = book_with_media
+        out = StringIO()
+        
+        call_command('delete_all_books', '--confirm', '--purge', '--batch-size', '1', stdout=out)
+        
+        assert not Book.objects.exists()
+        assert not BookAuthor.objects.exists()
+        assert not BookImage.objects.exists()
+        assert not BookPage.objects.exists()
+        assert Author.objects.exists()
+        assert not any(file.storage.exists(file.name) for file in files)
+        assert 'Файлов удалено: 2' in out.getvalue()
+    
+    @pytest.mark.django_db(transaction=True)
+    def test_purge_keep_files(self, book_with_media):
+        """--keep-files оставляет файлы в хранилище"""
+        book, files = book_with_media
+        
+        call_command('delete_all_books', '--confirm', '--purge', '--keep-files', stdout=StringIO())
+        
+        assert not Book.objects.exists()
+        assert all(file.storage.exists(file.name) for file in files)
+    
+    def test_purge_scoped_to_library_and_owner(self, book, user2, category):
+        """--library и --owner ограничивают удаление"""
+        other_library = Library.objects.create(owner=user2, name='Другая библиотека')
+        other_book = Book.objects.create(owner=user2, library=other_library, category=category, title='Чужая')
+        
+        call_command('delete_all_books', '--confirm', '--purge', '--library', str(book.library_id), stdout=StringIO())
+        assert not Book.objects.filter(id=book.id).exists()
+        assert Book.objects.filter(id=other_book.id).exists()
+        
+        call_command('delete_all_books', '--confirm', '--purge', '--owner', user2.username, stdout=StringIO())
+        assert not Book.objects.exists()
+    
+    def test_unknown_library(self, book):
+        """Несуществующая библиотека - ошибка"""
+        from django.core.management.base import CommandError
+        with pytest.raises(CommandError):
+            call_command('delete_all_books', '--confirm', '--purge', '--library', '999999', stdout=StringIO())
 
+
+@pytest.mark.django_db
+class TestJsonRenderBenchmarkCommand:
+    """Тесты команды json_render_benchmark"""
+    
+    def test_report(self, book):
+        """Отчет: рендереры дают одинаковый JSON, размеры со сжатием меньше исходного"""
+        out = StringIO()
+        call_command('json_render_benchmark', '--books', '1', '--repeat', '2', '--json', stdout=out)
+        report = json.loads(out.getvalue())
+        
+        assert report['books'] == 1
+        assert [item['path'] for item in report['serialization']] == ['model', 'values']
+        assert all(item['identical'] for item in report['serialization'])
+        assert all(item['identical'] for item in report['rendering'])
+        assert {item['renderer'] for item in report['rendering']} >= {'json'}
+        identity, gzip = report['compression'][:2]
+        assert identity['encoding'] == 'identity' and gzip['encoding'] == 'gzip'
+        assert gzip['bytes'] < identity['bytes']
+    
+    def test_not_enough_books(self, book):
+        """Книг меньше, чем --books - ошибка с подсказкой"""
+        from django.core.management.base import CommandError
+        with pytest.raises(CommandError, match='generate_test_books'):
+            call_command('json_render_benchmark', '--books', '5', stdout=StringIO())
@@ -0,0 +1,85 @@
+"""
+Тесты для FastJSONRenderer и FastJSONParser (orjson с откатом на стандартный json)
+"""
+import io
+import uuid
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+
+import pytest
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from books import renderers
+from books.parsers import FastJSONParser
+from books.renderers import FastJSONRenderer
+from books.serializers import BookListSerializer
+
+
+DATA = {
+    'id': 1,
+    'title': 'Мастер и Маргарита\u2028',
+    'price': Decimal('12.50'),
+    'created_at': datetime(2024, 5, 1, 12, 30, tzinfo=dt_timezone.utc),
+    'published': date(1967, 1, 1),
+    'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'lazy': gettext_lazy('Книги'),
+    'counts': {1: 2},
+    'tags': ('фантастика', None, True, 1.5),
+}
+
+
+class TestFastJSONRenderer:
+    """Тесты FastJSONRenderer"""
+
+    def test_same_output_as_drf(self):
+        """Результат совпадает с JSONRenderer DRF"""
+        assert FastJSONRenderer().render(DATA) == JSONRenderer().render(DATA)
+
+    def test_book_list_same_output(self, book, rf):
+        """Страница BookListSerializer рендерится одинаково"""
+        from rest_framework.request import Request
+        request = Request(rf.get('/api/books/'))
+        data = BookListSerializer([book], many=True, context={'request': request}).data
+
+        assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    def test_indent_falls_back_to_json(self):
+        """С отступом (indent) используется стандартный json"""
+        rendered = FastJSONRenderer().render({'a': 1}, 'application/json; indent=2')
+        assert rendered == b'{\n  "a": 1\n}'
+
+    def test_without_orjson(self, monkeypatch):
+        """Без orjson - стандартный json"""
+        monkeypatch.setattr(renderers, 'orjson', None)
+        assert FastJSONRenderer().render(DATA) == JSONRenderer().render(DATA)
+
+    def test_none(self):
+        assert FastJSONRenderer().render(None) == b''
+
+
+class TestFastJSONParser:
+    """Тесты FastJSONParser"""
+
+    def test_parse(self):
+        """Разбор совпадает с JSONParser DRF"""
+        body = '{"title": "Книга", "ids": [1, 2], "price": 1.5, "extra": null}'.encode()
+        assert FastJSONParser().parse(io.BytesIO(body)) == JSONParser().parse(io.BytesIO(body))
+
+    def test_invalid_json(self):
+        """Некорректный JSON - ParseError"""
+        with pytest.raises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"title": '))
+
+    def test_nan_rejected(self):
+        """NaN отклоняется, как в JSONParser со STRICT_JSON"""
+        with pytest.raises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"price": NaN}'))
+
+    def test_other_encoding(self):
+        """Тело не в UTF-8 разбирает JSONParser"""
+        body = '{"title": "Книга"}'.encode('cp1251')
+        parsed = FastJSONParser().parse(io.BytesIO(body), parser_context={'encoding': 'cp1251'})
+        assert parsed == {'title': 'Книга'}
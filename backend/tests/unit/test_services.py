@@ -87,6 +87,357 @@ class TestHashtagService:
         assert book.hashtags.count() == 1
 
 
+class TestHashtagCountService:
+    """Тесты HashtagCountService (таблица частот хэштегов)"""
+    
+    @staticmethod
+    def _counts():
+        from books.models import HashtagCategoryCount
+        return {
+            (row.hashtag_id, row.library_id, row.category_id): row.count
+            for row in HashtagCategoryCount.objects.filter(count__gt=0)
+        }
+    
+    def _assert_consistent(self):
+        """Поддерживаемые сигналами счетчики совпадают с пересчетом с нуля"""
+        from books.services.hashtag_counts import HashtagCountService
+        maintained = self._counts()
+        HashtagCountService.rebuild()
+        assert maintained == self._counts()
+        return maintained
+    
+    def test_add_and_remove_hashtags(self, book, user):
+        """Добавление через сервис и m2m, удаление связи, remove и clear"""
+        HashtagService.add_hashtags_to_book(book, ['фантастика', 'приключения'], user)
+        extra = Hashtag.objects.create(name='#extra', slug='extra', creator=user)
+        book.hashtags.add(extra)
+        counts = self._assert_consistent()
+        assert len(counts) == 3
+        assert set(counts.values()) == {1}
+        
+        BookHashtag.objects.get(book=book, hashtag=extra).delete()
+        book.hashtags.remove(Hashtag.objects.get(name='#фантастика'))
+        assert len(self._assert_consistent()) == 1
+        
+        book.hashtags.clear()
+        assert self._assert_consistent() == {}
+    
+    def test_book_moved(self, book, user, user2):
+        """Перенос книги в другую библиотеку и категорию переносит счетчики"""
+        from books.models import Category
+        HashtagService.add_hashtags_to_book(book, ['фантастика'], user)
+        other_library = Library.objects.create(owner=user2, name='Другая', address='Адрес')
+        other_category = Category.objects.create(code='other', name='Другая', slug='other')
+        
+        TransferService.transfer_to_library(book, other_library)
+        book.category = other_category
+        book.save()
+        
+        hashtag = Hashtag.objects.get(name='#фантастика')
+        assert self._assert_consistent() == {(hashtag.id, other_library.id, other_category.id): 1}
+    
+    def test_book_and_category_deleted(self, book, user, library, category, publisher):
+        """Удаление книги и категории"""
+        HashtagService.add_hashtags_to_book(book, ['фантастика', 'приключения'], user)
+        second = Book.objects.create(owner=user, library=library, category=category, title='Вторая')
+        HashtagService.add_hashtags_to_book(second, ['фантастика'], user)
+        hashtag = Hashtag.objects.get(name='#фантастика')
+        assert self._assert_consistent()[(hashtag.id, library.id, category.id)] == 2
+        
+        book.delete()
+        assert self._assert_consistent() == {(hashtag.id, library.id, category.id): 1}
+        
+        category.delete()
+        assert self._assert_consistent() == {(hashtag.id, library.id, None): 1}
+    
+    def test_cached_cloud(self, book, user, library, settings):
+        """Закэшированный ответ сбрасывается изменением счетчиков"""
+        from django.core.cache import cache
+        from books.services.hashtag_counts import HashtagCountService
+        from books.services.profiling import QueryRecorder
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        settings.HASHTAG_CLOUD_CACHE_TIMEOUT = 60
+        cache.clear()
+        HashtagService.add_hashtags_to_book(book, ['фантастика'], user)
+        
+        first = HashtagCountService.cached_cloud([library.id])
+        with QueryRecorder() as recorder:
+            assert HashtagCountService.cached_cloud([library.id]) == first
+        assert recorder.count == 0
+        
+        HashtagService.add_hashtags_to_book(book, ['приключения'], user)
+        assert len(HashtagCountService.cached_cloud([library.id])['hashtags']) == 2
+    
+    @pytest.mark.django_db(transaction=True)
+    def test_queryset_delete_rebuilds_after_commit(self, book, user):
+        """Массовое удаление книг - пересчет после коммита"""
+        HashtagService.add_hashtags_to_book(book, ['фантастика'], user)
+        
+        Book.objects.filter(id=book.id).delete()
+        
+        assert self._counts() == {}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_queryset_delete_rebuilds_only_affected_libraries(self, book, user, library, category):
+        """Пересчет после массового удаления ограничен библиотеками удаленных книг"""
+        from unittest.mock import patch
+        from books.models import HashtagCategoryCount
+        from books.services.hashtag_counts import HashtagCountService
+        other_library = Library.objects.create(owner=user, name='Другая библиотека')
+        other = Book.objects.create(owner=user, library=other_library, category=category, title='Другая')
+        HashtagService.add_hashtags_to_book(book, ['фантастика'], user)
+        HashtagService.add_hashtags_to_book(other, ['фантастика'], user)
+        HashtagCategoryCount.objects.filter(library=other_library).update(count=99)
+        
+        with patch.object(HashtagCountService, 'rebuild', wraps=HashtagCountService.rebuild) as rebuild:
+            Book.objects.filter(id=book.id).delete()
+        
+        rebuild.assert_called_once_with({library.id})
+        hashtag = Hashtag.objects.get(name='#фантастика')
+        assert self._counts() == {(hashtag.id, other_library.id, category.id): 99}
+
+
+class TestAutocompleteService:
+    """Тесты индекса автодополнения"""
+    
+    def test_normalize(self):
+        """Регистр, ё и знаки препинания не учитываются"""
+        from books.services.autocomplete import normalize
+        assert normalize('  Пётр  ЁЖИКОВ-Зелёный ') == 'петр ежиков зеленый'
+        assert normalize('#Фантастика') == 'фантастика'
+    
+    def test_prefix_index_order_and_limit(self):
+        """Каждое слово запроса - начало слова названия, порядок - по количеству книг"""
+        from books.services.autocomplete import PrefixIndex
+        index = PrefixIndex([
+            {'id': 1, 'name': 'Толстой Алексей Николаевич', 'books_count': 5},
+            {'id': 2, 'name': 'Толстой Лев Николаевич', 'books_count': 40},
+            {'id': 3, 'name': 'Достоевский Фёдор', 'books_count': 30},
+            {'id': 4, 'name': 'Алексеев Сергей', 'books_count': 0},
+        ], 'name', top_k=3)
+        
+        assert [e['id'] for e in index.search('тол')] == [2, 1]
+        assert [e['id'] for e in index.search('ник тол')] == [2, 1]
+        assert [e['id'] for e in index.search('алекс')] == [1, 4]
+        assert [e['id'] for e in index.search('ФЕД')] == [3]
+        assert [e['id'] for e in index.search('т а')] == [1]
+        assert [e['id'] for e in index.search('ев')] == []
+        assert [e['id'] for e in index.search('л')] == [2]
+        assert len(index.search('', 10)) == 0
+        # Ограничение сверху - top_k
+        assert [e['id'] for e in index.search('о', 100)] == []
+        assert len(index.search('а', 100)) == 2
+        assert len(index.search('т', 1)) == 1
+    
+    def test_search_invalidated_by_signals(self, author):
+        """Новый автор сразу попадает в индекс, популярные - выше"""
+        from books.services.autocomplete import AutocompleteService
+        from books.services.profiling import QueryRecorder
+        assert [a['id'] for a in AutocompleteService.search('authors', 'тестов')] == [author.id]
+        with QueryRecorder() as recorder:
+            AutocompleteService.search('authors', 'тест ив')
+        assert recorder.count == 0
+        
+        popular = Author.objects.create(full_name='Тестовый Популярный')
+        book = Book.objects.create(title='Книга')
+        BookAuthor.objects.create(book=book, author=popular)
+        AutocompleteService.invalidate('authors')
+        
+        results = AutocompleteService.search('authors', 'тест')
+        assert [a['id'] for a in results] == [popular.id, author.id]
+        assert results[0]['books_count'] == 1
+        
+        popular.delete()
+        assert [a['id'] for a in AutocompleteService.search('authors', 'тест')] == [author.id]
+
+
+class FakeConnection:
+    """Соединение для тестов пула"""
+    
+    def __init__(self):
+        self.closed = False
+        self.healthy = True
+    
+    def close(self):
+        self.closed = True
+
+
+class TestConnectionPool:
+    """Тесты пула соединений с БД"""
+    
+    def _pool(self, **kwargs):
+        from books.services.db_pool import ConnectionPool
+        
+        def check(conn):
+            if not conn.healthy:
+                raise ConnectionError('broken')
+        
+        return ConnectionPool(FakeConnection, check=check, reset=lambda conn: not conn.closed, **kwargs)
+    
+    def test_reuse_and_metrics(self):
+        """Возвращенное соединение выдается повторно, метрики отражают использование"""
+        pool = self._pool(max_size=2)
+        first = pool.acquire()
+        assert pool.stats()['in_use'] == 1
+        pool.release(first)
+        
+        assert pool.acquire() is first
+        stats = pool.stats()
+        assert (stats['created'], stats['acquired'], stats['size'], stats['idle']) == (1, 2, 1, 0)
+    
+    def test_waits_for_release_and_times_out(self):
+        """При max_size выданных соединений запрос ждет возврата, без возврата - PoolTimeout"""
+        import threading
+        from books.services.db_pool import PoolTimeout
+        pool = self._pool(max_size=1, timeout=2)
+        conn = pool.acquire()
+        threading.Timer(0.05, pool.release, args=[conn]).start()
+        
+        assert pool.acquire() is conn
+        assert pool.stats()['waited'] == 1
+        
+        pool.timeout = 0.01
+        with pytest.raises(PoolTimeout):
+            pool.acquire()
+        assert pool.stats()['timeouts'] == 1
+    
+    def test_broken_connections_replaced(self):
+        """Соединение, не прошедшее проверку или сброс, закрывается и заменяется новым"""
+        pool = self._pool(max_size=1)
+        conn = pool.acquire()
+        conn.healthy = False
+        pool.release(conn)
+        
+        replacement = pool.acquire()
+        assert replacement is not conn and conn.closed
+        replacement.close()
+        pool.release(replacement)  # Сброс не удался - место освобождается
+        
+        stats = pool.stats()
+        assert (stats['size'], stats['created'], stats['closed'], stats['check_failures']) == (0, 2, 2, 1)
+    
+    def test_fill_and_max_idle(self):
+        """fill открывает min_size соединений, простаивавшие дольше max_idle заменяются"""
+        pool = self._pool(min_size=2, max_size=3, max_idle=0)
+        pool.fill()
+        assert pool.stats()['idle'] == 2
+        
+        conn = pool.acquire()
+        assert not conn.closed
+        assert pool.stats()['closed'] == 1
+
+class TestOffload:
+    """Тесты выноса CPU-работы в пул процессов"""
+    
+    def test_runs_in_thread_without_pool(self, settings):
+        """CPU_POOL_WORKERS = 0 - выполнение в потоке"""
+        import os
+        from asgiref.sync import async_to_sync
+        from books.services.offload import get_process_pool, run_cpu
+        
+        settings.CPU_POOL_WORKERS = 0
+        assert get_process_pool() is None
+        assert async_to_sync(run_cpu)(os.getpid) == os.getpid()
+    
+    def test_runs_in_process_pool(self, settings):
+        """С пулом функция выполняется в дочернем процессе"""
+        import os
+        from asgiref.sync import async_to_sync
+        from books.services.offload import run_cpu, shutdown_process_pool
+        
+        settings.CPU_POOL_WORKERS = 1
+        try:
+            assert async_to_sync(run_cpu)(pow, 2, 10) == 1024
+            assert async_to_sync(run_cpu)(os.getpid) != os.getpid()
+        finally:
+            shutdown_process_pool()
+
+
+class TestAdmissionClass:
+    """Тесты слотов параллельности и token bucket контроля допуска"""
+    
+    def _admission(self, **limits):
+        from books.services.admission import AdmissionClass
+        return AdmissionClass('test', {'rate_per_minute': 0, **limits})
+    
+    def test_user_and_global_slots(self):
+        """Пользователь не занимает больше user_slots, все вместе - больше global_slots"""
+        from books.exceptions import AdmissionRejected
+        admission = self._admission(global_slots=2, user_slots=1)
+        
+        admission.acquire('user:1', timeout=0)
+        with pytest.raises(AdmissionRejected):
+            admission.acquire('user:1', timeout=0)
+        admission.acquire('user:2', timeout=0)
+        with pytest.raises(AdmissionRejected):
+            admission.acquire('user:3', timeout=0)
+        
+        stats = admission.stats()
+        assert (stats['active'], stats['active_users'], stats['rejected_busy']) == (2, 2, 2)
+        admission.release('user:1')
+        admission.acquire('user:3', timeout=0)
+    
+    def test_queued_request_gets_released_slot(self):
+        """Запрос в очереди получает слот после освобождения"""
+        import threading
+        admission = self._admission(global_slots=1)
+        admission.acquire('user:1', timeout=0)
+        
+        releaser = threading.Timer(0.05, admission.release, args=['user:1'])
+        releaser.start()
+        admission.acquire('user:2', timeout=5)
+        releaser.join()
+        
+        stats = admission.stats()
+        assert (stats['active'], stats['queued'], stats['waiting']) == (1, 1, 0)
+    
+    def test_queue_timeout_and_max_queue(self):
+        """Без слота за timeout и при заполненной очереди - отказ"""
+        from books.exceptions import AdmissionRejected
+        admission = self._admission(global_slots=1, max_queue=0)
+        admission.acquire('user:1', timeout=0)
+        
+        with pytest.raises(AdmissionRejected) as error:
+            admission.acquire('user:2', timeout=5)
+        assert error.value.retry_after >= 1
+        assert admission.stats()['queued'] == 0
+    
+    def test_async_acquire_waits_without_thread(self):
+        """Асинхронное ожидание слота"""
+        import asyncio
+        from asgiref.sync import async_to_sync
+        from books.exceptions import AdmissionRejected
+        admission = self._admission(global_slots=1)
+        admission.acquire('user:1', timeout=0)
+        
+        async def wait_for_slot():
+            asyncio.get_running_loop().call_later(0.05, admission.release, 'user:1')
+            await admission.aacquire('user:2', timeout=5)
+            with pytest.raises(AdmissionRejected):
+                await admission.aacquire('user:3', timeout=0.1)
+        
+        async_to_sync(wait_for_slot)()
+        assert admission.stats()['waiting'] == 0
+    
+    def test_rate_limit(self):
+        """Сверх burst запросы отклоняются до появления токена; отказ по слоту токен не тратит"""
+        from books.exceptions import AdmissionRejected
+        admission = self._admission(rate_per_minute=60, burst=2, global_slots=1)
+        
+        admission.acquire('user:1', timeout=0)
+        with pytest.raises(AdmissionRejected):
+            admission.acquire('user:1', timeout=0)  # Нет слота - токен возвращается
+        admission.release('user:1')
+        admission.acquire('user:1', timeout=0)
+        admission.release('user:1')
+        with pytest.raises(AdmissionRejected) as error:
+            admission.acquire('user:1', timeout=0)
+        
+        assert 0 < error.value.retry_after <= 1
+        assert admission.stats()['rejected_rate'] == 1
+        admission.acquire('user:2', timeout=0)  # У другого пользователя свой bucket
+
+
 class TestTransferService:
     """Тесты TransferService"""
     
@@ -241,3 +592,268 @@ class TestBookService:
         book.refresh_from_db()
         assert book.authors.count() == 0
 
+
+
+class TestBookBulkService:
+    """Тесты BookBulkService и BulkJobQueue (массовые действия админки)"""
+    
+    @pytest.fixture
+    def books(self, book, user, library, category):
+        others = [Book.objects.create(owner=user, library=library, category=category, title=f'Книга {i}') for i in range(4)]
+        return [book, *others]
+    
+    def test_job_runs_in_batches(self, books):
+        """Задача обходит queryset пачками по pk и вызывает finish"""
+        from books.services.bulk_jobs import BulkJobQueue
+        batches, finished = [], []
+        
+        def handler(ids):
+            batches.append(ids)
+            return len(ids)
+        
+        job = BulkJobQueue.enqueue('test', Book.objects.order_by('-title'), handler, lambda: finished.append(1), batch_size=2)
+        
+        assert job.status == 'done'
+        assert (job.processed, job.batches, finished) == (5, 3, [1])
+        assert sum(batches, []) == sorted(book.id for book in books)
+        assert BulkJobQueue.stats()[0]['id'] == job.id
+    
+    def test_job_failure(self, books):
+        """Ошибка обработчика останавливает задачу, обработанные пачки остаются"""
+        from books.services.bulk_jobs import BulkJobQueue
+        
+        def handler(ids):
+            if ids[0] != books[0].id:
+                raise ValueError('сбой')
+            Book.objects.filter(id__in=ids).update(status='read')
+            return len(ids)
+        
+        job = BulkJobQueue.enqueue('test', Book.objects.all(), handler, batch_size=1)
+        
+        assert (job.status, job.error, job.processed) == ('failed', 'сбой', 1)
+        assert list(Book.objects.filter(status='read')) == [books[0]]
+    
+    def test_background_job(self, books, settings):
+        """С BULK_JOBS_BACKGROUND задача выполняется фоновым потоком"""
+        from books.services.bulk_jobs import BulkJobQueue
+        settings.BULK_JOBS_BACKGROUND = True
+        
+        job = BulkJobQueue.enqueue('test', Book.objects.none(), lambda ids: len(ids))
+        BulkJobQueue._queue.join()
+        
+        assert (job.status, job.processed) == ('done', 0)
+    
+    def test_transfer(self, books, user2):
+        """Передача в библиотеку переносит счетчики хэштегов, передача пользователю меняет владельца"""
+        from books.services.book_bulk import BookBulkService
+        HashtagService.add_hashtags_to_book(books[0], ['фантастика'], books[0].owner)
+        other_library = Library.objects.create(owner=user2, name='Другая', address='Адрес')
+        
+        job = BookBulkService.enqueue_transfer(
+            Book.objects.filter(id__in=[b.id for b in books[:3]]), other_library.id, user2.id
+        )
+        
+        assert job.processed == 3
+        assert Book.objects.filter(library=other_library, owner=user2).count() == 3
+        assert TestHashtagCountService()._assert_consistent() == {
+            (Hashtag.objects.get(name='#фантастика').id, other_library.id, books[0].category_id): 1
+        }
+        with pytest.raises(TransferError):
+            BookBulkService.enqueue_transfer(Book.objects.all(), library_id=999999)
+    
+    def test_retag(self, books, user):
+        """Добавление с учетом лимита хэштегов книги и удаление, счетчики согласованы"""
+        from books.services.book_bulk import BookBulkService
+        full = books[0]
+        HashtagService.add_hashtags_to_book(full, [f'тег{i}' for i in range(MAX_HASHTAGS_PER_BOOK - 1)], user)
+        new = [Hashtag.objects.create(name=f'#новый{i}', slug=f'new-{i}') for i in range(2)]
+        
+        BookBulkService.enqueue_retag(Book.objects.all(), add_ids=[tag.id for tag in new])
+        
+        assert BookHashtag.objects.filter(book=full).count() == MAX_HASHTAGS_PER_BOOK
+        assert BookHashtag.objects.filter(hashtag=new[1]).count() == len(books) - 1
+        TestHashtagCountService()._assert_consistent()
+        
+        job = BookBulkService.enqueue_retag(Book.objects.all(), remove_ids=[new[0].id])
+        
+        assert job.processed == len(books)
+        assert not BookHashtag.objects.filter(hashtag=new[0]).exists()
+        TestHashtagCountService()._assert_consistent()
+    
+    def test_reprocess_pages(self, book, monkeypatch):
+        """Страницы обрабатываются заново, ошибка обработки сохраняется в странице"""
+        from books.models import BookPage
+        from books.services.book_bulk import BookBulkService
+        pages = [
+            BookPage.objects.create(book=book, page_number=n, original_image=f'books/pages/original/{n}.jpg',
+                                    processing_status='failed')
+            for n in (1, 2)
+        ]
+        
+        def process(input_path, output_path):
+            if str(input_path).endswith('2.jpg'):
+                raise ValueError('контур не найден')
+            return 800, 1200
+        
+        monkeypatch.setattr('books.services.document_processor.process_document', process)
+        job = BookBulkService.enqueue_reprocess(BookPage.objects.filter(book=book))
+        
+        assert job.processed == 2
+        statuses = {page.page_number: (page.processing_status, page.width) for page in BookPage.objects.all()}
+        assert statuses == {1: ('completed', 800), 2: ('failed', None)}
+        pages[1].refresh_from_db()
+        assert pages[1].error_message == 'контур не найден'
+
+
+class TestRowCounts:
+    """Тесты оценки количества строк"""
+    
+    def test_bounded_count(self, book, user):
+        from books.services.row_counts import bounded_count
+        Book.objects.create(owner=user, title='Вторая')
+        
+        assert bounded_count(Book.objects.all(), 10) == 2
+        assert bounded_count(Book.objects.all(), 1) == 1
+    
+    def test_no_estimate_without_postgresql(self, db):
+        """На SQLite оценки нет - вызывающий использует bounded_count"""
+        from books.services.row_counts import table_row_estimate
+        assert table_row_estimate(Book) is None
+        
+    def test_approximate_count(self, book, user, monkeypatch):
+        """Точно до предела; дальше - оценка (reltuples без фильтров, EXPLAIN с фильтрами) или сам предел"""
+        from books.services import row_counts
+        Book.objects.bulk_create([Book(owner=user, title=f'Книга {i}') for i in range(4)])
+        filtered = Book.objects.filter(title__startswith='Книга')
+        
+        assert row_counts.approximate_count(filtered, 10) == (4, False)
+        assert row_counts.approximate_count(filtered, 3) == (3, True)
+        
+        monkeypatch.setattr(row_counts, 'planner_estimate', lambda queryset: 120)
+        monkeypatch.setattr(row_counts, 'table_row_estimate', lambda model, using=None: 5000)
+        assert row_counts.approximate_count(filtered, 3) == (120, True)
+        assert row_counts.approximate_count(Book.objects.all(), 3) == (5000, True)
+        # Оценка не больше предела противоречит COUNT - используется предел
+        monkeypatch.setattr(row_counts, 'planner_estimate', lambda queryset: 2)
+        assert row_counts.approximate_count(filtered, 3) == (3, True)
+    
+    def test_no_planner_estimate_without_postgresql(self, book):
+        from books.services.row_counts import planner_estimate
+        assert planner_estimate(Book.objects.filter(title='x')) is None
+
+
+class TestReadingStatsService:
+    """Тесты ReadingStatsService (сводные таблицы статистики чтения)"""
+    
+    @staticmethod
+    def _rollups():
+        from books.models import ReadingAuthorCount, ReadingMonthCount
+        months = {
+            (row.user_id, row.year, row.month, row.category_id): (row.reads, row.rereads)
+            for row in ReadingMonthCount.objects.exclude(reads=0, rereads=0)
+        }
+        authors = {(row.user_id, row.author_id): row.reads for row in ReadingAuthorCount.objects.exclude(reads=0)}
+        return months, authors
+    
+    def _assert_consistent(self):
+        """Поддерживаемые сигналами таблицы совпадают с пересчетом с нуля"""
+        from books.services.reading_stats import ReadingStatsService
+        maintained = self._rollups()
+        ReadingStatsService.rebuild()
+        assert maintained == self._rollups()
+        return maintained
+    
+    @staticmethod
+    def _read(book, *dates):
+        from datetime import date
+        from books.models import BookReadingDate
+        return [BookReadingDate.objects.create(book=book, date=date.fromisoformat(value)) for value in dates]
+    
+    def test_added_and_removed(self, book, user, category, author):
+        """Повторное прочтение - любая дата, кроме самой ранней, в том числе добавленная раньше первой"""
+        readings = self._read(book, '2024-03-10', '2024-05-01')
+        months, authors = self._assert_consistent()
+        assert months == {(user.id, 2024, 3, category.id): (1, 0), (user.id, 2024, 5, category.id): (1, 1)}
+        assert authors == {(user.id, author.id): 2}
+        
+        earlier = self._read(book, '2023-12-31')[0]
+        months, _ = self._assert_consistent()
+        assert months[(user.id, 2023, 12, category.id)] == (1, 0)
+        assert months[(user.id, 2024, 3, category.id)] == (1, 1)
+        
+        earlier.delete()
+        readings[1].delete()
+        months, authors = self._assert_consistent()
+        assert months == {(user.id, 2024, 3, category.id): (1, 0)}
+        assert authors == {(user.id, author.id): 1}
+    
+    def test_book_changes(self, book, user, user2, category, author):
+        """Смена владельца и категории, авторы книги, удаление категории и книги"""
+        from books.models import Category
+        self._read(book, '2024-01-05', '2024-02-05')
+        TransferService.transfer_to_user(book, user2)
+        months, authors = self._assert_consistent()
+        assert {key[0] for key in months} == {user2.id}
+        assert authors == {(user2.id, author.id): 2}
+        
+        other = Author.objects.create(full_name='Второй Автор')
+        BookAuthor.objects.create(book=book, author=other, order=2)
+        BookAuthor.objects.filter(book=book, author=author).delete()
+        assert self._assert_consistent()[1] == {(user2.id, other.id): 2}
+        
+        book.category = Category.objects.create(code='other', name='Другая', slug='other')
+        book.save()
+        category_id = book.category_id
+        assert {key[3] for key in self._assert_consistent()[0]} == {category_id}
+        
+        Category.objects.get(id=category_id).delete()
+        assert {key[3] for key in self._assert_consistent()[0]} == {None}
+        
+        book.refresh_from_db()
+        book.delete()
+        assert self._assert_consistent() == ({}, {})
+    
+    def test_bulk_transfer(self, book, user, user2):
+        """Передача книг queryset.update() (админка) - без сигналов, через books_transferred"""
+        from books.services.book_bulk import BookBulkService
+        self._read(book, '2024-01-05')
+        
+        BookBulkService.transfer([book.id], owner_id=user2.id)
+        
+        months, _ = self._assert_consistent()
+        assert {key[0] for key in months} == {user2.id}
+    
+    @pytest.mark.django_db(transaction=True)
+    def test_queryset_delete_rebuilds_after_commit(self, book, user):
+        """Массовое удаление дат прочтения и книг - пересчет после коммита"""
+        from books.models import BookReadingDate
+        self._read(book, '2024-01-05', '2024-02-05', '2024-03-05')
+        
+        BookReadingDate.objects.filter(date__lt='2024-03-01').delete()
+        assert self._rollups()[0] == {(user.id, 2024, 3, book.category_id): (1, 0)}
+        
+        Book.objects.filter(id=book.id).delete()
+        assert self._rollups() == ({}, {})
+    
+    def test_stats(self, book, user, library, category, author):
+        from datetime import date
+        from books.services.reading_stats import ReadingStatsService
+        second = Book.objects.create(owner=user, library=library, title='Без категории')
+        self._read(book, '2023-11-20', '2023-12-01', '2024-01-15')
+        self._read(second, '2024-01-20', '2024-03-02')
+        
+        stats = ReadingStatsService.stats(user.id, today=date(2024, 4, 10))
+        
+        assert (stats['total_reads'], stats['rereads'], stats['books_read']) == (5, 3, 2)
+        assert stats['by_year'] == [
+            {'year': 2023, 'reads': 2, 'rereads': 1}, {'year': 2024, 'reads': 3, 'rereads': 2}
+        ]
+        assert [(item['year'], item['month'], item['reads']) for item in stats['by_month']] == [
+            (2023, 11, 1), (2023, 12, 1), (2024, 1, 2), (2024, 3, 1)
+        ]
+        assert stats['by_category'] == [
+            {'id': category.id, 'name': category.name, 'reads': 3}, {'id': None, 'name': None, 'reads': 2}
+        ]
+        assert stats['by_author'] == [{'id': author.id, 'full_name': author.full_name, 'reads': 3}]
+        assert stats['streaks'] == {'current_months': 1, 'longest_months': 3}
+        assert ReadingStatsService.stats(user.id, today=date(2024, 6, 1))['streaks']['current_months'] == 0
@@ -27,7 +27,7 @@ const AuthorAutocomplete = ({ selectedAuthors = [], onChange, maxAuthors = 3, pl
     const timer = setTimeout(async () => {
       setLoading(true);
       try {
-        const results = await authorsAPI.search(searchQuery.trim());
+        const results = await authorsAPI.autocomplete(searchQuery.trim());
         // Фильтруем уже выбранных авторов
         const filteredResults = (Array.isArray(results) ? results : (results.results || []))
           .filter(author => !selectedAuthors.some(selected => selected.id === author.id));
@@ -61,7 +61,7 @@ const PublisherAutocomplete = ({ value, onChange, placeholder = 'Введите
     const timer = setTimeout(async () => {
       setLoading(true);
       try {
-        const results = await publishersAPI.search(searchQuery.trim());
+        const results = await publishersAPI.autocomplete(searchQuery.trim());
         setSuggestions(Array.isArray(results) ? results : (results.results || []));
         // Показываем список только если пользователь взаимодействовал с полем
         if (hasBeenFocused || userHasTyped) {
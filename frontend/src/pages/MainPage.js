@@ -31,7 +31,8 @@ const MainPage = () => {
     count: 0,
     next: null,
     previous: null,
-    paginated: false
+    paginated: false,
+    countIsEstimate: false
   });
   const [searchQuery, setSearchQuery] = useState('');
   const [filters, setFilters] = useState({
@@ -367,7 +368,8 @@ const MainPage = () => {
         count: data.count || 0,
         next: data.next || null,
         previous: data.previous || null,
-        paginated: data.paginated || false
+        paginated: data.paginated || false,
+        countIsEstimate: data.count_is_estimate || false
       });
       
       // Отображаем только текущую страницу
@@ -519,8 +521,15 @@ const MainPage = () => {
           {paginationInfo.paginated && paginationInfo.count > 0 && (
             <div className="pagination">
               <div className="pagination-info">
-                Страница {currentPage} из {Math.ceil(paginationInfo.count / 30)} 
-                ({paginationInfo.count} книг всего)
+                {paginationInfo.countIsEstimate ? (
+                  // Количество приблизительное (бэкенд считает точно только до предела)
+                  <>Страница {currentPage} (около {paginationInfo.count.toLocaleString('ru-RU')} книг)</>
+                ) : (
+                  <>
+                    Страница {currentPage} из {Math.ceil(paginationInfo.count / 30)} 
+                    ({paginationInfo.count} книг всего)
+                  </>
+                )}
               </div>
               <div className="pagination-controls">
                 <button
@@ -532,7 +541,7 @@ const MainPage = () => {
                 </button>
                 <button
                   onClick={() => setCurrentPage(prev => prev + 1)}
-                  disabled={!paginationInfo.next || currentPage >= Math.ceil(paginationInfo.count / 30)}
+                  disabled={!paginationInfo.next || (!paginationInfo.countIsEstimate && currentPage >= Math.ceil(paginationInfo.count / 30))}
                   className="pagination-button"
                 >
                   Следующая →
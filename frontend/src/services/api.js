@@ -184,6 +184,12 @@ export const hashtagsAPI = {
     const response = await apiClient.get('/hashtags/', { params });
     return response.data;
   },
+  autocomplete: async (query, limit) => {
+    const response = await apiClient.get('/hashtags/autocomplete/', {
+      params: { q: query, ...(limit ? { limit } : {}) },
+    });
+    return response.data;
+  },
   getByCategory: async (categoryId = null, libraryIds = []) => {
     const params = new URLSearchParams();
     if (categoryId) {
@@ -357,6 +363,12 @@ export const authorsAPI = {
     });
     return response.data;
   },
+  autocomplete: async (query, limit) => {
+    const response = await apiClient.get('/authors/autocomplete/', {
+      params: { q: query, ...(limit ? { limit } : {}) },
+    });
+    return response.data;
+  },
   getAll: async () => {
     const response = await apiClient.get('/authors/');
     return response.data;
@@ -387,6 +399,12 @@ export const publishersAPI = {
     });
     return response.data;
   },
+  autocomplete: async (query, limit) => {
+    const response = await apiClient.get('/publishers/autocomplete/', {
+      params: { q: query, ...(limit ? { limit } : {}) },
+    });
+    return response.data;
+  },
   getAll: async () => {
     const response = await apiClient.get('/publishers/');
     return response.data;
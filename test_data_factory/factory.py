@@ -1,6 +1,7 @@
 """
 Главная фабрика тестовых данных
 """
+import io
 import os
 import sys
 import random
@@ -9,10 +10,12 @@ from typing import Optional
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import transaction
+from django.db import connection, transaction
 from django.core.files import File
 
-from books.models import Category, Author, Publisher, Language, Book, BookAuthor, BookImage, BookReview, Library, Hashtag, BookPage, BookElectronic, BookReadingDate
+from books.models import Category, Author, Publisher, Language, Book, BookAuthor, BookImage, BookReview, Library, Hashtag, BookHashtag, BookPage, BookElectronic, BookReadingDate
+from books.services.hashtag_counts import HashtagCountService
+from books.services.reading_stats import ReadingStatsService
 
 # Добавляем путь к фабрике для импорта
 factory_path = Path(__file__).parent
@@ -22,10 +25,78 @@ if str(factory_path) not in sys.path:
 from test_data_factory.generators.publishers_loader import load_publishers_from_json
 from test_data_factory.generators.authors_loader import load_authors_from_json
 from test_data_factory.generators.book_generator import BookGenerator
-from test_data_factory.generators.image_generator import generate_book_images, generate_book_pages
+from test_data_factory.generators.image_generator import generate_book_images, generate_book_pages, generate_book_images_batch
 
 User = get_user_model()
 
+# Тексты для отзывов
+REVIEW_TEXTS = [
+    "Отличная книга, рекомендую!",
+    "Очень интересное произведение.",
+    "Неожиданный поворот сюжета.",
+    "Классика, которую стоит прочитать.",
+    "Интересно, но не без недостатков.",
+    "Прекрасное произведение, впечатлен.",
+    "На любителя, но мне понравилось.",
+    "Сложное, но стоящее чтение.",
+    "Легко читается, рекомендую.",
+    "Не самое лучшее произведение автора.",
+    "Потрясающая книга!",
+    "Очень понравилось, буду перечитывать.",
+    "Хорошее произведение, но есть минусы.",
+    "Рекомендую всем любителям этого жанра.",
+    "Интересная книга, но не без изъянов.",
+    "Великолепно написано!",
+    "Стоит прочитать каждому.",
+    "Не произвело особого впечатления.",
+    "Отличный сюжет, рекомендую.",
+    "Хорошая книга для отдыха.",
+]
+
+# Заметки к датам прочтения
+READING_NOTES = [
+    'Прочитал с удовольствием',
+    'Отличная книга',
+    'Перечитал, еще лучше',
+    'Впечатлен',
+    'Рекомендую',
+]
+
+
+def random_review() -> tuple[Optional[int], str]:
+    """
+    Случайный отзыв (rating, review_text):
+    30% - только звезды, 30% - только текст, 35% - звезды + текст,
+    5% - пустой отзыв (для тестирования)
+    """
+    review_type = random.random()
+    if review_type < 0.30:
+        return random.randint(1, 5), ""
+    if review_type < 0.60:
+        return None, random.choice(REVIEW_TEXTS)
+    if review_type < 0.95:
+        return random.randint(1, 5), random.choice(REVIEW_TEXTS)
+    return None, ""
+
+
+def random_reading_dates() -> list:
+    """
+    Даты прочтения (от 1 до 5 без повторов, от года назад до сегодня).
+    Каждое следующее прочтение - через 7-180 дней после предыдущего
+    """
+    from datetime import date, timedelta
+    
+    today = date.today()
+    days_ago = random.randint(30, 365)  # Первое прочтение - от месяца до года назад
+    dates = []
+    for reading_num in range(random.randint(1, 5)):
+        if reading_num > 0:
+            days_ago = max(0, days_ago - random.randint(7, 180))
+        read_date = today - timedelta(days=days_ago)
+        if read_date not in dates:
+            dates.append(read_date)
+    return dates
+
 
 class TestDataFactory:
     """Фабрика для генерации тестовых данных"""
@@ -467,13 +538,88 @@ class TestDataFactory:
         
         return authors_list, publishers_list
     
-    def generate_books_for_all_categories(self, books_per_category: int = 3, distribute_to_all_libraries: bool = True):
+    def generate_authors(self, count: int, prefix: str = 'Автор') -> list:
+        """
+        Создает дополнительных (синтетических) авторов одним bulk_create
+        и добавляет их в пул авторов для книг
+        
+        Args:
+            count: Количество авторов
+            prefix: Префикс ФИО ("Автор 1", "Автор 2", ...)
+        
+        Returns:
+            list: Созданные авторы
+        """
+        if not self.authors:
+            self.ensure_authors_and_publishers_in_db()
+        
+        names = [f'{prefix} {index}' for index in range(1, count + 1)]
+        existing_names = set(Author.objects.filter(full_name__in=names).values_list('full_name', flat=True))
+        Author.objects.bulk_create(
+            [Author(full_name=name) for name in names if name not in existing_names],
+            batch_size=1000
+        )
+        created = list(Author.objects.filter(full_name__in=names))
+        known_ids = {author.id for author in self.authors}
+        self.authors.extend(author for author in created if author.id not in known_ids)
+        print(f"  ✓ Создано дополнительных авторов: {count - len(existing_names)}")
+        return created
+    
+    def generate_hashtags(self, count: int, prefix: str = 'тег') -> list:
+        """
+        Создает дополнительные хэштеги текущего пользователя одним bulk_create
+        и добавляет их в пул хэштегов для книг
+        
+        Args:
+            count: Количество хэштегов
+            prefix: Префикс названия ("тег_1", "тег_2", ...)
+        
+        Returns:
+            list: Созданные хэштеги
+        """
+        if not self.user:
+            raise ValueError("Необходимо сначала создать пользователя (ensure_user_and_library)")
+        
+        from django.utils.text import slugify
+        existing_slugs = set(Hashtag.objects.values_list('slug', flat=True))
+        existing_names = set(Hashtag.objects.filter(creator=self.user).values_list('name', flat=True))
+        
+        new_hashtags = []
+        for index in range(1, count + 1):
+            name = f'{prefix}_{index}'
+            if name in existing_names:
+                continue
+            # Кириллица в slugify не сохраняется - добавляем латинскую основу
+            base_slug = slugify(f'tag-{prefix}-{index}') or f'tag-{index}'
+            slug = base_slug
+            counter = 1
+            while slug in existing_slugs:
+                slug = f'{base_slug}-{counter}'
+                counter += 1
+            existing_slugs.add(slug)
+            new_hashtags.append(Hashtag(name=name, slug=slug, creator=self.user))
+        
+        Hashtag.objects.bulk_create(new_hashtags, batch_size=1000)
+        created = list(Hashtag.objects.filter(creator=self.user, name__startswith=f'{prefix}_'))
+        known_ids = {hashtag.id for hashtag in self.hashtags}
+        self.hashtags.extend(hashtag for hashtag in created if hashtag.id not in known_ids)
+        print(f"  ✓ Создано дополнительных хэштегов: {len(new_hashtags)}")
+        return created
+    
+    def generate_books_for_all_categories(
+        self,
+        books_per_category: int = 3,
+        distribute_to_all_libraries: bool = True,
+        with_media: bool = True
+    ):
         """
         Генерирует книги для всех категорий
         
         Args:
             books_per_category: Количество книг на категорию
             distribute_to_all_libraries: Если True, распределяет книги равномерно между всеми библиотеками
+            with_media: Генерировать изображения, страницы и электронные версии
+                (False - только строки БД, для быстрого наполнения)
         """
         if not self.categories:
             self.load_data()
@@ -559,66 +705,67 @@ class TestDataFactory:
                                 order=order
                             )
                         
-                        # Генерируем изображения
-                        try:
-                            image_paths = generate_book_images(
-                                title=book.title,
-                                count=3,
-                                output_dir=self.output_images_dir
-                            )
+                        if with_media:
+                            # Генерируем изображения
+                            try:
+                                image_paths = generate_book_images(
+                                    title=book.title,
+                                    count=3,
+                                    output_dir=self.output_images_dir
+                                )
                             
-                            # Создаем записи BookImage
-                            for order, img_path in enumerate(image_paths, start=1):
-                                with open(img_path, 'rb') as img_file:
-                                    book_image = BookImage(
-                                        book=book,
-                                        order=order
-                                    )
-                                    book_image.image.save(
-                                        img_path.name,
-                                        File(img_file),
-                                        save=True
-                                    )
+                                # Создаем записи BookImage
+                                for order, img_path in enumerate(image_paths, start=1):
+                                    with open(img_path, 'rb') as img_file:
+                                        book_image = BookImage(
+                                            book=book,
+                                            order=order
+                                        )
+                                        book_image.image.save(
+                                            img_path.name,
+                                            File(img_file),
+                                            save=True
+                                        )
                             
-                        except Exception as e:
-                            print(f"    ⚠️  Ошибка генерации изображений: {e}")
+                            except Exception as e:
+                                print(f"    ⚠️  Ошибка генерации изображений: {e}")
                         
-                        # Генерируем страницы книги (от 1 до 5 страниц)
-                        try:
-                            num_pages = random.randint(1, 5)
-                            page_paths = generate_book_pages(
-                                title=book.title,
-                                count=num_pages,
-                                output_dir=self.output_images_dir
-                            )
+                            # Генерируем страницы книги (от 1 до 5 страниц)
+                            try:
+                                num_pages = random.randint(1, 5)
+                                page_paths = generate_book_pages(
+                                    title=book.title,
+                                    count=num_pages,
+                                    output_dir=self.output_images_dir
+                                )
                             
-                            # Создаем записи BookPage
-                            first_page = None
-                            for page_number, page_path in enumerate(page_paths, start=1):
-                                with open(page_path, 'rb') as page_file:
-                                    book_page = BookPage(
-                                        book=book,
-                                        page_number=page_number,
-                                        processing_status='pending',
-                                        width=1200,  # Стандартная ширина страницы
-                                        height=1600  # Стандартная высота страницы
-                                    )
-                                    book_page.original_image.save(
-                                        page_path.name,
-                                        File(page_file),
-                                        save=True
-                                    )
-                                    # Сохраняем первую страницу как обложку
-                                    if page_number == 1:
-                                        first_page = book_page
+                                # Создаем записи BookPage
+                                first_page = None
+                                for page_number, page_path in enumerate(page_paths, start=1):
+                                    with open(page_path, 'rb') as page_file:
+                                        book_page = BookPage(
+                                            book=book,
+                                            page_number=page_number,
+                                            processing_status='pending',
+                                            width=1200,  # Стандартная ширина страницы
+                                            height=1600  # Стандартная высота страницы
+                                        )
+                                        book_page.original_image.save(
+                                            page_path.name,
+                                            File(page_file),
+                                            save=True
+                                        )
+                                        # Сохраняем первую страницу как обложку
+                                        if page_number == 1:
+                                            first_page = book_page
                             
-                            # Назначаем первую страницу как обложку
-                            if first_page:
-                                book.cover_page = first_page
-                                book.save(update_fields=['cover_page'])
+                                # Назначаем первую страницу как обложку
+                                if first_page:
+                                    book.cover_page = first_page
+                                    book.save(update_fields=['cover_page'])
                             
-                        except Exception as e:
-                            print(f"    ⚠️  Ошибка генерации страниц: {e}")
+                            except Exception as e:
+                                print(f"    ⚠️  Ошибка генерации страниц: {e}")
                         
                         # Добавляем хэштеги к половине книг (50% вероятность)
                         if random.random() < 0.5 and self.hashtags:
@@ -644,55 +791,11 @@ class TestDataFactory:
                             if not all_users:
                                 all_users = [library_owner]
                             
-                            # Тексты для отзывов
-                            review_texts = [
-                                "Отличная книга, рекомендую!",
-                                "Очень интересное произведение.",
-                                "Неожиданный поворот сюжета.",
-                                "Классика, которую стоит прочитать.",
-                                "Интересно, но не без недостатков.",
-                                "Прекрасное произведение, впечатлен.",
-                                "На любителя, но мне понравилось.",
-                                "Сложное, но стоящее чтение.",
-                                "Легко читается, рекомендую.",
-                                "Не самое лучшее произведение автора.",
-                                "Потрясающая книга!",
-                                "Очень понравилось, буду перечитывать.",
-                                "Хорошее произведение, но есть минусы.",
-                                "Рекомендую всем любителям этого жанра.",
-                                "Интересная книга, но не без изъянов.",
-                                "Великолепно написано!",
-                                "Стоит прочитать каждому.",
-                                "Не произвело особого впечатления.",
-                                "Отличный сюжет, рекомендую.",
-                                "Хорошая книга для отдыха.",
-                            ]
-                            
                             # Создаем отзывы от разных пользователей
                             selected_users = random.sample(all_users, min(num_reviews, len(all_users)))
                             
                             for user in selected_users:
-                                # Варианты отзывов:
-                                # 30% - только звезды
-                                # 30% - только текст
-                                # 35% - звезды + текст
-                                # 5% - пустой отзыв (для тестирования)
-                                review_type = random.random()
-                                
-                                rating = None
-                                review_text = ""
-                                
-                                if review_type < 0.30:
-                                    # Только звезды
-                                    rating = random.randint(1, 5)
-                                elif review_type < 0.60:
-                                    # Только текст
-                                    review_text = random.choice(review_texts)
-                                elif review_type < 0.95:
-                                    # Звезды + текст
-                                    rating = random.randint(1, 5)
-                                    review_text = random.choice(review_texts)
-                                # else: пустой отзыв (для тестирования)
+                                rating, review_text = random_review()
                                 
                                 # Создаем отзыв (upsert - если отзыв уже есть от этого пользователя, обновляем)
                                 BookReview.objects.update_or_create(
@@ -707,7 +810,7 @@ class TestDataFactory:
                             print(f"    ⚠️  Ошибка создания отзывов: {e}")
                         
                         # Генерируем электронные версии для части книг (60% вероятность)
-                        if random.random() < 0.6:
+                        if with_media and random.random() < 0.6:
                             try:
                                 import tempfile
                                 import os
@@ -751,61 +854,16 @@ class TestDataFactory:
                         # Для want_to_reread тоже генерируем даты, так как книга уже была прочитана
                         if book.status == 'read' or book.status == 'want_to_reread':
                             try:
-                                from datetime import datetime, timedelta
-                                
-                                # Количество прочтений (от 1 до 5, для реалистичности)
-                                num_readings = random.randint(1, 5)
-                                
-                                # Генерируем даты прочтения (от 1 года назад до сегодня)
-                                # Первое прочтение - самое раннее
-                                days_ago_first = random.randint(30, 365)  # От месяца до года назад
-                                
-                                # Используем set для отслеживания уже созданных дат, чтобы избежать дубликатов
-                                created_dates = set()
-                                
-                                for reading_num in range(num_readings):
-                                    # Каждое следующее прочтение не раньше предыдущего
-                                    # Но не позже сегодня
-                                    if reading_num == 0:
-                                        # Первое прочтение
-                                        days_ago = days_ago_first
-                                    else:
-                                        # Последующие прочтения - через некоторое время после предыдущего
-                                        # Минимум 7 дней, максимум 180 дней после предыдущего
-                                        days_ago = max(0, days_ago - random.randint(7, 180))
-                                    
-                                    # Вычисляем дату прочтения
-                                    read_date = datetime.now().date() - timedelta(days=days_ago)
-                                    
-                                    # Проверяем, что такой даты еще нет для этой книги
-                                    if read_date in created_dates:
-                                        # Если дата уже есть, добавляем 1 день
-                                        read_date = read_date + timedelta(days=1)
-                                        days_ago = max(0, days_ago - 1)
-                                    
-                                    # Проверяем, что дата не в будущем
-                                    if read_date > datetime.now().date():
-                                        read_date = datetime.now().date()
-                                    
+                                for read_date in random_reading_dates():
                                     # Проверяем, что такая дата еще не существует в БД для этой книги
                                     if BookReadingDate.objects.filter(book=book, date=read_date).exists():
-                                        # Если уже существует, пропускаем эту дату
                                         continue
                                     
-                                    # Добавляем дату в set
-                                    created_dates.add(read_date)
-                                    
                                     # Создаем запись о прочтении
                                     BookReadingDate.objects.create(
                                         book=book,
                                         date=read_date,
-                                        notes='' if random.random() < 0.7 else random.choice([
-                                            'Прочитал с удовольствием',
-                                            'Отличная книга',
-                                            'Перечитал, еще лучше',
-                                            'Впечатлен',
-                                            'Рекомендую'
-                                        ])
+                                        notes='' if random.random() < 0.7 else random.choice(READING_NOTES)
                                     )
                             except Exception as e:
                                 print(f"    ⚠️  Ошибка создания дат прочтения: {e}")
@@ -817,6 +875,252 @@ class TestDataFactory:
         print(f"\n✅ Создано книг: {created_count}")
         return created_count
     
+    def generate_books_bulk(
+        self,
+        books_per_category: int = 3,
+        total_books: Optional[int] = None,
+        batch_size: int = 5000,
+        distribute_to_all_libraries: bool = True,
+        images: str = 'skip',
+        image_workers: Optional[int] = None,
+        image_variants: Optional[int] = None,
+        use_copy: Optional[bool] = None,
+    ) -> dict:
+        """
+        Быстрая генерация книг: строки формируются в памяти пачками и вставляются
+        через bulk_create (одна транзакция на пачку). Авторы, хэштеги, отзывы и даты
+        прочтения создаются одним bulk_create на пачку.
+        
+        В отличие от generate_books_for_all_categories страницы и электронные версии
+        не создаются, сигналы и save() моделей не вызываются.
+        
+        Args:
+            books_per_category: Количество книг на категорию (если не указан total_books)
+            total_books: Общее количество книг (категории берутся по кругу)
+            batch_size: Размер пачки (книг на транзакцию)
+            distribute_to_all_libraries: Распределять книги между всеми библиотеками
+            images: 'skip' - без изображений, 'pool' - изображения (3 на книгу)
+                рендерятся в пуле процессов
+            image_workers: Количество процессов для изображений (по умолчанию - число CPU)
+            image_variants: Рендерить только столько вариантов изображений, книгам -
+                жесткие ссылки на них (для миллионов книг без миллионов кодирований)
+            use_copy: Вставлять связанные строки через COPY (по умолчанию - на PostgreSQL);
+                книги всегда вставляются через bulk_create, чтобы получить id
+        
+        Returns:
+            dict: Количество созданных строк по таблицам, время и скорость (строк/с)
+        """
+        import time
+        
+        if images not in ('skip', 'pool'):
+            raise ValueError("images должен быть 'skip' или 'pool'")
+        if not self.categories:
+            self.load_data()
+        if not self.authors or not self.publishers:
+            self.ensure_authors_and_publishers_in_db()
+        if not self.languages:
+            self._ensure_languages_in_db()
+        
+        if distribute_to_all_libraries and self.all_libraries:
+            libraries_to_use = self.all_libraries
+        else:
+            if not self.user or not self.library:
+                raise ValueError("Необходимо вызвать ensure_user_and_library() перед генерацией")
+            libraries_to_use = [self.library]
+        if not self.hashtags:
+            self.user = self.user or libraries_to_use[0].owner
+            self._ensure_hashtags_in_db()
+        
+        categories = list(self.categories)
+        if total_books is None:
+            total_books = len(categories) * books_per_category
+        user_ids = list(User.objects.values_list('id', flat=True))
+        hashtag_ids = [hashtag.id for hashtag in self.hashtags]
+        authors_pool = self.authors.copy()
+        random.shuffle(authors_pool)
+        
+        if use_copy is None:
+            use_copy = connection.vendor == 'postgresql'
+        image_field = BookImage._meta.get_field('image')
+        
+        stats = {
+            'books': 0,
+            'book_authors': 0,
+            'book_hashtags': 0,
+            'reviews': 0,
+            'reading_dates': 0,
+            'images': 0,
+        }
+        print(f"\n⚡ Быстрая генерация {total_books} книг (пачки по {batch_size}, изображения: {images})...")
+        started = time.perf_counter()
+        
+        for batch_start in range(0, total_books, batch_size):
+            batch_end = min(batch_start + batch_size, total_books)
+            books = []
+            books_authors = []
+            for index in range(batch_start, batch_end):
+                # Каждый автор пула используется хотя бы раз: основной автор берется по кругу
+                book_authors = [authors_pool[index % len(authors_pool)]]
+                for author in random.sample(authors_pool, min(random.randint(0, 2), len(authors_pool))):
+                    if author not in book_authors:
+                        book_authors.append(author)
+                library = libraries_to_use[index % len(libraries_to_use)]
+                category = categories[index % len(categories)]
+                books.append(Book(**BookGenerator.generate_book_data(
+                    category=category,
+                    authors=book_authors,
+                    publisher=self.publishers[index % len(self.publishers)],
+                    library=library,
+                    owner=library.owner,
+                    category_name=category.name,
+                    languages=self.languages
+                )))
+                books_authors.append(book_authors)
+            
+            image_paths = []
+            if images == 'pool':
+                image_paths = generate_book_images_batch(
+                    [book.title for book in books],
+                    count=3,
+                    output_dir=self.output_images_dir,
+                    workers=image_workers,
+                    variants=image_variants
+                )
+            
+            with transaction.atomic():
+                Book.objects.bulk_create(books, batch_size=batch_size)
+                
+                rows = self._bulk_related_rows(books, books_authors, user_ids, hashtag_ids)
+                for key, model in (
+                    ('book_authors', BookAuthor),
+                    ('book_hashtags', BookHashtag),
+                    ('reviews', BookReview),
+                    ('reading_dates', BookReadingDate),
+                ):
+                    if use_copy:
+                        self._copy_rows(model, rows[key])
+                    else:
+                        model.objects.bulk_create(rows[key], batch_size=batch_size)
+                    stats[key] += len(rows[key])
+                
+                book_images = []
+                for book, paths in zip(books, image_paths):
+                    for order, path in enumerate(paths, start=1):
+                        name = self._store_file(image_field, path)
+                        path.unlink(missing_ok=True)
+                        book_images.append(BookImage(book=book, image=name, order=order))
+                BookImage.objects.bulk_create(book_images, batch_size=batch_size)
+                stats['images'] += len(book_images)
+            
+            stats['books'] += len(books)
+            elapsed = time.perf_counter() - started
+            print(f"  ✓ {stats['books']}/{total_books} книг ({stats['books'] / elapsed:.0f} книг/с)")
+        
+        # bulk_create не отправляет сигналы - частоты хэштегов и статистика чтения пересчитываются
+        # для затронутых библиотек и их владельцев
+        HashtagCountService.rebuild(library_ids={library.id for library in libraries_to_use})
+        ReadingStatsService.rebuild(user_ids={library.owner_id for library in libraries_to_use})
+        
+        elapsed = time.perf_counter() - started
+        rows_total = sum(stats.values())
+        stats.update({
+            'rows': rows_total,
+            'elapsed_s': round(elapsed, 3),
+            'books_per_second': round(stats['books'] / elapsed, 1) if elapsed else 0.0,
+            'rows_per_second': round(rows_total / elapsed, 1) if elapsed else 0.0,
+        })
+        print(
+            f"\n✅ Создано книг: {stats['books']}, всего строк: {rows_total} за {stats['elapsed_s']} с "
+            f"({stats['books_per_second']} книг/с, {stats['rows_per_second']} строк/с)"
+        )
+        return stats
+    
+    @staticmethod
+    def _store_file(field, path: Path) -> str:
+        """
+        Помещает файл в хранилище поля. Для файлового хранилища - жесткой ссылкой
+        (без копирования, варианты изображений не дублируются на диске)
+        """
+        storage = field.storage
+        name = field.generate_filename(None, path.name)
+        try:
+            name = storage.get_available_name(name)
+            target = Path(storage.path(name))
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.link(path, target)
+            return name
+        except (NotImplementedError, OSError):
+            with open(path, 'rb') as file:
+                return storage.save(name, File(file))
+    
+    @staticmethod
+    def _copy_rows(model, objects: list) -> None:
+        """
+        Вставка строк через COPY FROM STDIN (PostgreSQL, текстовый формат).
+        Значения готовятся так же, как в bulk_create (pre_save заполняет auto_now_add)
+        """
+        if not objects:
+            return
+        fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+        
+        def encode(value) -> str:
+            if value is None:
+                return '\\N'
+            if isinstance(value, bool):
+                return 't' if value else 'f'
+            return (
+                str(value).replace('\\', '\\\\').replace('\t', '\\t')
+                .replace('\n', '\\n').replace('\r', '\\r')
+            )
+        
+        buffer = io.StringIO()
+        for obj in objects:
+            values = [field.get_db_prep_save(field.pre_save(obj, add=True), connection) for field in fields]
+            buffer.write('\t'.join(encode(value) for value in values))
+            buffer.write('\n')
+        buffer.seek(0)
+        
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN',
+                buffer
+            )
+    
+    @staticmethod
+    def _bulk_related_rows(books: list, books_authors: list, user_ids: list, hashtag_ids: list) -> dict:
+        """
+        Связанные строки для пачки книг (с уже назначенными id):
+        авторы, хэштеги (у половины книг), отзывы (5-20 на книгу),
+        даты прочтения (для статусов read и want_to_reread)
+        """
+        rows = {'book_authors': [], 'book_hashtags': [], 'reviews': [], 'reading_dates': []}
+        
+        for book, book_authors in zip(books, books_authors):
+            for order, author in enumerate(book_authors, start=1):
+                rows['book_authors'].append(BookAuthor(book_id=book.id, author_id=author.id, order=order))
+            
+            if hashtag_ids and random.random() < 0.5:
+                for hashtag_id in random.sample(hashtag_ids, random.randint(1, min(20, len(hashtag_ids)))):
+                    rows['book_hashtags'].append(BookHashtag(book_id=book.id, hashtag_id=hashtag_id))
+            
+            reviewers = user_ids or [book.owner_id]
+            for user_id in random.sample(reviewers, min(random.randint(5, 20), len(reviewers))):
+                rating, review_text = random_review()
+                rows['reviews'].append(BookReview(
+                    book_id=book.id, user_id=user_id, rating=rating, review_text=review_text
+                ))
+            
+            if book.status in ('read', 'want_to_reread'):
+                for read_date in random_reading_dates():
+                    rows['reading_dates'].append(BookReadingDate(
+                        book_id=book.id,
+                        date=read_date,
+                        notes='' if random.random() < 0.7 else random.choice(READING_NOTES)
+                    ))
+        
+        return rows
+    
     def cleanup(self):
         """Удаляет временные файлы"""
         import shutil
@@ -1,19 +1,30 @@
 """
 Загрузчик авторов из JSON файла
 """
-import json
 from pathlib import Path
+from typing import Iterator
 
+from test_data_factory.generators.json_stream import iter_json_array
 
-def load_authors_from_json(json_path: Path = None) -> list[dict]:
+
+def default_authors_path() -> Path:
+    """Путь к JSON файлу авторов по умолчанию"""
+    base_dir = Path(__file__).parent.parent.parent
+    # Пробуем сначала новый файл, потом старый для обратной совместимости
+    new_path = base_dir / 'test_data_factory' / 'data' / 'russian_authors_full_merged.json'
+    old_path = base_dir / 'test_data_factory' / 'data' / 'russian_authors_batch1_structured.json'
+    return new_path if new_path.exists() else old_path
+
+
+def iter_authors_from_json(json_path: Path = None) -> Iterator[dict]:
     """
-    Загружает авторов из JSON файла и преобразует в формат для создания Author
+    Потоково читает авторов из JSON файла (по одному, без загрузки файла целиком)
     
     Args:
         json_path: Путь к JSON файлу. Если None, использует дефолтный путь.
     
-    Returns:
-        Список словарей с данными авторов:
+    Yields:
+        Словари с данными авторов:
         {
             'full_name': str,  # Фамилия Имя Отчество
             'birth_year': int or None,
@@ -22,18 +33,9 @@ def load_authors_from_json(json_path: Path = None) -> list[dict]:
         }
     """
     if json_path is None:
-        # Определяем путь относительно корня проекта
-        base_dir = Path(__file__).parent.parent.parent
-        # Пробуем сначала новый файл, потом старый для обратной совместимости
-        new_path = base_dir / 'test_data_factory' / 'data' / 'russian_authors_full_merged.json'
-        old_path = base_dir / 'test_data_factory' / 'data' / 'russian_authors_batch1_structured.json'
-        json_path = new_path if new_path.exists() else old_path
-    
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+        json_path = default_authors_path()
     
-    authors = []
-    for item in data:
+    for item in iter_json_array(json_path):
         surname = item.get('Фамилия', '').strip()
         name = item.get('Имя', '').strip()
         patronymic = item.get('Отчество')
@@ -48,16 +50,25 @@ def load_authors_from_json(json_path: Path = None) -> list[dict]:
         if not full_name:
             continue
         
-        author = {
+        yield {
             'full_name': full_name,
             'birth_year': item.get('год рождения'),
             'death_year': item.get('год смерти'),
-            'biography': item.get('короткая биография', '').strip(),
+            'biography': (item.get('короткая биография') or '').strip(),
         }
-        
-        authors.append(author)
+
+
+def load_authors_from_json(json_path: Path = None) -> list[dict]:
+    """
+    Загружает авторов из JSON файла и преобразует в формат для создания Author
     
-    return authors
+    Args:
+        json_path: Путь к JSON файлу. Если None, использует дефолтный путь.
+    
+    Returns:
+        Список словарей с данными авторов (см. iter_authors_from_json)
+    """
+    return list(iter_authors_from_json(json_path))
 
 
 if __name__ == '__main__':
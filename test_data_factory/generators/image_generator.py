@@ -1,8 +1,16 @@
 """
 Генератор изображений книг
 """
+import io
+import os
 import random
+import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
 from pathlib import Path
+from typing import Optional
 from PIL import Image, ImageDraw, ImageFont
 
 
@@ -30,6 +38,133 @@ TEXT_COLORS = [
     (50, 40, 40),      # Темно-бордовый
 ]
 
+# Шрифты по порядку предпочтения (macOS, Linux)
+FONT_PATHS = {
+    False: ["/System/Library/Fonts/Helvetica.ttc", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"],
+    True: ["/System/Library/Fonts/Helvetica.ttc", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"],
+}
+
+IMAGE_QUALITY = 85
+PAGE_QUALITY = 90
+
+# Пулы вариантов для generate_*_batch(variants=N): ключ -> пути к файлам вариантов
+_VARIANT_POOLS: dict = {}
+
+
+@lru_cache(maxsize=None)
+def load_font(size: int, bold: bool = False):
+    """Шрифт нужного размера (ищется и загружается один раз на процесс)"""
+    for path in FONT_PATHS[bold]:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
+    # Fallback на стандартный шрифт
+    return ImageFont.load_default()
+
+
+def wrap_title(title: str, max_chars_per_line: int, max_lines: int) -> list[str]:
+    """Разбивает длинный заголовок на строки по словам"""
+    lines = []
+    current_line = []
+    for word in title.split():
+        if len(' '.join(current_line + [word])) <= max_chars_per_line:
+            current_line.append(word)
+        else:
+            if current_line:
+                lines.append(' '.join(current_line))
+            current_line = [word]
+    if current_line:
+        lines.append(' '.join(current_line))
+    return lines[:max_lines]
+
+
+def _encode_jpeg(img: Image.Image, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, 'JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=64)
+def encoded_background(width: int, height: int, color: tuple, quality: int) -> bytes:
+    """Однотонное изображение в JPEG (кодируется один раз на размер и цвет)"""
+    return _encode_jpeg(Image.new('RGB', (width, height), color=color), quality)
+
+
+def _draw_centered_lines(
+    img: Image.Image,
+    lines: list[str],
+    font,
+    line_height: int,
+    start_y: int,
+    fill: tuple,
+    shadow_offset: int = 0
+) -> None:
+    """Рисует строки по центру (ширина строки - по метрикам шрифта, без textbbox)"""
+    draw = ImageDraw.Draw(img)
+    width = img.size[0]
+    for i, line in enumerate(lines):
+        x = (width - int(font.getlength(line))) // 2
+        y = start_y + i * line_height
+        if shadow_offset:
+            draw.text((x + shadow_offset, y + shadow_offset), line, font=font, fill=(0, 0, 0))
+        draw.text((x, y), line, font=font, fill=fill)
+
+
+def render_book_image(title: str, order: int, width: int = 800, height: int = 1200) -> bytes:
+    """
+    JPEG изображения книги: order=1 - с названием, 2-3 - однотонные
+    (однотонные берутся из кэша закодированных фонов)
+    """
+    color = random.choice(COLOR_PALETTE)
+    if order != 1 or not title:
+        return encoded_background(width, height, color, IMAGE_QUALITY)
+
+    font_size = 48
+    font = load_font(font_size)
+    lines = wrap_title(title, max_chars_per_line=20, max_lines=5)
+    line_height = font_size + 10
+    start_y = (height - len(lines) * line_height) // 2
+
+    img = Image.new('RGB', (width, height), color=color)
+    # Темный цвет текста для контраста, тень для лучшей читаемости
+    _draw_centered_lines(img, lines, font, line_height, start_y, random.choice(TEXT_COLORS), shadow_offset=2)
+    return _encode_jpeg(img, IMAGE_QUALITY)
+
+
+def render_book_page(title: str, page_number: int, width: int = 1200, height: int = 1600) -> bytes:
+    """
+    JPEG страницы книги: 1 - титульная с названием, остальные - пустые
+    (пустые берутся из кэша закодированных фонов)
+    """
+    # Белый или слегка серый фон, как настоящая страница
+    bg_color = (255, 255, 255) if random.random() < 0.9 else (248, 248, 248)
+    if page_number != 1 or not title:
+        return encoded_background(width, height, bg_color, PAGE_QUALITY)
+
+    font_size = 72
+    font = load_font(font_size, bold=True)
+    lines = wrap_title(title, max_chars_per_line=25, max_lines=6)
+    line_height = font_size + 20
+    # По центру, чуть выше середины
+    start_y = (height - len(lines) * line_height) // 2 - 50
+
+    img = Image.new('RGB', (width, height), color=bg_color)
+    _draw_centered_lines(img, lines, font, line_height, start_y, (30, 30, 30))
+    return _encode_jpeg(img, PAGE_QUALITY)
+
+
+def _unique_path(output_dir: Path, prefix: str) -> Path:
+    """Путь с уникальным именем (без перезаписи файлов других книг)"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    return output_dir / f"{prefix}_{uuid.uuid4().hex[:12]}.jpg"
+
+
+def _write(output_dir: Path, prefix: str, data: bytes) -> Path:
+    filepath = _unique_path(output_dir, prefix)
+    filepath.write_bytes(data)
+    return filepath
+
 
 def generate_book_image(
     title: str,
@@ -40,90 +175,18 @@ def generate_book_image(
 ) -> Path:
     """
     Генерирует изображение книги
-    
+
     Args:
         title: Название книги (для главного изображения)
         order: Порядок изображения (1 - главное с текстом, 2-3 - однотонные)
         output_dir: Директория для сохранения
         width: Ширина изображения
         height: Высота изображения
-    
+
     Returns:
         Path к созданному файлу изображения
     """
-    # Создаем изображение
-    img = Image.new('RGB', (width, height), color=random.choice(COLOR_PALETTE))
-    draw = ImageDraw.Draw(img)
-    
-    # Для главного изображения (order=1) добавляем текст
-    if order == 1 and title:
-        try:
-            # Пытаемся использовать стандартный шрифт
-            # На macOS может быть другой путь
-            font_size = 48
-            try:
-                font = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", font_size)
-            except:
-                try:
-                    font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", font_size)
-                except:
-                    # Fallback на стандартный шрифт
-                    font = ImageFont.load_default()
-        except:
-            font = ImageFont.load_default()
-        
-        # Разбиваем длинный заголовок на строки
-        words = title.split()
-        lines = []
-        current_line = []
-        max_chars_per_line = 20
-        
-        for word in words:
-            if len(' '.join(current_line + [word])) <= max_chars_per_line:
-                current_line.append(word)
-            else:
-                if current_line:
-                    lines.append(' '.join(current_line))
-                current_line = [word]
-        
-        if current_line:
-            lines.append(' '.join(current_line))
-        
-        # Ограничиваем количество строк (максимум 5)
-        lines = lines[:5]
-        
-        # Выбираем цвет текста (темный для контраста)
-        text_color = random.choice(TEXT_COLORS)
-        
-        # Вычисляем позицию для текста (по центру)
-        total_height = len(lines) * (font_size + 10)
-        start_y = (height - total_height) // 2
-        
-        # Рисуем каждую строку
-        for i, line in enumerate(lines):
-            # Вычисляем ширину текста для центрирования
-            bbox = draw.textbbox((0, 0), line, font=font)
-            text_width = bbox[2] - bbox[0]
-            x = (width - text_width) // 2
-            y = start_y + i * (font_size + 10)
-            
-            # Рисуем тень для лучшей читаемости (опционально)
-            shadow_offset = 2
-            draw.text((x + shadow_offset, y + shadow_offset), line, 
-                     font=font, fill=(0, 0, 0, 100))
-            
-            # Рисуем основной текст
-            draw.text((x, y), line, font=font, fill=text_color)
-    
-    # Сохраняем изображение
-    output_dir.mkdir(parents=True, exist_ok=True)
-    filename = f"book_image_{order}_{random.randint(1000, 9999)}.jpg"
-    filepath = output_dir / filename
-    
-    # Сохраняем как JPEG
-    img.save(filepath, 'JPEG', quality=85)
-    
-    return filepath
+    return _write(output_dir, f"book_image_{order}", render_book_image(title, order, width, height))
 
 
 def generate_book_images(
@@ -133,21 +196,16 @@ def generate_book_images(
 ) -> list[Path]:
     """
     Генерирует несколько изображений для книги
-    
+
     Args:
         title: Название книги
         count: Количество изображений (обычно 3)
         output_dir: Директория для сохранения
-    
+
     Returns:
         Список путей к созданным файлам
     """
-    images = []
-    for order in range(1, count + 1):
-        img_path = generate_book_image(title, order, output_dir)
-        images.append(img_path)
-    
-    return images
+    return [generate_book_image(title, order, output_dir) for order in range(1, count + 1)]
 
 
 def generate_book_page(
@@ -159,85 +217,18 @@ def generate_book_page(
 ) -> Path:
     """
     Генерирует изображение страницы книги
-    
+
     Args:
         title: Название книги (для первой страницы)
         page_number: Номер страницы (1 - титульная с названием, остальные - пустые)
         output_dir: Директория для сохранения
         width: Ширина изображения (стандартный формат страницы)
         height: Высота изображения
-    
+
     Returns:
         Path к созданному файлу изображения
     """
-    # Создаем изображение страницы (белый фон, как настоящая страница)
-    bg_color = (255, 255, 255) if random.random() < 0.9 else (248, 248, 248)  # Белый или слегка серый
-    img = Image.new('RGB', (width, height), color=bg_color)
-    draw = ImageDraw.Draw(img)
-    
-    # Для первой страницы (титульной) добавляем название книги
-    if page_number == 1 and title:
-        try:
-            # Пытаемся использовать стандартный шрифт
-            font_size = 72
-            try:
-                font = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", font_size)
-            except:
-                try:
-                    font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", font_size)
-                except:
-                    # Fallback на стандартный шрифт
-                    font = ImageFont.load_default()
-        except:
-            font = ImageFont.load_default()
-        
-        # Разбиваем длинный заголовок на строки
-        words = title.split()
-        lines = []
-        current_line = []
-        max_chars_per_line = 25  # Для больших страниц больше символов
-        
-        for word in words:
-            if len(' '.join(current_line + [word])) <= max_chars_per_line:
-                current_line.append(word)
-            else:
-                if current_line:
-                    lines.append(' '.join(current_line))
-                current_line = [word]
-        
-        if current_line:
-            lines.append(' '.join(current_line))
-        
-        # Ограничиваем количество строк (максимум 6)
-        lines = lines[:6]
-        
-        # Цвет текста (темный, почти черный)
-        text_color = (30, 30, 30)
-        
-        # Вычисляем позицию для текста (по центру, чуть выше середины)
-        total_height = len(lines) * (font_size + 20)
-        start_y = (height - total_height) // 2 - 50
-        
-        # Рисуем каждую строку
-        for i, line in enumerate(lines):
-            # Вычисляем ширину текста для центрирования
-            bbox = draw.textbbox((0, 0), line, font=font)
-            text_width = bbox[2] - bbox[0]
-            x = (width - text_width) // 2
-            y = start_y + i * (font_size + 20)
-            
-            # Рисуем текст
-            draw.text((x, y), line, font=font, fill=text_color)
-    
-    # Сохраняем изображение
-    output_dir.mkdir(parents=True, exist_ok=True)
-    filename = f"book_page_{page_number}_{random.randint(1000, 9999)}.jpg"
-    filepath = output_dir / filename
-    
-    # Сохраняем как JPEG
-    img.save(filepath, 'JPEG', quality=90)
-    
-    return filepath
+    return _write(output_dir, f"book_page_{page_number}", render_book_page(title, page_number, width, height))
 
 
 def generate_book_pages(
@@ -247,39 +238,115 @@ def generate_book_pages(
 ) -> list[Path]:
     """
     Генерирует страницы книги
-    
+
     Args:
         title: Название книги (для первой страницы)
         count: Количество страниц (от 1 до 5)
         output_dir: Директория для сохранения
-    
+
     Returns:
         Список путей к созданным файлам страниц
     """
-    pages = []
-    for page_number in range(1, count + 1):
-        page_path = generate_book_page(title, page_number, output_dir)
-        pages.append(page_path)
-    
-    return pages
+    return [generate_book_page(title, page_number, output_dir) for page_number in range(1, count + 1)]
+
+
+def _map_titles(func, titles: list[str], count: int, output_dir: Path, workers: Optional[int]) -> list[list[Path]]:
+    """func(title, count, output_dir) для каждого названия, в пуле процессов при workers != 1"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(titles) < 2:
+        return [func(title, count, output_dir) for title in titles]
+    chunksize = max(1, len(titles) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, titles, repeat(count), repeat(output_dir), chunksize=chunksize))
+
+
+def _link(source: Path, output_dir: Path, prefix: str) -> Path:
+    """Жесткая ссылка на файл варианта (копия, если ссылки не поддерживаются)"""
+    target = _unique_path(output_dir, prefix)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+    return target
+
+
+def _generate_batch(
+    func,
+    prefix: str,
+    titles: list[str],
+    count: int,
+    output_dir: Path,
+    workers: Optional[int],
+    variants: Optional[int]
+) -> list[list[Path]]:
+    if not variants:
+        return _map_titles(func, titles, count, output_dir, workers)
+
+    # Пул вариантов рендерится один раз (пока файлы существуют), книги получают ссылки на них
+    key = (prefix, str(output_dir), count, variants)
+    pool = _VARIANT_POOLS.get(key)
+    if not pool or not all(path.exists() for paths in pool for path in paths):
+        sample = [titles[index % len(titles)] for index in range(variants)] if titles else []
+        pool = _VARIANT_POOLS[key] = _map_titles(func, sample, count, output_dir / 'variants', workers)
+
+    return [
+        [_link(path, output_dir, f"{prefix}_{number}") for number, path in enumerate(pool[index % variants], start=1)]
+        for index in range(len(titles))
+    ]
+
+
+def generate_book_images_batch(
+    titles: list[str],
+    count: int,
+    output_dir: Path,
+    workers: Optional[int] = None,
+    variants: Optional[int] = None
+) -> list[list[Path]]:
+    """
+    Генерирует изображения для многих книг
+
+    Args:
+        titles: Названия книг
+        count: Количество изображений на книгу
+        output_dir: Директория для сохранения
+        workers: Количество процессов (по умолчанию - число CPU, 1 - без пула)
+        variants: Если указано, рендерится только столько вариантов, а файлы книг -
+            жесткие ссылки на них (название на обложке может не совпадать с книгой)
+
+    Returns:
+        Списки путей к файлам для каждой книги (в порядке titles)
+    """
+    return _generate_batch(generate_book_images, 'book_image', titles, count, output_dir, workers, variants)
+
+
+def generate_book_pages_batch(
+    titles: list[str],
+    count: int,
+    output_dir: Path,
+    workers: Optional[int] = None,
+    variants: Optional[int] = None
+) -> list[list[Path]]:
+    """
+    Генерирует страницы для многих книг (параметры как у generate_book_images_batch)
+    """
+    return _generate_batch(generate_book_pages, 'book_page', titles, count, output_dir, workers, variants)
 
 
 if __name__ == '__main__':
     # Тест
     output_dir = Path(__file__).parent.parent / 'generated_images'
     title = "История русской литературы"
-    
+
     print("Генерирую тестовые изображения...")
     images = generate_book_images(title, 3, output_dir)
-    
+
     print(f"\nСоздано {len(images)} изображений:")
     for img_path in images:
         print(f"  - {img_path}")
-    
+
     print("\nГенерирую тестовые страницы...")
     pages = generate_book_pages(title, 5, output_dir)
-    
+
     print(f"\nСоздано {len(pages)} страниц:")
     for page_path in pages:
         print(f"  - {page_path}")
-
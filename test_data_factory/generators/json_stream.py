@@ -0,0 +1,85 @@
+"""
+Потоковое чтение JSON массивов (без загрузки всего файла в память)
+"""
+import json
+from pathlib import Path
+from typing import Any, Iterator
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _Reader:
+    """Буфер поверх файла, дочитываемый кусками"""
+
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def read_more(self) -> bool:
+        """Дочитывает кусок, отбрасывая уже разобранную часть буфера"""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        self.eof = not chunk
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return bool(chunk)
+
+    def next_char(self) -> str:
+        """Следующий непробельный символ (без продвижения), '' - конец файла"""
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position].isspace():
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.read_more():
+                return ''
+
+
+def iter_json_array(json_path: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Итерирует элементы JSON массива верхнего уровня по одному
+
+    В памяти находится только текущий кусок файла и недочитанный элемент.
+
+    Args:
+        json_path: Путь к JSON файлу с массивом верхнего уровня
+        chunk_size: Размер читаемого куска (символов)
+
+    Yields:
+        Элементы массива (обычно словари)
+    """
+    decoder = json.JSONDecoder()
+    with open(json_path, 'r', encoding='utf-8') as f:
+        reader = _Reader(f, chunk_size)
+        if reader.next_char() != '[':
+            raise ValueError(f'Ожидался JSON массив: {json_path}')
+        reader.position += 1
+        if reader.next_char() == ']':
+            return
+
+        while True:
+            reader.next_char()
+            # Элемент может быть обрезан границей куска - дочитываем, пока не разберется целиком
+            while True:
+                try:
+                    item, end = decoder.raw_decode(reader.buffer, reader.position)
+                except json.JSONDecodeError:
+                    if not reader.read_more():
+                        raise
+                    continue
+                if end == len(reader.buffer) and reader.read_more():
+                    continue
+                break
+            reader.position = end
+            yield item
+
+            separator = reader.next_char()
+            if separator == ']':
+                return
+            if separator != ',':
+                raise ValueError(f'Некорректный JSON массив: {json_path}')
+            reader.position += 1
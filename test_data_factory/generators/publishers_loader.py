@@ -1,19 +1,27 @@
 """
 Загрузчик издательств из JSON файла
 """
-import json
 from pathlib import Path
+from typing import Iterator
 
+from test_data_factory.generators.json_stream import iter_json_array
 
-def load_publishers_from_json(json_path: Path = None) -> list[dict]:
+
+def default_publishers_path() -> Path:
+    """Путь к JSON файлу издательств по умолчанию"""
+    base_dir = Path(__file__).parent.parent.parent
+    return base_dir / 'test_data_factory' / 'data' / 'russian_publishers_unified.json'
+
+
+def iter_publishers_from_json(json_path: Path = None) -> Iterator[dict]:
     """
-    Загружает издательства из JSON файла и преобразует в формат для создания Publisher
+    Потоково читает издательства из JSON файла (по одному, без загрузки файла целиком)
     
     Args:
         json_path: Путь к JSON файлу. Если None, использует дефолтный путь.
     
-    Returns:
-        Список словарей с данными издательств:
+    Yields:
+        Словари с данными издательств:
         {
             'name': str,
             'city': str,
@@ -22,27 +30,32 @@ def load_publishers_from_json(json_path: Path = None) -> list[dict]:
         }
     """
     if json_path is None:
-        # Определяем путь относительно корня проекта
-        base_dir = Path(__file__).parent.parent.parent
-        json_path = base_dir / 'test_data_factory' / 'data' / 'russian_publishers_unified.json'
-    
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+        json_path = default_publishers_path()
     
-    publishers = []
-    for item in data:
+    for item in iter_json_array(json_path):
         publisher = {
-            'name': item.get('Название', '').strip(),
-            'city': item.get('Город', '').strip(),
+            'name': (item.get('Название') or '').strip(),
+            'city': (item.get('Город') or '').strip(),
             'website': item.get('ссылка на сайт') if item.get('ссылка на сайт') else '',
-            'description': item.get('Описание', '').strip(),
+            'description': (item.get('Описание') or '').strip(),
         }
         
         # Пропускаем пустые названия
         if publisher['name']:
-            publishers.append(publisher)
+            yield publisher
+
+
+def load_publishers_from_json(json_path: Path = None) -> list[dict]:
+    """
+    Загружает издательства из JSON файла и преобразует в формат для создания Publisher
+    
+    Args:
+        json_path: Путь к JSON файлу. Если None, использует дефолтный путь.
     
-    return publishers
+    Returns:
+        Список словарей с данными издательств (см. iter_publishers_from_json)
+    """
+    return list(iter_publishers_from_json(json_path))
 
 
 if __name__ == '__main__':